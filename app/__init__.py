@@ -86,6 +86,13 @@ def create_app(config_class=Config):
     app.register_blueprint(assistants_bp, url_prefix='/assistants')
     app.register_blueprint(task_management_bp)  # Sprint 18: No URL prefix, uses /api/task_management
     
+    # Job workers run from startup (the handlers are registered by the agent routes), so queued
+    # executions and those abandoned by a recycled worker resume without waiting for a request
+    if app.config.get('JOB_WORKERS_AUTOSTART') and not app.testing:
+        from app.utils.job_queue import ensure_job_workers
+        with app.app_context():
+            ensure_job_workers(app)
+    
     # Logging setup
     if not app.debug:
         if not os.path.exists('logs'):
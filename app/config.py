@@ -13,6 +13,69 @@ class Config:
     # Data directory
     DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
     
+    # Storage backend for data managers: 'json' (one file per record) or 'sqlite'
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'json'
+    # SQLite database file, defaults to vntrai.db inside DATA_DIR
+    SQLITE_DB_PATH = os.environ.get('SQLITE_DB_PATH')
+    
+    # Maximum number of parsed records kept in memory per data manager
+    DATA_CACHE_SIZE = int(os.environ.get('DATA_CACHE_SIZE') or 2048)
+    
+    # Threads reading/writing record files in batch operations (load_many, save_many)
+    DATA_IO_WORKERS = int(os.environ.get('DATA_IO_WORKERS') or 8)
+    # fsync record files and directories on write (batch writes share one fsync per directory)
+    DATA_FSYNC = (os.environ.get('DATA_FSYNC') or 'false').lower() in ('1', 'true', 'yes')
+    # Threads running manager calls awaited from asyncio code (aload, asave, ...)
+    DATA_ASYNC_WORKERS = int(os.environ.get('DATA_ASYNC_WORKERS') or 4)
+    
+    # Task state patches journaled per agent run before they are folded into the run file
+    TASK_JOURNAL_COMPACT_ENTRIES = int(os.environ.get('TASK_JOURNAL_COMPACT_ENTRIES') or 50)
+    
+    # Seconds a writer waits for the lock of a record (e.g. an agent run) before giving up
+    RUN_LOCK_TIMEOUT = float(os.environ.get('RUN_LOCK_TIMEOUT') or 30)
+    
+    # Task outputs (html_output, raw_response) of at least this many characters go to DATA_DIR/blobs
+    BLOB_MIN_SIZE = int(os.environ.get('BLOB_MIN_SIZE') or 1024)
+    
+    # Finished agent runs not updated for this many days are moved to DATA_DIR/archive
+    RUN_ARCHIVE_AFTER_DAYS = float(os.environ.get('RUN_ARCHIVE_AFTER_DAYS') or 90)
+    # Size at which a new archive segment file is started
+    RUN_ARCHIVE_SEGMENT_MB = int(os.environ.get('RUN_ARCHIVE_SEGMENT_MB') or 64)
+    
+    # Tasks of one agent run executed at the same time by the run executor (independent tasks only)
+    RUN_MAX_PARALLEL_TASKS = int(os.environ.get('RUN_MAX_PARALLEL_TASKS') or 4)
+    
+    # Background job queue executing tasks and runs (SQLite file, defaults to DATA_DIR/_meta/jobs.db)
+    JOB_QUEUE_DB = os.environ.get('JOB_QUEUE_DB')
+    # Worker threads per web process; 0 = only queue jobs and run migration/run_job_worker.py separately
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 4)
+    # Start the workers with the app, so queued jobs and jobs of dead workers resume after a restart
+    JOB_WORKERS_AUTOSTART = (os.environ.get('JOB_WORKERS_AUTOSTART') or 'true').lower() in ('1', 'true', 'yes')
+    # Seconds without heartbeat after which a running job counts as abandoned and is queued again
+    JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS') or 60)
+    # Executions of a job whose worker died before it is given up
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 2)
+    # Events kept per job for clients resuming a dropped stream (Last-Event-ID)
+    JOB_EVENT_BUFFER = int(os.environ.get('JOB_EVENT_BUFFER') or 5000)
+    # Hours finished jobs and their events are kept
+    JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS') or 24)
+    
+    # Batch runs: one task executed for every row of a CSV file or Google Sheet (DATA_DIR/_meta/batches.db)
+    BATCH_DEFAULT_CONCURRENCY = int(os.environ.get('BATCH_DEFAULT_CONCURRENCY') or 4)
+    # Upper limit for the rows of one batch executed at the same time
+    BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY') or 16)
+    # Executions of a failing row before it stays failed (retry endpoint resets it)
+    BATCH_ROW_ATTEMPTS = int(os.environ.get('BATCH_ROW_ATTEMPTS') or 2)
+    BATCH_MAX_ROWS = int(os.environ.get('BATCH_MAX_ROWS') or 50000)
+    # Seconds between two writes of the results to an output Google Sheet
+    BATCH_SHEET_FLUSH_SECONDS = float(os.environ.get('BATCH_SHEET_FLUSH_SECONDS') or 60)
+    
+    # Memoized results of AI tasks with cache_results (DATA_DIR/_meta/results.db); tasks may set cache_ttl in seconds
+    RESULT_CACHE_TTL_HOURS = float(os.environ.get('RESULT_CACHE_TTL_HOURS') or 24)
+    # Least recently used results are evicted beyond these limits
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES') or 10000)
+    RESULT_CACHE_MAX_MB = float(os.environ.get('RESULT_CACHE_MAX_MB') or 256)
+    
     # WTF Forms CSRF Protection
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None
@@ -24,6 +24,8 @@ def register_routes():
     from . import session_api
     from . import agent_run_api
     from . import streaming_api
+    from . import job_api
+    from . import batch_api
 
 # Register routes immediately
 register_routes()
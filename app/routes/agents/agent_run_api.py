@@ -64,15 +64,16 @@ def api_save_selected_task(run_uuid):
             return error_response('Missing task_index')
         
         # Validate that the agent run exists
-        agent_run = agent_run_manager.load(run_uuid)
-        if not agent_run:
+        if not agent_run_manager.exists(run_uuid):
             return error_response('Agent run not found', 404)
         
-        # Save selected task index in agent run metadata
-        agent_run['selected_task_index'] = task_index
-        agent_run['updated_at'] = current_timestamp()
+        def select_task(agent_run):
+            # Save selected task index in agent run metadata
+            agent_run['selected_task_index'] = task_index
+            agent_run['updated_at'] = current_timestamp()
         
-        success = agent_run_manager.save(agent_run)
+        # Conditional save, so task state changes of a running execution are kept
+        success = agent_run_manager.modify(run_uuid, select_task) is not None
         
         if success:
             return success_response('Selected task saved successfully')
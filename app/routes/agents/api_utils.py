@@ -2,7 +2,7 @@
 Shared utilities for agent API routes
 """
 
-from flask import jsonify, current_app
+from flask import jsonify, current_app, request
 from app.utils.data_manager import agents_manager, tools_manager, agent_run_manager
 from datetime import datetime
 import uuid
@@ -51,6 +51,46 @@ def error_response(message, status_code=400):
     return jsonify({'success': False, 'error': message}), status_code
 
 
+def record_etag(record):
+    """ETag of a stored record: its revision (see DataManager.save)"""
+    return f'"{agents_manager.get_revision(record)}"'
+
+
+def with_etag(response, record):
+    """Set the ETag header of a response (or a (response, status) tuple) for a record"""
+    target = response[0] if isinstance(response, tuple) else response
+    target.headers['ETag'] = record_etag(record)
+    return response
+
+
+def if_match_revision():
+    """Get the revision required by the If-Match header, None without one (or for *)
+    
+    An ETag that is not a revision of ours can never match, -1 is returned then.
+    """
+    value = (request.headers.get('If-Match') or '').strip()
+    if not value or value == '*':
+        return None
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        return -1
+
+
+def revision_conflict_response(conflict):
+    """Response for a RevisionConflict: 412 if the client sent If-Match, 409 otherwise"""
+    status_code = 412 if request.headers.get('If-Match') else 409
+    response = jsonify({
+        'success': False,
+        'error': 'The item was changed by someone else, reload it and try again',
+        'revision': conflict.actual
+    })
+    response.headers['ETag'] = f'"{conflict.actual}"'
+    return response, status_code
+
+
 def generate_uuid():
     """Generate a new UUID string"""
     return str(uuid.uuid4())
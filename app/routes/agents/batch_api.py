@@ -0,0 +1,274 @@
+"""
+Batch Run API Routes
+Run one task of an agent for every row of a CSV file or Google Sheet
+
+A batch is executed by a background job (see batch_jobs) with bounded
+concurrency; it can be paused, resumed and failed rows can be retried.
+Results are available as CSV and optionally written back to a Google Sheet.
+"""
+
+import csv
+import io
+import json
+
+from flask import Response, current_app, jsonify, request
+from app.routes.agents import agents_bp
+from app.utils.batch_store import get_batch_store, output_table, parse_csv_rows
+from app.utils.data_manager import agents_manager
+from app.utils.job_queue import ensure_job_workers, get_job_queue
+from .api_utils import error_response, log_error, log_info
+from .batch_jobs import batch_job_key, read_sheet_rows
+from .task_jobs import job_event_response, resume_position
+from app import csrf
+
+
+def _batch_options():
+    """Get the request options from JSON or from a multipart form (nested values as JSON strings)"""
+    if request.is_json:
+        return request.get_json(silent=True) or {}
+    options = request.form.to_dict()
+    for key in ('column_map', 'rows', 'google_sheet', 'output_sheet'):
+        if options.get(key):
+            options[key] = json.loads(options[key])
+    return options
+
+
+def _input_table(options):
+    """Get (columns, rows) from an uploaded CSV file, CSV text, a rows list or a Google Sheet"""
+    upload = request.files.get('file')
+    if upload:
+        return parse_csv_rows(upload.read().decode('utf-8-sig', errors='replace'))
+    if options.get('csv'):
+        return parse_csv_rows(options['csv'])
+    if options.get('rows'):
+        rows = [dict(row) for row in options['rows']]
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        return columns, rows
+    if options.get('google_sheet'):
+        return read_sheet_rows(options['google_sheet'])
+    raise ValueError('No input table: upload a CSV file or pass csv, rows or google_sheet')
+
+
+def _start_batch(store, batch):
+    """Queue the job executing a batch (attaches to the running one), returns the job"""
+    job_queue = get_job_queue()
+    job, created = job_queue.enqueue('batch', {'batch_id': batch['id']}, dedupe_key=batch_job_key(batch['id']))
+    store.update_batch(batch['id'], job_id=job['id'])
+    ensure_job_workers(current_app._get_current_object())
+    log_info(f"Batch {batch['id']}: {'queued' if created else 'attached to'} job {job['id']}")
+    return job
+
+
+def _active_job(batch_id):
+    return get_job_queue().find_active(batch_job_key(batch_id))
+
+
+@agents_bp.route('/api/agents/<agent_uuid>/batches', methods=['POST'])
+@csrf.exempt
+def api_create_batch(agent_uuid):
+    """Create a batch run of a task over the rows of an input table and start it
+
+    Options (JSON or form fields): task_uuid, name, concurrency, max_attempts,
+    column_map ({task input: column}, default: columns are the inputs),
+    output_column, output_sheet ({tool_id, spreadsheet_id, range}) and
+    start (default true). Input: a CSV file upload (file), csv text, rows
+    (list of objects) or google_sheet ({tool_id, spreadsheet_id, range}).
+    """
+    try:
+        agent = agents_manager.load(agent_uuid)
+        if not agent:
+            return error_response('Agent not found', 404)
+
+        options = _batch_options()
+        task_uuid = options.get('task_uuid')
+        task_def = next((task for task in agent.get('tasks', []) if task.get('uuid') == task_uuid), None)
+        if not task_def:
+            return error_response('Task definition not found', 404)
+
+        try:
+            columns, rows = _input_table(options)
+        except (ValueError, KeyError) as e:
+            return error_response(f"Cannot read input table: {str(e)}")
+        if not rows:
+            return error_response('The input table has no rows')
+        max_rows = current_app.config.get('BATCH_MAX_ROWS', 50000)
+        if len(rows) > max_rows:
+            return error_response(f"The input table has {len(rows)} rows, at most {max_rows} are allowed")
+
+        column_map = options.get('column_map') or {}
+        unknown = [column for column in column_map.values() if column not in columns]
+        if unknown:
+            return error_response(f"Unknown columns in column_map: {', '.join(unknown)}")
+
+        try:
+            concurrency = int(options.get('concurrency') or current_app.config.get('BATCH_DEFAULT_CONCURRENCY', 4))
+            max_attempts = int(options.get('max_attempts') or current_app.config.get('BATCH_ROW_ATTEMPTS', 2))
+        except (TypeError, ValueError):
+            return error_response('concurrency and max_attempts must be numbers')
+        concurrency = max(1, min(concurrency, current_app.config.get('BATCH_MAX_CONCURRENCY', 16)))
+
+        store = get_batch_store()
+        batch = store.create_batch(
+            agent_uuid, task_uuid,
+            options.get('name') or f"Batch {task_def.get('name', '')}".strip(),
+            columns, rows, concurrency, max(1, max_attempts),
+            {
+                'column_map': column_map,
+                'output_column': options.get('output_column') or 'output',
+                'output_sheet': options.get('output_sheet') or None
+            }
+        )
+
+        job = None
+        if str(options.get('start', 'true')).lower() not in ('0', 'false', 'no'):
+            job = _start_batch(store, batch)
+            batch = store.get_batch(batch['id'])
+        return jsonify({'success': True, 'batch': batch, 'job_id': job['id'] if job else None}), 201
+
+    except Exception as e:
+        log_error(f"Error creating batch for agent {agent_uuid}: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@agents_bp.route('/api/agents/<agent_uuid>/batches', methods=['GET'])
+def api_list_batches(agent_uuid):
+    """List the batch runs of an agent with their progress"""
+    try:
+        return jsonify({'success': True, 'batches': get_batch_store().list_batches(agent_uuid)})
+    except Exception as e:
+        log_error(f"Error listing batches of agent {agent_uuid}: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@agents_bp.route('/api/batches/<batch_id>', methods=['GET'])
+def api_get_batch(batch_id):
+    """Get a batch run with its progress"""
+    batch = get_batch_store().get_batch(batch_id)
+    if not batch:
+        return error_response('Batch not found', 404)
+    return jsonify({'success': True, 'batch': batch})
+
+
+@agents_bp.route('/api/batches/<batch_id>', methods=['DELETE'])
+@csrf.exempt
+def api_delete_batch(batch_id):
+    """Delete a batch run that is not being executed (its agent runs are kept)"""
+    store = get_batch_store()
+    if not store.get_batch(batch_id):
+        return error_response('Batch not found', 404)
+    if _active_job(batch_id):
+        return error_response('Batch is being executed, pause it first', 409)
+    store.delete_batch(batch_id)
+    return jsonify({'success': True, 'message': 'Batch deleted'})
+
+
+@agents_bp.route('/api/batches/<batch_id>/stream', methods=['GET'])
+@csrf.exempt
+def api_stream_batch(batch_id):
+    """Stream the progress events of a batch's current (or last) job, resumable with Last-Event-ID"""
+    batch = get_batch_store().get_batch(batch_id)
+    if not batch:
+        return error_response('Batch not found', 404)
+    job_queue = get_job_queue()
+    job = job_queue.get(batch['job_id']) if batch['job_id'] else None
+    if not job:
+        return error_response('Batch has not been started', 404)
+    resume_job_id, after_seq = resume_position()
+    return job_event_response(job_queue, job, after_seq if resume_job_id == job['id'] else 0)
+
+
+@agents_bp.route('/api/batches/<batch_id>/pause', methods=['POST'])
+@csrf.exempt
+def api_pause_batch(batch_id):
+    """Pause a batch: no further rows are started, running rows finish"""
+    store = get_batch_store()
+    if not store.get_batch(batch_id):
+        return error_response('Batch not found', 404)
+    job = _active_job(batch_id)
+    if not job:
+        return error_response('Batch is not being executed', 409)
+    # The batch executor checks the status before starting rows, the cancel request also stops a queued job
+    store.update_batch(batch_id, status='paused')
+    get_job_queue().request_cancel(job['id'])
+    return jsonify({'success': True, 'message': 'Batch pausing after the running rows'})
+
+
+@agents_bp.route('/api/batches/<batch_id>/resume', methods=['POST'])
+@csrf.exempt
+def api_resume_batch(batch_id):
+    """Resume (or start) a batch: its pending rows are executed"""
+    store = get_batch_store()
+    batch = store.get_batch(batch_id)
+    if not batch:
+        return error_response('Batch not found', 404)
+    job = _active_job(batch_id)
+    if job and job['cancel_requested']:
+        return error_response('Batch is still pausing, resume it once the running rows finished', 409)
+    if not job and not batch['progress']['pending']:
+        return error_response('Batch has no pending rows, retry failed rows instead', 409)
+    job = _start_batch(store, batch)
+    return jsonify({'success': True, 'job_id': job['id'], 'batch': store.get_batch(batch_id)})
+
+
+@agents_bp.route('/api/batches/<batch_id>/retry', methods=['POST'])
+@csrf.exempt
+def api_retry_batch_rows(batch_id):
+    """Execute failed rows again (JSON body: rows, list of row indexes; default all failed rows)
+
+    The rows get all attempts again; a paused batch keeps them pending until it is resumed.
+    """
+    store = get_batch_store()
+    batch = store.get_batch(batch_id)
+    if not batch:
+        return error_response('Batch not found', 404)
+    row_indexes = (request.get_json(silent=True) or {}).get('rows')
+    try:
+        row_indexes = [int(index) for index in row_indexes] if row_indexes is not None else None
+    except (TypeError, ValueError):
+        return error_response('rows must be a list of row indexes')
+
+    count = store.reset_rows(batch_id, ('failed',), row_indexes, reset_attempts=True)
+    if not count:
+        return error_response('No failed rows to retry', 409)
+    job = None
+    if batch['status'] != 'paused':
+        job = _start_batch(store, batch)
+    return jsonify({'success': True, 'rows': count, 'job_id': job['id'] if job else None,
+                    'batch': store.get_batch(batch_id)})
+
+
+@agents_bp.route('/api/batches/<batch_id>/rows', methods=['GET'])
+def api_get_batch_rows(batch_id):
+    """Get rows of a batch with their results (query: status, offset, limit)"""
+    store = get_batch_store()
+    if not store.get_batch(batch_id):
+        return error_response('Batch not found', 404)
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+    except ValueError:
+        return error_response('offset and limit must be numbers')
+    rows = store.get_rows(batch_id, request.args.get('status') or None, offset, limit)
+    return jsonify({'success': True, 'rows': rows, 'offset': offset, 'limit': limit})
+
+
+@agents_bp.route('/api/batches/<batch_id>/output.csv', methods=['GET'])
+def api_download_batch_output(batch_id):
+    """Download the output table of a batch as CSV (input columns, output, status, error)"""
+    store = get_batch_store()
+    batch = store.get_batch(batch_id)
+    if not batch:
+        return error_response('Batch not found', 404)
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for line in output_table(store, batch):
+            writer.writerow(line)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    filename = f"batch-{batch_id[:8]}.csv"
+    return Response(generate_csv(), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
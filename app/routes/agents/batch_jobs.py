@@ -0,0 +1,218 @@
+"""
+Batch Jobs
+Job queue handler executing one task of an agent for every row of a batch
+"""
+
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from flask import current_app
+from app.utils.batch_store import get_batch_store, output_table, table_rows
+from app.utils.data_manager import agent_run_manager, agents_manager, tools_manager
+from app.utils.job_queue import register_job_handler
+from .api_utils import log_error, log_info
+from .task_executor import TaskExecutor
+
+# Seconds without a finished row after which the progress is sent again
+PROGRESS_INTERVAL = 15
+
+
+def batch_job_key(batch_id):
+    """Dedupe key of a batch execution: one job per batch at a time"""
+    return f"batch:{batch_id}"
+
+
+def _execute_sheet_tool(tool_id, inputs):
+    """Run a Google Sheets tool operation, returns its outputs"""
+    result = asyncio.run(tools_manager.execute_tool_with_implementation(tool_id, inputs))
+    if not result.get('success'):
+        raise ValueError(result.get('error') or result.get('message') or 'Google Sheets operation failed')
+    return result.get('outputs') or {}
+
+
+def read_sheet_rows(source):
+    """Get (columns, rows) of a Google Sheet range (source: tool_id, spreadsheet_id, range), header in the first line"""
+    outputs = _execute_sheet_tool(source['tool_id'], {
+        'operation': 'read',
+        'spreadsheet_id': source['spreadsheet_id'],
+        'range': source.get('range') or 'A1:Z10000'
+    })
+    return table_rows(outputs.get('values') or [])
+
+
+def write_sheet_table(output, values):
+    """Write the output table of a batch to a Google Sheet (output: tool_id, spreadsheet_id, range)"""
+    _execute_sheet_tool(output['tool_id'], {
+        'operation': 'write',
+        'spreadsheet_id': output['spreadsheet_id'],
+        'range': output.get('range') or 'A1',
+        'values': values
+    })
+
+
+class BatchExecutor:
+    """Executes a task of an agent for the rows of a batch
+
+    Every row gets its own agent run; its cells are the task inputs (renamed by
+    the column_map option). Up to concurrency rows run at the same time, each
+    through TaskExecutor in a worker thread. A failed row is executed again
+    until it used max_attempts attempts. When stop_event is set (pause) no
+    further rows are started and the running ones finish.
+    """
+
+    def __init__(self, store, batch, agent, task_def, app=None, stop_event=None):
+        self.store = store
+        self.batch = batch
+        self.agent = agent
+        self.task_def = task_def
+        self.app = app
+        self.stop_event = stop_event
+        self.column_map = batch['options'].get('column_map') or {}
+        self.output_sheet = batch['options'].get('output_sheet')
+        self._results = queue.Queue()
+        self._sheet_flushed = time.time()
+
+    def events(self):
+        """Execute the pending rows, yielding the event payloads"""
+        batch_id = self.batch['id']
+        concurrency = max(1, self.batch['concurrency'])
+        # Rows left running by a stopped worker start over
+        self.store.reset_rows(batch_id)
+        self.store.update_batch(batch_id, status='running', error=None, finished_at=None)
+        yield {'type': 'batch_started', 'batch_id': batch_id, 'concurrency': concurrency,
+               'progress': self.store.progress(batch_id)}
+
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"batch-{batch_id[:8]}")
+        running = 0
+        try:
+            while True:
+                if not self._stopped():
+                    for item in self.store.claim_rows(batch_id, concurrency - running):
+                        running += 1
+                        pool.submit(self._run_row, item)
+                        yield {'type': 'row_started', 'row': item['row_index'], 'attempt': item['attempts']}
+                if not running:
+                    break
+
+                try:
+                    row_index, status, error, run_uuid = self._results.get(timeout=PROGRESS_INTERVAL)
+                except queue.Empty:
+                    yield {'type': 'batch_progress', 'progress': self.store.progress(batch_id)}
+                    continue
+                running -= 1
+                yield {'type': 'row_finished', 'row': row_index, 'status': status, 'error': error,
+                       'run_uuid': run_uuid, 'progress': self.store.progress(batch_id)}
+                self._flush_sheet()
+        finally:
+            pool.shutdown(wait=False)
+
+        progress = self.store.progress(batch_id)
+        if self._stopped() and progress['pending']:
+            status = 'paused'
+        else:
+            status = 'completed'
+        self.store.update_batch(batch_id, status=status, finished_at=time.time() if status == 'completed' else None)
+        self._flush_sheet(force=True)
+        yield {'type': 'batch_paused' if status == 'paused' else 'batch_complete', 'status': status,
+               'progress': progress}
+
+    def _stopped(self):
+        """Paused: by the job's cancel flag or, without waiting for it, by the batch status"""
+        if self.stop_event is not None and self.stop_event.is_set():
+            return True
+        return self.store.get_status(self.batch['id']) == 'paused'
+
+    def _run_row(self, item):
+        """Execute the task for one row in a worker thread, storing its result"""
+        row_index = item['row_index']
+        status, output, error, run_uuid = 'failed', None, None, item['run_uuid']
+        try:
+            with self.app.app_context() if self.app else nullcontext():
+                if not run_uuid:
+                    agent_run = agent_run_manager.create_agent_run(
+                        self.batch['agent_uuid'], name=f"{self.batch['name']} #{row_index + 1}")
+                    if not agent_run:
+                        raise IOError('Agent run could not be created')
+                    run_uuid = agent_run['uuid']
+
+                executor = TaskExecutor(run_uuid, self.task_def['uuid'], self.task_def, self._inputs(item['inputs']),
+                                        self.agent, 'POST')
+                for payload in executor.events():
+                    if payload.get('type') == 'error':
+                        error = payload.get('error')
+
+                state = agent_run_manager.get_task_state(run_uuid, self.task_def['uuid'], resolve_blobs=True) or {}
+                if state.get('status') == 'completed':
+                    status, error = 'done', None
+                    output = (state.get('results') or {}).get('raw_response', '')
+                else:
+                    error = error or state.get('error') or 'Task finished without result'
+                    if state.get('status') == 'running':
+                        agent_run_manager.set_task_status(run_uuid, self.task_def['uuid'], 'error', error)
+        except Exception as e:
+            log_error(f"Error executing row {row_index} of batch {self.batch['id']}: {str(e)}")
+            status, output, error = 'failed', None, str(e)
+
+        if status == 'failed' and item['attempts'] < self.batch['max_attempts']:
+            status = 'pending'  # Executed again, the error is kept until then
+        try:
+            self.store.finish_row(self.batch['id'], row_index, status, output, error, run_uuid)
+        except IOError as e:
+            log_error(f"Error storing row {row_index} of batch {self.batch['id']}: {str(e)}")
+        self._results.put((row_index, status, error, run_uuid))
+
+    def _inputs(self, row):
+        """Task inputs of a row: cells under their column name or renamed by column_map (input: column)"""
+        if not self.column_map:
+            return dict(row)
+        return {name: row.get(column, '') for name, column in self.column_map.items()}
+
+    def _flush_sheet(self, force=False):
+        """Write the results to the output sheet every BATCH_SHEET_FLUSH_SECONDS and at the end"""
+        if not self.output_sheet:
+            return
+        interval = (self.app or current_app).config.get('BATCH_SHEET_FLUSH_SECONDS', 60)
+        if not force and time.time() - self._sheet_flushed < interval:
+            return
+        self._sheet_flushed = time.time()
+        try:
+            write_sheet_table(self.output_sheet, list(output_table(self.store, self.batch)))
+        except Exception as e:
+            log_error(f"Error writing results of batch {self.batch['id']} to Google Sheets: {str(e)}")
+
+
+def execute_batch_job(job, cancelled):
+    """Execute the pending rows of a batch (payload: batch_id)"""
+    store = get_batch_store()
+    batch = store.get_batch(job['payload']['batch_id'])
+    if not batch:
+        yield {'type': 'error', 'error': 'Batch not found'}
+        return
+
+    agent = agents_manager.load(batch['agent_uuid'])
+    task_def = next((task for task in (agent or {}).get('tasks', []) if task.get('uuid') == batch['task_uuid']), None)
+    if not task_def:
+        error = 'Agent not found' if not agent else 'Task definition not found'
+        store.update_batch(batch['id'], status='failed', error=error)
+        yield {'type': 'error', 'error': error}
+        return
+
+    log_info(f"Job {job['id']}: executing batch {batch['id']} ({batch['progress']['total']} rows)")
+    executor = BatchExecutor(store, batch, agent, task_def, current_app._get_current_object(), stop_event=cancelled)
+    yield from executor.events()
+
+
+def abandon_batch_job(job):
+    """A batch given up after its workers died stays resumable"""
+    try:
+        store = get_batch_store()
+        store.reset_rows(job['payload']['batch_id'])
+        store.update_batch(job['payload']['batch_id'], status='paused', error='Execution was interrupted')
+    except IOError as e:
+        log_error(f"Error pausing interrupted batch {job['payload']['batch_id']}: {str(e)}")
+
+
+register_job_handler('batch', execute_batch_job, abandon_batch_job)
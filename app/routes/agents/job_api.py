@@ -0,0 +1,49 @@
+"""
+Background Job API Routes
+Status, event streams and cancellation of queued task and run executions
+"""
+
+from flask import jsonify
+from app.routes.agents import agents_bp
+from app.utils.job_queue import get_job_queue
+from .api_utils import error_response, log_error
+from .task_jobs import job_event_response, resume_position
+from app import csrf
+
+
+@agents_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Get the status of a background job"""
+    try:
+        job = get_job_queue().get(job_id)
+        if not job:
+            return error_response('Job not found', 404)
+        return jsonify({'success': True, 'job': job})
+    except Exception as e:
+        log_error(f"Error getting job {job_id}: {str(e)}")
+        return error_response(str(e), 500)
+
+
+@agents_bp.route('/api/jobs/<job_id>/stream', methods=['GET'])
+@csrf.exempt
+def api_stream_job(job_id):
+    """Stream the events of a background job (from the start or after Last-Event-ID, also after it finished)"""
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if not job:
+        return error_response('Job not found', 404)
+    resume_job_id, after_seq = resume_position()
+    return job_event_response(job_queue, job, after_seq if resume_job_id == job_id else 0)
+
+
+@agents_bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@csrf.exempt
+def api_cancel_job(job_id):
+    """Cancel a queued job or ask the worker of a running job to stop it"""
+    try:
+        if not get_job_queue().request_cancel(job_id):
+            return error_response('Job not found or already finished', 404)
+        return jsonify({'success': True, 'message': 'Job cancellation requested'})
+    except Exception as e:
+        log_error(f"Error cancelling job {job_id}: {str(e)}")
+        return error_response(str(e), 500)
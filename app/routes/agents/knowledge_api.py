@@ -5,8 +5,9 @@ Handles CRUD operations for agent knowledge items
 
 from flask import request, jsonify
 from app.routes.agents import agents_bp
-from app.utils.data_manager import agents_manager
-from .api_utils import validate_json_request, success_response, error_response, get_agent_or_404
+from app.utils.data_manager import agents_manager, RevisionConflict
+from .api_utils import (validate_json_request, success_response, error_response, get_agent_or_404,
+                        if_match_revision, revision_conflict_response)
 
 
 @agents_bp.route('/knowledge', methods=['POST'])
@@ -20,12 +21,14 @@ def api_create_knowledge():
         if not agent_id or not knowledge_data:
             return error_response('Missing agent_id or knowledge data')
         
-        success = agents_manager.add_knowledge_item(agent_id, knowledge_data)
+        success = agents_manager.add_knowledge_item(agent_id, knowledge_data, if_match_revision())
         if success:
             return success_response('Knowledge item created successfully')
         else:
             return error_response('Failed to create knowledge item', 500)
             
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -41,12 +44,15 @@ def api_update_knowledge(knowledge_id):
         if not agent_id:
             return error_response('Missing agent_id')
         
-        success = agents_manager.update_knowledge_item(agent_id, knowledge_id, knowledge_data)
+        success = agents_manager.update_knowledge_item(agent_id, knowledge_id, knowledge_data,
+                                                       if_match_revision())
         if success:
             return success_response('Knowledge item updated successfully')
         else:
             return error_response('Failed to update knowledge item', 500)
             
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -61,11 +67,13 @@ def api_delete_knowledge(knowledge_id):
         if not agent_id:
             return error_response('Missing agent_id')
         
-        success = agents_manager.remove_knowledge_item(agent_id, knowledge_id)
+        success = agents_manager.remove_knowledge_item(agent_id, knowledge_id, if_match_revision())
         if success:
             return success_response('Knowledge item deleted successfully')
         else:
             return error_response('Failed to delete knowledge item', 500)
             
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return error_response(str(e), 500)
@@ -7,6 +7,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from app.utils.data_manager import agents_manager, tools_manager, agent_run_manager
 from app.utils.validation import DataValidator
 from app.utils.assistant_manager import assistant_manager
+from app.utils.pagination import get_page_args, pagination_context
 import uuid
 import os
 from datetime import datetime
@@ -20,57 +21,46 @@ from app.routes.agents import agents_bp
 def list_agents():
     """Agent overview page with card grid layout"""
     try:
-        # Get all agents
-        agents = agents_manager.load_all()
-        
         # Get filter parameters
         category_filter = request.args.get('category', '')
         status_filter = request.args.get('status', '')
         search_query = request.args.get('search', '')
+        limit, cursor = get_page_args()
         
-        # Apply filters
+        # Apply filters while paging through agents (newest first)
+        filters = {'status': status_filter} if status_filter else {}
+        predicate = None
         if category_filter:
-            agents = [a for a in agents if a.get('category', '').lower() == category_filter.lower()]
-        
-        if status_filter:
-            agents = [a for a in agents if a.get('status') == status_filter]
+            predicate = lambda a: a.get('category', '').lower() == category_filter.lower()
         
-        if search_query:
-            search_lower = search_query.lower()
-            agents = [a for a in agents if 
-                     search_lower in a.get('name', '').lower() or 
-                     search_lower in a.get('description', '').lower()]
+        agents, next_cursor = agents_manager.get_page(filters, sort_key='created_at', reverse=True,
+                                                      limit=limit, cursor=cursor,
+                                                      query=search_query or None, predicate=predicate)
         
-        # Get statistics
-        total_agents = len(agents_manager.load_all())
-        active_agents = len([a for a in agents_manager.load_all() if a.get('status') == 'active'])
-        inactive_agents = len([a for a in agents_manager.load_all() if a.get('status') == 'inactive'])
+        # Get statistics from the incrementally maintained aggregates
+        stats = agents_manager.get_stats()
         
         # Get unique categories for filter
-        all_agents = agents_manager.load_all()
-        categories = list(set([a.get('category', 'General') for a in all_agents if a.get('category')]))
+        categories = [category for category in agents_manager.get_counts('category') if category]
         
-        # Add session count to each agent
+        # Add session count to each agent on this page
         for agent in agents:
-            agent_runs = agent_run_manager.get_agent_runs(agent.get('id', ''))
-            agent['total_runs'] = len(agent_runs)
-        
-        # Sort agents by created_at descending (newest first)
-        agents.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+            agent['total_runs'] = agent_run_manager.count({'agent_uuid': agent.get('id', '')})
         
         return render_template('agents/list.html', 
                              agents=agents, 
                              categories=categories,
                              stats={
-                                 'total': total_agents,
-                                 'active': active_agents, 
-                                 'inactive': inactive_agents
+                                 'total': stats['total'],
+                                 'active': stats['active'], 
+                                 'inactive': stats['inactive']
                              },
                              filters={
                                  'category': category_filter,
                                  'status': status_filter,
                                  'search': search_query
-                             })
+                             },
+                             pagination=pagination_context(next_cursor))
     except Exception as e:
         current_app.logger.error(f"Error loading agents: {str(e)}")
         flash(f'Error loading agents: {str(e)}', 'error')
@@ -0,0 +1,251 @@
+"""
+Run Executor
+Executes all tasks of an agent run in dependency order, independent tasks in parallel
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+from app.utils.data_manager import agent_run_manager
+from .api_utils import log_error, log_info
+from .task_executor import TaskExecutor
+
+# Seconds without events after which a keep-alive (None) is yielded
+KEEPALIVE_INTERVAL = 15
+
+# Task statuses that make dependent tasks skip
+FAILED_STATUSES = ('error', 'skipped', 'cancelled')
+
+
+class TaskGraphError(ValueError):
+    """Invalid depends_on edges: unknown tasks or a cycle"""
+
+
+def task_dependencies(tasks):
+    """Get {task uuid: [task uuids it depends on]} from the depends_on lists of the task definitions
+
+    Raises TaskGraphError for unknown tasks and cycles.
+    """
+    names = {task.get('uuid'): task.get('name') or task.get('uuid') for task in tasks}
+    dependencies = {}
+    for task in tasks:
+        depends_on = task.get('depends_on') or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        unknown = [dep for dep in depends_on if dep not in names]
+        if unknown:
+            raise TaskGraphError(f"Task '{names[task.get('uuid')]}' depends on unknown tasks: {', '.join(unknown)}")
+        dependencies[task['uuid']] = list(dict.fromkeys(depends_on))
+
+    ordered = set(topological_order(dependencies))
+    blocked = [uuid for uuid in dependencies if uuid not in ordered]
+    if blocked:
+        raise TaskGraphError(f"Circular task dependencies: {', '.join(names[uuid] for uuid in blocked)}")
+    return dependencies
+
+
+def topological_order(dependencies):
+    """Get the task uuids with every task after its dependencies, otherwise in definition order
+
+    Tasks on a cycle are left out.
+    """
+    waiting = {uuid: set(deps) for uuid, deps in dependencies.items()}
+    order = []
+    done = set()
+    while True:
+        ready = [uuid for uuid, deps in waiting.items() if deps <= done]
+        if not ready:
+            return order
+        for uuid in ready:
+            del waiting[uuid]
+        order.extend(ready)
+        done.update(ready)
+
+
+class RunExecutor:
+    """Executes the tasks of an agent run as a dependency graph
+
+    A task starts once all tasks of its depends_on list are completed; up to
+    max_workers tasks run at the same time, each through TaskExecutor in a
+    worker thread. The output of a completed task (its raw response) is stored
+    under the task's output_variable and passed to downstream tasks as
+    {{variable}}. Tasks depending on a failed task are skipped. Already
+    completed tasks are not executed again unless rerun is set.
+
+    The events of all tasks are multiplexed into one stream, each tagged with
+    its task_uuid, framed by run_started/task_started/task_finished/run_complete.
+    """
+
+    def __init__(self, run_uuid, agent, agent_run, max_workers=4, rerun=False, app=None, stop_event=None):
+        self.run_uuid = run_uuid
+        self.agent = agent
+        self.agent_run = agent_run
+        self.max_workers = max(1, max_workers)
+        self.rerun = rerun
+        self.app = app
+        self.tasks = {task['uuid']: task for task in agent.get('tasks', [])}
+        self.dependencies = task_dependencies(agent.get('tasks', []))
+        self.order = topological_order(self.dependencies)
+        self._states = {state.get('task_uuid'): state for state in agent_run.get('task_states', [])}
+        self._events = queue.Queue()
+        self._stop = stop_event or threading.Event()
+
+    def stop(self):
+        """Start no further tasks; running tasks finish (also done by setting stop_event)"""
+        self._stop.set()
+
+    def events(self):
+        """Execute the run, yielding the event payloads (None while waiting for slow tasks)"""
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"run-{self.run_uuid[:8]}")
+        try:
+            yield from self._execute(pool)
+        finally:
+            # When closed early running tasks finish in the background
+            pool.shutdown(wait=False)
+
+    def _execute(self, pool):
+        statuses = {}
+        outputs = {}
+        for uuid in self.order:
+            state = self._states.get(uuid) or {}
+            if not self.rerun and state.get('status') == 'completed':
+                statuses[uuid] = 'completed'
+                outputs[uuid] = self._completed_outputs(uuid, state)
+        previous = list(outputs)
+
+        yield {
+            'type': 'run_started',
+            'run_uuid': self.run_uuid,
+            'max_parallel': self.max_workers,
+            'tasks': [{'task_uuid': uuid, 'name': self.tasks[uuid].get('name', ''),
+                       'depends_on': self.dependencies[uuid], 'status': statuses.get(uuid, 'pending')}
+                      for uuid in self.order]
+        }
+        self._set_run_status('running')
+
+        pending = [uuid for uuid in self.order if uuid not in statuses]
+        running = set()
+        while pending or running:
+            # One pass in topological order: skips cascade, ready tasks start
+            for uuid in list(pending):
+                deps = self.dependencies[uuid]
+                failed = [dep for dep in deps if statuses.get(dep) in FAILED_STATUSES]
+                if failed:
+                    pending.remove(uuid)
+                    statuses[uuid] = 'skipped'
+                    reason = f"Dependency '{self.tasks[failed[0]].get('name', failed[0])}' did not complete"
+                    agent_run_manager.set_task_status(self.run_uuid, uuid, 'skipped', reason)
+                    yield {'type': 'task_finished', 'task_uuid': uuid, 'status': 'skipped', 'error': reason}
+                elif (len(running) < self.max_workers and not self._stop.is_set()
+                      and all(statuses.get(dep) == 'completed' for dep in deps)):
+                    pending.remove(uuid)
+                    running.add(uuid)
+                    yield {'type': 'task_started', 'task_uuid': uuid, 'name': self.tasks[uuid].get('name', '')}
+                    pool.submit(self._run_task, uuid, self._variables_for(uuid, outputs, previous))
+
+            if not running:
+                break  # Stopped, the remaining tasks stay pending
+
+            try:
+                kind, uuid, payload = self._events.get(timeout=KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                yield None
+                continue
+
+            if kind == 'event':
+                yield {**payload, 'task_uuid': uuid}
+            else:
+                running.discard(uuid)
+                statuses[uuid] = payload
+                if payload == 'completed':
+                    outputs[uuid] = self._store_outputs(uuid)
+                yield {'type': 'task_finished', 'task_uuid': uuid, 'status': payload}
+
+        if pending:
+            run_status = 'cancelled'
+        elif all(status == 'completed' for status in statuses.values()):
+            run_status = 'completed'
+        else:
+            run_status = 'error'
+        self._set_run_status(run_status)
+        yield {
+            'type': 'run_complete',
+            'status': run_status,
+            'tasks': statuses,
+            'progress': agent_run_manager.get_task_progress(self.run_uuid)
+        }
+
+    def _run_task(self, uuid, variables):
+        """Execute one task in a worker thread, forwarding its events"""
+        status = 'error'
+        try:
+            with self.app.app_context() if self.app else nullcontext():
+                inputs = (self._states.get(uuid) or {}).get('inputs') or {}
+                executor = TaskExecutor(self.run_uuid, uuid, self.tasks[uuid], inputs, self.agent, 'POST', variables)
+                for payload in executor.events():
+                    self._events.put(('event', uuid, payload))
+
+                state = agent_run_manager.get_task_state(self.run_uuid, uuid)
+                status = (state or {}).get('status', 'error')
+                if status == 'running':
+                    # The executor returned without recording a result
+                    agent_run_manager.set_task_status(self.run_uuid, uuid, 'error', 'Task finished without result')
+                    status = 'error'
+        except Exception as e:
+            log_error(f"Error executing task {uuid} of run {self.run_uuid}: {str(e)}")
+            agent_run_manager.set_task_status(self.run_uuid, uuid, 'error', str(e))
+        finally:
+            self._events.put(('done', uuid, status))
+
+    def _variables_for(self, uuid, outputs, previous):
+        """Run inputs plus the outputs of previously completed and upstream tasks"""
+        upstream = set()
+        stack = list(self.dependencies[uuid])
+        while stack:
+            dep = stack.pop()
+            if dep not in upstream:
+                upstream.add(dep)
+                stack.extend(self.dependencies[dep])
+
+        variables = dict(self.agent_run.get('inputs') or {})
+        for dep in previous + [dep for dep in self.order if dep in upstream and dep not in previous]:
+            variables.update(outputs.get(dep) or {})
+        return variables
+
+    def _completed_outputs(self, uuid, state):
+        """Get the output variables of a task completed before this run started"""
+        name = self.tasks[uuid].get('output_variable')
+        if not name:
+            return {}
+        if name in (state.get('outputs') or {}):
+            return {name: state['outputs'][name]}
+        results = agent_run_manager.resolve_blobs(state).get('results') or {}
+        return {name: results['raw_response']} if 'raw_response' in results else {}
+
+    def _store_outputs(self, uuid):
+        """Save the response of a completed task as its output variable"""
+        name = self.tasks[uuid].get('output_variable')
+        if not name:
+            return {}
+        state = agent_run_manager.get_task_state(self.run_uuid, uuid, resolve_blobs=True) or {}
+        results = state.get('results') or {}
+        if 'raw_response' not in results:
+            return {}
+        outputs = {name: results['raw_response']}
+        agent_run_manager.set_task_outputs(self.run_uuid, uuid, outputs)
+        log_info(f"Task {uuid} of run {self.run_uuid} produced output variable '{name}'")
+        return outputs
+
+    def _set_run_status(self, status):
+        try:
+            with agent_run_manager.transaction(self.run_uuid) as run:
+                if run:
+                    now = datetime.now().isoformat()
+                    run.data['status'] = status
+                    run.data['started_at' if status == 'running' else 'completed_at'] = now
+                    run.data['updated_at'] = now
+        except Exception as e:
+            log_error(f"Error setting status of run {self.run_uuid}: {str(e)}")
@@ -6,6 +6,7 @@ Handles session CRUD operations and cleanup for agents
 from flask import request, jsonify, current_app
 from app.routes.agents import agents_bp
 from app.utils.data_manager import agent_run_manager
+from app.utils.pagination import get_page_args
 from .api_utils import (validate_json_request, success_response, error_response, 
                         get_agent_or_404, current_timestamp, log_error, log_info)
 from app import csrf
@@ -15,10 +16,15 @@ from datetime import datetime
 @agents_bp.route('/api/<agent_id>/sessions', methods=['GET'])
 @csrf.exempt
 def get_agent_sessions(agent_id):
-    """Get all sessions/runs for an agent"""
+    """Get sessions/runs for an agent, newest activity first, one page at a time"""
     try:
-        # Get agent runs from agent_run_manager
-        agent_runs = agent_run_manager.get_agent_runs(agent_id)
+        limit, cursor = get_page_args()
+        
+        # Get one page of agent run summaries from agent_run_manager
+        agent_runs, next_cursor = agent_run_manager.get_page({'agent_uuid': agent_id},
+                                                             sort_key='updated_at', reverse=True,
+                                                             limit=limit, cursor=cursor,
+                                                             summaries=True)
         
         # Format sessions for frontend display
         sessions = []
@@ -39,9 +45,8 @@ def get_agent_sessions(agent_id):
                     age_days = 0
                 
                 # Get task completion status
-                tasks = run_data.get('tasks', [])
-                completed_tasks = len([t for t in tasks if t.get('status') == 'completed'])
-                total_tasks = len(tasks)
+                completed_tasks = run_data.get('completed_tasks', 0)
+                total_tasks = run_data.get('total_tasks', 0)
                 
                 session = {
                     'id': run_id,
@@ -59,13 +64,11 @@ def get_agent_sessions(agent_id):
                 log_error(f"Error processing session {run_id}: {str(session_error)}")
                 continue
         
-        # Sort sessions by last activity (newest first)
-        sessions.sort(key=lambda x: x.get('last_activity', ''), reverse=True)
-        
         return jsonify({
             'success': True,
             'sessions': sessions,
-            'total_count': len(sessions)
+            'total_count': agent_run_manager.count({'agent_uuid': agent_id}),
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -99,16 +102,12 @@ def cleanup_agent_sessions(agent_id):
         data = request.get_json() or {}
         cleanup_types = data.get('types', ['closed', 'error'])
         
-        # Get all agent runs
-        agent_runs = agent_run_manager.get_agent_runs(agent_id)
+        # Get all agent run summaries (status is all we need here)
+        agent_runs = agent_run_manager.get_agent_run_summaries(agent_id)
         
-        deleted_count = 0
-        for run_data in agent_runs:
-            run_id = run_data.get('id', run_data.get('uuid'))
-            status = run_data.get('status', 'unknown')
-            if status in cleanup_types:
-                if agent_run_manager.delete(run_id):
-                    deleted_count += 1
+        run_ids = [run_data.get('id', run_data.get('uuid')) for run_data in agent_runs
+                   if run_data.get('status', 'unknown') in cleanup_types]
+        deleted_count = len(agent_run_manager.delete_many(run_ids))
         
         return success_response(
             f'Cleaned up {deleted_count} sessions',
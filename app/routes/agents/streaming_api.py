@@ -1,24 +1,44 @@
 """
 Task Streaming Execution API
 Simplified Flask routes for real-time task execution
+
+Tasks and runs are executed as background jobs (see task_jobs); the routes
+only queue them and stream their events, so a closed browser tab or a
+recycled web worker no longer stops an execution.
 """
 
-from flask import request, jsonify, Response
+from flask import request, jsonify, Response, current_app
 from app.routes.agents import agents_bp
 from app.utils.data_manager import agent_run_manager, agents_manager, tools_manager
+from app.utils.identity_map import use_identity_map
+from app.utils.job_queue import ensure_job_workers, get_job_queue
+from app.utils.json_codec import sse_event
 from .api_utils import log_error, log_info
 from app import csrf
-import json
 
 # Import modular components
-from .task_executor import TaskExecutor
+from .run_executor import TaskGraphError, task_dependencies
+from .task_jobs import (event_stream_response, job_event_response, resume_job_response, resume_position,
+                        run_job_key, task_job_key)
 from .thread_management import get_thread_lock, force_cancel_all_active_runs
 
 
 @agents_bp.route('/api/agent_run/<run_uuid>/task_execute/<task_uuid>/stream', methods=['GET', 'POST'])
 @csrf.exempt
+@use_identity_map
 def api_stream_execute_task(run_uuid, task_uuid):
-    """Stream execute a task with real-time HTML output and OpenAI Assistant integration"""
+    """Stream execute a task with real-time HTML output and OpenAI Assistant integration
+    
+    The task is queued as a job and its events are streamed; while the task is
+    still queued or running, a repeated request attaches to the same job. A
+    request with Last-Event-ID resumes the stream after that event and never
+    starts a new execution. Tasks with cache_results replay the result of an
+    identical earlier prompt unless use_cache is false (JSON body or query).
+    """
+    
+    resume_job_id, after_seq = resume_position()
+    if resume_job_id:
+        return _resume_task_stream(run_uuid, task_uuid, resume_job_id, after_seq)
     
     # IMPORTANT: Extract all request data OUTSIDE the generator to avoid Flask context issues
     try:
@@ -26,7 +46,7 @@ def api_stream_execute_task(run_uuid, task_uuid):
         agent_run = agent_run_manager.load(run_uuid)
         if not agent_run:
             return Response(
-                f"data: {json.dumps({'error': 'Agent run not found'})}\n\n",
+                sse_event({'error': 'Agent run not found'}),
                 mimetype='text/event-stream'
             )
         
@@ -34,7 +54,7 @@ def api_stream_execute_task(run_uuid, task_uuid):
         agent = agents_manager.load(agent_run['agent_uuid'])
         if not agent:
             return Response(
-                f"data: {json.dumps({'error': 'Agent not found'})}\n\n",
+                sse_event({'error': 'Agent not found'}),
                 mimetype='text/event-stream'
             )
         
@@ -47,7 +67,7 @@ def api_stream_execute_task(run_uuid, task_uuid):
         
         if not task_def:
             return Response(
-                f"data: {json.dumps({'error': 'Task definition not found'})}\n\n",
+                sse_event({'error': 'Task definition not found'}),
                 mimetype='text/event-stream'
             )
         
@@ -56,57 +76,137 @@ def api_stream_execute_task(run_uuid, task_uuid):
             if request.method == 'POST':
                 request_data = request.get_json()
                 task_inputs = request_data.get('inputs', {}) if request_data else {}
+                use_cache = (request_data or {}).get('use_cache', True) is not False
                 log_info(f"POST method - task inputs from request: {task_inputs}")
             else:  # GET request
                 # For EventSource GET requests, get inputs from task state or use empty dict
                 task_state = agent_run_manager.get_task_state(run_uuid, task_uuid)
                 task_inputs = task_state.get('inputs', {}) if task_state else {}
+                use_cache = request.args.get('use_cache', 'true').lower() not in ('0', 'false', 'no')
                 log_info(f"GET method - task inputs from state: {task_inputs}")
         except Exception as e:
             log_error(f"Error getting task inputs: {str(e)}")
             task_inputs = {}
+            use_cache = True
         
-        # Store request method for use in generator
-        request_method = request.method
+        # Queue the execution, the worker loads run and agent again
+        job_queue = get_job_queue()
+        job, created = job_queue.enqueue('task', {
+            'run_uuid': run_uuid,
+            'task_uuid': task_uuid,
+            'inputs': task_inputs,
+            'request_method': request.method,
+            'use_cache': use_cache
+        }, dedupe_key=task_job_key(run_uuid, task_uuid))
+        ensure_job_workers(current_app._get_current_object())
+        log_info(f"Task {task_uuid} of run {run_uuid}: {'queued' if created else 'attached to'} job {job['id']}")
         
     except Exception as e:
         log_error(f"Error in request preparation: {str(e)}")
         return Response(
-            f"data: {json.dumps({'error': f'Request preparation failed: {str(e)}'})}\n\n",
+            sse_event({'error': f'Request preparation failed: {str(e)}'}),
             mimetype='text/event-stream'
         )
     
-    def generate_task_execution_stream():
-        """Generator function for streaming task execution"""
+    return job_event_response(job_queue, job)
+
+
+def _resume_task_stream(run_uuid, task_uuid, job_id, after_seq):
+    """Resume a dropped task stream; once the job was purged the stored result is sent"""
+    try:
+        response = resume_job_response(get_job_queue(), job_id, after_seq, task_job_key(run_uuid, task_uuid))
+        if response is not None:
+            return response
+        
+        task_state = agent_run_manager.get_task_state(run_uuid, task_uuid, resolve_blobs=True) or {}
+        html_output = (task_state.get('results') or {}).get('html_output')
+        if task_state.get('status') == 'completed' and html_output is not None:
+            return event_stream_response(
+                sse_event({'type': 'final_content', 'content': html_output,
+                           'container_id': f'streaming-content-{task_uuid}'})
+                + sse_event({'type': 'complete', 'html_result': html_output})
+            )
+        return Response(
+            sse_event({'type': 'error', 'error': 'Task execution stream expired, execute the task again'}),
+            mimetype='text/event-stream'
+        )
+    except Exception as e:
+        log_error(f"Error resuming task stream: {str(e)}")
+        return Response(sse_event({'type': 'error', 'error': str(e)}), mimetype='text/event-stream')
+
+
+@agents_bp.route('/api/agent_run/<run_uuid>/execute/stream', methods=['GET', 'POST'])
+@csrf.exempt
+def api_stream_execute_run(run_uuid):
+    """Stream the execution of all tasks of an agent run (dependency order, independent tasks in parallel)
+    
+    Options (JSON body or query string): rerun also executes completed tasks
+    again, max_parallel lowers RUN_MAX_PARALLEL_TASKS. The events of all tasks
+    are multiplexed and carry their task_uuid. A request with Last-Event-ID
+    resumes the stream after that event.
+    """
+    resume_job_id, after_seq = resume_position()
+    if resume_job_id:
+        response = resume_job_response(get_job_queue(), resume_job_id, after_seq, run_job_key(run_uuid))
+        if response is None:
+            return Response(sse_event({'type': 'error', 'error': 'Run execution stream expired, reload the run'}),
+                            mimetype='text/event-stream')
+        return response
+    
+    try:
+        agent_run = agent_run_manager.load(run_uuid)
+        if not agent_run:
+            return Response(sse_event({'error': 'Agent run not found'}), mimetype='text/event-stream')
+        
+        agent = agents_manager.load(agent_run['agent_uuid'])
+        if not agent:
+            return Response(sse_event({'error': 'Agent not found'}), mimetype='text/event-stream')
+        
+        options = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        rerun = str(options.get('rerun', '')).lower() in ('1', 'true', 'yes')
+        max_parallel = current_app.config.get('RUN_MAX_PARALLEL_TASKS', 4)
         try:
-            # Create and execute task
-            executor = TaskExecutor(run_uuid, task_uuid, task_def, task_inputs, agent, request_method)
-            yield from executor.execute()
-            
-        except Exception as e:
-            log_error(f"Error in task execution stream: {str(e)}")
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
-            # Set task status to error
-            try:
-                agent_run_manager.set_task_status(run_uuid, task_uuid, 'error', str(e))
-            except:
-                pass
+            max_parallel = min(max_parallel, int(options.get('max_parallel') or max_parallel))
+        except (TypeError, ValueError):
+            pass
+        
+        # Reject invalid dependencies before queuing
+        task_dependencies(agent.get('tasks', []))
+        
+        job_queue = get_job_queue()
+        job, created = job_queue.enqueue('run', {
+            'run_uuid': run_uuid,
+            'rerun': rerun,
+            'max_parallel': max_parallel
+        }, dedupe_key=run_job_key(run_uuid))
+        ensure_job_workers(current_app._get_current_object())
+        
+    except TaskGraphError as e:
+        return Response(sse_event({'type': 'error', 'error': str(e)}), mimetype='text/event-stream')
+    except Exception as e:
+        log_error(f"Error in run execution preparation: {str(e)}")
+        return Response(
+            sse_event({'error': f'Request preparation failed: {str(e)}'}),
+            mimetype='text/event-stream'
+        )
     
-    return Response(
-        generate_task_execution_stream(),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'Connection': 'keep-alive',
-            'X-Accel-Buffering': 'no',  # Disable nginx buffering
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Cache-Control'
-        }
-    )
+    return job_event_response(job_queue, job)
+
+
+@agents_bp.route('/api/agent_run/<run_uuid>/execute/stop', methods=['POST'])
+@csrf.exempt
+def api_stop_run_execution(run_uuid):
+    """Stop a run execution: no further tasks are started, running tasks finish"""
+    job_queue = get_job_queue()
+    job = job_queue.find_active(run_job_key(run_uuid))
+    if not job or not job_queue.request_cancel(job['id']):
+        return jsonify({'error': 'Run is not being executed'}), 404
+    return jsonify({'success': True, 'message': 'Run execution stopping after the running tasks'})
 
 
 @agents_bp.route('/api/agent_run/<run_uuid>/task_execute/<task_uuid>/stop', methods=['POST'])
 @csrf.exempt
+@use_identity_map
 def api_stop_task_execution(run_uuid, task_uuid):
     """Stop/cancel the current task execution"""
     try:
@@ -174,8 +274,15 @@ def api_stop_task_execution(run_uuid, task_uuid):
             success = force_cancel_all_active_runs(thread_id, headers)
             
             if success:
-                # Update task status to cancelled
-                agent_run_manager.set_task_status(run_uuid, task_uuid, 'cancelled', 'Task stopped by user')
+                # Stop the job; its handler marks the task as cancelled once it has stopped
+                job_queue = get_job_queue()
+                job = job_queue.find_active(task_job_key(run_uuid, task_uuid))
+                if job:
+                    job_queue.request_cancel(job['id'])
+                    job = job_queue.get(job['id'])
+                if not job or job['status'] == 'cancelled':
+                    # No handler runs the task (not started as a job, or cancelled while queued)
+                    agent_run_manager.set_task_status(run_uuid, task_uuid, 'cancelled', 'Task stopped by user')
                 log_info(f"Successfully stopped task {task_uuid} in run {run_uuid}")
                 
                 return jsonify({
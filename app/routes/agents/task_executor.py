@@ -3,34 +3,54 @@ Task Executor
 Handles task execution logic for both AI and tool tasks
 """
 
-import json
-from app.utils.data_manager import agent_run_manager, tools_manager
+from app.utils.base_manager import get_config_value
+from app.utils.data_manager import agent_run_manager, agents_manager, tools_manager
+from app.utils.json_codec import sse_event
+from app.utils.result_cache import get_result_cache, result_cache_key
 from .api_utils import log_error, log_info
 from .openai_client import OpenAIClient
-from .prompt_builder import build_context_prompt, render_response_content
+from .prompt_builder import build_context_prompt, render_response_content, resolve_variables
 from .thread_management import get_thread_lock
 
 
 class TaskExecutor:
     """Handles execution of different task types"""
     
-    def __init__(self, run_uuid, task_uuid, task_def, task_inputs, agent, request_method):
+    def __init__(self, run_uuid, task_uuid, task_def, task_inputs, agent, request_method, variables=None,
+                 use_cache=True):
         self.run_uuid = run_uuid
         self.task_uuid = task_uuid
         self.task_def = task_def
         self.task_inputs = task_inputs
         self.agent = agent
         self.request_method = request_method
+        # Outputs of upstream tasks (run executor), available as {{variables}} but not saved as inputs
+        self.variables = variables or {}
+        # Tasks with cache_results replay the result of an identical earlier prompt unless use_cache is off
+        self.use_cache = use_cache
+        self.agent_run = None
+        self.task_state = None
+        self._cache_key = None
     
     def execute(self):
-        """Execute the task based on its type"""
+        """Execute the task based on its type, yielding Server-Sent Events"""
+        for payload in self.events():
+            yield sse_event(payload)
+    
+    def events(self):
+        """Execute the task based on its type, yielding the event payloads"""
         try:
-            # Update task status to running
-            agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'running')
+            # Load the run once: mark the task as running and save its inputs in one commit
+            with agent_run_manager.transaction(self.run_uuid) as run:
+                if run:
+                    run.set_task_status(self.task_uuid, 'running')
+                    run.set_task_inputs(self.task_uuid, self.task_inputs)
+                    self.agent_run = run.data
+                    self.task_state = run.get_task_state(self.task_uuid)
             
             # Generate initial HTML
             start_html = '<div class="task-execution-output">'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': start_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': start_html}
             
             # Execute based on task type
             if self.task_def.get('type') == 'ai':
@@ -40,28 +60,39 @@ class TaskExecutor:
             
             # Close the main container
             end_html = '</div>'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': end_html})}\n\n"
-            
-            # Save task inputs
-            agent_run_manager.set_task_inputs(self.run_uuid, self.task_uuid, self.task_inputs)
+            yield {'type': 'html_chunk', 'content': end_html}
             
             # Signal completion
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+            yield {'type': 'complete'}
             
         except Exception as e:
             log_error(f"Error in task execution: {str(e)}")
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield {'type': 'error', 'error': str(e)}
             # Set task status to error
             try:
                 agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', str(e))
             except:
                 pass
     
+    def prompt_variables(self):
+        """Get the values for {{variables}}: upstream outputs, overridden by the task inputs
+        
+        Input values may reference upstream outputs themselves.
+        """
+        if not self.variables:
+            return self.task_inputs
+        variables = dict(self.variables)
+        for key, value in (self.task_inputs or {}).items():
+            variables[key] = resolve_variables(value, self.variables) if isinstance(value, str) else value
+        return variables
+    
     def _execute_ai_task(self):
         """Execute AI task with OpenAI Assistant integration"""
+        if (yield from self._replay_cached_result()):
+            return
+        
         # Create or get user session for this task
-        task_state = agent_run_manager.get_task_state(self.run_uuid, self.task_uuid)
-        thread_id = task_state.get('user_session_id') if task_state else None
+        thread_id = self.task_state.get('user_session_id') if self.task_state else None
         
         # Acquire thread lock to prevent concurrent access to the same OpenAI thread
         if thread_id:
@@ -69,7 +100,7 @@ class TaskExecutor:
             log_info(f"Acquiring lock for thread {thread_id}")
             if not thread_lock.acquire(timeout=30):  # 30 second timeout
                 error_html = '<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error: Thread is busy with another request. Please wait and try again.</div></div></div>'
-                yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+                yield {'type': 'html_chunk', 'content': error_html}
                 agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', 'Thread busy')
                 return
             log_info(f"Acquired lock for thread {thread_id}")
@@ -80,14 +111,14 @@ class TaskExecutor:
             # Get OpenAI configuration
             openai_client, error_html = self._get_openai_client()
             if not openai_client:
-                yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+                yield {'type': 'html_chunk', 'content': error_html}
                 return
             
             # Get assistant ID
             assistant_id = self.agent.get('assistant_id')
             if not assistant_id:
                 error_html = '<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error: No Assistant ID found for this agent</div></div></div>'
-                yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+                yield {'type': 'html_chunk', 'content': error_html}
                 agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', 'No Assistant ID')
                 return
             
@@ -102,7 +133,7 @@ class TaskExecutor:
                 log_info(f"Acquiring lock for newly created thread {thread_id}")
                 if not thread_lock.acquire(timeout=30):  # 30 second timeout
                     error_html = '<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error: Unable to acquire lock for new thread. Please try again.</div></div></div>'
-                    yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+                    yield {'type': 'html_chunk', 'content': error_html}
                     agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', 'Lock acquisition failed')
                     return
                 log_info(f"Acquired lock for newly created thread {thread_id}")
@@ -112,7 +143,7 @@ class TaskExecutor:
             
         except Exception as ai_error:
             error_html = f'<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Exception: {str(ai_error)}</div></div></div>'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': error_html}
             agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', str(ai_error))
         
         finally:
@@ -121,10 +152,66 @@ class TaskExecutor:
                 log_info(f"Releasing lock for thread {thread_id}")
                 thread_lock.release()
     
+    def _replay_cached_result(self):
+        """Replay the memoized result of the same prompt, assistant and agent version (task option cache_results)
+        
+        Returns True on a cache hit; on a miss the key is kept so the new result is stored.
+        """
+        assistant_id = self.agent.get('assistant_id')
+        if not (self.use_cache and self.task_def.get('cache_results') and assistant_id):
+            return False
+        
+        try:
+            context_prompt = build_context_prompt(self.task_def, self.prompt_variables(), self.agent, self.agent_run)
+            self._cache_key = result_cache_key(context_prompt, assistant_id, self.agent.get('model', ''),
+                                               agents_manager.get_revision(self.agent))
+            cached = get_result_cache().get(self._cache_key)
+        except IOError as e:
+            log_error(f"Result cache unavailable: {str(e)}")
+            self._cache_key = None
+            return False
+        if not cached:
+            return False
+        
+        log_info(f"Task {self.task_uuid}: replaying cached result {self._cache_key[:12]}")
+        rendered_content = render_response_content(cached['raw_response'], self._output_rendering())
+        yield {
+            'type': 'final_content',
+            'content': rendered_content,
+            'container_id': f'streaming-content-{self.task_uuid}',
+            'cached': True
+        }
+        self._save_completion({
+            'html_output': rendered_content,
+            'raw_response': cached['raw_response'],
+            'assistant_id': assistant_id,
+            'cached': True
+        })
+        return True
+    
+    def _output_rendering(self):
+        """Output rendering type of the task (output_rendering, or output.type of older definitions)"""
+        output_rendering = self.task_def.get('output_rendering', '')
+        if not output_rendering:
+            output_rendering = self.task_def.get('output', {}).get('type', 'text')
+        return output_rendering
+    
+    def _cache_result(self, results_data):
+        """Memoize a fresh AI result under the key computed before the execution"""
+        if not self._cache_key or results_data.get('cached') or 'raw_response' not in results_data:
+            return
+        ttl = self.task_def.get('cache_ttl') or float(get_config_value('RESULT_CACHE_TTL_HOURS', 24)) * 3600
+        try:
+            get_result_cache().put(self._cache_key, self.task_uuid, {'raw_response': results_data['raw_response']},
+                                   float(ttl))
+        except (IOError, TypeError, ValueError) as e:
+            log_error(f"Error caching result of task {self.task_uuid}: {str(e)}")
+    
     def _execute_tool_task(self):
         """Execute tool task (simple completion)"""
         # For tool tasks, just mark as completed without additional output
         agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'completed')
+        yield from ()
     
     def _get_openai_client(self):
         """Get configured OpenAI client or return error"""
@@ -172,17 +259,14 @@ class TaskExecutor:
             return thread_id
         else:
             error_html = f'<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error creating session: {error_msg}</div></div></div>'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': error_html}
             agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', f'Session creation failed: {error_msg}')
             return None
     
     def _execute_openai_prompt(self, openai_client, thread_id, assistant_id):
         """Execute the context prompt via OpenAI Assistant API"""
-        # Load agent run to get preferences
-        agent_run = agent_run_manager.load(self.run_uuid)
-        
-        # Build context prompt with agent run data for language preference
-        context_prompt = build_context_prompt(self.task_def, self.task_inputs, self.agent, agent_run)
+        # Build context prompt with agent run data (loaded in execute) for language preference
+        context_prompt = build_context_prompt(self.task_def, self.prompt_variables(), self.agent, self.agent_run)
         
         # Note: Context prompt output removed per backlog item - no longer displaying prompt to user
         
@@ -195,7 +279,7 @@ class TaskExecutor:
             else:
                 error_html = f'<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error: {error_msg}</div></div></div>'
             
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': error_html}
             agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', error_msg)
             return
         
@@ -203,13 +287,21 @@ class TaskExecutor:
         stream_response = openai_client.create_streaming_run(thread_id, assistant_id)
         if not stream_response:
             error_html = f'<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error: Failed to create streaming run</div></div></div>'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': error_html}
             agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', 'Failed to create streaming run')
             return
         
         # Process streaming response
         yield from self._handle_streaming_response(stream_response, openai_client, thread_id, assistant_id)
     
+    def _save_completion(self, results_data):
+        """Save results and mark the task completed in one commit"""
+        with agent_run_manager.transaction(self.run_uuid) as run:
+            if run:
+                run.set_task_results(self.task_uuid, results_data)
+                run.set_task_status(self.task_uuid, 'completed')
+        self._cache_result(results_data)
+    
     def _handle_completion(self, openai_client, thread_id, context_prompt, assistant_id):
         """Handle successful completion of OpenAI Assistant run"""
         success, response_content, error_msg = openai_client.get_thread_messages(thread_id)
@@ -234,7 +326,7 @@ class TaskExecutor:
             log_info(f"Raw response content: {response_content[:200]}...")
             
             # Display result directly without extra container
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': rendered_content})}\n\n"
+            yield {'type': 'html_chunk', 'content': rendered_content}
             
             # Save results to agent run
             results_data = {
@@ -243,22 +335,17 @@ class TaskExecutor:
                 'thread_id': thread_id,
                 'assistant_id': assistant_id
             }
-            agent_run_manager.set_task_results(self.run_uuid, self.task_uuid, results_data)
-            agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'completed')
+            self._save_completion(results_data)
             
         else:
             error_html = f'<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Error: {error_msg}</div></div></div>'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': error_html}
             agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', error_msg)
     
     def _handle_streaming_response(self, stream_response, openai_client, thread_id, assistant_id):
         """Handle streaming response from OpenAI Assistant API v2"""
         try:
-            agent_run = agent_run_manager.load(self.run_uuid)
-            output_rendering = self.task_def.get('output_rendering', '')
-            if not output_rendering:
-                output_config = self.task_def.get('output', {})
-                output_rendering = output_config.get('type', 'text')
+            output_rendering = self._output_rendering()
             
             accumulated_content = ""
             has_content = False
@@ -303,7 +390,7 @@ class TaskExecutor:
                                                     'content': temp_rendered, 
                                                     'container_id': f'streaming-content-{self.task_uuid}'
                                                 }
-                                                yield f"data: {json.dumps(event_data)}\n\n"
+                                                yield event_data
                                                 last_render_length = len(accumulated_content)
                                             except Exception as render_error:
                                                 log_error(f"Markdown rendering error during streaming: {render_error}")
@@ -311,14 +398,14 @@ class TaskExecutor:
                                                 import html
                                                 escaped_text = html.escape(text_value)
                                                 event_data = {'type': 'text_chunk', 'content': escaped_text}
-                                                yield f"data: {json.dumps(event_data)}\n\n"
+                                                yield event_data
                                         
                                         elif output_rendering not in ['markdown', 'markup']:
                                             # For text output, escape and send immediately as text chunk
                                             import html
                                             escaped_text = html.escape(text_value)
                                             event_data = {'type': 'text_chunk', 'content': escaped_text}
-                                            yield f"data: {json.dumps(event_data)}\n\n"
+                                            yield event_data
                     
                     elif event.event == 'thread.run.completed':
                         log_info("Run completed - processing final content")
@@ -340,7 +427,7 @@ class TaskExecutor:
                     'content': rendered_content, 
                     'container_id': f'streaming-content-{self.task_uuid}'
                 }
-                yield f"data: {json.dumps(event_data)}\n\n"
+                yield event_data
                 
                 # Save results to agent run
                 results_data = {
@@ -349,18 +436,17 @@ class TaskExecutor:
                     'thread_id': thread_id,
                     'assistant_id': assistant_id
                 }
-                agent_run_manager.set_task_results(self.run_uuid, self.task_uuid, results_data)
-                agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'completed')
+                self._save_completion(results_data)
                 
             else:
                 # No content received
                 log_error("No response received from AI")
                 agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', 'No response received')
                 error_html = '<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">No response received from AI</div></div></div>'
-                yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+                yield {'type': 'html_chunk', 'content': error_html}
                 
         except Exception as e:
             log_error(f"Error in streaming response handler: {str(e)}")
             agent_run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', str(e))
             error_html = f'<div class="error-section mb-6"><div class="bg-red-50 p-4 rounded-lg"><div class="text-red-700 font-medium">Streaming error: {str(e)}</div></div></div>'
-            yield f"data: {json.dumps({'type': 'html_chunk', 'content': error_html})}\n\n"
+            yield {'type': 'html_chunk', 'content': error_html}
@@ -0,0 +1,177 @@
+"""
+Task Jobs
+Job queue handlers executing tasks and whole agent runs outside of the HTTP request
+"""
+
+from flask import Response, current_app, request
+from app.utils.data_manager import agent_run_manager, agents_manager
+from app.utils.job_queue import register_job_handler
+from app.utils.json_codec import sse_event
+from .api_utils import log_error, log_info
+from .run_executor import RunExecutor, TaskGraphError
+from .task_executor import TaskExecutor
+
+
+def task_job_key(run_uuid, task_uuid):
+    """Dedupe key of a task execution: one job per task of a run at a time"""
+    return f"task:{run_uuid}:{task_uuid}"
+
+
+def run_job_key(run_uuid):
+    """Dedupe key of a run execution: one job per run at a time"""
+    return f"run:{run_uuid}"
+
+
+def event_id(job_id, seq):
+    """SSE id of the event seq of a job, sent back by reconnecting clients as Last-Event-ID"""
+    return f"{job_id}:{seq}"
+
+
+def resume_position():
+    """Get (job id, sequence number) from the Last-Event-ID header of the request
+
+    Clients that cannot set headers pass the id as last_event_id query
+    parameter. Returns (None, 0) for a fresh stream.
+    """
+    value = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or ''
+    job_id, _, seq = value.strip().rpartition(':')
+    if not job_id or not seq.isdigit():
+        return None, 0
+    return job_id, int(seq)
+
+
+def event_stream_response(stream):
+    """SSE response for a generator or string of formatted events"""
+    return Response(
+        stream,
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',  # Disable nginx buffering
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Cache-Control, Last-Event-ID'
+        }
+    )
+
+
+def job_event_response(job_queue, job, after_seq=0):
+    """SSE response following the events of a job after after_seq, starting with the job id
+
+    Every event carries its id, so a client whose connection dropped resumes
+    with Last-Event-ID instead of executing the task again. Events older than
+    the job's replay buffer are reported as missed in the first event.
+    """
+    def generate_job_event_stream():
+        """Generator function for streaming the job's events"""
+        try:
+            intro = {'type': 'job', 'job_id': job['id'], 'status': job['status']}
+            if after_seq:
+                first = job_queue.events(job['id'], after_seq, limit=1)
+                intro['resumed_after'] = after_seq
+                intro['missed'] = max(0, first[0][0] - after_seq - 1) if first else 0
+            yield sse_event(intro, event_id(job['id'], after_seq))
+            for event in job_queue.subscribe(job['id'], after_seq):
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield sse_event(event[1], event_id(job['id'], event[0]))
+        except Exception as e:
+            log_error(f"Error in job event stream: {str(e)}")
+            yield sse_event({'type': 'error', 'error': str(e)})
+    
+    return event_stream_response(generate_job_event_stream())
+
+
+def resume_job_response(job_queue, job_id, after_seq, dedupe_key):
+    """Resume the event stream of a job of the given execution, None if the job is gone"""
+    job = job_queue.get(job_id)
+    if not job or job['dedupe_key'] != dedupe_key:
+        return None
+    log_info(f"Resuming stream of job {job_id} after event {after_seq}")
+    return job_event_response(job_queue, job, after_seq)
+
+
+def _load_run_and_agent(run_uuid):
+    agent_run = agent_run_manager.load(run_uuid)
+    if not agent_run:
+        return None, None, 'Agent run not found'
+    agent = agents_manager.load(agent_run['agent_uuid'])
+    if not agent:
+        return agent_run, None, 'Agent not found'
+    return agent_run, agent, None
+
+
+def execute_task_job(job, cancelled):
+    """Execute one task of a run (payload: run_uuid, task_uuid, inputs, request_method, use_cache)"""
+    payload = job['payload']
+    run_uuid, task_uuid = payload['run_uuid'], payload['task_uuid']
+    agent_run, agent, error = _load_run_and_agent(run_uuid)
+    if error:
+        yield {'type': 'error', 'error': error}
+        return
+
+    task_def = next((task for task in agent.get('tasks', []) if task.get('uuid') == task_uuid), None)
+    if not task_def:
+        yield {'type': 'error', 'error': 'Task definition not found'}
+        return
+
+    log_info(f"Job {job['id']}: executing task {task_uuid} of run {run_uuid} (attempt {job['attempts']})")
+    executor = TaskExecutor(run_uuid, task_uuid, task_def, payload.get('inputs') or {}, agent,
+                            payload.get('request_method', 'POST'), use_cache=payload.get('use_cache', True))
+    events = executor.events()
+    try:
+        for event in events:
+            yield event
+            if cancelled.is_set():
+                agent_run_manager.set_task_status(run_uuid, task_uuid, 'cancelled', 'Task stopped by user')
+                yield {'type': 'cancelled'}
+                return
+    finally:
+        events.close()
+
+
+def execute_run_job(job, cancelled):
+    """Execute all tasks of a run with the RunExecutor (payload: run_uuid, rerun, max_parallel)"""
+    payload = job['payload']
+    agent_run, agent, error = _load_run_and_agent(payload['run_uuid'])
+    if error:
+        yield {'type': 'error', 'error': error}
+        return
+
+    try:
+        executor = RunExecutor(payload['run_uuid'], agent, agent_run, payload.get('max_parallel', 4),
+                               payload.get('rerun', False), current_app._get_current_object(), stop_event=cancelled)
+    except TaskGraphError as e:
+        yield {'type': 'error', 'error': str(e)}
+        return
+    for event in executor.events():
+        if event is not None:  # Keep-alives are not stored, the worker heartbeat covers slow tasks
+            yield event
+
+
+def _fail_running_tasks(run_uuid, task_uuids=None, run_status=None):
+    """Mark tasks left running by a dead worker as failed"""
+    try:
+        with agent_run_manager.transaction(run_uuid) as run:
+            if run is None:
+                return
+            for task_state in run.data.get('task_states', []):
+                if task_state.get('status') == 'running' and (task_uuids is None or task_state.get('task_uuid') in task_uuids):
+                    run.set_task_status(task_state['task_uuid'], 'error', 'Execution was interrupted')
+            if run_status:
+                run.data['status'] = run_status
+    except Exception as e:
+        log_error(f"Error failing interrupted tasks of run {run_uuid}: {str(e)}")
+
+
+def abandon_task_job(job):
+    _fail_running_tasks(job['payload']['run_uuid'], [job['payload']['task_uuid']])
+
+
+def abandon_run_job(job):
+    _fail_running_tasks(job['payload']['run_uuid'], run_status='error')
+
+
+register_job_handler('task', execute_task_job, abandon_task_job)
+register_job_handler('run', execute_run_job, abandon_run_job)
@@ -4,16 +4,45 @@ Handles CRUD operations for agent tasks, reordering, and task-specific API endpo
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from app.utils.data_manager import agents_manager
+from app.utils.data_manager import agents_manager, RevisionConflict
+from app.utils.result_cache import get_result_cache
 from datetime import datetime
 import uuid
 
+from .api_utils import if_match_revision, revision_conflict_response, with_etag
+from .run_executor import TaskGraphError, task_dependencies
+
 # Get blueprint from the parent module
 from app.routes.agents import agents_bp
 
+def _modify_agent(agent_id, change):
+    """Apply change(agent) through agents_manager.modify() (If-Match is honored)
+    
+    change returns an (error message, status code) tuple to abort without saving.
+    Returns (agent, None) or (None, (message, status code)); a RevisionConflict
+    is left to the caller.
+    """
+    errors = []
+    
+    def apply(agent):
+        errors.clear()
+        error = change(agent)
+        if error:
+            errors.append(error)
+            return False
+    
+    agent = agents_manager.modify(agent_id, apply, if_match_revision())
+    if agent is None:
+        if not agents_manager.exists(agent_id):
+            return None, ('Agent not found', 404)
+        return None, ('Failed to save agent', 500)
+    if errors:
+        return None, errors[0]
+    return agent, None
+
 @agents_bp.route('/api/<agent_id>/tasks', methods=['GET'])
 def api_get_agent_tasks(agent_id):
-    """Get all tasks for a specific agent"""
+    """Get all tasks for a specific agent (ETag = agent revision)"""
     try:
         agent = agents_manager.load(agent_id)
         if not agent:
@@ -24,11 +53,12 @@ def api_get_agent_tasks(agent_id):
         # Sort tasks by order
         tasks.sort(key=lambda x: x.get('order', 0))
         
-        return jsonify({
+        return with_etag(jsonify({
             'agent_id': agent_id,
             'tasks': tasks,
-            'count': len(tasks)
-        })
+            'count': len(tasks),
+            'revision': agents_manager.get_revision(agent)
+        }), agent)
         
     except Exception as e:
         current_app.logger.error(f"Error getting tasks for agent {agent_id}: {str(e)}")
@@ -38,10 +68,6 @@ def api_get_agent_tasks(agent_id):
 def api_create_agent_task(agent_id):
     """Create a new task for a specific agent"""
     try:
-        agent = agents_manager.load(agent_id)
-        if not agent:
-            return jsonify({'error': 'Agent not found'}), 404
-        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
@@ -51,9 +77,6 @@ def api_create_agent_task(agent_id):
         if not name:
             return jsonify({'error': 'Task name is required'}), 400
         
-        # Get current tasks
-        tasks = agent.get('tasks', [])
-        
         # Create new task
         task_def = {
             'uuid': str(uuid.uuid4()),
@@ -64,92 +87,126 @@ def api_create_agent_task(agent_id):
             'output_type': data.get('output_type', 'text'),
             'output_description': data.get('output_description', ''),
             'output_rendering': data.get('output_rendering', 'text'),
-            'order': len(tasks) + 1,
             'created_at': datetime.utcnow().isoformat(),
             'modified_at': datetime.utcnow().isoformat(),
             'ai_config': data.get('ai_config', {}),
             'tool_config': data.get('tool_config', {}),
+            'depends_on': data.get('depends_on', []),
+            'cache_results': bool(data.get('cache_results', False)),
+            'cache_ttl': data.get('cache_ttl'),
             'status': 'pending'
         }
         
-        # Add task to agent
-        tasks.append(task_def)
-        agent['tasks'] = tasks
-        agent['updated_at'] = datetime.utcnow().isoformat()
-        
-        # Save agent
-        agents_manager.save(agent)
-        
-        return jsonify({
+        def add_task(agent):
+            tasks = agent.get('tasks', [])
+            task_def['order'] = len(tasks) + 1
+            
+            # Add task to agent
+            tasks.append(task_def)
+            error = _check_dependencies(tasks)
+            if error:
+                return error
+            agent['tasks'] = tasks
+            agent['updated_at'] = datetime.utcnow().isoformat()
+        
+        agent, error = _modify_agent(agent_id, add_task)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        
+        return with_etag((jsonify({
             'success': True,
             'message': 'Task created successfully',
             'task': task_def
-        }), 201
+        }), 201), agent)
         
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         current_app.logger.error(f"Error creating task for agent {agent_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _check_dependencies(tasks):
+    """Validate the depends_on edges of the task list, (error message, 400) if they are invalid"""
+    try:
+        task_dependencies(tasks)
+    except TaskGraphError as e:
+        return str(e), 400
+    return None
+
+def _find_task_index(tasks, task_uuid):
+    """Get the index of a task in the agent's task list, None if it is missing"""
+    for i, task in enumerate(tasks):
+        if task.get('uuid') == task_uuid:
+            return i
+    return None
+
 @agents_bp.route('/<agent_id>/tasks/<task_uuid>', methods=['PUT'])
 def api_update_agent_task(agent_id, task_uuid):
     """Update a specific task"""
     try:
-        agent = agents_manager.load(agent_id)
-        if not agent:
-            return jsonify({'success': False, 'error': 'Agent not found'}), 404
-        
         data = request.get_json()
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        tasks = agent.get('tasks', [])
-        if not tasks:
-            return jsonify({'success': False, 'error': 'No tasks found'}), 404
+        updated = {}
         
-        # Find the task to update
-        task_index = None
-        for i, task in enumerate(tasks):
-            if task.get('uuid') == task_uuid:
-                task_index = i
-                break
+        def update_task(agent):
+            tasks = agent.get('tasks', [])
+            if not tasks:
+                return 'No tasks found', 404
+            
+            # Find the task to update
+            task_index = _find_task_index(tasks, task_uuid)
+            if task_index is None:
+                return 'Task not found', 404
+            
+            # Update task fields
+            task = tasks[task_index]
+            if 'name' in data:
+                task['name'] = data['name']
+            if 'description' in data:
+                task['description'] = data['description']
+            if 'type' in data:
+                task['type'] = data['type']
+            if 'output_variable' in data:
+                task['output_variable'] = data['output_variable']
+            if 'output_type' in data:
+                task['output_type'] = data['output_type']
+            if 'output_description' in data:
+                task['output_description'] = data['output_description']
+            if 'output_rendering' in data:
+                task['output_rendering'] = data['output_rendering']
+            if 'ai_config' in data:
+                task['ai_config'] = data['ai_config']
+            if 'tool_config' in data:
+                task['tool_config'] = data['tool_config']
+            if 'depends_on' in data:
+                task['depends_on'] = data['depends_on']
+                error = _check_dependencies(tasks)
+                if error:
+                    return error
+            if 'cache_results' in data:
+                task['cache_results'] = bool(data['cache_results'])
+            if 'cache_ttl' in data:
+                task['cache_ttl'] = data['cache_ttl']
+            
+            # Update modified timestamp
+            task['modified_at'] = datetime.utcnow().isoformat()
+            agent['tasks'] = tasks
+            updated['task'] = task
         
-        if task_index is None:
-            return jsonify({'success': False, 'error': 'Task not found'}), 404
-        
-        # Update task fields
-        task = tasks[task_index]
-        if 'name' in data:
-            task['name'] = data['name']
-        if 'description' in data:
-            task['description'] = data['description']
-        if 'type' in data:
-            task['type'] = data['type']
-        if 'output_variable' in data:
-            task['output_variable'] = data['output_variable']
-        if 'output_type' in data:
-            task['output_type'] = data['output_type']
-        if 'output_description' in data:
-            task['output_description'] = data['output_description']
-        if 'output_rendering' in data:
-            task['output_rendering'] = data['output_rendering']
-        if 'ai_config' in data:
-            task['ai_config'] = data['ai_config']
-        if 'tool_config' in data:
-            task['tool_config'] = data['tool_config']
-        
-        # Update modified timestamp
-        task['modified_at'] = datetime.utcnow().isoformat()
-        
-        # Save agent
-        agent['tasks'] = tasks
-        agents_manager.save(agent)
+        agent, error = _modify_agent(agent_id, update_task)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
         
-        return jsonify({
+        return with_etag(jsonify({
             'success': True,
             'message': 'Task updated successfully',
-            'task': task
-        })
+            'task': updated['task']
+        }), agent)
         
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         current_app.logger.error(f"Error updating task: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -158,129 +215,143 @@ def api_update_agent_task(agent_id, task_uuid):
 def api_delete_agent_task(agent_id, task_uuid):
     """Delete a specific task"""
     try:
-        agent = agents_manager.load(agent_id)
-        if not agent:
-            return jsonify({'success': False, 'error': 'Agent not found'}), 404
-        
-        tasks = agent.get('tasks', [])
-        if not tasks:
-            return jsonify({'success': False, 'error': 'No tasks found'}), 404
-        
-        # Find and remove the task
-        task_index = None
-        for i, task in enumerate(tasks):
-            if task.get('uuid') == task_uuid:
-                task_index = i
-                break
+        removed = {}
         
-        if task_index is None:
-            return jsonify({'success': False, 'error': 'Task not found'}), 404
-        
-        # Remove the task
-        removed_task = tasks.pop(task_index)
-        
-        # Reorder remaining tasks
-        for i, task in enumerate(tasks):
-            task['order'] = i + 1
-        
-        # Save agent
-        agent['tasks'] = tasks
-        agents_manager.save(agent)
-        
-        return jsonify({
+        def delete_task(agent):
+            tasks = agent.get('tasks', [])
+            if not tasks:
+                return 'No tasks found', 404
+            
+            # Find and remove the task
+            task_index = _find_task_index(tasks, task_uuid)
+            if task_index is None:
+                return 'Task not found', 404
+            removed['task'] = tasks.pop(task_index)
+            
+            # Reorder remaining tasks and drop dependencies on the removed one
+            for i, task in enumerate(tasks):
+                task['order'] = i + 1
+                if task_uuid in (task.get('depends_on') or []):
+                    task['depends_on'] = [dep for dep in task['depends_on'] if dep != task_uuid]
+            agent['tasks'] = tasks
+        
+        agent, error = _modify_agent(agent_id, delete_task)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
+        
+        return with_etag(jsonify({
             'success': True,
             'message': 'Task deleted successfully',
-            'deleted_task': removed_task,
-            'remaining_count': len(tasks)
-        })
+            'deleted_task': removed['task'],
+            'remaining_count': len(agent['tasks'])
+        }), agent)
         
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         current_app.logger.error(f"Error deleting task: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@agents_bp.route('/<agent_id>/tasks/<task_uuid>/cache', methods=['DELETE'])
+def api_clear_task_cache(agent_id, task_uuid):
+    """Remove the memoized results of a task (see cache_results)"""
+    try:
+        removed = get_result_cache().clear(task_uuid)
+        return jsonify({'success': True, 'message': f'{removed} cached results removed', 'removed': removed})
+    except Exception as e:
+        current_app.logger.error(f"Error clearing result cache of task {task_uuid}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @agents_bp.route('/<agent_id>/tasks/reorder', methods=['POST'])
 def api_reorder_agent_tasks(agent_id):
-    """Reorder tasks for a specific agent"""
+    """Reorder tasks for a specific agent
+    
+    The order is only applied to the task list it was made for: if tasks were
+    added or removed meanwhile, the length check fails and nothing is saved.
+    """
     try:
-        agent = agents_manager.load(agent_id)
-        if not agent:
-            return jsonify({'success': False, 'error': 'Agent not found'}), 404
-        
         data = request.get_json()
         if not data or 'task_order' not in data:
             return jsonify({'success': False, 'error': 'Task order not provided'}), 400
         
         task_order = data['task_order']  # List of task UUIDs in new order
-        tasks = agent.get('tasks', [])
-        
-        if len(task_order) != len(tasks):
-            return jsonify({'success': False, 'error': 'Task order length mismatch'}), 400
         
-        # Create new ordered task list
-        new_tasks = []
-        for i, task_uuid in enumerate(task_order):
-            # Find task by UUID
-            task = next((t for t in tasks if t.get('uuid') == task_uuid), None)
-            if not task:
-                return jsonify({'success': False, 'error': f'Task {task_uuid} not found'}), 404
+        def reorder_tasks(agent):
+            tasks = agent.get('tasks', [])
+            if len(task_order) != len(tasks):
+                return 'Task order length mismatch', 400
             
-            # Update order
-            task['order'] = i + 1
-            new_tasks.append(task)
+            # Create new ordered task list
+            new_tasks = []
+            for i, task_uuid in enumerate(task_order):
+                # Find task by UUID
+                task = next((t for t in tasks if t.get('uuid') == task_uuid), None)
+                if not task:
+                    return f'Task {task_uuid} not found', 404
+                
+                # Update order
+                task['order'] = i + 1
+                new_tasks.append(task)
+            
+            agent['tasks'] = new_tasks
+            agent['updated_at'] = datetime.utcnow().isoformat()
         
-        # Save reordered tasks
-        agent['tasks'] = new_tasks
-        agent['updated_at'] = datetime.utcnow().isoformat()
-        agents_manager.save(agent)
+        agent, error = _modify_agent(agent_id, reorder_tasks)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
         
-        return jsonify({
+        return with_etag(jsonify({
             'success': True,
             'message': 'Tasks reordered successfully',
-            'task_count': len(new_tasks)
-        })
+            'task_count': len(agent['tasks'])
+        }), agent)
         
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         current_app.logger.error(f"Error reordering tasks: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@agents_bp.route('/<agent_id>/tasks/<task_uuid>/move-up', methods=['POST'])
-def move_task_up(agent_id, task_uuid):
-    """Move a task up in the order"""
-    try:
-        agent = agents_manager.load(agent_id)
-        if not agent:
-            return jsonify({'success': False, 'error': 'Agent not found'}), 404
-        
+def _move_task(agent_id, task_uuid, offset):
+    """Swap a task with its neighbour (offset -1 = up, +1 = down)"""
+    def move(agent):
         tasks = agent.get('tasks', [])
         if not tasks:
-            return jsonify({'success': False, 'error': 'No tasks found'}), 400
+            return 'No tasks found', 400
         
         # Find the task index
-        task_index = None
-        for i, task in enumerate(tasks):
-            if task.get('uuid') == task_uuid:
-                task_index = i
-                break
-        
+        task_index = _find_task_index(tasks, task_uuid)
         if task_index is None:
-            return jsonify({'success': False, 'error': 'Task not found'}), 404
+            return 'Task not found', 404
         
-        if task_index == 0:
-            return jsonify({'success': False, 'error': 'Task is already at the top'}), 400
+        target_index = task_index + offset
+        if target_index < 0:
+            return 'Task is already at the top', 400
+        if target_index >= len(tasks):
+            return 'Task is already at the bottom', 400
         
         # Swap tasks
-        tasks[task_index], tasks[task_index - 1] = tasks[task_index - 1], tasks[task_index]
+        tasks[task_index], tasks[target_index] = tasks[target_index], tasks[task_index]
         
         # Update order numbers
         for i, task in enumerate(tasks):
             task['order'] = i + 1
-        
-        # Save agent
         agent['tasks'] = tasks
-        agents_manager.save(agent)
+    
+    return _modify_agent(agent_id, move)
+
+@agents_bp.route('/<agent_id>/tasks/<task_uuid>/move-up', methods=['POST'])
+def move_task_up(agent_id, task_uuid):
+    """Move a task up in the order"""
+    try:
+        agent, error = _move_task(agent_id, task_uuid, -1)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
         
-        return jsonify({'success': True, 'message': 'Task moved up successfully'})
+        return with_etag(jsonify({'success': True, 'message': 'Task moved up successfully'}), agent)
         
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         current_app.logger.error(f"Error moving task up: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -289,40 +360,14 @@ def move_task_up(agent_id, task_uuid):
 def move_task_down(agent_id, task_uuid):
     """Move a task down in the order"""
     try:
-        agent = agents_manager.load(agent_id)
-        if not agent:
-            return jsonify({'success': False, 'error': 'Agent not found'}), 404
-        
-        tasks = agent.get('tasks', [])
-        if not tasks:
-            return jsonify({'success': False, 'error': 'No tasks found'}), 400
-        
-        # Find the task index
-        task_index = None
-        for i, task in enumerate(tasks):
-            if task.get('uuid') == task_uuid:
-                task_index = i
-                break
-        
-        if task_index is None:
-            return jsonify({'success': False, 'error': 'Task not found'}), 404
-        
-        if task_index == len(tasks) - 1:
-            return jsonify({'success': False, 'error': 'Task is already at the bottom'}), 400
-        
-        # Swap tasks
-        tasks[task_index], tasks[task_index + 1] = tasks[task_index + 1], tasks[task_index]
-        
-        # Update order numbers
-        for i, task in enumerate(tasks):
-            task['order'] = i + 1
-        
-        # Save agent
-        agent['tasks'] = tasks
-        agents_manager.save(agent)
+        agent, error = _move_task(agent_id, task_uuid, 1)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
         
-        return jsonify({'success': True, 'message': 'Task moved down successfully'})
+        return with_etag(jsonify({'success': True, 'message': 'Task moved down successfully'}), agent)
         
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         current_app.logger.error(f"Error moving task down: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
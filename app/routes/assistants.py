@@ -382,11 +382,10 @@ def api_delete_assistant(assistant_id):
         
         if success:
             # Also remove assistant_id from any agents
-            agents = agents_manager.get_all()
+            agents = [agent for agent in agents_manager.get_all() if agent.get('assistant_id') == assistant_id]
             for agent in agents:
-                if agent.get('assistant_id') == assistant_id:
-                    agent['assistant_id'] = None
-                    agents_manager.save(agent)
+                agent['assistant_id'] = None
+            agents_manager.save_many(agents)
             
             return jsonify({'success': True, 'message': 'Assistant deleted successfully'})
         else:
@@ -8,6 +8,7 @@ from werkzeug.utils import secure_filename
 import os
 import json
 from app.utils import integrations_manager, validator, icon_manager
+from app.utils.pagination import get_page_args, pagination_context
 from datetime import datetime
 
 integrations_bp = Blueprint('integrations', __name__, url_prefix='/integrations')
@@ -16,7 +17,6 @@ integrations_bp = Blueprint('integrations', __name__, url_prefix='/integrations'
 def list_integrations():
     """Zeigt Liste aller Integrations"""
     try:
-        integrations = integrations_manager.load_all()
         stats = integrations_manager.get_stats()
         
         # Filter und Suche
@@ -24,26 +24,28 @@ def list_integrations():
         vendor_filter = request.args.get('vendor', '')
         status_filter = request.args.get('status', '')
         type_filter = request.args.get('type', '')
+        limit, cursor = get_page_args()
         
-        if search_query:
-            integrations = integrations_manager.search(search_query)
+        filters = {}
+        if status_filter:
+            filters['status'] = status_filter
+        if type_filter:
+            filters['type'] = type_filter
         
+        predicate = None
         if vendor_filter:
-            integrations = [i for i in integrations if i.get('vendor', '').lower() == vendor_filter.lower()]
+            predicate = lambda i: i.get('vendor', '').lower() == vendor_filter.lower()
         
-        if status_filter:
-            integrations = [i for i in integrations if i.get('status') == status_filter]
-            
-        if type_filter:
-            integrations = [i for i in integrations if i.get('type') == type_filter]
+        integrations, next_cursor = integrations_manager.get_page(filters, limit=limit, cursor=cursor,
+                                                                  query=search_query or None,
+                                                                  predicate=predicate)
         
         # Icons hinzufügen
         for integration in integrations:
             integration['icon_url'] = icon_manager.get_icon_path(integration['id'])
         
         # Vendor-Liste für Filter
-        all_integrations = integrations_manager.load_all()
-        vendors = sorted(set(i.get('vendor', '') for i in all_integrations if i.get('vendor')))
+        vendors = sorted(vendor for vendor in integrations_manager.get_counts('vendor') if vendor)
         
         return render_template('integrations/list.html', 
                              integrations=integrations,
@@ -52,7 +54,8 @@ def list_integrations():
                              search_query=search_query,
                              vendor_filter=vendor_filter,
                              status_filter=status_filter,
-                             type_filter=type_filter)
+                             type_filter=type_filter,
+                             pagination=pagination_context(next_cursor))
         
     except Exception as e:
         flash(f'Error loading integrations: {str(e)}', 'error')
@@ -10,7 +10,8 @@ from datetime import datetime
 import uuid
 import json
 
-from app.utils.data_manager import agents_manager, agent_run_manager, tools_manager
+from app.utils.data_manager import agents_manager, agent_run_manager, tools_manager, RevisionConflict
+from app.routes.agents.api_utils import if_match_revision, revision_conflict_response, with_etag
 
 # Blueprint for Sprint 18 task management
 task_management_bp = Blueprint('task_management', __name__, url_prefix='/api/task_management')
@@ -23,13 +24,15 @@ def get_agent_tasks(agent_uuid):
         if not agent:
             return jsonify({'success': False, 'error': 'Agent not found'}), 404
         
-        tasks = agents_manager.get_task_definitions(agent_uuid)
+        tasks = sorted(agent.get('tasks', []), key=lambda x: x.get('order', 0))
         
-        return jsonify({
+        # Send the ETag back as If-Match to make edits conditional
+        return with_etag(jsonify({
             'success': True,
             'tasks': tasks,
-            'count': len(tasks)
-        })
+            'count': len(tasks),
+            'revision': agents_manager.get_revision(agent)
+        }), agent)
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -87,7 +90,7 @@ def create_agent_task(agent_uuid):
             })
         
         # Add task to agent
-        success = agents_manager.add_task_definition(agent_uuid, task_def)
+        success = agents_manager.add_task_definition(agent_uuid, task_def, if_match_revision())
         
         if success:
             return jsonify({
@@ -98,6 +101,8 @@ def create_agent_task(agent_uuid):
         else:
             return jsonify({'success': False, 'error': 'Failed to create task'}), 500
     
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -119,7 +124,7 @@ def update_agent_task(agent_uuid, task_uuid):
         data['uuid'] = task_uuid
         data['updated_at'] = datetime.now().isoformat()
         
-        success = agents_manager.update_task_definition(agent_uuid, task_uuid, data)
+        success = agents_manager.update_task_definition(agent_uuid, task_uuid, data, if_match_revision())
         
         if success:
             task = agents_manager.get_task_definition(agent_uuid, task_uuid)
@@ -131,6 +136,8 @@ def update_agent_task(agent_uuid, task_uuid):
         else:
             return jsonify({'success': False, 'error': 'Failed to update task'}), 500
     
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -144,7 +151,7 @@ def delete_agent_task(agent_uuid, task_uuid):
         except ValidationError:
             return jsonify({'success': False, 'error': 'CSRF token validation failed'}), 400
         
-        success = agents_manager.remove_task_definition(agent_uuid, task_uuid)
+        success = agents_manager.remove_task_definition(agent_uuid, task_uuid, if_match_revision())
         
         if success:
             return jsonify({
@@ -154,6 +161,8 @@ def delete_agent_task(agent_uuid, task_uuid):
         else:
             return jsonify({'success': False, 'error': 'Failed to delete task'}), 500
     
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -171,7 +180,7 @@ def reorder_agent_tasks(agent_uuid):
         if not data or 'task_uuids' not in data:
             return jsonify({'success': False, 'error': 'task_uuids array required'}), 400
         
-        success = agents_manager.reorder_task_definitions(agent_uuid, data['task_uuids'])
+        success = agents_manager.reorder_task_definitions(agent_uuid, data['task_uuids'], if_match_revision())
         
         if success:
             tasks = agents_manager.get_task_definitions(agent_uuid)
@@ -183,6 +192,8 @@ def reorder_agent_tasks(agent_uuid):
         else:
             return jsonify({'success': False, 'error': 'Failed to reorder tasks'}), 500
     
+    except RevisionConflict as e:
+        return revision_conflict_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -226,34 +237,33 @@ def execute_task(run_uuid, task_uuid):
         inputs = data.get('inputs', {}) if data else {}
         print(f"[DEBUG] Extracted inputs: {inputs}")
         
-        # Get task definition and current state
-        agent_run = agent_run_manager.load(run_uuid)
-        if not agent_run:
-            print(f"[DEBUG] Agent run not found: {run_uuid}")
-            return jsonify({'success': False, 'error': 'Agent run not found'}), 404
-        
-        print(f"[DEBUG] Agent run found, agent_uuid: {agent_run.get('agent_uuid')}")
-        
-        agent = agents_manager.load(agent_run['agent_uuid'])
-        if not agent:
-            print(f"[DEBUG] Agent not found: {agent_run['agent_uuid']}")
-            return jsonify({'success': False, 'error': 'Agent not found'}), 404
-        
-        print(f"[DEBUG] Agent found: {agent.get('name', 'Unknown')}")
-        
-        task_def = agents_manager.get_task_definition(agent_run['agent_uuid'], task_uuid)
-        if not task_def:
-            print(f"[DEBUG] Task definition not found: {task_uuid}")
-            return jsonify({'success': False, 'error': 'Task definition not found'}), 404
-        
-        print(f"[DEBUG] Task definition found, type: {task_def.get('type')}")
-        
-        # Set task as running
-        status_result = agent_run_manager.set_task_status(run_uuid, task_uuid, 'running')
-        print(f"[DEBUG] Set task status to running: {status_result}")
-        
-        inputs_result = agent_run_manager.set_task_inputs(run_uuid, task_uuid, inputs)
-        print(f"[DEBUG] Set task inputs: {inputs_result}")
+        # Load the run once, then mark the task as running and store its inputs in one commit
+        with agent_run_manager.transaction(run_uuid) as run:
+            if not run:
+                print(f"[DEBUG] Agent run not found: {run_uuid}")
+                return jsonify({'success': False, 'error': 'Agent run not found'}), 404
+            agent_run = run.data
+            
+            print(f"[DEBUG] Agent run found, agent_uuid: {agent_run.get('agent_uuid')}")
+            
+            agent = agents_manager.load(agent_run['agent_uuid'])
+            if not agent:
+                print(f"[DEBUG] Agent not found: {agent_run['agent_uuid']}")
+                return jsonify({'success': False, 'error': 'Agent not found'}), 404
+            
+            print(f"[DEBUG] Agent found: {agent.get('name', 'Unknown')}")
+            
+            task_def = agents_manager.get_task_definition(agent_run['agent_uuid'], task_uuid)
+            if not task_def:
+                print(f"[DEBUG] Task definition not found: {task_uuid}")
+                return jsonify({'success': False, 'error': 'Task definition not found'}), 404
+            
+            print(f"[DEBUG] Task definition found, type: {task_def.get('type')}")
+            
+            # Set task as running
+            run.set_task_status(task_uuid, 'running')
+            run.set_task_inputs(task_uuid, inputs)
+        print(f"[DEBUG] Set task status to running with inputs: {run.committed}")
         
         try:
             # Execute task based on type
@@ -264,9 +274,11 @@ def execute_task(run_uuid, task_uuid):
             else:
                 raise ValueError(f"Unknown task type: {task_def['type']}")
             
-            # Save results and mark as completed
-            agent_run_manager.set_task_results(run_uuid, task_uuid, result)
-            agent_run_manager.set_task_status(run_uuid, task_uuid, 'completed')
+            # Save results and mark as completed in one commit
+            with agent_run_manager.transaction(run_uuid) as run:
+                if run:
+                    run.set_task_results(task_uuid, result)
+                    run.set_task_status(task_uuid, 'completed')
             
             return jsonify({
                 'success': True,
@@ -290,7 +302,7 @@ def execute_task(run_uuid, task_uuid):
 def get_task_status(run_uuid, task_uuid):
     """Get task execution status (Sprint 18)"""
     try:
-        task_state = agent_run_manager.get_task_state(run_uuid, task_uuid)
+        task_state = agent_run_manager.get_task_state(run_uuid, task_uuid, resolve_blobs=True)
         
         if task_state:
             return jsonify({
@@ -343,6 +355,26 @@ def sync_run_tasks(run_uuid):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@task_management_bp.route('/agent/<agent_uuid>/sync_tasks', methods=['POST'])
+def sync_agent_run_tasks(agent_uuid):
+    """Sync task definitions from agent to all of its agent runs"""
+    try:
+        # Validate CSRF token
+        try:
+            validate_csrf(request.headers.get('X-CSRFToken'))
+        except ValidationError:
+            return jsonify({'success': False, 'error': 'CSRF token validation failed'}), 400
+        
+        synced_count = agent_run_manager.sync_task_definitions_for_agent(agent_uuid)
+        return jsonify({
+            'success': True,
+            'synced_count': synced_count,
+            'message': f'Task definitions synced to {synced_count} runs'
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # Tools Options API (Sprint 18)
 
 @task_management_bp.route('/tools/assistant-enabled', methods=['GET'])
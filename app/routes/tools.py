@@ -13,6 +13,7 @@ import asyncio
 from datetime import datetime
 
 from app.utils.data_manager import ToolsManager, IntegrationsManager
+from app.utils.pagination import get_page_args, pagination_context
 from app.utils.validation import ToolValidator
 
 # Implementation Module Integration
@@ -35,22 +36,22 @@ validator = ToolValidator()
 def list_tools():
     """Liste aller Tools anzeigen"""
     try:
-        tools = tools_manager.get_all()
         integrations = integrations_manager.get_all()
         
         # Filter und Suche
         search_query = request.args.get('search', '')
         integration_filter = request.args.get('integration', '')
         status_filter = request.args.get('status', '')
+        limit, cursor = get_page_args()
         
-        if search_query:
-            tools = tools_manager.search(search_query)
-        
+        filters = {}
         if integration_filter:
-            tools = [t for t in tools if t.get('tool_definition') == integration_filter]
-        
+            filters['tool_definition'] = integration_filter
         if status_filter:
-            tools = [t for t in tools if t.get('status') == status_filter]
+            filters['status'] = status_filter
+        
+        tools, next_cursor = tools_manager.get_page(filters, limit=limit, cursor=cursor,
+                                                    query=search_query or None)
         
         # Erweitere Tools mit Integration-Informationen
         for tool in tools:
@@ -64,7 +65,8 @@ def list_tools():
                              integrations=integrations,
                              search_query=search_query,
                              integration_filter=integration_filter,
-                             status_filter=status_filter)
+                             status_filter=status_filter,
+                             pagination=pagination_context(next_cursor))
         
     except Exception as e:
         print(f"ERROR in list_tools: {str(e)}")
@@ -83,11 +85,7 @@ def view_tool(tool_id):
             return redirect(url_for('tools.list_tools'))
         
         # Integration-Details laden
-        integration = next(
-            (i for i in integrations_manager.get_all() 
-             if i['name'] == tool.get('tool_definition')), 
-            None
-        )
+        integration = integrations_manager.get_by_name(tool.get('tool_definition'))
         
         return render_template('tools/view.html', tool=tool, integration=integration)
         
@@ -472,11 +470,7 @@ def test_tool(tool_id):
                 pass
         
         # Fallback: Basic-Test ohne Implementation Module
-        integration = next(
-            (i for i in integrations_manager.get_all() 
-             if i['name'] == tool.get('tool_definition')), 
-            None
-        )
+        integration = integrations_manager.get_by_name(tool.get('tool_definition'))
         
         if not integration:
             return jsonify({'success': False, 'message': 'Integration nicht gefunden'}), 404
@@ -589,11 +583,7 @@ def execute_tool(tool_id):
                 pass
         
         # Fallback: Simulierte Ausführung
-        integration = next(
-            (i for i in integrations_manager.get_all() 
-             if i['name'] == tool.get('tool_definition')), 
-            None
-        )
+        integration = integrations_manager.get_by_name(tool.get('tool_definition'))
         
         if not integration:
             return jsonify({'success': False, 'message': 'Integration nicht gefunden'}), 404
@@ -676,11 +666,7 @@ def get_tool_config(tool_id):
             return jsonify({'success': False, 'message': 'Tool nicht gefunden'}), 404
         
         # Integration-Details laden
-        integration = next(
-            (i for i in integrations_manager.get_all() 
-             if i['name'] == tool.get('tool_definition')), 
-            None
-        )
+        integration = integrations_manager.get_by_name(tool.get('tool_definition'))
         
         return jsonify({
             'success': True,
@@ -695,9 +681,10 @@ def get_tool_config(tool_id):
 def search_tools():
     """Tools durchsuchen"""
     query = request.args.get('q', '').strip()
+    ranked = request.args.get('ranked', '').lower() in ('1', 'true', 'yes')
     try:
         if query:
-            tools = tools_manager.search(query)
+            tools = tools_manager.search(query, ranked=ranked)
         else:
             tools = tools_manager.get_all()
         
@@ -8,6 +8,10 @@ window.autoSaveTimeout = null;
 // Global variable to track current active task execution
 window.currentTaskExecution = null;
 
+// Reconnects of a dropped task stream (resumed with Last-Event-ID, no new execution)
+const STREAM_RESUME_ATTEMPTS = 5;
+const STREAM_RESUME_DELAY_MS = 1000;
+
 function restoreActiveTask(uuid) {
     if (window.taskDefinitions.length === 0) return;
     
@@ -342,9 +346,18 @@ function executeTaskWithStreaming(taskIndex, taskUuid, inputData) {
         abortController: abortController
     };
     
+    // Position in the task's event stream, used to resume after a dropped connection
+    const stream = {
+        url: `/agents/api/agent_run/${window.agentRunUuid}/task_execute/${taskUuid}/stream`,
+        signal: abortController.signal,
+        lastEventId: null,
+        finished: false,
+        attempts: 0
+    };
+    
     // Since EventSource doesn't support POST, we need to use fetch for the initial request
     // and then connect to a streaming endpoint
-    fetch(`/agents/api/agent_run/${window.agentRunUuid}/task_execute/${taskUuid}/stream`, {
+    runTaskStream(stream, taskIndex, outputElement, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -354,70 +367,12 @@ function executeTaskWithStreaming(taskIndex, taskUuid, inputData) {
         body: JSON.stringify({ inputs: inputData }),
         signal: abortController.signal  // Add abort signal
     })
-    .then(response => {
-        if (!response.ok) {
-            throw new Error('Network response was not ok');
-        }
-        
-        // Handle streaming response
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
-        let buffer = ''; // Buffer for incomplete data
-        
-        function readStream() {
-            return reader.read().then(({ done, value }) => {
-                if (done) {
-                    console.log('Stream complete');
-                    // Clear execution tracking and update UI
-                    window.currentTaskExecution = null;
-                    updateStopButtonVisibility(false);
-                    setButtonLoadingState(taskIndex, false);
-                    return;
-                }
-                
-                // Decode the chunk and add to buffer
-                const chunk = decoder.decode(value, { stream: true });
-                buffer += chunk;
-                
-                // Process complete SSE events from buffer
-                const events = buffer.split('\n\n');
-                // Keep the last incomplete event in buffer
-                buffer = events.pop() || '';
-                
-                events.forEach(event => {
-                    const lines = event.split('\n');
-                    let dataLine = null;
-                    
-                    // Find the data line in this event
-                    for (const line of lines) {
-                        if (line.startsWith('data: ')) {
-                            dataLine = line.slice(6);
-                            break;
-                        }
-                    }
-                    
-                    if (dataLine && dataLine.trim()) {
-                        try {
-                            // Handle case where multiple JSON objects might be in one line
-                            // This shouldn't happen but let's be defensive
-                            const firstJsonEnd = dataLine.indexOf('}\n\ndata:');
-                            const actualJsonData = firstJsonEnd > 0 ? dataLine.substring(0, firstJsonEnd + 1) : dataLine;
-                            
-                            const data = JSON.parse(actualJsonData);
-                            handleStreamData(data, taskIndex, outputElement);
-                        } catch (e) {
-                            console.error('Error parsing stream data:', e, 'Data:', dataLine);
-                            // On parse error, continue processing other events
-                        }
-                    }
-                });
-                
-                // Continue reading
-                return readStream();
-            });
-        }
-        
-        return readStream();
+    .then(() => {
+        console.log('Stream complete');
+        // Clear execution tracking and update UI
+        window.currentTaskExecution = null;
+        updateStopButtonVisibility(false);
+        setButtonLoadingState(taskIndex, false);
     })
     .catch(error => {
         console.error('Streaming error:', error);
@@ -444,6 +399,110 @@ function executeTaskWithStreaming(taskIndex, taskUuid, inputData) {
     });
 }
 
+// Read a task stream until it ends; a stream dropped before complete/error is
+// resumed from the last received event (the task keeps running on the server)
+function runTaskStream(stream, taskIndex, outputElement, requestOptions) {
+    return fetch(stream.url, requestOptions)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return readTaskStream(response.body.getReader(), stream, taskIndex, outputElement);
+        })
+        .catch(error => {
+            if (error.name === 'AbortError' || !stream.lastEventId || stream.attempts >= STREAM_RESUME_ATTEMPTS) {
+                throw error;
+            }
+            console.warn('Task stream interrupted:', error);
+        })
+        .then(() => {
+            if (stream.finished || !stream.lastEventId) {
+                return;
+            }
+            if (stream.attempts >= STREAM_RESUME_ATTEMPTS) {
+                throw new Error('Connection to the task stream lost');
+            }
+            
+            stream.attempts += 1;
+            const delay = STREAM_RESUME_DELAY_MS * 2 ** (stream.attempts - 1);
+            console.log(`Resuming task stream after event ${stream.lastEventId} in ${delay}ms (attempt ${stream.attempts})`);
+            return new Promise(resolve => setTimeout(resolve, delay))
+                .then(() => runTaskStream(stream, taskIndex, outputElement, {
+                    method: 'GET',
+                    headers: {
+                        'Accept': 'text/event-stream',
+                        'Last-Event-ID': stream.lastEventId
+                    },
+                    signal: stream.signal
+                }));
+        });
+}
+
+function readTaskStream(reader, stream, taskIndex, outputElement) {
+    const decoder = new TextDecoder();
+    let buffer = ''; // Buffer for incomplete data
+    
+    function readChunk() {
+        return reader.read().then(({ done, value }) => {
+            if (done) {
+                return;
+            }
+            
+            // Decode the chunk and add to buffer
+            const chunk = decoder.decode(value, { stream: true });
+            buffer += chunk;
+            
+            // Process complete SSE events from buffer
+            const events = buffer.split('\n\n');
+            // Keep the last incomplete event in buffer
+            buffer = events.pop() || '';
+            
+            events.forEach(event => {
+                const lines = event.split('\n');
+                let dataLine = null;
+                let eventId = null;
+                
+                // Find the id and data lines in this event
+                for (const line of lines) {
+                    if (line.startsWith('id: ')) {
+                        eventId = line.slice(4);
+                    } else if (line.startsWith('data: ')) {
+                        dataLine = line.slice(6);
+                        break;
+                    }
+                }
+                
+                if (dataLine && dataLine.trim()) {
+                    try {
+                        // Handle case where multiple JSON objects might be in one line
+                        // This shouldn't happen but let's be defensive
+                        const firstJsonEnd = dataLine.indexOf('}\n\ndata:');
+                        const actualJsonData = firstJsonEnd > 0 ? dataLine.substring(0, firstJsonEnd + 1) : dataLine;
+                        
+                        const data = JSON.parse(actualJsonData);
+                        handleStreamData(data, taskIndex, outputElement);
+                        if (['complete', 'error', 'cancelled'].includes(data.type)) {
+                            stream.finished = true;
+                        }
+                    } catch (e) {
+                        console.error('Error parsing stream data:', e, 'Data:', dataLine);
+                        // On parse error, continue processing other events
+                    }
+                }
+                if (eventId) {
+                    stream.lastEventId = eventId;
+                    stream.attempts = 0;
+                }
+            });
+            
+            // Continue reading
+            return readChunk();
+        });
+    }
+    
+    return readChunk();
+}
+
 function handleStreamData(data, taskIndex, outputElement) {
     switch (data.type) {
         case 'html_chunk':
@@ -536,6 +595,20 @@ function handleStreamData(data, taskIndex, outputElement) {
             console.log('Task execution completed:', taskIndex);
             break;
             
+        case 'job':
+            // Execution queued or resumed on the server
+            if (data.missed) {
+                console.warn(`Task stream resumed, ${data.missed} events were no longer available`);
+            }
+            break;
+            
+        case 'cancelled':
+            updateTaskStatus(taskIndex, 'cancelled');
+            setButtonLoadingState(taskIndex, false);
+            window.currentTaskExecution = null;
+            updateStopButtonVisibility(false);
+            break;
+            
         case 'error':
             // Handle execution error
             updateTaskStatus(taskIndex, 'error');
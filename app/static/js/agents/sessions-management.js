@@ -7,6 +7,11 @@
 let agentSessions = [];
 let filteredSessions = [];
 
+// Server-side pagination state
+const SESSIONS_PAGE_SIZE = 50;
+let sessionsNextCursor = null;
+let sessionsTotalCount = 0;
+
 // Initialize sessions when page loads
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Sessions management script DOM ready, checking agent data...');
@@ -18,8 +23,8 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-// Load sessions from API
-async function loadSessions() {
+// Load sessions from API (first page, or the next page when append is true)
+async function loadSessions(append = false) {
     console.log('loadSessions called for agent:', window.agentData?.id);
     try {
         const agentId = window.agentData.id;
@@ -27,16 +32,23 @@ async function loadSessions() {
             throw new Error('No agent ID available');
         }
         
-        console.log('Fetching sessions from API:', `/agents/api/${agentId}/sessions`);
-        const response = await fetch(`/agents/api/${agentId}/sessions`);
+        const params = new URLSearchParams({ limit: SESSIONS_PAGE_SIZE });
+        if (append && sessionsNextCursor) {
+            params.set('cursor', sessionsNextCursor);
+        }
+        
+        console.log('Fetching sessions from API:', `/agents/api/${agentId}/sessions?${params}`);
+        const response = await fetch(`/agents/api/${agentId}/sessions?${params}`);
         
         console.log('Sessions API response status:', response.status);
         if (response.ok) {
             const data = await response.json();
             console.log('Sessions data received:', data);
-            agentSessions = data.sessions || [];
-            filteredSessions = [...agentSessions];
-            updateSessionsDisplay();
+            const sessions = data.sessions || [];
+            agentSessions = append ? agentSessions.concat(sessions) : sessions;
+            sessionsNextCursor = data.next_cursor || null;
+            sessionsTotalCount = data.total_count || agentSessions.length;
+            filterSessions();
         } else {
             throw new Error(`API returned ${response.status}: ${response.statusText}`);
         }
@@ -69,7 +81,8 @@ function updateSessionsDisplay() {
     
     // Update count
     if (count) {
-        count.textContent = `(${filteredSessions.length} session${filteredSessions.length !== 1 ? 's' : ''})`;
+        const shown = `${filteredSessions.length} session${filteredSessions.length !== 1 ? 's' : ''}`;
+        count.textContent = sessionsNextCursor ? `(${shown} of ${sessionsTotalCount})` : `(${shown})`;
         console.log('Updated sessions count');
     }
     
@@ -102,6 +115,15 @@ function renderSessionsList() {
         const sessionElement = createSessionElement(session);
         list.appendChild(sessionElement);
     });
+    
+    // More sessions on the server: offer to load the next page
+    if (sessionsNextCursor) {
+        const loadMore = document.createElement('button');
+        loadMore.className = 'w-full mt-2 text-sm text-blue-600 hover:text-blue-800';
+        loadMore.textContent = 'Load more sessions';
+        loadMore.onclick = () => loadSessions(true);
+        list.appendChild(loadMore);
+    }
 }
 
 // Create session element
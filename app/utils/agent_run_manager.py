@@ -4,23 +4,85 @@ Handles agent runs with Sprint 18 task execution
 """
 
 import json
-import shutil
 import uuid
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
 
-from .base_manager import DataManager
+from .base_manager import DataManager, get_config_value
+from .blob_store import BlobStore, is_blob_ref
+from .identity_map import current_identity_map
+from .run_archive import RunArchive
+from .run_locks import RunLockTimeout
+from .run_transaction import RunTransaction
+from .task_journal import TaskStateJournal, apply_task_patch
 
 class AgentRunManager(DataManager):
     """Manager for agent runs with Sprint 18 task execution"""
     
+    id_field = 'uuid'
+    pretty_json = False  # Machine-owned, written on every task state change
+    trust_change_feed = True
+    sharded_layout = True  # Tens of thousands of runs, see migrate_storage_layout()
+    indexed_fields = ('agent_uuid',)
+    summary_fields = ('uuid', 'agent_uuid', 'name', 'status', 'created_at', 'updated_at',
+                      'started_at', 'completed_at', 'archived_at')
+    search_fields = {}  # Runs are not searched by text
+    
+    # Task result fields moved to the blob store once they reach BLOB_MIN_SIZE characters
+    blob_fields = ('html_output', 'raw_response')
+    
+    # Runs with a task in one of these states are never archived
+    ACTIVE_TASK_STATUSES = ('running',)
+    
     def __init__(self):
         super().__init__('agentrun')
-        self._save_locks = {}  # Track save operations to prevent concurrent writes
+        
+        # Task state patches are appended here and folded into the run on the next save
+        self._journal = TaskStateJournal(self.meta_dir / 'journal')
+        self.journal_compact_entries = int(get_config_value('TASK_JOURNAL_COMPACT_ENTRIES', 50))
+        
+        # Large task outputs are stored once, compressed, outside the run documents
+        self._blobs = BlobStore(self.data_dir.parent / 'blobs')
+        self.blob_min_size = int(get_config_value('BLOB_MIN_SIZE', 1024))
+        
+        # Old runs are packed into compressed segment files, see archive_old_runs()
+        self._archive = RunArchive(self.data_dir.parent / 'archive' / self.data_type,
+                                   int(get_config_value('RUN_ARCHIVE_SEGMENT_MB', 64)) * 1024 * 1024)
+        self.archive_after_days = float(get_config_value('RUN_ARCHIVE_AFTER_DAYS', 90))
+    
+    def _externalize_results(self, task_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a task state whose large result fields are replaced by blob references"""
+        results = task_state.get('results')
+        if not isinstance(results, dict):
+            return task_state
+        
+        refs = {}
+        for field in self.blob_fields:
+            value = results.get(field)
+            if isinstance(value, str) and len(value) >= self.blob_min_size:
+                try:
+                    refs[field] = self._blobs.put(value)
+                except IOError as e:
+                    print(f"Error storing {field} blob, keeping it inline: {e}")
+        
+        if not refs:
+            return task_state
+        return {**task_state, 'results': {**results, **refs}}
+    
+    def resolve_blobs(self, task_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a task state with blob references in its results replaced by their content"""
+        results = task_state.get('results')
+        if not isinstance(results, dict) or not any(is_blob_ref(value) for value in results.values()):
+            return task_state
+        
+        resolved = {field: (self._blobs.get(value) or '') if is_blob_ref(value) else value
+                    for field, value in results.items()}
+        return {**task_state, 'results': resolved}
     
-    def save(self, item: Dict[str, Any]) -> bool:
-        """Save agent run using uuid instead of id"""
+    def _prepare_save(self, item: Dict[str, Any]) -> str:
+        """Assign uuid and timestamps and move large task outputs to the blob store"""
         uuid_val = item.get('uuid')
         if not uuid_val:
             uuid_val = str(uuid.uuid4())
@@ -30,44 +92,322 @@ class AgentRunManager(DataManager):
         if 'id' in item:
             del item['id']
         
+        # A saved run is live again (see _after_save_many)
+        item.pop('archived_at', None)
+        
         # Update timestamp
         item['updated_at'] = datetime.now().isoformat()
         if 'created_at' not in item:
             item['created_at'] = item['updated_at']
         
-        file_path = self.data_dir / f"{uuid_val}.json"
+        if item.get('task_states'):
+            item['task_states'] = [self._externalize_results(task_state) for task_state in item['task_states']]
+        return uuid_val
+    
+    def save(self, item: Dict[str, Any], expected_revision: Optional[int] = None) -> bool:
+        """Save agent run using uuid instead of id (conditionally with expected_revision)"""
+        uuid_val = self._prepare_save(item)
         
-        # Safe write with temporary file to prevent corruption
-        temp_path = file_path.with_suffix('.tmp')
         try:
-            # Write to temporary file first
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(item, f, indent=2, ensure_ascii=False)
-            
-            # Validate JSON by reading it back
-            with open(temp_path, 'r', encoding='utf-8') as f:
-                json.load(f)  # This will raise an exception if JSON is invalid
-            
-            # If validation passes, move temp file to final location
-            shutil.move(str(temp_path), str(file_path))
-            return True
-            
-        except (IOError, json.JSONDecodeError) as e:
+            with self.lock(uuid_val):
+                self._assign_revision(uuid_val, item, self._read_stored(uuid_val), expected_revision)
+                self._cache.invalidate(uuid_val)
+                # Backend writes via a temporary file and validates before replacing
+                self.backend.write(uuid_val, item, validate=True)
+                
+                # The snapshot now contains all journaled task state patches
+                self._journal.clear(uuid_val)
+                self._after_save(uuid_val, item)
+        except (IOError, json.JSONDecodeError, RunLockTimeout) as e:
             print(f"Error saving {self.data_type} {uuid_val}: {e}")
-            # Clean up temp file if it exists
-            if temp_path.exists():
-                temp_path.unlink()
             return False
+        return True
     
-    def load(self, uuid_val: str) -> Optional[Dict[str, Any]]:
-        """Load agent run by uuid"""
-        file_path = self.data_dir / f"{uuid_val}.json"
-        if not file_path.exists():
-            return None
+    def save_many(self, items: List[Dict[str, Any]]) -> List[str]:
+        """Save several agent runs, batch by batch under their run locks
+        
+        Returns the uuids of the saved runs; a batch that fails is skipped as a
+        whole.
+        """
+        runs = {}
+        for item in items:
+            runs[self._prepare_save(item)] = item
         
+        saved = []
+        for batch_ids in self._lock_batches(list(runs)):
+            try:
+                with self._lock_all(batch_ids):
+                    batch = {uuid_val: runs[uuid_val] for uuid_val in batch_ids}
+                    stored = self._load_many_items(batch_ids)
+                    for uuid_val, agent_run in batch.items():
+                        self._assign_revision(uuid_val, agent_run, stored.get(uuid_val))
+                        self._cache.invalidate(uuid_val)
+                    self.backend.write_many(batch, validate=True)
+                    for uuid_val in batch:
+                        self._journal.clear(uuid_val)
+                    self._after_save_many(batch)
+            except (IOError, json.JSONDecodeError, RunLockTimeout) as e:
+                print(f"Error saving {len(batch_ids)} {self.data_type}: {e}")
+                continue
+            saved.extend(batch_ids)
+        return saved
+    
+    def delete(self, uuid_val: str) -> bool:
+        """Delete agent run, waiting for running writers of the run"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with self.lock(uuid_val):
+                if self._archive.contains(uuid_val):
+                    return bool(self._delete_archived([uuid_val]))
+                return super().delete(uuid_val)
+        except RunLockTimeout as e:
+            print(f"Error deleting {self.data_type} {uuid_val}: {e}")
+            return False
+    
+    def delete_many(self, uuids: List[str]) -> List[str]:
+        """Delete several agent runs, batch by batch under their run locks"""
+        deleted = []
+        for batch_ids in self._lock_batches(list(dict.fromkeys(uuids))):
+            try:
+                with self._lock_all(batch_ids):
+                    archived = [uuid_val for uuid_val in batch_ids if self._archive.contains(uuid_val)]
+                    deleted.extend(self._delete_archived(archived))
+                    deleted.extend(super().delete_many([uuid_val for uuid_val in batch_ids
+                                                        if uuid_val not in archived]))
+            except RunLockTimeout as e:
+                print(f"Error deleting {len(batch_ids)} {self.data_type}: {e}")
+        return deleted
+    
+    def _read_stored(self, uuid_val: str) -> Optional[Dict[str, Any]]:
+        """The stored run is the run file (with its journal) or else the archived copy
+        
+        Replaying the journal gives the revision a save has to expect, so saving
+        a copy read before a task state patch fails instead of dropping the patch.
+        """
+        agent_run = super()._read_stored(uuid_val)
+        if agent_run is None:
+            return self._archive.get(uuid_val)
+        self._replay_journal(uuid_val, agent_run)
+        return agent_run
+    
+    def _delete_archived(self, uuids: List[str]) -> List[str]:
+        """Delete archived runs (caller holds their locks)"""
+        if uuids:
+            self._archive.remove_many(uuids)
+            self._after_delete_many(uuids)
+        return uuids
+    
+    def _after_save_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        super()._after_save_many(items)
+        # A run written as a file is no longer archived (the archived copy is outdated)
+        unarchived = [uuid_val for uuid_val, item in items.items()
+                      if not item.get('archived_at') and self._archive.contains(uuid_val)]
+        if unarchived:
+            self._archive.remove_many(unarchived)
+    
+    def _after_delete_many(self, uuids: List[str]) -> None:
+        super()._after_delete_many(uuids)
+        for uuid_val in uuids:
+            self._journal.clear(uuid_val)
+    
+    def _ensure_ids(self) -> None:
+        """Known ids are the run files plus the archived runs (caller holds _ids_lock)"""
+        if self._ids is None:
+            self._ids = set(self.backend.list_ids()) | set(self._archive.ids())
+    
+    def archive_old_runs(self, older_than_days: Optional[float] = None, limit: Optional[int] = None) -> int:
+        """Move runs not updated for older_than_days (RUN_ARCHIVE_AFTER_DAYS) into the archive
+        
+        Candidates are picked from the summaries. Each run is stored with an
+        archived_at timestamp (kept in its summary, so list views and statistics
+        work without decompressing) and its file is removed; load() restores it.
+        Returns the number of archived runs.
+        """
+        days = self.archive_after_days if older_than_days is None else older_than_days
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        
+        candidates = [summary['uuid'] for summary in self.load_summaries()
+                      if summary.get('uuid') and self._is_archivable(summary, cutoff)]
+        if limit is not None:
+            candidates = candidates[:limit]
+        
+        archived = 0
+        for batch_ids in self._lock_batches(candidates):
+            try:
+                with self._lock_all(batch_ids):
+                    # Re-read under the lock: the run may have changed since the summaries were read
+                    batch = {uuid_val: agent_run for uuid_val, agent_run in self._load_many_items(batch_ids).items()
+                             if self._is_archivable(agent_run, cutoff)}
+                    if not batch:
+                        continue
+                    archived_at = datetime.now().isoformat()
+                    for agent_run in batch.values():
+                        agent_run['archived_at'] = archived_at
+                    
+                    self._archive.put_many(batch)
+                    for uuid_val in batch:
+                        self._cache.invalidate(uuid_val)
+                    self.backend.remove_many(batch)
+                    for uuid_val in batch:
+                        self._journal.clear(uuid_val)
+                    self._after_save_many(batch)
+                    archived += len(batch)
+            except (IOError, json.JSONDecodeError, RunLockTimeout) as e:
+                print(f"Error archiving {len(batch_ids)} {self.data_type}: {e}")
+        return archived
+    
+    def _is_archivable(self, agent_run: Dict[str, Any], cutoff: str) -> bool:
+        """Check if a run (or its summary) was last active before cutoff and has no running task
+        
+        The run status is not used: runs started from the UI keep status 'created'
+        while their tasks are executed.
+        """
+        if agent_run.get('archived_at'):
+            return False
+        if 'task_statuses' in agent_run:
+            task_statuses = agent_run['task_statuses'].values()
+        else:
+            task_statuses = [task_state.get('status') for task_state in agent_run.get('task_states', [])]
+        if any(status in self.ACTIVE_TASK_STATUSES for status in task_statuses):
+            return False
+        return (agent_run.get('updated_at') or agent_run.get('created_at') or '') < cutoff
+    
+    def _unarchive(self, uuid_val: str) -> Optional[Dict[str, Any]]:
+        """Restore an archived run as a regular run file, None if it is not archived"""
+        with self.lock(uuid_val):
+            agent_run = self._read_record(uuid_val)
+            if agent_run is not None:
+                # Restored meanwhile by another thread or process
+                return agent_run
+            
+            agent_run = self._archive.get(uuid_val)
+            if agent_run is None:
+                return None
+            agent_run.pop('archived_at', None)
+            
+            # Written as stored, without touching updated_at
+            self.backend.write(uuid_val, agent_run, validate=True)
+            self._archive.remove_many([uuid_val])
+            self._after_save(uuid_val, agent_run)
+            return agent_run
+    
+    def get_archive_stats(self) -> Dict[str, int]:
+        """Get the number of archived runs and the disk usage of the archive"""
+        return self._archive.get_stats()
+    
+    @staticmethod
+    def _apply_task_counts(summary: Dict[str, Any]) -> None:
+        """Derive the task counters of a run summary from its task statuses"""
+        status_counts = {}
+        for status in summary.get('task_statuses', {}).values():
+            status_counts[status] = status_counts.get(status, 0) + 1
+        
+        summary['total_tasks'] = len(summary.get('task_statuses', {}))
+        summary['completed_tasks'] = status_counts.get('completed', 0)
+        summary['task_status_counts'] = status_counts
+    
+    def summarize(self, agent_run: Dict[str, Any]) -> Dict[str, Any]:
+        """Run summary including task counts computed from the task states"""
+        summary = super().summarize(agent_run)
+        summary['task_statuses'] = {task_state.get('task_uuid'): task_state.get('status', 'pending')
+                                    for task_state in agent_run.get('task_states', [])}
+        self._apply_task_counts(summary)
+        return summary
+    
+    def _replay_journal(self, uuid_val: str, agent_run: Dict[str, Any]) -> None:
+        """Apply task state patches written since the last snapshot
+        
+        Every journal entry is a change of the run and counts as one revision on
+        top of the snapshot's.
+        """
+        entries = self._journal.read(uuid_val)
+        for entry in entries:
+            apply_task_patch(agent_run, entry)
+        if entries:
+            agent_run[self.revision_field] = self.get_revision(agent_run) + len(entries)
+    
+    def _iter_records(self):
+        # Archived runs are read (not restored) from the archive in one pass per segment
+        archived_ids = set(self._archive.ids())
+        for uuid_val in self.get_all_ids():
+            if uuid_val in archived_ids:
+                continue
+            try:
+                agent_run = self._read_record(uuid_val)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"Error loading {self.data_type} {uuid_val}: {e}")
+                continue
+            if agent_run is not None:
+                self._replay_journal(uuid_val, agent_run)
+                yield uuid_val, agent_run
+        
+        if archived_ids:
+            try:
+                archived = self._archive.get_many(archived_ids)
+            except IOError as e:
+                print(f"Error reading archived {self.data_type}: {e}")
+                archived = {}
+            yield from archived.items()
+    
+    def rebuild_derived_data(self, records: Optional[Iterable[Tuple[str, Dict[str, Any]]]] = None) -> int:
+        """Rebuild derived data including the archive's offset index
+        
+        Given records are run files: journals are replayed over them and the
+        archived runs are added. A run found both as a file and in the archive
+        (archiving was interrupted) stays a file and is dropped from the archive.
+        """
+        self._archive.rebuild_index()
+        if records is None:
+            return super().rebuild_derived_data()
+        
+        archived_ids = set(self._archive.ids())
+        restored = []
+        
+        def all_records():
+            for uuid_val, agent_run in records:
+                if uuid_val in archived_ids:
+                    archived_ids.discard(uuid_val)
+                    restored.append(uuid_val)
+                self._replay_journal(uuid_val, agent_run)
+                yield uuid_val, agent_run
+            if archived_ids:
+                yield from self._archive.get_many(archived_ids).items()
+        
+        count = super().rebuild_derived_data(all_records())
+        if restored:
+            self._archive.remove_many(restored)
+        return count
+    
+    def _load_many_items(self, uuids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several agent runs at once, including their journaled task state patches"""
+        agent_runs = super()._load_many_items(uuids)
+        
+        # Archived runs are returned as stored (with archived_at), without restoring them
+        missing = [uuid_val for uuid_val in uuids if uuid_val not in agent_runs]
+        if missing:
+            try:
+                agent_runs.update(self._archive.get_many(missing))
+            except IOError as e:
+                print(f"Error reading archived {self.data_type}: {e}")
+        
+        for uuid_val, data in agent_runs.items():
+            self._replay_journal(uuid_val, data)
+            if 'uuid' not in data:
+                data['uuid'] = uuid_val
+            data.pop('id', None)
+        return {uuid_val: agent_runs[uuid_val] for uuid_val in uuids if uuid_val in agent_runs}
+    
+    def _load_item(self, uuid_val: str) -> Optional[Dict[str, Any]]:
+        """Read agent run by uuid (an archived run is restored first)"""
+        try:
+            data = self._read_record(uuid_val)
+            if data is None:
+                if not self._archive.contains(uuid_val):
+                    return None
+                data = self._unarchive(uuid_val)
+                if data is None:
+                    return None
+            
+            self._replay_journal(uuid_val, data)
             
             # Ensure uuid field exists and remove id field if present
             if 'uuid' not in data:
@@ -125,101 +465,144 @@ class AgentRunManager(DataManager):
             return agent_run
         return None
     
-    def get_task_state(self, run_id: str, task_uuid: str) -> Optional[Dict[str, Any]]:
-        """Get task execution state from agent run (Sprint 18)"""
+    def get_task_state(self, run_id: str, task_uuid: str, resolve_blobs: bool = False) -> Optional[Dict[str, Any]]:
+        """Get task execution state from agent run (Sprint 18)
+        
+        Large results are blob references unless resolve_blobs is set.
+        """
         agent_run = self.load(run_id)
         if not agent_run or 'task_states' not in agent_run:
             return None
         
         for task_state in agent_run['task_states']:
             if task_state.get('task_uuid') == task_uuid:
-                return task_state
+                return self.resolve_blobs(task_state) if resolve_blobs else task_state
         
         return None
     
     def update_task_state(self, run_id: str, task_uuid: str, state_data: Dict[str, Any]) -> bool:
-        """Update task execution state in agent run (Sprint 18)"""
-        print(f"[DEBUG] update_task_state called with run_id={run_id}, task_uuid={task_uuid}, state_data={state_data}")
+        """Update task execution state in agent run (Sprint 18)
         
-        # Prevent concurrent modifications of the same run
-        if run_id in self._save_locks:
-            print(f"[DEBUG] Save operation already in progress for run_id={run_id}, skipping")
-            return False
-            
-        self._save_locks[run_id] = True
+        The change is appended to the run's task state journal instead of
+        rewriting the run; every TASK_JOURNAL_COMPACT_ENTRIES patches the journal
+        is folded into the snapshot.
+        """
+        print(f"[DEBUG] update_task_state called with run_id={run_id}, task_uuid={task_uuid}, keys={list(state_data)}")
         
         try:
-            agent_run = self.load(run_id)
-            if not agent_run:
-                print(f"[DEBUG] Agent run not found: {run_id}")
-                return False
+            with self.lock(run_id):
+                if not self.exists(run_id):
+                    print(f"[DEBUG] Agent run not found: {run_id}")
+                    return False
                 
-            if 'task_states' not in agent_run:
-                print(f"[DEBUG] No task_states in agent run: {run_id}, creating empty list")
-                agent_run['task_states'] = []
-            
-            print(f"[DEBUG] Found {len(agent_run['task_states'])} task states")
-            
-            # Look for existing task state
-            for i, task_state in enumerate(agent_run['task_states']):
-                print(f"[DEBUG] Checking task state {i}: task_uuid={task_state.get('task_uuid')}")
-                if task_state.get('task_uuid') == task_uuid:
-                    print(f"[DEBUG] Found matching task state at index {i}")
-                    # Update state data while preserving task_uuid
-                    updated_state = {**task_state, **state_data}
-                    updated_state['task_uuid'] = task_uuid
-                    updated_state['updated_at'] = datetime.now().isoformat()
-                    
-                    agent_run['task_states'][i] = updated_state
-                    agent_run['updated_at'] = datetime.now().isoformat()
-                    
-                    result = self.save(agent_run)
-                    print(f"[DEBUG] Save result: {result}")
-                    return result
-            
-            # No existing task state found, create a new one
-            print(f"[DEBUG] No matching task state found for task_uuid: {task_uuid}, creating new one")
-            new_task_state = {
-                'task_uuid': task_uuid,
-                'status': 'pending',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat(),
-                **state_data  # Add the provided state data
-            }
-            
-            agent_run['task_states'].append(new_task_state)
-            agent_run['updated_at'] = datetime.now().isoformat()
+                entry = {
+                    'task_uuid': task_uuid,
+                    'state': state_data,
+                    'at': datetime.now().isoformat()
+                }
+                return self._append_patches(run_id, [entry])
+        except RunLockTimeout as e:
+            print(f"Error updating task state for {self.data_type} {run_id}: {e}")
+            return False
+    
+    @contextmanager
+    def transaction(self, run_id: str, timeout: Optional[float] = None) -> Iterator[Optional[RunTransaction]]:
+        """Load a run once, apply any number of task state changes and commit them once
+        
+            with agent_run_manager.transaction(run_uuid) as run:
+                run.set_task_results(task_uuid, results)
+                run.set_task_status(task_uuid, 'completed')
+        
+        The run lock is held for the whole block. run is None if the run does not
+        exist. Task state changes are committed as one journal entry, other changes
+        to run.data with a full save; nothing is written if the block raises.
+        run.committed tells whether the commit succeeded.
+        """
+        with self.lock(run_id, timeout):
+            # Read fresh (not from the identity map): run.data is changed before it is committed
+            agent_run = self._load_item(run_id)
+            if agent_run is None:
+                yield None
+                return
             
-            result = self.save(agent_run)
-            print(f"[DEBUG] Created new task state, save result: {result}")
-            return result
+            run = RunTransaction(run_id, agent_run)
+            yield run
             
-        finally:
-            # Always release the lock
-            if run_id in self._save_locks:
-                del self._save_locks[run_id]
+            if run.needs_full_save():
+                run.committed = self.save(run.data)
+            elif run.patches:
+                run.committed = self._append_patches(run_id, run.patches)
+            else:
+                run.committed = True
     
-    def set_task_status(self, run_id: str, task_uuid: str, status: str, error: str = None) -> bool:
-        """Set task status (Sprint 18)"""
-        state_data = {'status': status}
+    def _append_patches(self, run_id: str, patches: List[Dict[str, Any]]) -> bool:
+        """Journal task state patches as one entry (caller holds the run lock)"""
+        patches = [{**patch, 'state': self._externalize_results(patch['state'])} for patch in patches]
+        entry = patches[0] if len(patches) == 1 else {'patches': patches, 'at': patches[-1]['at']}
+        try:
+            entries = self._journal.append(run_id, entry)
+        except (IOError, TypeError, ValueError) as e:
+            print(f"Error journaling task state for {self.data_type} {run_id}: {e}")
+            return False
         
-        if status == 'running' and not self.get_task_state(run_id, task_uuid).get('started_at'):
-            state_data['started_at'] = datetime.now().isoformat()
-        elif status in ['completed', 'error', 'skipped']:
-            state_data['completed_at'] = datetime.now().isoformat()
-            
-            # Calculate execution time if started
-            task_state = self.get_task_state(run_id, task_uuid)
-            if task_state and task_state.get('started_at'):
-                started = datetime.fromisoformat(task_state['started_at'].replace('Z', '+00:00'))
-                completed = datetime.now()
-                execution_time = (completed - started).total_seconds()
-                state_data['execution_time'] = execution_time
+        # Write through to the run in the identity map, like a replay of the journal would
+        identity = current_identity_map()
+        if identity is not None:
+            found, agent_run = identity.get(self.data_type, run_id)
+            if found and agent_run is not None:
+                apply_task_patch(agent_run, entry)
+                agent_run[self.revision_field] = self.get_revision(agent_run) + 1
+        
+        self._patch_summary(run_id, patches)
         
-        if error:
-            state_data['error'] = error
+        if entries >= self.journal_compact_entries:
+            return self.compact_journal(run_id)
+        return True
+    
+    def _patch_summary(self, run_id: str, patches: List[Dict[str, Any]]) -> None:
+        """Apply task state patches to the run summary without loading the run"""
+        if not self._summaries:
+            return
+        summary = self._load_summary(run_id)
+        if summary is not None and 'task_statuses' not in summary:
+            # Summary written before task statuses were tracked
+            agent_run = self.load(run_id)
+            summary = self.summarize(agent_run) if agent_run else None
+        if summary is None:
+            return
         
-        return self.update_task_state(run_id, task_uuid, state_data)
+        task_statuses = summary['task_statuses']
+        for patch in patches:
+            task_uuid = patch['task_uuid']
+            task_statuses[task_uuid] = patch['state'].get('status', task_statuses.get(task_uuid, 'pending'))
+            summary['updated_at'] = patch['at']
+        self._apply_task_counts(summary)
+        self._summaries.put(run_id, summary)
+    
+    def compact_journal(self, run_id: str) -> bool:
+        """Fold the task state journal of a run into its snapshot"""
+        try:
+            with self.lock(run_id):
+                agent_run = self._load_item(run_id)
+                if not agent_run:
+                    return False
+                return self.save(agent_run)
+        except RunLockTimeout as e:
+            print(f"Error compacting journal of {self.data_type} {run_id}: {e}")
+            return False
+    
+    def set_task_status(self, run_id: str, task_uuid: str, status: str, error: str = None) -> bool:
+        """Set task status (Sprint 18)"""
+        try:
+            # Read and update in one transaction so started_at/execution_time stay consistent
+            with self.transaction(run_id) as run:
+                if run is None:
+                    return False
+                run.set_task_status(task_uuid, status, error)
+            return run.committed
+        except RunLockTimeout as e:
+            print(f"Error setting task status for {self.data_type} {run_id}: {e}")
+            return False
     
     def set_task_inputs(self, run_id: str, task_uuid: str, inputs: Dict[str, Any]) -> bool:
         """Set task inputs (Sprint 18)"""
@@ -272,8 +655,12 @@ class AgentRunManager(DataManager):
             **status_counts
         }
     
-    def get_task_definitions_with_states(self, run_id: str) -> List[Dict[str, Any]]:
-        """Get task definitions combined with their execution states (Sprint 18)"""
+    def get_task_definitions_with_states(self, run_id: str, resolve_blobs: bool = True) -> List[Dict[str, Any]]:
+        """Get task definitions combined with their execution states (Sprint 18)
+        
+        Task outputs stored as blobs are loaded here (for the run view) unless
+        resolve_blobs is False.
+        """
         try:
             from flask import current_app
             
@@ -297,14 +684,17 @@ class AgentRunManager(DataManager):
                         current_app.logger.warning(f"Task without UUID found in agent {agent_run['agent_uuid']}")
                         continue
                         
-                    task_state = task_states_dict.get(task_uuid, {
+                    task_state = task_states_dict.get(task_uuid)
+                    if task_state is not None and resolve_blobs:
+                        task_state = self.resolve_blobs(task_state)
+                    task_state = task_state or {
                         'task_uuid': task_uuid,
                         'status': 'pending',
                         'inputs': {},
                         'outputs': {},
                         'results': {},
                         'error': None
-                    })
+                    }
                     
                     combined_task = {
                         'definition': task_def,
@@ -334,17 +724,9 @@ class AgentRunManager(DataManager):
                 print(f"Error in get_task_definitions_with_states: {str(e)}")
             return []
     
-    def sync_task_definitions(self, run_id: str) -> bool:
-        """Sync task definitions from agent to agent run (Sprint 18)"""
-        agent_run = self.load(run_id)
-        if not agent_run:
-            return False
-        
-        from .agents_manager import agents_manager
-        agent = agents_manager.load(agent_run['agent_uuid'])
-        if not agent or 'tasks' not in agent:
-            return False
-        
+    @staticmethod
+    def _synced_task_states(agent_run: Dict[str, Any], agent: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Task states matching the agent's current task definitions, keeping existing states"""
         # Get existing task states
         existing_states = {ts['task_uuid']: ts for ts in agent_run.get('task_states', [])}
         
@@ -368,35 +750,71 @@ class AgentRunManager(DataManager):
                     'completed_at': None,
                     'execution_time': None
                 })
+        return new_task_states
+    
+    def sync_task_definitions(self, run_id: str) -> bool:
+        """Sync task definitions from agent to agent run (Sprint 18)"""
+        from .agents_manager import agents_manager
+        synced = []
         
-        agent_run['task_states'] = new_task_states
-        agent_run['updated_at'] = datetime.now().isoformat()
-        return self.save(agent_run)
+        def sync(agent_run):
+            synced.clear()
+            agent = agents_manager.load(agent_run['agent_uuid'])
+            if not agent or 'tasks' not in agent:
+                return False
+            agent_run['task_states'] = self._synced_task_states(agent_run, agent)
+            agent_run['updated_at'] = datetime.now().isoformat()
+            synced.append(run_id)
+        
+        # Conditional save, retried on concurrent task state changes instead of overwriting them
+        return self.modify(run_id, sync) is not None and bool(synced)
+    
+    def sync_task_definitions_for_agent(self, agent_uuid: str) -> int:
+        """Sync the task definitions of an agent into all of its runs, returns the number of runs saved"""
+        from .agents_manager import agents_manager
+        agent = agents_manager.load(agent_uuid)
+        if not agent or 'tasks' not in agent:
+            return 0
+        
+        run_ids = [summary['uuid'] for summary in self.get_agent_run_summaries(agent_uuid) if summary.get('uuid')]
+        saved = 0
+        for batch_ids in self._lock_batches(run_ids):
+            try:
+                with self._lock_all(batch_ids):
+                    # Read under the run locks: task state changes cannot land between read and save
+                    agent_runs = list(self._load_many_items(batch_ids).values())
+                    for agent_run in agent_runs:
+                        agent_run['task_states'] = self._synced_task_states(agent_run, agent)
+                    saved += len(self.save_many(agent_runs))
+            except RunLockTimeout as e:
+                print(f"Error syncing task definitions of {len(batch_ids)} {self.data_type}: {e}")
+        return saved
 
     def get_agent_runs(self, agent_uuid: str) -> List[Dict[str, Any]]:
         """Get all agent runs for a specific agent"""
-        all_runs = self.get_all()
-        agent_runs = [run for run in all_runs if run.get('agent_uuid') == agent_uuid]
+        agent_runs = self.find_by('agent_uuid', agent_uuid)
         # Sort by created_at timestamp (newest first)
         return sorted(agent_runs, key=lambda x: x.get('created_at', ''), reverse=True)
     
+    def get_agent_run_summaries(self, agent_uuid: str) -> List[Dict[str, Any]]:
+        """Get the summaries of all agent runs for a specific agent (newest first)"""
+        summaries = self.load_summaries({'agent_uuid': agent_uuid})
+        return sorted(summaries, key=lambda x: x.get('created_at', ''), reverse=True)
+    
     def get_most_recent_run(self, agent_uuid: str) -> Optional[Dict[str, Any]]:
         """Get the most recent agent run for a specific agent"""
-        agent_runs = self.get_agent_runs(agent_uuid)
-        return agent_runs[0] if agent_runs else None
+        summaries = self.get_agent_run_summaries(agent_uuid)
+        return self.load(summaries[0]['uuid']) if summaries else None
     
     def set_language_preference(self, run_id: str, language: str) -> bool:
         """Set language preference for an agent run"""
-        try:
-            agent_run = self.load(run_id)
-            if not agent_run:
-                return False
-            
-            # Set language preference in agent run
+        def set_language(agent_run):
             agent_run['language_preference'] = language
             agent_run['updated_at'] = datetime.now().isoformat()
-            
-            return self.save(agent_run)
+        
+        try:
+            # Conditional save, so task state changes written meanwhile are kept
+            return self.modify(run_id, set_language) is not None
             
         except Exception as e:
             print(f"Error setting language preference for run {run_id}: {e}")
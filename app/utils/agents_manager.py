@@ -12,6 +12,11 @@ from .base_manager import DataManager
 class AgentsManager(DataManager):
     """Manager for agents data with Sprint 18 Task Management Revolution"""
     
+    summary_fields = ('id', 'uuid', 'name', 'category', 'status', 'created_at', 'updated_at',
+                      'use_as_agent', 'use_as_insight')
+    counted_fields = ('status', 'category', 'use_as', 'has_tasks')
+    summed_fields = ('task_count',)
+    
     def __init__(self):
         super().__init__('agents')
     
@@ -59,13 +64,29 @@ class AgentsManager(DataManager):
             return agent
         return None
 
+    def summarize(self, agent: Dict[str, Any]) -> Dict[str, Any]:
+        """Agent summary including task count and usage mode (for the statistics)"""
+        summary = super().summarize(agent)
+        summary['task_count'] = len(agent.get('tasks', []))
+        summary['has_tasks'] = summary['task_count'] > 0
+        
+        use_as_agent = agent.get('use_as_agent', True)
+        use_as_insight = agent.get('use_as_insight', False)
+        if use_as_agent and use_as_insight:
+            summary['use_as'] = 'both'
+        elif use_as_insight:
+            summary['use_as'] = 'insight'
+        else:
+            summary['use_as'] = 'agent'
+        return summary
+
     # Sprint 18: Task Management Methods
-    def add_task_definition(self, agent_id: str, task: Dict[str, Any]) -> bool:
+    # Edits go through modify(): an agent saved by someone else in between is
+    # re-read and the edit applied again, so concurrent edits are all kept.
+    # With expected_revision (If-Match) a changed agent raises RevisionConflict.
+    def add_task_definition(self, agent_id: str, task: Dict[str, Any],
+                            expected_revision: Optional[int] = None) -> bool:
         """Add task definition to agent (Sprint 18)"""
-        agent = self.load(agent_id)
-        if not agent:
-            return False
-        
         # Ensure task has required fields for Sprint 18
         if 'uuid' not in task:
             task['uuid'] = str(uuid.uuid4())
@@ -74,89 +95,146 @@ class AgentsManager(DataManager):
             task['id'] = task['uuid']  # Use uuid as id for validator compatibility
         if 'type' not in task:
             task['type'] = 'ai'  # Default to AI task
-        if 'name' not in task:
-            task['name'] = f"Task {len(agent['tasks']) + 1}"
-        if 'order' not in task:
-            task['order'] = len(agent['tasks']) + 1
         if 'created_at' not in task:
             task['created_at'] = datetime.now().isoformat()
-        
         task['updated_at'] = datetime.now().isoformat()
         
-        if 'tasks' not in agent:
-            agent['tasks'] = []
+        def add(agent):
+            if 'tasks' not in agent:
+                agent['tasks'] = []
+            new_task = dict(task)
+            if 'name' not in new_task:
+                new_task['name'] = f"Task {len(agent['tasks']) + 1}"
+            if 'order' not in new_task:
+                new_task['order'] = len(agent['tasks']) + 1
+            
+            agent['tasks'].append(new_task)
+            agent['updated_at'] = datetime.now().isoformat()
         
-        agent['tasks'].append(task)
-        agent['updated_at'] = datetime.now().isoformat()
-        return self.save(agent)
+        return self.modify(agent_id, add, expected_revision) is not None
     
-    def update_task_definition(self, agent_id: str, task_uuid: str, task_data: Dict[str, Any]) -> bool:
+    def update_task_definition(self, agent_id: str, task_uuid: str, task_data: Dict[str, Any],
+                               expected_revision: Optional[int] = None) -> bool:
         """Update task definition in agent (Sprint 18)"""
-        agent = self.load(agent_id)
-        if not agent or 'tasks' not in agent:
+        found = []
+        
+        def update(agent):
+            found.clear()
+            for i, task in enumerate(agent.get('tasks', [])):
+                if task.get('uuid') == task_uuid:
+                    changes = {**task_data, 'uuid': task_uuid, 'updated_at': datetime.now().isoformat()}
+                    # Preserve order and creation time
+                    if 'order' not in changes:
+                        changes['order'] = task.get('order', i + 1)
+                    if 'created_at' not in changes:
+                        changes['created_at'] = task.get('created_at', datetime.now().isoformat())
+                    
+                    agent['tasks'][i] = {**task, **changes}
+                    agent['updated_at'] = datetime.now().isoformat()
+                    found.append(task_uuid)
+                    return True
             return False
         
-        for i, task in enumerate(agent['tasks']):
-            if task.get('uuid') == task_uuid:
-                task_data['uuid'] = task_uuid
-                task_data['updated_at'] = datetime.now().isoformat()
-                # Preserve order and creation time
-                if 'order' not in task_data:
-                    task_data['order'] = task.get('order', i + 1)
-                if 'created_at' not in task_data:
-                    task_data['created_at'] = task.get('created_at', datetime.now().isoformat())
-                
-                agent['tasks'][i] = {**task, **task_data}
-                agent['updated_at'] = datetime.now().isoformat()
-                return self.save(agent)
-        
-        return False
+        return self.modify(agent_id, update, expected_revision) is not None and bool(found)
     
-    def remove_task_definition(self, agent_id: str, task_uuid: str) -> bool:
+    def remove_task_definition(self, agent_id: str, task_uuid: str,
+                               expected_revision: Optional[int] = None) -> bool:
         """Remove task definition from agent (Sprint 18)"""
-        agent = self.load(agent_id)
-        if not agent or 'tasks' not in agent:
-            return False
+        found = []
         
-        original_count = len(agent['tasks'])
-        agent['tasks'] = [task for task in agent['tasks'] if task.get('uuid') != task_uuid]
-        
-        if len(agent['tasks']) < original_count:
+        def remove(agent):
+            found.clear()
+            tasks = [task for task in agent.get('tasks', []) if task.get('uuid') != task_uuid]
+            if len(tasks) == len(agent.get('tasks', [])):
+                return False
+            
             # Reorder remaining tasks
-            for i, task in enumerate(agent['tasks']):
+            for i, task in enumerate(tasks):
                 task['order'] = i + 1
+            agent['tasks'] = tasks
             agent['updated_at'] = datetime.now().isoformat()
-            return self.save(agent)
+            found.append(task_uuid)
         
-        return False
+        return self.modify(agent_id, remove, expected_revision) is not None and bool(found)
     
-    def reorder_task_definitions(self, agent_id: str, task_uuids: List[str]) -> bool:
+    def reorder_task_definitions(self, agent_id: str, task_uuids: List[str],
+                                 expected_revision: Optional[int] = None) -> bool:
         """Reorder task definitions in agent (Sprint 18)"""
-        agent = self.load(agent_id)
-        if not agent or 'tasks' not in agent:
-            return False
+        def reorder(agent):
+            if 'tasks' not in agent:
+                return False
+            
+            # Create task dictionary for quick lookup
+            tasks_dict = {task['uuid']: task for task in agent['tasks']}
+            
+            # Reorder tasks and update order field
+            reordered_tasks = []
+            for i, task_uuid in enumerate(task_uuids):
+                if task_uuid in tasks_dict:
+                    task = tasks_dict[task_uuid]
+                    task['order'] = i + 1
+                    task['updated_at'] = datetime.now().isoformat()
+                    reordered_tasks.append(task)
+            
+            # Add any tasks that weren't in the reorder list (e.g. added concurrently)
+            for task in agent['tasks']:
+                if task['uuid'] not in task_uuids:
+                    task['order'] = len(reordered_tasks) + 1
+                    reordered_tasks.append(task)
+            
+            agent['tasks'] = reordered_tasks
+            agent['updated_at'] = datetime.now().isoformat()
         
-        # Create task dictionary for quick lookup
-        tasks_dict = {task['uuid']: task for task in agent['tasks']}
+        agent = self.modify(agent_id, reorder, expected_revision)
+        return agent is not None and 'tasks' in agent
+    
+    # Knowledge base items (agent['knowledge_base'], identified by their id)
+    def add_knowledge_item(self, agent_id: str, knowledge: Dict[str, Any],
+                           expected_revision: Optional[int] = None) -> bool:
+        """Add knowledge item to agent"""
+        knowledge = {**knowledge, 'id': knowledge.get('id') or str(uuid.uuid4())}
+        knowledge.setdefault('created_at', datetime.now().isoformat())
+        knowledge['updated_at'] = datetime.now().isoformat()
+        
+        def add(agent):
+            agent.setdefault('knowledge_base', []).append(dict(knowledge))
+            agent['updated_at'] = datetime.now().isoformat()
         
-        # Reorder tasks and update order field
-        reordered_tasks = []
-        for i, task_uuid in enumerate(task_uuids):
-            if task_uuid in tasks_dict:
-                task = tasks_dict[task_uuid]
-                task['order'] = i + 1
-                task['updated_at'] = datetime.now().isoformat()
-                reordered_tasks.append(task)
+        return self.modify(agent_id, add, expected_revision) is not None
+    
+    def update_knowledge_item(self, agent_id: str, knowledge_id: str, knowledge_data: Dict[str, Any],
+                              expected_revision: Optional[int] = None) -> bool:
+        """Update knowledge item of agent"""
+        found = []
+        
+        def update(agent):
+            found.clear()
+            for i, item in enumerate(agent.get('knowledge_base', [])):
+                if item.get('id') == knowledge_id:
+                    agent['knowledge_base'][i] = {**item, **knowledge_data, 'id': knowledge_id,
+                                                  'updated_at': datetime.now().isoformat()}
+                    agent['updated_at'] = datetime.now().isoformat()
+                    found.append(knowledge_id)
+                    return True
+            return False
         
-        # Add any tasks that weren't in the reorder list
-        for task in agent['tasks']:
-            if task['uuid'] not in task_uuids:
-                task['order'] = len(reordered_tasks) + 1
-                reordered_tasks.append(task)
+        return self.modify(agent_id, update, expected_revision) is not None and bool(found)
+    
+    def remove_knowledge_item(self, agent_id: str, knowledge_id: str,
+                              expected_revision: Optional[int] = None) -> bool:
+        """Remove knowledge item from agent"""
+        found = []
+        
+        def remove(agent):
+            found.clear()
+            items = [item for item in agent.get('knowledge_base', []) if item.get('id') != knowledge_id]
+            if len(items) == len(agent.get('knowledge_base', [])):
+                return False
+            agent['knowledge_base'] = items
+            agent['updated_at'] = datetime.now().isoformat()
+            found.append(knowledge_id)
         
-        agent['tasks'] = reordered_tasks
-        agent['updated_at'] = datetime.now().isoformat()
-        return self.save(agent)
+        return self.modify(agent_id, remove, expected_revision) is not None and bool(found)
     
     def get_task_definition(self, agent_id: str, task_uuid: str) -> Optional[Dict[str, Any]]:
         """Get specific task definition from agent (Sprint 18)"""
@@ -200,18 +278,26 @@ class AgentsManager(DataManager):
         return tools_manager.is_assistant_enabled(tool_id)
 
     def get_agent_statistics(self) -> Dict[str, Any]:
-        """Get statistics about agents for overview page"""
-        all_agents = self.load_all()
+        """Get statistics about agents for overview page
         
-        # Count by status
+        Read from the aggregates maintained with the agent summaries.
+        """
+        # Count by status (agents without status count as inactive)
         status_counts = {
             'active': 0,
             'inactive': 0,
             'draft': 0
         }
+        for status, count in self.get_counts('status').items():
+            status = status if status is not None else 'inactive'
+            if status in status_counts:
+                status_counts[status] += count
         
         # Count by category
         category_counts = {}
+        for category, count in self.get_counts('category').items():
+            category = category if category is not None else 'general'
+            category_counts[category] = category_counts.get(category, 0) + count
         
         # Count by use_as field (Sprint 17.5)
         use_as_counts = {
@@ -219,40 +305,14 @@ class AgentsManager(DataManager):
             'insight': 0,
             'both': 0
         }
+        use_as_counts.update(self.get_counts('use_as'))
         
         # Task statistics (Sprint 18)
-        total_tasks = 0
-        agents_with_tasks = 0
-        
-        for agent in all_agents:
-            # Status counts
-            status = agent.get('status', 'inactive')
-            if status in status_counts:
-                status_counts[status] += 1
-            
-            # Category counts
-            category = agent.get('category', 'general')
-            category_counts[category] = category_counts.get(category, 0) + 1
-            
-            # Use as counts (Sprint 17.5)
-            use_as_agent = agent.get('use_as_agent', True)
-            use_as_insight = agent.get('use_as_insight', False)
-            
-            if use_as_agent and use_as_insight:
-                use_as_counts['both'] += 1
-            elif use_as_insight:
-                use_as_counts['insight'] += 1
-            else:
-                use_as_counts['agent'] += 1
-            
-            # Task statistics (Sprint 18)
-            tasks = agent.get('tasks', [])
-            if tasks:
-                agents_with_tasks += 1
-                total_tasks += len(tasks)
+        total_tasks = int(self.get_total('task_count'))
+        agents_with_tasks = self.get_counts('has_tasks').get(True, 0)
         
         # Calculate averages
-        total_agents = len(all_agents)
+        total_agents = self.count_all()
         avg_tasks_per_agent = round(total_tasks / total_agents, 1) if total_agents > 0 else 0
         
         return {
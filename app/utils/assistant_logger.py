@@ -7,7 +7,9 @@ import os
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+
+from .sharding import find_path, flat_path, sharded_path
 
 class AssistantLogger:
     """Handles logging of all Assistant API calls per agent"""
@@ -60,7 +62,7 @@ class AssistantLogger:
             log_entry["error_message"] = error_msg
         
         # Create log file path
-        log_file = self.logs_dir / f"{agent_id}.log"
+        log_file = self._log_path(agent_id)
         
         # Append to log file
         try:
@@ -72,6 +74,22 @@ class AssistantLogger:
             with open(fallback_log, 'a', encoding='utf-8') as f:
                 f.write(f"{timestamp} - Failed to log for agent {agent_id}: {str(e)}\n")
     
+    def _log_path(self, agent_id: str) -> Path:
+        """Get the sharded log file of an agent (agentlogs/ab/<agent_id>.log)
+        
+        A log file still in the flat layout is moved into its shard first.
+        """
+        log_file = sharded_path(self.logs_dir, agent_id, '.log')
+        log_file.parent.mkdir(exist_ok=True)
+        
+        legacy_file = flat_path(self.logs_dir, agent_id, '.log')
+        if legacy_file.exists() and not log_file.exists():
+            try:
+                os.replace(legacy_file, log_file)
+            except OSError:
+                pass
+        return log_file
+    
     def get_agent_logs(self, agent_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get logs for a specific agent
@@ -83,9 +101,9 @@ class AssistantLogger:
         Returns:
             List of log entries, most recent first
         """
-        log_file = self.logs_dir / f"{agent_id}.log"
+        log_file = find_path(self.logs_dir, agent_id, '.log')
         
-        if not log_file.exists():
+        if log_file is None:
             return []
         
         logs = []
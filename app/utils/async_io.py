@@ -0,0 +1,46 @@
+"""
+Async I/O for vntrai Data Management
+Bounded thread pool running blocking manager calls on behalf of asyncio code
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .identity_map import IdentityMap, current_identity_map, identity_scope
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Get the shared executor (DATA_ASYNC_WORKERS threads), created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from .base_manager import get_config_value
+            workers = max(1, int(get_config_value('DATA_ASYNC_WORKERS', 4)))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='data-io')
+        return _executor
+
+
+def _call_in_scope(identity_map: Optional[IdentityMap], func: Callable[..., Any], args: tuple,
+                   kwargs: dict) -> Any:
+    if identity_map is None:
+        return func(*args, **kwargs)
+    with identity_scope(identity_map):
+        return func(*args, **kwargs)
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await a blocking call run on the I/O executor, keeping the event loop free
+
+    At most DATA_ASYNC_WORKERS calls run at once, further calls wait in the
+    executor's queue. The identity map in effect (see identity_map) is carried
+    over to the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    call = partial(_call_in_scope, current_identity_map(), func, args, kwargs)
+    return await loop.run_in_executor(get_io_executor(), call)
@@ -5,14 +5,96 @@ Contains the base DataManager class with common functionality
 
 import json
 import os
+import random
+import threading
+import time
 import uuid
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Any, Tuple
+
+from .async_io import run_blocking
+from .change_feed import ChangeFeed
+from .identity_map import current_identity_map
+from .pagination import decode_cursor, encode_cursor
+from .record_cache import RecordCache
+from .record_index import RecordIndex, index_key
+from .run_locks import RunLockManager, RunLockTimeout
+from .search_index import SearchIndex, tokenize
+from .storage_backends import create_backend
+from .summary_store import SummaryStore
+
+
+def get_config_value(key: str, default: Any = None) -> Any:
+    """Read a config value from the Flask app, falling back to Config and the environment"""
+    try:
+        from flask import current_app
+        return current_app.config.get(key, default)
+    except (ImportError, RuntimeError):
+        pass
+
+    try:
+        from app.config import Config
+        return getattr(Config, key, default)
+    except ImportError:
+        return os.environ.get(key, default)
+
+
+# Cache signature of records validated through the change feed instead of the backend
+FEED_SIGNATURE = 'change-feed'
+
+
+class RevisionConflict(Exception):
+    """Raised by a conditional save when the stored item has another revision"""
+    
+    def __init__(self, item_id: str, expected: int, actual: int):
+        super().__init__(f"Revision conflict for {item_id}: expected {expected}, stored {actual}")
+        self.item_id = item_id
+        self.expected = expected
+        self.actual = actual
+
 
 class DataManager:
     """Base class for data management operations"""
     
+    # Field holding the item id (file name / primary key)
+    id_field = 'id'
+    
+    # Pretty-printed JSON files for collections people edit by hand, compact otherwise
+    pretty_json = True
+    
+    # Record files spread over hashed-prefix subdirectories (<data_dir>/ab/<id>.json),
+    # for collections that grow to tens of thousands of records
+    sharded_layout = False
+    
+    # Only written through the managers (never by hand): cached records and ids are
+    # then validated by the change feed alone, without a stat/query per record
+    trust_change_feed = False
+    
+    # Fields with a persisted secondary index, see find_by()
+    indexed_fields: Tuple[str, ...] = ()
+    
+    # Fields kept in the persisted summary projection, see load_summaries()
+    summary_fields: Tuple[str, ...] = ()
+    
+    # Summary fields with incrementally maintained aggregates, see get_counts()/get_total()
+    counted_fields: Tuple[str, ...] = ('status',)
+    summed_fields: Tuple[str, ...] = ()
+    
+    # Text fields in the full-text search index with their ranking weight, see search()
+    search_fields: Dict[str, int] = {'name': 3, 'tool_definition': 2, 'vendor': 2, 'description': 1}
+    
+    # Counter incremented by every save, see save(expected_revision=...) and modify()
+    revision_field = 'revision'
+    
+    # Items locked together by save_many() (each lock holds a lock file open)
+    LOCK_BATCH_SIZE = 100
+    
+    # Upper bound (seconds, growing per attempt) of the random wait before modify() retries
+    MODIFY_BACKOFF = 0.01
+    
     def __init__(self, data_type: str):
         self.data_type = data_type  # 'integrations', 'tools', 'agents', 'agentrun'
         
@@ -25,44 +107,572 @@ class DataManager:
             self.data_dir = Path(__file__).parent.parent.parent / "data" / data_type
             
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Record storage (one JSON file per record or SQLite, see STORAGE_BACKEND)
+        self.backend = create_backend(data_type, self.data_dir, pretty=self.pretty_json,
+                                      sharded=self.sharded_layout)
+        
+        # Parsed records keyed by item id, validated against the backend signature
+        self._cache = RecordCache(int(get_config_value('DATA_CACHE_SIZE', 2048)))
+        
+        # Derived data (indexes etc.) lives next to the collections, outside the record directory
+        self.meta_dir = self.data_dir.parent / '_meta' / data_type
+        
+        # Changes by other processes arrive through the feed and invalidate just those records
+        self._feed = ChangeFeed(self.meta_dir / 'changes.log')
+        self._ids = None  # Known item ids (trust_change_feed only)
+        self._ids_lock = threading.Lock()
+        self._index = RecordIndex(self.meta_dir / 'indexes.json', self.indexed_fields) if self.indexed_fields else None
+        self._summaries = SummaryStore(self.meta_dir / 'summaries.jsonl', self.counted_fields,
+                                       self.summed_fields) if self.summary_fields else None
+        self._search = SearchIndex(self.meta_dir / 'search.jsonl', self.search_fields) if self.search_fields else None
+        
+        # Per-item locks serialize writers across threads and worker processes, so
+        # the revision check of a save and its write happen together
+        self._locks = RunLockManager(self.meta_dir / 'locks', float(get_config_value('RUN_LOCK_TIMEOUT', 30)))
+    
+    def lock(self, item_id: str, timeout: Optional[float] = None) -> ContextManager[None]:
+        """Hold the (reentrant) lock of an item: with manager.lock(item_id): ...
+        
+        Raises RunLockTimeout if the lock is not free within timeout seconds
+        (RUN_LOCK_TIMEOUT by default).
+        """
+        return self._locks.hold(item_id, timeout)
+    
+    @contextmanager
+    def _lock_all(self, item_ids: List[str]) -> Iterator[None]:
+        """Hold the locks of several items, acquired in sorted order so batches cannot deadlock"""
+        with ExitStack() as stack:
+            for item_id in sorted(item_ids, key=self._locks.order_key):
+                stack.enter_context(self.lock(item_id))
+            yield
+    
+    def _lock_batches(self, item_ids: List[str]) -> Iterator[List[str]]:
+        """Split item ids into batches whose locks (and lock files) are held together"""
+        for start in range(0, len(item_ids), self.LOCK_BATCH_SIZE):
+            yield item_ids[start:start + self.LOCK_BATCH_SIZE]
+    
+    def sync_changes(self) -> None:
+        """Invalidate cached records changed by other processes since the last call"""
+        changes = self._feed.poll()
+        with self._ids_lock:
+            if changes is None:
+                self._cache.invalidate()
+                self._ids = None
+                return
+            for item_id, operation in changes:
+                self._cache.invalidate(item_id)
+                if self._ids is not None:
+                    if operation == 'delete':
+                        self._ids.discard(item_id)
+                    else:
+                        self._ids.add(item_id)
+    
+    def _read_record(self, item_id: str, signature: Any = None) -> Optional[Dict[str, Any]]:
+        """Read a record through the cache, parsing it only if it changed"""
+        if self.trust_change_feed:
+            self.sync_changes()
+            cached = self._cache.get(item_id, FEED_SIGNATURE)
+            if cached is not None:
+                return cached
+            item = self.backend.read(item_id)
+            if item is not None:
+                self._cache.put(item_id, FEED_SIGNATURE, item)
+            return item
+        
+        if signature is None:
+            signature = self.backend.signature(item_id)
+            if signature is None:
+                return None
+        
+        cached = self._cache.get(item_id, signature)
+        if cached is not None:
+            return cached
+        
+        item = self.backend.read(item_id)
+        if item is not None:
+            self._cache.put(item_id, signature, item)
+        return item
+    
+    def invalidate_cache(self, item_id: Optional[str] = None) -> None:
+        """Drop cached records (all of them when no item_id is given)"""
+        self._cache.invalidate(item_id)
+        if item_id is None:
+            with self._ids_lock:
+                self._ids = None
+    
+    def _ensure_ids(self) -> None:
+        """List the ids once, the change feed keeps them current (caller holds _ids_lock)"""
+        if self._ids is None:
+            self._ids = set(self.backend.list_ids())
     
     def get_all_ids(self) -> List[str]:
         """Get all item IDs"""
-        return [f.stem for f in self.data_dir.glob("*.json")]
+        if self.trust_change_feed:
+            self.sync_changes()
+            with self._ids_lock:
+                self._ensure_ids()
+                return list(self._ids)
+        return self.backend.list_ids()
     
     def exists(self, item_id: str) -> bool:
         """Check if item exists"""
-        return (self.data_dir / f"{item_id}.json").exists()
+        if self.trust_change_feed:
+            self.sync_changes()
+            with self._ids_lock:
+                self._ensure_ids()
+                return item_id in self._ids
+        return self.backend.exists(item_id)
     
     def load(self, item_id: str) -> Optional[Dict[str, Any]]:
-        """Load single item by ID"""
-        file_path = self.data_dir / f"{item_id}.json"
-        if not file_path.exists():
-            return None
+        """Load single item by ID
+        
+        Within an identity scope (see identity_map) the item is read once and the
+        same dict is returned by every further load in that scope.
+        """
+        identity = current_identity_map()
+        if identity is None:
+            return self._load_item(item_id)
         
+        found, item = identity.get(self.data_type, item_id)
+        if not found:
+            item = self._load_item(item_id)
+            identity.put(self.data_type, item_id, item)
+        return item
+    
+    def _load_item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Read single item (bypassing the identity map)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self._read_record(item_id)
         except (json.JSONDecodeError, IOError) as e:
             print(f"Error loading {self.data_type} {item_id}: {e}")
             return None
     
-    def load_all(self) -> List[Dict[str, Any]]:
-        """Load all items"""
-        items = []
-        for file_path in self.data_dir.glob("*.json"):
+    def load_many(self, item_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Load several items at once (item id -> item, missing items left out)
+        
+        Cached items are served from the cache, the rest is read by the backend
+        in one batch (files on a thread pool, SQLite in one query). Items of the
+        identity map in effect are taken from it.
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        identity = current_identity_map()
+        if identity is None:
+            return self._load_many_items(item_ids)
+        
+        items = {}
+        missing = []
+        for item_id in item_ids:
+            found, item = identity.get(self.data_type, item_id)
+            if not found:
+                missing.append(item_id)
+            elif item is not None:
+                items[item_id] = item
+        
+        loaded = self._load_many_items(missing) if missing else {}
+        for item_id in missing:
+            identity.put(self.data_type, item_id, loaded.get(item_id))
+        items.update(loaded)
+        return {item_id: items[item_id] for item_id in item_ids if item_id in items}
+    
+    def _load_many_items(self, item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several items (bypassing the identity map)"""
+        items = {}
+        signatures = {}
+        
+        if self.trust_change_feed:
+            self.sync_changes()
+        for item_id in item_ids:
+            signature = FEED_SIGNATURE if self.trust_change_feed else self.backend.signature(item_id)
+            if signature is None:
+                continue
+            cached = self._cache.get(item_id, signature)
+            if cached is not None:
+                items[item_id] = cached
+            else:
+                signatures[item_id] = signature
+        
+        errors = {}
+        try:
+            loaded = self.backend.read_many(signatures, errors)
+        except IOError as e:
+            print(f"Error loading {len(signatures)} {self.data_type}: {e}")
+            loaded = {}
+        for item_id, error in errors.items():
+            print(f"Error loading {self.data_type} {item_id}: {error}")
+        for item_id, item in loaded.items():
+            self._cache.put(item_id, signatures[item_id], item)
+            items[item_id] = item
+        
+        return {item_id: items[item_id] for item_id in item_ids if item_id in items}
+    
+    def _iter_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (item_id, item) for all readable items"""
+        if self.trust_change_feed:
+            signatures = [(item_id, FEED_SIGNATURE) for item_id in self.get_all_ids()]
+        else:
+            signatures = self.backend.list_signatures()
+        
+        for item_id, signature in signatures:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    item = json.load(f)
-                    items.append(item)
+                item = self._read_record(item_id, signature)
             except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading {file_path}: {e}")
+                print(f"Error loading {self.data_type} {item_id}: {e}")
                 continue
+            if item is not None:
+                yield item_id, item
+    
+    def load_all(self, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Load all items
+        
+        With fields, only those fields of each item are returned. If they are all
+        summary fields the result is served from the summaries without reading
+        any item.
+        """
+        if fields is None:
+            items = [item for _, item in self._iter_records()]
+            return sorted(items, key=lambda x: x.get('name', ''))
+        
+        fields = list(fields)
+        if self._summaries and set(fields) <= set(self.summary_fields):
+            items = self.load_summaries()
+        else:
+            items = sorted((item for _, item in self._iter_records()), key=lambda x: x.get('name', ''))
+        return [{field: item.get(field) for field in fields} for item in items]
+    
+    def summarize(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the summary projection of an item (subclasses may add computed fields)
+        
+        Missing fields stay missing, so .get() defaults behave as on the full item.
+        """
+        return {field: item[field] for field in self.summary_fields if field in item}
+    
+    def _ensure_summaries(self) -> None:
+        self._summaries.ensure_loaded(
+            lambda: ((item_id, self.summarize(item)) for item_id, item in self._iter_records()))
+    
+    def _load_summary(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Get the summary of one item, falling back to the item itself"""
+        if self._summaries:
+            self._ensure_summaries()
+            summary = self._summaries.get(item_id)
+            if summary is not None:
+                return summary
+        item = self.load(item_id)
+        return self.summarize(item) if item is not None else None
+    
+    def load_summaries(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Load the summaries of all items matching equality filters, sorted by name
         
-        return sorted(items, key=lambda x: x.get('name', ''))
+        Summaries are small projections (see summary_fields) persisted next to the
+        collection, so list views and statistics don't have to parse full records.
+        """
+        filters = filters or {}
+        if self._summaries:
+            self._ensure_summaries()
+            if filters:
+                candidates = (self._summaries.get(item_id) for item_id in self._filter_ids(filters))
+            else:
+                candidates = self._summaries.all().values()
+        else:
+            candidates = (self.summarize(item) for _, item in self._iter_records())
+        
+        summaries = [summary for summary in candidates
+                     if summary and all(summary.get(field) == value for field, value in filters.items())]
+        return sorted(summaries, key=lambda x: x.get('name') or '')
+    
+    def get_counts(self, field: str) -> Dict[Any, int]:
+        """Get {value: number of items} for a counted field
+        
+        Served from the aggregates maintained with the summaries (O(1) once they
+        are loaded); falls back to counting all items.
+        """
+        if self._summaries and field in self.counted_fields:
+            self._ensure_summaries()
+            return self._summaries.counts(field)
+        
+        counts = {}
+        for item in self.load_all():
+            counts[item.get(field)] = counts.get(item.get(field), 0) + 1
+        return counts
+    
+    def get_total(self, field: str) -> float:
+        """Get the sum of a numeric (summed) summary field over all items"""
+        if self._summaries and field in self.summed_fields:
+            self._ensure_summaries()
+            return self._summaries.total(field)
+        return sum(item.get(field) or 0 for item in self.load_summaries())
+    
+    def count_all(self) -> int:
+        """Get the number of items"""
+        if self._summaries:
+            self._ensure_summaries()
+            return self._summaries.size()
+        return len(self.get_all_ids())
+    
+    def _after_save(self, item_id: str, item: Dict[str, Any]) -> None:
+        """Keep derived data up to date after an item was written"""
+        self._after_save_many({item_id: item})
+    
+    def _after_save_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Keep derived data up to date after items were written (one write per derived store)"""
+        self._feed.publish_many(items, 'save')
+        with self._ids_lock:
+            if self._ids is not None:
+                self._ids.update(items)
+        identity = current_identity_map()
+        if identity is not None:
+            for item_id, item in items.items():
+                identity.put(self.data_type, item_id, item)
+        if self._index:
+            self._index.update_many(items.items())
+        if self._summaries:
+            self._summaries.put_many((item_id, self.summarize(item)) for item_id, item in items.items())
+        if self._search:
+            self._search.put_many((item_id, self._search.token_weights(item)) for item_id, item in items.items())
+    
+    def _after_delete(self, item_id: str) -> None:
+        """Keep derived data up to date after an item was removed"""
+        self._after_delete_many([item_id])
     
-    def save(self, item: Dict[str, Any]) -> bool:
-        """Save single item"""
+    def _after_delete_many(self, item_ids: List[str]) -> None:
+        """Keep derived data up to date after items were removed (one write per derived store)"""
+        self._feed.publish_many(item_ids, 'delete')
+        with self._ids_lock:
+            if self._ids is not None:
+                self._ids.difference_update(item_ids)
+        identity = current_identity_map()
+        if identity is not None:
+            for item_id in item_ids:
+                identity.put(self.data_type, item_id, None)
+        if self._index:
+            self._index.remove_many(item_ids)
+        if self._summaries:
+            self._summaries.remove_many(item_ids)
+        if self._search:
+            self._search.remove_many(item_ids)
+    
+    def rebuild_indexes(self) -> None:
+        """Rebuild the persisted secondary indexes from the stored items"""
+        if self._index:
+            self._index.rebuild(self._iter_records())
+    
+    def rebuild_search_index(self) -> None:
+        """Rebuild the persisted full-text search index from the stored items"""
+        if self._search:
+            self._search.rebuild((item_id, self._search.token_weights(item))
+                                 for item_id, item in self._iter_records())
+    
+    def rebuild_summaries(self) -> None:
+        """Rebuild the persisted summaries from the stored items"""
+        if self._summaries:
+            self._summaries.rebuild((item_id, self.summarize(item)) for item_id, item in self._iter_records())
+
+    def rebuild_derived_data(self, records: Optional[Iterable[Tuple[str, Dict[str, Any]]]] = None) -> int:
+        """Rebuild indexes, summaries (with their counters) and the search index in one pass
+        
+        records are (item id, item) pairs, all stored items by default. Returns
+        the number of items.
+        """
+        if records is None:
+            records = self._iter_records()
+        
+        index_entries, summaries, search_entries = [], [], []
+        count = 0
+        for item_id, item in records:
+            count += 1
+            if self._index:
+                index_entries.append((item_id, {field: item.get(field) for field in self.indexed_fields}))
+            if self._summaries:
+                summaries.append((item_id, self.summarize(item)))
+            if self._search:
+                search_entries.append((item_id, self._search.token_weights(item)))
+        
+        if self._index:
+            self._index.rebuild(index_entries)
+        if self._summaries:
+            self._summaries.rebuild(summaries)
+        if self._search:
+            self._search.rebuild(search_entries)
+        return count
+    
+    def publish_changes(self, item_ids: List[str], operation: str = 'save') -> None:
+        """Announce items changed outside save()/delete() (e.g. repaired files) to all processes"""
+        for item_id in item_ids:
+            self._cache.invalidate(item_id)
+        self._feed.publish_many(item_ids, operation)
+        with self._ids_lock:
+            self._ids = None
+    
+    def migrate_storage_layout(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Move record files of the flat layout into their shards (sharded_layout only)
+
+        Runs online: records are found in both layouts meanwhile, and file
+        signatures do not change, so caches and derived data stay valid. limit
+        bounds the files moved per call for migrating in small batches.
+        """
+        migrate = getattr(self.backend, 'migrate_layout', None)
+        if not self.sharded_layout or migrate is None:
+            return {'moved': 0, 'removed': 0, 'failed': 0, 'remaining': 0}
+        return migrate(limit)
+
+    def _lookup_ids(self, field: str, value: Any, case_sensitive: bool = True) -> Optional[List[str]]:
+        """Get candidate ids for field == value from the backend or an index, None if neither applies"""
+        item_ids = self.backend.find_ids(field, value) if case_sensitive else None
+        
+        if item_ids is None and field in self.indexed_fields and index_key(value) is not None:
+            self._index.ensure_loaded(self._iter_records)
+            item_ids = self._index.lookup(field, value)
+        
+        return item_ids
+    
+    def find_by(self, field: str, value: Any, case_sensitive: bool = True) -> List[Dict[str, Any]]:
+        """Find items where field equals value
+        
+        Uses the backend's queryable columns or a declared index when possible,
+        so the cost is proportional to the number of matches; otherwise scans.
+        """
+        item_ids = self._lookup_ids(field, value, case_sensitive)
+        
+        if item_ids is None:
+            candidates = [item for _, item in self._iter_records()]
+        else:
+            candidates = list(self.load_many(item_ids).values())
+        
+        matches = [item for item in candidates
+                   if self._values_equal(item.get(field), value, case_sensitive)]
+        return sorted(matches, key=lambda x: x.get('name', ''))
+    
+    def _filter_ids(self, filters: Dict[str, Any]) -> List[str]:
+        """Narrow the candidate ids for equality filters using every available index"""
+        item_ids = None
+        for field, value in filters.items():
+            field_ids = self._lookup_ids(field, value)
+            if field_ids is not None:
+                item_ids = set(field_ids) if item_ids is None else item_ids & set(field_ids)
+        
+        return list(item_ids) if item_ids is not None else self.get_all_ids()
+    
+    @staticmethod
+    def _values_equal(actual: Any, expected: Any, case_sensitive: bool) -> bool:
+        """Compare field values, optionally ignoring case for strings"""
+        if not case_sensitive and isinstance(actual, str) and isinstance(expected, str):
+            return actual.lower() == expected.lower()
+        return actual == expected
+    
+    @staticmethod
+    def _sort_value(value: Any) -> str:
+        """Normalize a field value for sorting and cursors"""
+        return '' if value is None else str(value)
+    
+    def _uses_summaries(self, fields: Iterable[str]) -> bool:
+        """Check if all fields can be answered from the summaries"""
+        return bool(self._summaries) and set(fields) <= set(self.summary_fields)
+    
+    def _sort_entries(self, item_ids: Iterable[str], sort_key: str) -> List[Tuple[str, str]]:
+        """Get (sort value, item id) pairs for the given ids from the summaries
+        
+        Raises ValueError for a sort_key that is not a summary field: ordering by
+        it would mean parsing every record of the collection.
+        """
+        if not self._uses_summaries([sort_key]):
+            raise ValueError(f"Cannot sort {self.data_type} by '{sort_key}': "
+                             f"only summary fields are sortable ({', '.join(self.summary_fields)})")
+        self._ensure_summaries()
+        known = set(self._summaries.ids())
+        
+        entries = []
+        for item_id in item_ids:
+            if item_id in known:
+                entries.append((self._sort_value(self._summaries.get_field(item_id, sort_key)), item_id))
+                continue
+            # Created by another process since the summaries were read
+            item = self.load(item_id)
+            if item is not None:
+                entries.append((self._sort_value(item.get(sort_key)), item_id))
+        return entries
+    
+    def iter_items(self, filters: Optional[Dict[str, Any]] = None, sort_key: str = 'name',
+                   reverse: bool = False, limit: Optional[int] = None, cursor: Optional[str] = None,
+                   query: Optional[str] = None,
+                   predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                   summaries: bool = False) -> Iterator[Dict[str, Any]]:
+        """Iterate items in sort_key order, optionally starting after a cursor
+        
+        filters are field == value criteria (narrowed through indexes), query is a
+        search string as in search() and predicate an arbitrary extra check. Items
+        are only loaded as the generator is consumed, up to limit. With summaries,
+        the summary projections are yielded (and checked) instead of full items.
+        sort_key has to be one of summary_fields (ValueError otherwise), so the
+        order is known without reading any record.
+        """
+        filters = filters or {}
+        load = self._load_summary if summaries else self.load
+        
+        scores = self.search_scores(query) if query else None
+        if scores is None:
+            item_ids = self._filter_ids(filters)
+        elif filters:
+            item_ids = [item_id for item_id in self._filter_ids(filters) if item_id in scores]
+        else:
+            item_ids = list(scores)
+        entries = sorted(self._sort_entries(item_ids, sort_key))
+        
+        after = decode_cursor(cursor)
+        if after is not None:
+            if reverse:
+                entries = entries[:bisect_left(entries, after)]
+            else:
+                entries = entries[bisect_right(entries, after):]
+        if reverse:
+            entries.reverse()
+        
+        # Without a search index the query is checked against every loaded item
+        query_lower = query.lower() if query and scores is None else None
+        yielded = 0
+        for _, item_id in entries:
+            if limit is not None and yielded >= limit:
+                return
+            
+            item = load(item_id)
+            if item is None:
+                continue
+            if any(item.get(field) != value for field, value in filters.items()):
+                continue
+            if query_lower and not self.matches_query(item, query_lower):
+                continue
+            if predicate and not predicate(item):
+                continue
+            
+            yielded += 1
+            yield item
+    
+    def get_page(self, filters: Optional[Dict[str, Any]] = None, sort_key: str = 'name',
+                 reverse: bool = False, limit: int = 50, cursor: Optional[str] = None,
+                 query: Optional[str] = None,
+                 predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 summaries: bool = False) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of iter_items() and the cursor for the next page (None on the last page)"""
+        items = list(self.iter_items(filters, sort_key, reverse, limit + 1, cursor, query, predicate,
+                                     summaries))
+        
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(self._sort_value(last.get(sort_key)), last.get(self.id_field))
+        
+        return items, next_cursor
+    
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Count items matching equality filters"""
+        filters = filters or {}
+        load = self._load_summary if self._uses_summaries(filters) else self.load
+        return sum(1 for item in (load(item_id) for item_id in self._filter_ids(filters))
+                   if item and all(item.get(field) == value for field, value in filters.items()))
+    
+    def _prepare_save(self, item: Dict[str, Any]) -> str:
+        """Assign an id (if missing) and timestamps before an item is written"""
         item_id = item.get('id')
         if not item_id:
             item_id = str(uuid.uuid4())
@@ -72,28 +682,148 @@ class DataManager:
         item['updated_at'] = datetime.now().isoformat()
         if 'created_at' not in item:
             item['created_at'] = item['updated_at']
+        return item_id
+    
+    def get_revision(self, item: Optional[Dict[str, Any]]) -> int:
+        """Get the revision of an item (0 for a missing item or one saved before revisions existed)"""
+        if not item:
+            return 0
+        try:
+            return int(item.get(self.revision_field) or 0)
+        except (TypeError, ValueError):
+            return 0
+    
+    def _read_stored(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Read the stored version of an item for the revision check of a save"""
+        try:
+            return self._read_record(item_id)
+        except json.JSONDecodeError:
+            return None
+    
+    def _assign_revision(self, item_id: str, item: Dict[str, Any], stored: Optional[Dict[str, Any]],
+                         expected_revision: Optional[int] = None) -> None:
+        """Check expected_revision against the stored item and give item the next revision
+        
+        The caller holds the item lock until the item is written.
+        """
+        stored_revision = self.get_revision(stored)
+        if expected_revision is not None and int(expected_revision) != stored_revision:
+            raise RevisionConflict(item_id, int(expected_revision), stored_revision)
+        item[self.revision_field] = max(stored_revision, self.get_revision(item)) + 1
+    
+    def save(self, item: Dict[str, Any], expected_revision: Optional[int] = None) -> bool:
+        """Save single item
+        
+        Every save increments the item's revision. With expected_revision the save
+        is conditional: RevisionConflict is raised (and nothing written) if the
+        stored item has another revision, i.e. it changed since it was read
+        (0 expects that the item does not exist yet).
+        """
+        item_id = self._prepare_save(item)
         
-        file_path = self.data_dir / f"{item_id}.json"
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(item, f, indent=2, ensure_ascii=False)
-            return True
-        except IOError as e:
+            with self.lock(item_id):
+                self._assign_revision(item_id, item, self._read_stored(item_id), expected_revision)
+                self._cache.invalidate(item_id)
+                self.backend.write(item_id, item)
+                self._after_save(item_id, item)
+        except (IOError, RunLockTimeout) as e:
             print(f"Error saving {self.data_type} {item_id}: {e}")
             return False
+        return True
     
-    def delete(self, item_id: str) -> bool:
-        """Delete single item"""
-        file_path = self.data_dir / f"{item_id}.json"
-        if not file_path.exists():
-            return False
+    def modify(self, item_id: str, change: Callable[[Dict[str, Any]], Any],
+               expected_revision: Optional[int] = None, retries: int = 8) -> Optional[Dict[str, Any]]:
+        """Apply change(item) to the stored item and save it conditionally
         
+        If another writer saved the item in between, the change is applied again
+        to the new version (up to retries times, after a short random backoff),
+        so concurrent edits of different parts of an item are all kept. With
+        expected_revision (e.g. from an If-Match header) the caller's view must
+        be current: a mismatch raises RevisionConflict instead of retrying.
+        change may return False to leave the item unsaved. Returns the item as saved, None if it does not exist or
+        could not be written.
+        """
+        for attempt in range(retries + 1):
+            # A fresh copy: change() must not touch the identity map's item before it is saved
+            item = self._load_item(item_id)
+            if item is None:
+                return None
+            
+            revision = self.get_revision(item)
+            if expected_revision is not None and int(expected_revision) != revision:
+                raise RevisionConflict(item_id, int(expected_revision), revision)
+            if change(item) is False:
+                return item
+            
+            try:
+                return item if self.save(item, expected_revision=revision) else None
+            except RevisionConflict:
+                if expected_revision is not None or attempt == retries:
+                    raise
+            time.sleep(random.uniform(0, self.MODIFY_BACKOFF * (attempt + 1)))
+        return None
+    
+    def delete(self, item_id: str) -> bool:
+        """Delete single item (under its lock, so it cannot interleave with a save)"""
         try:
-            file_path.unlink()
-            return True
-        except IOError as e:
+            with self.lock(item_id):
+                self._cache.invalidate(item_id)
+                if not self.backend.remove(item_id):
+                    return False
+                self._after_delete(item_id)
+        except (IOError, RunLockTimeout) as e:
             print(f"Error deleting {self.data_type} {item_id}: {e}")
             return False
+        return True
+    
+    def save_many(self, items: Iterable[Dict[str, Any]]) -> List[str]:
+        """Save several items with one batch write per lock batch
+        
+        Every item gets its next revision (unconditionally, as save() without
+        expected_revision). Returns the ids of the saved items; a batch that
+        fails is skipped as a whole, so no item of it was replaced.
+        """
+        batch = {}
+        for item in items:
+            batch[self._prepare_save(item)] = item
+        
+        saved = []
+        for batch_ids in self._lock_batches(list(batch)):
+            try:
+                with self._lock_all(batch_ids):
+                    chunk = {item_id: batch[item_id] for item_id in batch_ids}
+                    stored = self._load_many_items(batch_ids)
+                    for item_id, item in chunk.items():
+                        self._assign_revision(item_id, item, stored.get(item_id))
+                        self._cache.invalidate(item_id)
+                    self.backend.write_many(chunk)
+                    self._after_save_many(chunk)
+            except (IOError, RunLockTimeout) as e:
+                print(f"Error saving {len(batch_ids)} {self.data_type}: {e}")
+                continue
+            saved.extend(batch_ids)
+        return saved
+    
+    def delete_many(self, item_ids: Iterable[str]) -> List[str]:
+        """Delete several items, returning the ids that existed and were removed
+        
+        Items are deleted batch by batch under their locks, like save_many().
+        """
+        deleted = []
+        for batch_ids in self._lock_batches(list(dict.fromkeys(item_ids))):
+            try:
+                with self._lock_all(batch_ids):
+                    for item_id in batch_ids:
+                        self._cache.invalidate(item_id)
+                    removed = self.backend.remove_many(batch_ids)
+                    if removed:
+                        self._after_delete_many(removed)
+            except (IOError, RunLockTimeout) as e:
+                print(f"Error deleting {len(batch_ids)} {self.data_type}: {e}")
+                continue
+            deleted.extend(removed)
+        return deleted
     
     def get_all(self) -> List[Dict[str, Any]]:
         """Get all items - alias for load_all"""
@@ -115,56 +845,113 @@ class DataManager:
         
         return self.save(data)
     
-    def update(self, item_id: str, data: Dict[str, Any]) -> bool:
-        """Update existing item"""
+    def update(self, item_id: str, data: Dict[str, Any], expected_revision: Optional[int] = None) -> bool:
+        """Update existing item (conditionally with expected_revision, see save())"""
         data['id'] = item_id  # Ensure ID is set
         data['updated_at'] = datetime.utcnow().isoformat() + 'Z'
         
-        return self.save(data)
+        return self.save(data, expected_revision)
     
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search items by query"""
-        all_items = self.load_all()
-        query_lower = query.lower()
-        
-        results = []
-        for item in all_items:
-            # Search in name, description, and vendor (if exists)
-            searchable_text = (
-                item.get('name', '').lower() + ' ' +
-                item.get('description', '').lower() + ' ' +
-                item.get('vendor', '').lower() + ' ' +
-                item.get('tool_definition', '').lower()
-            )
-            
-            if query_lower in searchable_text:
-                results.append(item)
+    # Awaitable counterparts for asyncio code paths: the blocking call runs on the
+    # shared I/O executor (see async_io), so the event loop is not stalled on disk I/O
+    async def aload(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Awaitable load()"""
+        return await run_blocking(self.load, item_id)
+    
+    async def aload_many(self, item_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Awaitable load_many()"""
+        return await run_blocking(self.load_many, list(item_ids))
+    
+    async def aload_all(self, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Awaitable load_all()"""
+        return await run_blocking(self.load_all, fields)
+    
+    async def afind_by(self, field: str, value: Any, case_sensitive: bool = True) -> List[Dict[str, Any]]:
+        """Awaitable find_by()"""
+        return await run_blocking(self.find_by, field, value, case_sensitive)
+    
+    async def asave(self, item: Dict[str, Any], expected_revision: Optional[int] = None) -> bool:
+        """Awaitable save()"""
+        return await run_blocking(self.save, item, expected_revision)
+    
+    async def asave_many(self, items: Iterable[Dict[str, Any]]) -> List[str]:
+        """Awaitable save_many()"""
+        return await run_blocking(self.save_many, list(items))
+    
+    async def aupdate(self, item_id: str, data: Dict[str, Any], expected_revision: Optional[int] = None) -> bool:
+        """Awaitable update()"""
+        return await run_blocking(self.update, item_id, data, expected_revision)
+    
+    async def amodify(self, item_id: str, change: Callable[[Dict[str, Any]], Any],
+                      expected_revision: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Awaitable modify() (change runs on the executor thread)"""
+        return await run_blocking(self.modify, item_id, change, expected_revision)
+    
+    async def adelete(self, item_id: str) -> bool:
+        """Awaitable delete()"""
+        return await run_blocking(self.delete, item_id)
+    
+    @staticmethod
+    def matches_query(item: Dict[str, Any], query_lower: str) -> bool:
+        """Check if a lowercase query occurs in the item's searchable text"""
+        # Search in name, description, and vendor (if exists)
+        searchable_text = (
+            item.get('name', '').lower() + ' ' +
+            item.get('description', '').lower() + ' ' +
+            item.get('vendor', '').lower() + ' ' +
+            item.get('tool_definition', '').lower()
+        )
+        return query_lower in searchable_text
+    
+    def search_scores(self, query: str) -> Optional[Dict[str, float]]:
+        """Get {item id: relevance} for a query from the search index
+        
+        Returns None when there is no index or the query contains no words, in
+        which case callers fall back to matches_query().
+        """
+        if not self._search or not tokenize(query):
+            return None
+        self._search.ensure_loaded(
+            lambda: ((item_id, self._search.token_weights(item)) for item_id, item in self._iter_records()))
+        return self._search.query(query)
+    
+    def search(self, query: str, ranked: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search items by query
         
-        return results
+        Every word of the query must match the start of a word in name,
+        description, vendor or tool_definition. Results are sorted by name, or
+        by relevance (best first) when ranked.
+        """
+        scores = self.search_scores(query)
+        if scores is None:
+            query_lower = query.lower()
+            items = [item for item in self.load_all() if self.matches_query(item, query_lower)]
+            return items[:limit] if limit is not None else items
+        
+        if ranked:
+            item_ids = sorted(scores, key=lambda item_id: -scores[item_id])
+            if limit is not None:
+                item_ids = item_ids[:limit]
+            return [item for item in (self.load(item_id) for item_id in item_ids) if item]
+        
+        items = sorted((item for item in (self.load(item_id) for item_id in scores) if item),
+                       key=lambda x: x.get('name', ''))
+        return items[:limit] if limit is not None else items
 
     def filter_by_status(self, status: str) -> List[Dict[str, Any]]:
         """Filter items by status"""
-        all_items = self.load_all()
-        return [item for item in all_items if item.get('status') == status]
+        return self.find_by('status', status)
     
     def get_stats(self) -> Dict[str, int]:
         """Get statistics about items"""
-        all_items = self.load_all()
+        status_counts = self.get_counts('status')
+        total = sum(status_counts.values())
+        active = status_counts.get('active', 0)
+        inactive = status_counts.get('inactive', 0)
         
-        stats = {
-            'total': len(all_items),
-            'active': 0,
-            'inactive': 0,
-            'other': 0
+        return {
+            'total': total,
+            'active': active,
+            'inactive': inactive,
+            'other': total - active - inactive
         }
-        
-        for item in all_items:
-            status = item.get('status', 'unknown')
-            if status == 'active':
-                stats['active'] += 1
-            elif status == 'inactive':
-                stats['inactive'] += 1
-            else:
-                stats['other'] += 1
-        
-        return stats
@@ -0,0 +1,310 @@
+"""
+Batch Store for vntrai Batch Runs
+Batches (one task executed for every row of an input table) and their rows in SQLite
+"""
+
+import csv
+import io
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .json_codec import dumps, loads
+from .sqlite_db import SQLiteDatabase
+
+# Row statuses (batches: created, running, paused, completed, failed); pending rows are
+# executed, a failed row with attempts left is set pending again
+ROW_STATUSES = ('pending', 'running', 'done', 'failed')
+
+_stores: Dict[str, 'BatchStore'] = {}
+_registry_lock = threading.Lock()
+
+
+def parse_csv_rows(text: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """Get (columns, rows) of a CSV text with a header line (delimiter detected)"""
+    text = text.lstrip('﻿')
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+    except csv.Error:
+        # Inconsistent lines (e.g. short ones): the most frequent delimiter of the header
+        header = text.split('\n', 1)[0]
+        dialect = csv.excel()
+        dialect.delimiter = max(',;\t', key=header.count)
+    reader = csv.reader(io.StringIO(text), dialect)
+    return table_rows(list(reader))
+
+
+def table_rows(values: List[List[Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Get (columns, rows) of a table given as lists of cells, the first one being the header
+
+    Empty lines are skipped; short lines are filled up with empty strings.
+    """
+    if not values:
+        return [], []
+    columns = [str(cell).strip() or f"column_{index + 1}" for index, cell in enumerate(values[0])]
+    rows = []
+    for line in values[1:]:
+        if not any(str(cell).strip() for cell in line):
+            continue
+        cells = list(line) + [''] * (len(columns) - len(line))
+        rows.append(dict(zip(columns, cells)))
+    return columns, rows
+
+
+class BatchStore:
+    """Batches and their rows in one SQLite database (WAL mode), shared by all processes
+
+    Rows are claimed by the batch job in row order (atomic status change), so a
+    batch job restarted after a crash or a pause continues where it stopped.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS batches (
+            id TEXT PRIMARY KEY,
+            agent_uuid TEXT NOT NULL,
+            task_uuid TEXT NOT NULL,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            concurrency INTEGER NOT NULL,
+            max_attempts INTEGER NOT NULL,
+            columns TEXT NOT NULL,
+            options TEXT NOT NULL,
+            job_id TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_batches_agent ON batches (agent_uuid, created_at);
+        CREATE TABLE IF NOT EXISTS batch_rows (
+            batch_id TEXT NOT NULL,
+            row_index INTEGER NOT NULL,
+            inputs TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_uuid TEXT,
+            output TEXT,
+            error TEXT,
+            started_at REAL,
+            finished_at REAL,
+            PRIMARY KEY (batch_id, row_index)
+        );
+        CREATE INDEX IF NOT EXISTS idx_batch_rows_status ON batch_rows (batch_id, status, row_index);
+    """
+
+    COLUMNS = ('id', 'agent_uuid', 'task_uuid', 'name', 'status', 'concurrency', 'max_attempts', 'columns',
+               'options', 'job_id', 'error', 'created_at', 'updated_at', 'finished_at')
+
+    ROW_COLUMNS = ('batch_id', 'row_index', 'inputs', 'status', 'attempts', 'run_uuid', 'output', 'error',
+                   'started_at', 'finished_at')
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._db = SQLiteDatabase(self.db_path, 'batch store', self.SCHEMA)
+
+    def _row_to_batch(self, row: tuple) -> Dict[str, Any]:
+        batch = dict(zip(self.COLUMNS, row))
+        batch['columns'] = loads(batch['columns'])
+        batch['options'] = loads(batch['options'])
+        return batch
+
+    def _row_to_item(self, row: tuple) -> Dict[str, Any]:
+        item = dict(zip(self.ROW_COLUMNS, row))
+        item['inputs'] = loads(item['inputs'])
+        return item
+
+    def create_batch(self, agent_uuid: str, task_uuid: str, name: str, columns: List[str],
+                     rows: List[Dict[str, Any]], concurrency: int, max_attempts: int,
+                     options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Store a new batch with its input rows (status created)
+
+        options hold the column mapping, the output column and the input/output
+        table descriptions.
+        """
+        batch_id = str(uuid.uuid4())
+        now = time.time()
+
+        def insert(conn):
+            conn.execute(
+                f"INSERT INTO batches ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                (batch_id, agent_uuid, task_uuid, name, 'created', concurrency, max_attempts, dumps(columns),
+                 dumps(options or {}), None, None, now, now, None)
+            )
+            conn.executemany(
+                "INSERT INTO batch_rows (batch_id, row_index, inputs) VALUES (?, ?, ?)",
+                ((batch_id, index, dumps(row)) for index, row in enumerate(rows))
+            )
+
+        self._db.transaction(insert)
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Get a batch with its progress, None if it does not exist"""
+        rows = self._db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM batches WHERE id = ?", (batch_id,))
+        if not rows:
+            return None
+        batch = self._row_to_batch(rows[0])
+        batch['progress'] = self.progress(batch_id)
+        return batch
+
+    def get_status(self, batch_id: str) -> Optional[str]:
+        """Get the status of a batch, None if it does not exist"""
+        rows = self._db.execute("SELECT status FROM batches WHERE id = ?", (batch_id,))
+        return rows[0][0] if rows else None
+
+    def list_batches(self, agent_uuid: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the batches (of an agent), newest first, with their progress"""
+        if agent_uuid:
+            rows = self._db.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM batches WHERE agent_uuid = ? ORDER BY created_at DESC",
+                (agent_uuid,)
+            )
+        else:
+            rows = self._db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM batches ORDER BY created_at DESC")
+        batches = [self._row_to_batch(row) for row in rows]
+        for batch in batches:
+            batch['progress'] = self.progress(batch['id'])
+        return batches
+
+    def update_batch(self, batch_id: str, **fields: Any) -> bool:
+        """Set fields of a batch (status, job_id, error, concurrency, finished_at)"""
+        allowed = ('status', 'job_id', 'error', 'concurrency', 'finished_at')
+        fields = {key: value for key, value in fields.items() if key in allowed}
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        changed = self._db.update(f"UPDATE batches SET {assignments} WHERE id = ?", (*fields.values(), batch_id))
+        return changed > 0
+
+    def delete_batch(self, batch_id: str) -> bool:
+        """Delete a batch and its rows (the agent runs of the rows are kept)"""
+        def delete(conn):
+            conn.execute("DELETE FROM batch_rows WHERE batch_id = ?", (batch_id,))
+            return conn.execute("DELETE FROM batches WHERE id = ?", (batch_id,)).rowcount > 0
+
+        return self._db.transaction(delete)
+
+    def progress(self, batch_id: str) -> Dict[str, int]:
+        """Get the number of rows per status and in total"""
+        counts = {status: 0 for status in ROW_STATUSES}
+        for status, count in self._db.execute(
+            "SELECT status, COUNT(*) FROM batch_rows WHERE batch_id = ? GROUP BY status", (batch_id,)
+        ):
+            counts[status] = count
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def claim_rows(self, batch_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Mark up to limit pending rows as running (row order), returns them with attempts counted"""
+        if limit <= 0:
+            return []
+
+        def claim(conn):
+            rows = conn.execute(
+                f"SELECT {', '.join(self.ROW_COLUMNS)} FROM batch_rows WHERE batch_id = ? AND status = 'pending' "
+                "ORDER BY row_index LIMIT ?",
+                (batch_id, limit)
+            ).fetchall()
+            now = time.time()
+            items = []
+            for row in rows:
+                item = self._row_to_item(row)
+                item['status'] = 'running'
+                item['attempts'] += 1
+                item['started_at'] = now
+                conn.execute(
+                    "UPDATE batch_rows SET status = 'running', attempts = ?, started_at = ?, finished_at = NULL "
+                    "WHERE batch_id = ? AND row_index = ?",
+                    (item['attempts'], now, batch_id, item['row_index'])
+                )
+                items.append(item)
+            return items
+
+        return self._db.transaction(claim)
+
+    def finish_row(self, batch_id: str, row_index: int, status: str, output: Optional[str] = None,
+                   error: Optional[str] = None, run_uuid: Optional[str] = None) -> None:
+        """Store the result of a row (status done, failed or pending for another attempt)"""
+        self._db.execute(
+            "UPDATE batch_rows SET status = ?, output = ?, error = ?, run_uuid = COALESCE(?, run_uuid), "
+            "finished_at = ? WHERE batch_id = ? AND row_index = ?",
+            (status, output, error, run_uuid, time.time(), batch_id, row_index)
+        )
+
+    def reset_rows(self, batch_id: str, statuses: Tuple[str, ...] = ('running',),
+                   row_indexes: Optional[List[int]] = None, reset_attempts: bool = False) -> int:
+        """Set rows with one of the statuses back to pending, returns the number of rows reset
+
+        Used for rows left running by a stopped worker and for retries of
+        failed rows (reset_attempts gives them all attempts again).
+        """
+        def reset(conn):
+            sql = (f"UPDATE batch_rows SET status = 'pending'{', attempts = 0' if reset_attempts else ''} "
+                   f"WHERE batch_id = ? AND status IN ({', '.join('?' * len(statuses))})")
+            params = (batch_id, *statuses)
+            if row_indexes is None:
+                return conn.execute(sql, params).rowcount
+            changed = 0
+            for start in range(0, len(row_indexes), 500):
+                chunk = tuple(row_indexes[start:start + 500])
+                changed += conn.execute(
+                    f"{sql} AND row_index IN ({', '.join('?' * len(chunk))})", params + chunk
+                ).rowcount
+            return changed
+
+        return self._db.transaction(reset)
+
+    def get_rows(self, batch_id: str, status: Optional[str] = None, offset: int = 0,
+                 limit: int = 100) -> List[Dict[str, Any]]:
+        """Get rows of a batch in row order (optionally only those with a status)"""
+        if status:
+            rows = self._db.execute(
+                f"SELECT {', '.join(self.ROW_COLUMNS)} FROM batch_rows WHERE batch_id = ? AND status = ? "
+                "ORDER BY row_index LIMIT ? OFFSET ?",
+                (batch_id, status, limit, offset)
+            )
+        else:
+            rows = self._db.execute(
+                f"SELECT {', '.join(self.ROW_COLUMNS)} FROM batch_rows WHERE batch_id = ? "
+                "ORDER BY row_index LIMIT ? OFFSET ?",
+                (batch_id, limit, offset)
+            )
+        return [self._row_to_item(row) for row in rows]
+
+    def iter_rows(self, batch_id: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Iterate over all rows of a batch in row order, page by page"""
+        after = -1
+        while True:
+            rows = self._db.execute(
+                f"SELECT {', '.join(self.ROW_COLUMNS)} FROM batch_rows WHERE batch_id = ? AND row_index > ? "
+                "ORDER BY row_index LIMIT ?",
+                (batch_id, after, page_size)
+            )
+            for row in rows:
+                yield self._row_to_item(row)
+            if len(rows) < page_size:
+                return
+            after = rows[-1][1]
+
+
+def output_table(store: BatchStore, batch: Dict[str, Any]) -> Iterator[List[Any]]:
+    """Rows of the output table of a batch: the input columns plus output, status and error"""
+    output_column = batch['options'].get('output_column') or 'output'
+    columns = list(batch['columns'])
+    yield columns + [output_column, 'status', 'error']
+    for item in store.iter_rows(batch['id']):
+        inputs = item['inputs']
+        yield [inputs.get(column, '') for column in columns] + [item['output'] or '', item['status'], item['error'] or '']
+
+
+def get_batch_store() -> BatchStore:
+    """Get the batch store of the configured DATA_DIR"""
+    from .base_manager import get_config_value
+    db_path = os.path.abspath(os.path.join(get_config_value('DATA_DIR', 'data'), '_meta', 'batches.db'))
+    with _registry_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = BatchStore(Path(db_path))
+        return store
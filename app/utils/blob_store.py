@@ -0,0 +1,72 @@
+"""
+Blob Store for vntrai Data Management
+Content-addressed, compressed storage for large text bodies (e.g. task outputs)
+"""
+
+import hashlib
+import os
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Key marking a blob reference inside a record
+BLOB_REF_KEY = '$blob'
+
+
+def is_blob_ref(value: Any) -> bool:
+    """Check if a value is a reference created by BlobStore.put()"""
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+
+class BlobStore:
+    """zlib-compressed text bodies stored as <blob_dir>/<ab>/<sha256>.z
+
+    Bodies are addressed by the SHA-256 of their content, so identical outputs
+    are stored once. Blobs are immutable; records keep small references of the
+    form {'$blob': <sha256>, 'size': <bytes>}.
+    """
+
+    def __init__(self, blob_dir: Path):
+        self.blob_dir = Path(blob_dir)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest: str) -> Path:
+        """Get the file path of a blob"""
+        return self.blob_dir / digest[:2] / f"{digest}.z"
+
+    def put(self, text: str) -> Dict[str, Any]:
+        """Store a text body (if not stored yet) and return its reference"""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self.path_for(digest)
+
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            # A temp file of its own per writer: threads storing the same output at once
+            # each replace the blob with identical content
+            fd, temp_path = tempfile.mkstemp(prefix=f"{digest}.", suffix='.tmp', dir=str(blob_path.parent))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(zlib.compress(data, 6))
+                os.replace(temp_path, blob_path)
+            except IOError:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+        return {BLOB_REF_KEY: digest, 'size': len(data)}
+
+    def get(self, ref: Dict[str, Any]) -> Optional[str]:
+        """Load the text body of a reference, None if the blob is missing or unreadable"""
+        digest = ref.get(BLOB_REF_KEY, '')
+        try:
+            with open(self.path_for(digest), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except (IOError, zlib.error, UnicodeDecodeError) as e:
+            print(f"Error loading blob {digest}: {e}")
+            return None
+
+    def exists(self, digest: str) -> bool:
+        """Check if a blob is stored"""
+        return self.path_for(digest).exists()
@@ -0,0 +1,156 @@
+"""
+Change Feed for vntrai Data Management
+Per-collection log of changed item ids, so every process can invalidate only what changed
+"""
+
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from .file_locks import file_lock
+from .json_codec import dumps_bytes, loads
+
+
+class ChangeFeed:
+    """Append-only log of (item id, operation) lines shared by all processes
+
+    The byte offset into the log is the collection's sequence number: it only
+    grows, so a process that remembers its offset reads exactly the changes it
+    has not seen yet. When the log exceeds MAX_BYTES it is replaced by a file
+    holding only a header line with a new generation id; readers notice the new
+    inode (or, should the inode have been reused, the other generation) and drop
+    all their cached state once. Appends and the rotation hold the same file
+    lock, so no change is written to a log that is being replaced.
+    """
+
+    MAX_BYTES = 1024 * 1024
+
+    # Longest header line written by a rotation
+    HEADER_BYTES = 128
+
+    def __init__(self, feed_path: Path):
+        self.feed_path = Path(feed_path)
+        self.feed_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.feed_path.with_name(f"{self.feed_path.name}.lock")
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+        # Changes made before this process started are irrelevant: nothing is cached yet
+        self._inode, self._offset, self._generation = None, 0, b''
+        try:
+            with open(self.feed_path, 'rb') as f:
+                self._adopt(f, os.fstat(f.fileno()))
+        except OSError:
+            pass
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return self.feed_path.stat()
+        except OSError:
+            return None
+
+    @property
+    def sequence(self) -> Tuple[Optional[int], int]:
+        """Position up to which this process has seen changes (inode, offset)"""
+        return (self._inode, self._offset)
+
+    def publish(self, item_id: str, operation: str = 'save') -> None:
+        """Announce that an item was saved or deleted"""
+        self.publish_many([item_id], operation)
+
+    def publish_many(self, item_ids: Iterable[str], operation: str = 'save') -> None:
+        """Announce that items were saved or deleted, in a single append"""
+        data = b''.join(dumps_bytes({'id': item_id, 'op': operation}) + b'\n' for item_id in item_ids)
+        if not data:
+            return
+        try:
+            with self._write_lock, file_lock(self.lock_path):
+                with open(self.feed_path, 'ab') as f:
+                    f.write(data)
+                    size = f.tell()
+                if size > self.MAX_BYTES:
+                    self._rotate()
+        except IOError as e:
+            print(f"Error publishing changes to {self.feed_path}: {e}")
+
+    def _rotate(self) -> None:
+        """Replace the log by one with a new generation header (caller holds the file lock)"""
+        header = dumps_bytes({'op': 'rotate', 'generation': uuid.uuid4().hex}) + b'\n'
+        fd, temp_path = tempfile.mkstemp(prefix=f"{self.feed_path.name}.", suffix='.tmp',
+                                         dir=str(self.feed_path.parent))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+            os.replace(temp_path, self.feed_path)
+        except IOError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _read_generation(self, f: BinaryIO) -> bytes:
+        """Get the header line of a rotated log, empty for a log that was never rotated"""
+        f.seek(0)
+        line = f.readline(self.HEADER_BYTES)
+        return line if line.startswith(b'{"op":"rotate"') else b''
+
+    def _adopt(self, f: BinaryIO, stat: os.stat_result) -> None:
+        """Continue at the end of an opened log (its earlier changes are not of interest)"""
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        self._generation = self._read_generation(f)
+
+    def poll(self) -> Optional[List[Tuple[str, str]]]:
+        """Get (item id, operation) pairs published since the last poll
+
+        Returns None when changes may have been missed (the log was rotated or
+        removed), in which case the caller has to drop everything it cached.
+        """
+        stat = self._stat()
+        with self._lock:
+            if stat is None:
+                if self._inode is None:
+                    return []
+                self._inode, self._offset, self._generation = None, 0, b''
+                return None
+
+            if stat.st_ino == self._inode and stat.st_size == self._offset:
+                return []
+
+            try:
+                f = open(self.feed_path, 'rb')
+            except OSError:
+                return []
+            with f:
+                # Checked on the opened file: the path may have been rotated since the stat above
+                stat = os.fstat(f.fileno())
+                if self._inode is None:
+                    # Log created since the last poll: read it from the start, unless it
+                    # was rotated meanwhile and earlier changes are gone
+                    self._inode, self._offset = stat.st_ino, 0
+                    self._generation = self._read_generation(f)
+                    if self._generation:
+                        self._offset = stat.st_size
+                        return None
+                elif (stat.st_ino != self._inode or stat.st_size < self._offset
+                      or self._read_generation(f) != self._generation):
+                    self._adopt(f, stat)
+                    return None
+
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+            # Only consume complete lines, a concurrent append may still be in progress
+            complete = data[:data.rfind(b'\n') + 1]
+            self._offset += len(complete)
+
+        changes = []
+        for line in complete.splitlines():
+            try:
+                entry = loads(line)
+            except ValueError:
+                continue
+            if entry.get('id') is not None:
+                changes.append((entry.get('id'), entry.get('op', 'save')))
+        return changes
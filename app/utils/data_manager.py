@@ -4,7 +4,7 @@ Backward compatibility file that imports all manager instances
 """
 
 # Import all manager classes and their global instances
-from .base_manager import DataManager
+from .base_manager import DataManager, RevisionConflict
 from .integrations_manager import IntegrationsManager, integrations_manager
 from .tools_manager import ToolsManager, tools_manager
 from .agents_manager import AgentsManager, agents_manager
@@ -13,7 +13,7 @@ from .icon_manager import IconManager, icon_manager
 
 # Export all instances for backward compatibility
 __all__ = [
-    'DataManager',
+    'DataManager', 'RevisionConflict',
     'IntegrationsManager', 'integrations_manager',
     'ToolsManager', 'tools_manager', 
     'AgentsManager', 'agents_manager',
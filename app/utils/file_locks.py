@@ -0,0 +1,36 @@
+"""
+File Locks for vntrai Data Management
+Exclusive advisory locks on lock files, serializing writers across worker processes
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:
+    # No advisory file locks on this platform, only threads are serialized
+    FILE_LOCKS_AVAILABLE = False
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """Hold an exclusive flock on lock_path (created if missing) for the with block
+
+    flock locks belong to the open file, so callers still need a thread lock to
+    serialize the threads of their own process.
+    """
+    if not FILE_LOCKS_AVAILABLE:
+        yield
+        return
+
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
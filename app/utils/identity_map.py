@@ -0,0 +1,98 @@
+"""
+Identity Map for vntrai Data Management
+Request-scoped map of loaded records, so a request parses each record only once
+"""
+
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Explicitly entered scopes of the current thread (innermost last), see identity_scope()
+_scopes = threading.local()
+
+
+class IdentityMap:
+    """Records loaded within one scope, keyed by (data type, item id)
+
+    Every load of a record in the scope returns the same dict, None is kept for
+    records known to be missing. The managers write through: saves go to disk
+    and replace the entry, deletes and task state patches drop it.
+    """
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data_type: str, item_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Get (found, record) - found is False if the record was not loaded in this scope"""
+        key = (data_type, item_id)
+        if key in self._records:
+            self.hits += 1
+            return True, self._records[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, data_type: str, item_id: str, record: Optional[Dict[str, Any]]) -> None:
+        """Remember a loaded or written record (None: known to be missing)"""
+        self._records[(data_type, item_id)] = record
+
+    def discard(self, data_type: str, item_id: str) -> None:
+        """Forget a record, the next load reads it again"""
+        self._records.pop((data_type, item_id), None)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+def current_identity_map() -> Optional[IdentityMap]:
+    """Get the identity map in effect: the innermost identity_scope(), else the request's (flask.g)"""
+    stack = getattr(_scopes, 'stack', None)
+    if stack:
+        return stack[-1]
+
+    try:
+        from flask import g
+        return g.get('identity_map')
+    except (ImportError, RuntimeError):
+        # Not in a Flask app context
+        return None
+
+
+@contextmanager
+def identity_scope(identity_map: Optional[IdentityMap] = None) -> Iterator[IdentityMap]:
+    """Use an identity map for the with block (a new one if none is given)
+
+    Needed where flask.g is gone, e.g. in the body of a streaming response
+    generator: capture current_identity_map() in the view and re-enter it there.
+    """
+    identity_map = identity_map if identity_map is not None else IdentityMap()
+    _scope_stack().append(identity_map)
+    try:
+        yield identity_map
+    finally:
+        # A suspended generator may be closed after other scopes were entered (or in another thread)
+        stack = _scope_stack()
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i] is identity_map:
+                del stack[i]
+                break
+
+
+def _scope_stack() -> list:
+    stack = getattr(_scopes, 'stack', None)
+    if stack is None:
+        stack = _scopes.stack = []
+    return stack
+
+
+def use_identity_map(view):
+    """View decorator: share loaded records within the request through an identity map on flask.g"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import g
+        if g.get('identity_map') is None:
+            g.identity_map = IdentityMap()
+        return view(*args, **kwargs)
+    return wrapper
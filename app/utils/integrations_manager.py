@@ -12,6 +12,11 @@ from .base_manager import DataManager
 class IntegrationsManager(DataManager):
     """Manager for integrations data"""
     
+    indexed_fields = ('implementation', 'vendor', 'type', 'name')
+    summary_fields = ('id', 'name', 'vendor', 'type', 'status', 'implementation',
+                      'created_at', 'updated_at')
+    counted_fields = ('status', 'vendor', 'type')
+    
     def __init__(self):
         super().__init__('integrations')
     
@@ -40,21 +45,23 @@ class IntegrationsManager(DataManager):
     
     def filter_by_vendor(self, vendor: str) -> List[Dict[str, Any]]:
         """Filter integrations by vendor"""
-        all_integrations = self.load_all()
-        return [item for item in all_integrations if item.get('vendor', '').lower() == vendor.lower()]
+        return self.find_by('vendor', vendor, case_sensitive=False)
     
     def filter_by_type(self, integration_type: str) -> List[Dict[str, Any]]:
         """Filter integrations by type"""
-        all_integrations = self.load_all()
-        return [item for item in all_integrations if item.get('type') == integration_type]
+        return self.find_by('type', integration_type)
     
     def get_by_implementation(self, implementation: str) -> Optional[Dict[str, Any]]:
         """Get integration by implementation type"""
-        all_integrations = self.load_all()
-        for integration in all_integrations:
-            if integration.get('implementation') == implementation:
-                return integration
-        return None
+        integrations = self.find_by('implementation', implementation)
+        return integrations[0] if integrations else None
+    
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get integration by name (tools reference integrations by name via tool_definition)"""
+        if not name:
+            return None
+        integrations = self.find_by('name', name)
+        return integrations[0] if integrations else None
 
 # Global instance
 integrations_manager = IntegrationsManager()
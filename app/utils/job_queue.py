@@ -0,0 +1,507 @@
+"""
+Job Queue for vntrai Background Execution
+Durable SQLite-backed queue of jobs with their event streams, executed by worker threads
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .json_codec import dumps, loads
+from .sqlite_db import SQLiteDatabase
+
+# Job statuses after which no further events are written
+FINISHED_STATUSES = ('done', 'failed', 'cancelled')
+
+# Events appended between two trims of a job's replay buffer
+TRIM_INTERVAL = 256
+
+# Seconds between two checks of a running job's cancel flag by its worker
+CANCEL_CHECK_INTERVAL = 1.0
+
+# A handler gets the job and an event set on cancel requests and yields event payloads
+JobHandler = Callable[[Dict[str, Any], threading.Event], Iterable[Dict[str, Any]]]
+
+_handlers: Dict[str, Tuple[JobHandler, Optional[Callable[[Dict[str, Any]], None]]]] = {}
+_queues: Dict[str, 'JobQueue'] = {}
+_pools: Dict[Tuple[str, int], 'JobWorkerPool'] = {}  # (queue file, process id) -> pool
+_registry_lock = threading.Lock()
+
+
+def register_job_handler(kind: str, handler: JobHandler,
+                         on_abandon: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+    """Register the handler executing jobs of a kind
+
+    on_abandon is called for jobs given up after their worker died JOB_MAX_ATTEMPTS
+    times, e.g. to mark the task they were running as failed.
+    """
+    _handlers[kind] = (handler, on_abandon)
+
+
+class JobQueue:
+    """Jobs and their events in one SQLite database (WAL mode), shared by all processes
+
+    A job is claimed by exactly one worker (atomic status change). Its handler's
+    events are appended with a per-job sequence number, so subscribers can
+    follow a job from any process and resume after a given event. Only the
+    last event_buffer events of a job are kept for replay. Workers keep a
+    heartbeat on their jobs; jobs of dead workers are queued again.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            dedupe_key TEXT,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_dedupe_key ON jobs (dedupe_key, status);
+        CREATE TABLE IF NOT EXISTS job_events (
+            job_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            PRIMARY KEY (job_id, seq)
+        );
+    """
+
+    COLUMNS = ('id', 'kind', 'dedupe_key', 'payload', 'status', 'attempts', 'worker', 'error',
+               'cancel_requested', 'created_at', 'started_at', 'finished_at', 'heartbeat_at')
+
+    def __init__(self, db_path: Path, event_buffer: int = 5000):
+        self.db_path = Path(db_path)
+        self.event_buffer = max(1, event_buffer)
+        self._db = SQLiteDatabase(self.db_path, 'job queue', self.SCHEMA)
+        self._appended: Dict[str, int] = {}
+        # Wakes up local subscribers and idle workers without waiting for the next poll
+        self._changed = threading.Condition()
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait(self, timeout: float) -> None:
+        """Wait until something changes in this process or timeout seconds passed"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _row_to_job(self, row: tuple) -> Dict[str, Any]:
+        job = dict(zip(self.COLUMNS, row))
+        job['payload'] = loads(job['payload'])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def enqueue(self, kind: str, payload: Dict[str, Any],
+                dedupe_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job, returns (job, created)
+
+        With a dedupe_key an unfinished job with the same key is returned instead
+        of queuing another one (created is False then).
+        """
+        def insert(conn):
+            if dedupe_key:
+                row = conn.execute(
+                    f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                    (dedupe_key,)
+                ).fetchone()
+                if row:
+                    return self._row_to_job(row), False
+            job_id = str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedupe_key, payload, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, dedupe_key, dumps(payload), time.time())
+            )
+            row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row), True
+
+        job, created = self._db.transaction(insert)
+        if created:
+            self._notify()
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job, None if it does not exist"""
+        rows = self._db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return self._row_to_job(rows[0]) if rows else None
+
+    def find_active(self, dedupe_key: str) -> Optional[Dict[str, Any]]:
+        """Get the unfinished job with a dedupe key, None if there is none"""
+        rows = self._db.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+            (dedupe_key,)
+        )
+        return self._row_to_job(rows[0]) if rows else None
+
+    def claim(self, worker: str, kinds: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job of the given kinds for a worker, None if there is none"""
+        kinds = list(kinds)
+        if not kinds:
+            return None
+        # Idle workers poll: look without taking the write lock first
+        if not self._db.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1"):
+            return None
+
+        def take(conn):
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = 'queued' AND kind IN ({', '.join('?' * len(kinds))}) "
+                "ORDER BY created_at LIMIT 1",
+                tuple(kinds)
+            ).fetchone()
+            if not row:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker, now, now, row[0])
+            )
+            return self._row_to_job(conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (row[0],)
+            ).fetchone())
+
+        return self._db.transaction(take)
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Mark jobs as alive"""
+        if job_ids:
+            self._db.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), *job_ids)
+            )
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        """Set the final status of a job"""
+        self._db.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, error, time.time(), job_id)
+        )
+        self._appended.pop(job_id, None)
+        self._notify()
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Ask the worker of a job to stop it (a queued job is cancelled right away)
+
+        A job run by this process is signalled at once; workers of other
+        processes notice the request within CANCEL_CHECK_INTERVAL seconds of
+        their job's next event.
+        """
+        def cancel(conn):
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row or row[0] in FINISHED_STATUSES:
+                return False
+            if row[0] == 'queued':
+                conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?", (time.time(), job_id))
+            else:
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return True
+
+        cancelled = self._db.transaction(cancel)
+        self._notify()
+        pool = _pools.get((str(self.db_path), os.getpid()))
+        if cancelled and pool is not None:
+            pool.cancel(job_id)
+        return cancelled
+
+    def cancel_requests(self, job_ids: List[str]) -> List[str]:
+        """Get the ids of the given jobs whose cancellation was requested"""
+        if not job_ids:
+            return []
+        rows = self._db.execute(
+            f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({', '.join('?' * len(job_ids))})",
+            tuple(job_ids)
+        )
+        return [row[0] for row in rows]
+
+    def add_event(self, job_id: str, payload: Dict[str, Any]) -> None:
+        """Append an event to a job's stream, dropping the oldest beyond event_buffer now and then"""
+        self._db.execute(
+            "INSERT INTO job_events (job_id, seq, payload) "
+            "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM job_events WHERE job_id = ?",
+            (job_id, dumps(payload), job_id)
+        )
+        appended = self._appended.get(job_id, 0) + 1
+        self._appended[job_id] = appended
+        if appended % TRIM_INTERVAL == 0:
+            self._db.execute(
+                "DELETE FROM job_events WHERE job_id = ? AND "
+                "seq <= (SELECT MAX(seq) FROM job_events WHERE job_id = ?) - ?",
+                (job_id, job_id, self.event_buffer)
+            )
+        self._notify()
+
+    def events(self, job_id: str, after_seq: int = 0, limit: int = 500) -> List[Tuple[int, Dict[str, Any]]]:
+        """Get (sequence number, payload) of the events of a job after after_seq"""
+        rows = self._db.execute(
+            "SELECT seq, payload FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (job_id, after_seq, limit)
+        )
+        return [(seq, loads(payload)) for seq, payload in rows]
+
+    def subscribe(self, job_id: str, after_seq: int = 0, poll_interval: float = 0.5,
+                  keepalive: float = 15) -> Iterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """Follow the events of a job until it is finished
+
+        Yields (sequence number, payload), or None after keepalive seconds
+        without events. Events of other processes are picked up by polling.
+        """
+        idle_since = time.time()
+        while True:
+            # Status first: events written before the job finished are read below
+            job = self.get(job_id)
+            events = self.events(job_id, after_seq)
+            for event in events:
+                after_seq = event[0]
+                yield event
+            if events:
+                idle_since = time.time()
+                continue
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return
+            if time.time() - idle_since >= keepalive:
+                idle_since = time.time()
+                yield None
+            self.wait(poll_interval)
+
+    def requeue_stale(self, stale_after: float, max_attempts: int) -> List[Dict[str, Any]]:
+        """Queue running jobs without heartbeat again, returns the jobs given up (failed)"""
+        def recover(conn):
+            cutoff = time.time() - stale_after
+            rows = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,)
+            ).fetchall()
+            given_up = []
+            for row in rows:
+                job = self._row_to_job(row)
+                if job['attempts'] < max_attempts and not job['cancel_requested']:
+                    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?", (job['id'],))
+                    event = {'type': 'job_retry', 'attempt': job['attempts'] + 1}
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        ('Worker stopped', time.time(), job['id'])
+                    )
+                    event = {'type': 'error', 'error': 'The worker executing this job stopped'}
+                    given_up.append(job)
+                conn.execute(
+                    "INSERT INTO job_events (job_id, seq, payload) "
+                    "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM job_events WHERE job_id = ?",
+                    (job['id'], dumps(event), job['id'])
+                )
+            return given_up
+
+        given_up = self._db.transaction(recover)
+        self._notify()
+        return given_up
+
+    def purge(self, older_than: float) -> int:
+        """Delete jobs finished more than older_than seconds ago with their events, returns the number deleted"""
+        def delete(conn):
+            cutoff = time.time() - older_than
+            job_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?", (cutoff,)
+            ).fetchall()]
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                conn.execute(f"DELETE FROM job_events WHERE job_id IN ({placeholders})", tuple(chunk))
+                conn.execute(f"DELETE FROM jobs WHERE id IN ({placeholders})", tuple(chunk))
+            return len(job_ids)
+
+        return self._db.transaction(delete)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of jobs per status"""
+        return {status: count for status, count in
+                self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+
+
+class JobWorkerPool:
+    """Worker threads executing queued jobs with the registered handlers
+
+    Every worker claims one job at a time, runs its handler inside an app
+    context and stores the yielded events. A maintenance thread keeps the
+    heartbeat of the running jobs, queues jobs of dead workers again and purges
+    old jobs. Cancel requests reach a handler through its cancelled event: set
+    directly when the request is made in this process, otherwise when its
+    worker finds the job's cancel flag (checked between events and by the
+    maintenance thread).
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = 4, app=None, stale_after: float = 60,
+                 max_attempts: int = 2, retention_seconds: float = 24 * 3600):
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.app = app
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._running: Dict[str, threading.Event] = {}
+        self._running_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the worker and maintenance threads"""
+        if self._threads:
+            return
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain, name='job-maintenance', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming jobs and wait for the running ones to finish"""
+        self._stopping.set()
+        self.queue._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self) -> None:
+        worker = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim(worker, list(_handlers))
+            except IOError as e:
+                print(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                self.queue.wait(1.0)
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        handler, _ = _handlers[job['kind']]
+        cancelled = threading.Event()
+        with self._running_lock:
+            self._running[job['id']] = cancelled
+
+        status, error = 'done', None
+        checked_at = time.time()
+        try:
+            with self.app.app_context() if self.app is not None else nullcontext():
+                for payload in handler(job, cancelled):
+                    self._add_event(job['id'], payload)
+                    if not cancelled.is_set() and time.time() - checked_at >= CANCEL_CHECK_INTERVAL:
+                        checked_at = time.time()
+                        self._check_cancelled(job['id'], cancelled)
+            if cancelled.is_set():
+                status = 'cancelled'
+        except Exception as e:
+            print(f"Error executing job {job['id']} ({job['kind']}): {e}")
+            status, error = 'failed', str(e)
+            self._add_event(job['id'], {'type': 'error', 'error': str(e)})
+        finally:
+            with self._running_lock:
+                self._running.pop(job['id'], None)
+            try:
+                self.queue.finish(job['id'], status, error)
+            except IOError as e:
+                print(f"Error finishing job {job['id']}: {e}")
+
+    def _add_event(self, job_id: str, payload: Dict[str, Any]) -> None:
+        try:
+            self.queue.add_event(job_id, payload)
+        except IOError as e:
+            print(f"Error storing event of job {job_id}: {e}")
+
+    def _check_cancelled(self, job_id: str, cancelled: threading.Event) -> None:
+        """Set a running job's cancelled event if another process requested the cancellation"""
+        try:
+            if self.queue.cancel_requests([job_id]):
+                cancelled.set()
+        except IOError as e:
+            print(f"Error checking cancel request of job {job_id}: {e}")
+
+    def cancel(self, job_id: str) -> bool:
+        """Signal the handler of a job run by this pool to stop, False if it is not running here"""
+        with self._running_lock:
+            cancelled = self._running.get(job_id)
+        if cancelled is None:
+            return False
+        cancelled.set()
+        return True
+
+    def _maintain(self) -> None:
+        interval = max(1.0, self.stale_after / 4)
+        last_purge = 0.0
+        while not self._stopping.wait(interval):
+            try:
+                with self._running_lock:
+                    running = dict(self._running)
+                self.queue.heartbeat(list(running))
+                for job_id in self.queue.cancel_requests(list(running)):
+                    running[job_id].set()
+
+                for job in self.queue.requeue_stale(self.stale_after, self.max_attempts):
+                    on_abandon = _handlers.get(job['kind'], (None, None))[1]
+                    if on_abandon:
+                        with self.app.app_context() if self.app is not None else nullcontext():
+                            on_abandon(job)
+
+                if time.time() - last_purge > 3600:
+                    self.queue.purge(self.retention_seconds)
+                    last_purge = time.time()
+            except Exception as e:
+                print(f"Error in job queue maintenance: {e}")
+
+
+def get_job_queue() -> JobQueue:
+    """Get the job queue of the configured DATA_DIR (JOB_QUEUE_DB overrides the location)"""
+    from .base_manager import get_config_value
+    db_path = get_config_value('JOB_QUEUE_DB') or os.path.join(get_config_value('DATA_DIR', 'data'), '_meta', 'jobs.db')
+    db_path = os.path.abspath(db_path)
+    with _registry_lock:
+        queue = _queues.get(db_path)
+        if queue is None:
+            queue = _queues[db_path] = JobQueue(Path(db_path), int(get_config_value('JOB_EVENT_BUFFER', 5000)))
+        return queue
+
+
+def ensure_job_workers(app=None, workers: Optional[int] = None) -> Optional[JobWorkerPool]:
+    """Start the worker pool of this process for the job queue (once)
+
+    Runs JOB_WORKERS threads; with JOB_WORKERS = 0 this process only queues
+    jobs and migration/run_job_worker.py executes them. create_app() calls this
+    at startup (JOB_WORKERS_AUTOSTART), so queued and abandoned jobs are picked
+    up without waiting for a request. Returns the pool, None if no workers run
+    here.
+    """
+    from .base_manager import get_config_value
+    queue = get_job_queue()
+    if workers is None:
+        workers = int(get_config_value('JOB_WORKERS', 4))
+    if workers <= 0:
+        return None
+
+    # Threads do not survive a fork (e.g. gunicorn --preload): every process starts its own pool
+    pool_key = (str(queue.db_path), os.getpid())
+    with _registry_lock:
+        pool = _pools.get(pool_key)
+        if pool is None:
+            pool = JobWorkerPool(
+                queue, workers, app,
+                stale_after=float(get_config_value('JOB_STALE_SECONDS', 60)),
+                max_attempts=int(get_config_value('JOB_MAX_ATTEMPTS', 2)),
+                retention_seconds=float(get_config_value('JOB_RETENTION_HOURS', 24)) * 3600
+            )
+            pool.start()
+            _pools[pool_key] = pool
+        return pool
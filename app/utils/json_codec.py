@@ -0,0 +1,78 @@
+"""
+JSON Codec for vntrai
+Central JSON serialization: orjson when installed, stdlib json otherwise
+"""
+
+import json
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+    FAST_CODEC_AVAILABLE = True
+except ImportError:
+    FAST_CODEC_AVAILABLE = False
+
+# Re-exported so callers can catch decode errors without importing json
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps_bytes(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, compact or indented by 2 spaces
+
+    Non-ASCII characters are written as UTF-8 (like ensure_ascii=False). Raises
+    TypeError for values JSON cannot represent.
+    """
+    if FAST_CODEC_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bit - let the stdlib try before giving up
+            pass
+
+    if pretty:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys)
+    return text.encode('utf-8')
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Serialize to a JSON string (see dumps_bytes)"""
+    return dumps_bytes(obj, pretty, sort_keys).decode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Parse JSON from bytes or str, raising JSONDecodeError (a ValueError) if invalid"""
+    if FAST_CODEC_AVAILABLE:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def encode_record(item: Dict[str, Any], pretty: bool = False, validate: bool = False) -> bytes:
+    """Serialize a record for storage
+
+    With validate the bytes are parsed back in memory before they are written,
+    instead of re-reading the written file.
+    """
+    data = dumps_bytes(item, pretty=pretty)
+    if validate:
+        loads(data)
+    return data
+
+
+def sse_event(payload: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """Format a payload as one Server-Sent Events data message
+
+    With an event_id the message carries an id: line, which a reconnecting
+    client sends back as Last-Event-ID.
+    """
+    if event_id is not None:
+        return f"id: {event_id}\ndata: {dumps(payload)}\n\n"
+    return f"data: {dumps(payload)}\n\n"
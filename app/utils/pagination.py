@@ -0,0 +1,62 @@
+"""
+Pagination helpers for vntrai
+Opaque cursors for DataManager.iter_items and page links for list views
+"""
+
+import base64
+from typing import Any, Dict, Optional, Tuple
+
+from .json_codec import dumps_bytes, loads
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value: str, item_id: str) -> str:
+    """Encode the position after an item as an opaque, URL-safe cursor"""
+    raw = dumps_bytes([sort_value, item_id])
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Decode a cursor created by encode_cursor, None if missing or invalid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, item_id = loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(sort_value), str(item_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def get_page_args(default_limit: Optional[int] = None) -> Tuple[int, Optional[str]]:
+    """Read limit and cursor from the current request's query string"""
+    from flask import request
+    from .base_manager import get_config_value
+
+    if default_limit is None:
+        default_limit = int(get_config_value('PAGE_SIZE', DEFAULT_PAGE_SIZE))
+
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        limit = default_limit
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    return limit, request.args.get('cursor') or None
+
+
+def pagination_context(next_cursor: Optional[str]) -> Dict[str, Any]:
+    """Build next/first page links for the current request, keeping its filters"""
+    from flask import request, url_for
+
+    args = request.args.to_dict()
+    current_cursor = args.pop('cursor', None)
+    view_args = dict(request.view_args or {})
+
+    return {
+        'next_url': url_for(request.endpoint, **view_args, **args, cursor=next_cursor) if next_cursor else None,
+        'first_url': url_for(request.endpoint, **view_args, **args) if current_cursor else None,
+        'next_cursor': next_cursor
+    }
@@ -0,0 +1,82 @@
+"""
+Record Cache for vntrai Data Management
+In-process LRU cache of parsed records, validated against a file signature
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def clone_record(value: Any) -> Any:
+    """Copy a JSON-shaped value (dicts, lists and scalars) without the overhead of deepcopy"""
+    if isinstance(value, dict):
+        return {key: clone_record(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone_record(item) for item in value]
+    return value
+
+
+class RecordCache:
+    """Bounded LRU cache for parsed records
+
+    Every entry carries the signature (e.g. mtime/size) of its source at the time it
+    was parsed. A lookup only hits when the caller presents the same signature, so
+    files changed behind our back are re-read. Records are handed out as copies because
+    callers routinely mutate the dicts they get from the managers.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max(0, int(max_entries))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, signature: Hashable) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached record if it is still valid for signature"""
+        if signature is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record = entry[1]
+
+        return clone_record(record)
+
+    def put(self, key: str, signature: Hashable, record: Dict[str, Any]) -> None:
+        """Store a copy of record under key, evicting the least recently used entries"""
+        if signature is None or self.max_entries == 0:
+            return
+
+        record = clone_record(record)
+        with self._lock:
+            self._entries[key] = (signature, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop a single entry, or the whole cache when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics"""
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
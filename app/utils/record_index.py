@@ -0,0 +1,222 @@
+"""
+Record Index for vntrai Data Management
+Persisted secondary indexes (field value -> item ids) for DataManager collections
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .file_locks import file_lock
+from .json_codec import dumps_bytes, loads
+
+
+def index_key(value: Any) -> Optional[str]:
+    """Normalize a field value to its index key (case-insensitive for strings)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return value.lower()
+    return json.dumps(value, sort_keys=True)
+
+
+class RecordIndex:
+    """Secondary indexes over a fixed set of record fields
+
+    Only the per-record entries (item id -> {field: key}) are persisted; the
+    value -> ids maps are derived from them when the file is loaded. The file is
+    re-read whenever another manager instance or process has replaced it, and is
+    rebuilt from the records when it is missing or was built for other fields.
+
+    Writers hold an exclusive file lock while they re-read, change and replace
+    the file, so concurrent updates from several worker processes are merged
+    instead of overwriting each other. Readers need no lock: the file is only
+    ever replaced atomically.
+
+    Keys are case-insensitive, so lookups return candidates that callers should
+    verify against the loaded record.
+    """
+
+    def __init__(self, index_path: Path, fields: Iterable[str]):
+        self.index_path = Path(index_path)
+        self.lock_path = self.index_path.with_name(f"{self.index_path.name}.lock")
+        self.fields = tuple(fields)
+        self._entries: Dict[str, Dict[str, str]] = {}
+        self._values: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.fields}
+        self._file_signature = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Serialize read-modify-write cycles of the index file across threads and processes"""
+        with self._lock, file_lock(self.lock_path):
+            yield
+
+    def _current_file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.index_path.stat()
+        except OSError:
+            return None
+        # Every persist replaces the file, so a new inode identifies it even within one mtime tick
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def ensure_loaded(self, iter_records: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]]) -> None:
+        """Load the persisted index, or rebuild it from iter_records if unusable"""
+        with self._lock:
+            signature = self._current_file_signature()
+            if self._loaded and signature == self._file_signature:
+                return
+
+            if signature is not None and self._load_file():
+                self._file_signature = signature
+                self._loaded = True
+                return
+
+        with self._write_lock():
+            # Another process may have built the index while this one waited for the lock
+            signature = self._current_file_signature()
+            if signature is not None and self._load_file():
+                self._file_signature = signature
+                self._loaded = True
+                return
+            self._rebuild(iter_records())
+
+    def _load_file(self) -> bool:
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = loads(f.read())
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error loading index {self.index_path}: {e}")
+            return False
+
+        if data.get('fields') != list(self.fields):
+            return False
+
+        self._set_entries(data.get('entries', {}))
+        return True
+
+    def _set_entries(self, entries: Dict[str, Dict[str, str]]) -> None:
+        self._entries = entries
+        self._values = {field: {} for field in self.fields}
+        for item_id, keys in entries.items():
+            for field, key in keys.items():
+                if field in self._values:
+                    self._values[field].setdefault(key, set()).add(item_id)
+
+    def _persist(self) -> None:
+        """Atomically replace the index file (caller holds _write_lock)"""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=f"{self.index_path.name}.", suffix='.tmp',
+                                             dir=str(self.index_path.parent))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dumps_bytes({'fields': list(self.fields), 'entries': self._entries}))
+            os.replace(temp_path, self.index_path)
+            self._file_signature = self._current_file_signature()
+        except IOError as e:
+            print(f"Error saving index {self.index_path}: {e}")
+            self._file_signature = None
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def rebuild(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Rebuild the index from (item_id, record) pairs and persist it"""
+        with self._write_lock():
+            self._rebuild(records)
+
+    def _rebuild(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        entries = {}
+        for item_id, item in records:
+            keys = self._keys_for(item)
+            if keys:
+                entries[item_id] = keys
+        self._set_entries(entries)
+        self._loaded = True
+        self._persist()
+
+    def _keys_for(self, item: Dict[str, Any]) -> Dict[str, str]:
+        keys = {}
+        for field in self.fields:
+            key = index_key(item.get(field))
+            if key is not None:
+                keys[field] = key
+        return keys
+
+    def _drop(self, item_id: str) -> None:
+        for field, key in self._entries.pop(item_id, {}).items():
+            ids = self._values.get(field, {}).get(key)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._values[field][key]
+
+    def _reindex(self, item_id: str, item: Dict[str, Any]) -> bool:
+        """Update the entries of one record in memory, True if they changed"""
+        keys = self._keys_for(item)
+        if self._entries.get(item_id, {}) == keys:
+            return False
+
+        self._drop(item_id)
+        if keys:
+            self._entries[item_id] = keys
+            for field, key in keys.items():
+                self._values[field].setdefault(key, set()).add(item_id)
+        return True
+
+    def update(self, item_id: str, item: Dict[str, Any]) -> None:
+        """Re-index a saved record"""
+        self.update_many([(item_id, item)])
+
+    def update_many(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Re-index saved records, persisting the index once"""
+        with self._write_lock():
+            self._refresh_if_changed()
+            if not self._loaded:
+                # Nothing persisted yet, the first lookup builds the index from the records
+                return
+
+            changed = False
+            for item_id, item in records:
+                changed = self._reindex(item_id, item) or changed
+            if changed:
+                self._persist()
+
+    def remove(self, item_id: str) -> None:
+        """Remove a deleted record from the index"""
+        self.remove_many([item_id])
+
+    def remove_many(self, item_ids: Iterable[str]) -> None:
+        """Remove deleted records from the index, persisting it once"""
+        with self._write_lock():
+            self._refresh_if_changed()
+            if not self._loaded:
+                return
+
+            changed = False
+            for item_id in item_ids:
+                if item_id in self._entries:
+                    self._drop(item_id)
+                    changed = True
+            if changed:
+                self._persist()
+
+    def _refresh_if_changed(self) -> None:
+        """Pick up changes persisted by other instances before modifying the index (caller holds _write_lock)"""
+        signature = self._current_file_signature()
+        if signature is not None and signature != self._file_signature and self._load_file():
+            self._file_signature = signature
+            self._loaded = True
+
+    def lookup(self, field: str, value: Any) -> List[str]:
+        """Get candidate ids whose field matches value (case-insensitive)"""
+        key = index_key(value)
+        with self._lock:
+            if key is None:
+                return []
+            return list(self._values.get(field, {}).get(key, ()))
@@ -0,0 +1,124 @@
+"""
+Result Cache for vntrai Task Executions
+Memoized AI task results in SQLite, keyed on the resolved prompt, with TTL and LRU eviction
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .json_codec import dumps, dumps_bytes, loads
+from .sqlite_db import SQLiteDatabase
+
+_caches: Dict[str, 'ResultCache'] = {}
+_registry_lock = threading.Lock()
+
+
+def result_cache_key(prompt: str, assistant_id: str, model: str, agent_revision: int) -> str:
+    """Cache key of an AI task execution: hash of the resolved prompt, assistant, model and agent version"""
+    material = dumps_bytes({'prompt': prompt, 'assistant_id': assistant_id, 'model': model or '',
+                            'agent_revision': agent_revision}, sort_keys=True)
+    return hashlib.sha256(material).hexdigest()
+
+
+class ResultCache:
+    """Task results in one SQLite database (WAL mode), shared by all processes
+
+    Entries expire after their TTL. When the cache holds more than max_entries
+    entries or max_bytes of results, the least recently used entries are
+    evicted. Counting the entries scans the table, so the limits are checked
+    every EVICT_INTERVAL puts of a process (and may be exceeded until then).
+    """
+
+    EVICT_INTERVAL = 100
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            task_uuid TEXT NOT NULL,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            used_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_used ON results (used_at);
+        CREATE INDEX IF NOT EXISTS idx_results_task ON results (task_uuid);
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._db = SQLiteDatabase(self.db_path, 'result cache', self.SCHEMA)
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get the cached result of a key, None when missing or expired"""
+        now = time.time()
+        rows = self._db.execute("SELECT value FROM results WHERE key = ? AND expires_at > ?", (key, now))
+        if not rows:
+            return None
+        self._db.execute("UPDATE results SET used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        return loads(rows[0][0])
+
+    def put(self, key: str, task_uuid: str, value: Dict[str, Any], ttl: float) -> None:
+        """Store a result for ttl seconds, evicting old entries beyond the size limits every EVICT_INTERVAL puts"""
+        data = dumps(value)
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, task_uuid, value, size, created_at, expires_at, used_at, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+            (key, task_uuid, data, len(data), now, now + ttl, now)
+        )
+        with self._puts_lock:
+            self._puts += 1
+            due = self._puts % self.EVICT_INTERVAL == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries and least recently used ones beyond the limits, returns the number removed"""
+        removed = self._db.update("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        while True:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results")[0]
+            if count <= self.max_entries and size <= self.max_bytes:
+                return removed
+            # Drop the oldest tenth (at least the surplus of entries) per round
+            batch = max(count - self.max_entries, count // 10, 1)
+            removed += self._db.update(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used_at LIMIT ?)", (batch,)
+            )
+
+    def clear(self, task_uuid: Optional[str] = None) -> int:
+        """Remove the entries of a task (all entries without task_uuid), returns the number removed"""
+        if task_uuid:
+            return self._db.update("DELETE FROM results WHERE task_uuid = ?", (task_uuid,))
+        return self._db.update("DELETE FROM results")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of entries, their size in bytes and the hits"""
+        count, size, hits = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM results"
+        )[0]
+        return {'entries': count, 'bytes': size, 'hits': hits}
+
+
+def get_result_cache() -> ResultCache:
+    """Get the result cache of the configured DATA_DIR"""
+    from .base_manager import get_config_value
+    db_path = os.path.abspath(os.path.join(get_config_value('DATA_DIR', 'data'), '_meta', 'results.db'))
+    with _registry_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = ResultCache(
+                Path(db_path),
+                int(get_config_value('RESULT_CACHE_MAX_ENTRIES', 10000)),
+                int(float(get_config_value('RESULT_CACHE_MAX_MB', 256)) * 1024 * 1024)
+            )
+        return cache
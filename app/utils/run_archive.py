@@ -0,0 +1,208 @@
+"""
+Run Archive for vntrai Agent Runs
+Old runs packed into compressed, append-only segment files with an offset index
+"""
+
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .file_locks import file_lock
+from .json_codec import dumps_bytes, loads
+from .summary_store import SummaryStore
+
+# Every entry starts with this marker and the length of its compressed payload
+FRAME_MAGIC = b'RA'
+FRAME_HEADER = struct.Struct('>2sI')
+
+
+class RunArchive:
+    """Records packed into <archive_dir>/segment-<n>.z files
+
+    Each entry is a frame (marker, length, zlib-compressed JSON of id and record)
+    appended to the current segment; a new segment is started once it reaches
+    segment_max_bytes. The offset index (item id -> segment, offset, length) is
+    an append-only log like the summaries, so other processes pick up changes
+    incrementally. Removing an entry appends a small tombstone frame and drops
+    it from the index, so a lost index can be rebuilt by scanning the segments.
+    """
+
+    def __init__(self, archive_dir: Path, segment_max_bytes: int = 64 * 1024 * 1024):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self._index = SummaryStore(self.archive_dir / 'index.jsonl')
+        self._lock = threading.Lock()
+
+    def _ensure_index(self) -> None:
+        self._index.ensure_loaded(self._scan_segments)
+
+    def _segment_paths(self) -> List[Path]:
+        return sorted(self.archive_dir.glob('segment-*.z'))
+
+    def segment_path(self, number: int) -> Path:
+        """Get the file path of a segment"""
+        return self.archive_dir / f"segment-{number:06d}.z"
+
+    @contextmanager
+    def _append_lock(self) -> Iterator[None]:
+        """Serialize appends across threads and processes"""
+        with self._lock, file_lock(self.archive_dir / 'append.lock'):
+            yield
+
+    def _current_segment(self) -> Path:
+        segments = self._segment_paths()
+        if not segments:
+            return self.segment_path(1)
+        current = segments[-1]
+        if current.stat().st_size < self.segment_max_bytes:
+            return current
+        return self.segment_path(int(current.stem.split('-')[1]) + 1)
+
+    def put_many(self, records: Dict[str, Dict[str, Any]]) -> None:
+        """Append records to the archive (replacing earlier archived versions)
+
+        The segment is flushed to disk before the index points to the new
+        entries, so an indexed entry is always readable.
+        """
+        if not records:
+            return
+
+        locations = []
+        with self._append_lock():
+            self._ensure_index()
+            segment = self._current_segment()
+            entries = [{'id': item_id, 'record': record} for item_id, record in records.items()]
+            for entry, (offset, length) in zip(entries, self._append_frames(segment, entries)):
+                locations.append((entry['id'], {'segment': segment.name, 'offset': offset, 'length': length}))
+            self._index.put_many(locations)
+
+    @staticmethod
+    def _append_frames(segment: Path, entries: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+        """Append entries as frames and flush them to disk, returns (offset, length) of each"""
+        positions = []
+        with open(segment, 'ab') as f:
+            for entry in entries:
+                payload = zlib.compress(dumps_bytes(entry), 6)
+                offset = f.tell()
+                f.write(FRAME_HEADER.pack(FRAME_MAGIC, len(payload)))
+                f.write(payload)
+                positions.append((offset, FRAME_HEADER.size + len(payload)))
+            f.flush()
+            os.fsync(f.fileno())
+        return positions
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Read an archived record, None if it is not archived"""
+        self._ensure_index()
+        location = self._index.get(item_id)
+        if location is None:
+            return None
+
+        with open(self.archive_dir / location['segment'], 'rb') as f:
+            f.seek(location['offset'])
+            frame = f.read(location['length'])
+        entry = self._decode_frame(frame)
+        if entry is None or entry.get('id') != item_id:
+            raise IOError(f"Corrupt archive entry for {item_id} in {location['segment']}")
+        return entry['record']
+
+    def get_many(self, item_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several archived records, reading each segment in offset order"""
+        self._ensure_index()
+        by_segment = {}
+        for item_id in item_ids:
+            location = self._index.get(item_id)
+            if location is not None:
+                by_segment.setdefault(location['segment'], []).append((location['offset'], location['length'], item_id))
+
+        records = {}
+        for segment, entries in by_segment.items():
+            with open(self.archive_dir / segment, 'rb') as f:
+                for offset, length, item_id in sorted(entries):
+                    f.seek(offset)
+                    entry = self._decode_frame(f.read(length))
+                    if entry is not None and entry.get('id') == item_id:
+                        records[item_id] = entry['record']
+                    else:
+                        print(f"Corrupt archive entry for {item_id} in {segment}")
+        return records
+
+    @staticmethod
+    def _decode_frame(frame: bytes) -> Optional[Dict[str, Any]]:
+        if len(frame) < FRAME_HEADER.size:
+            return None
+        magic, length = FRAME_HEADER.unpack_from(frame)
+        if magic != FRAME_MAGIC or len(frame) < FRAME_HEADER.size + length:
+            return None
+        try:
+            return loads(zlib.decompress(frame[FRAME_HEADER.size:FRAME_HEADER.size + length]))
+        except (zlib.error, ValueError):
+            return None
+
+    def remove_many(self, item_ids: Iterable[str]) -> None:
+        """Drop records from the archive (their frames stay in the segments)"""
+        with self._append_lock():
+            self._ensure_index()
+            item_ids = [item_id for item_id in item_ids if self._index.get(item_id) is not None]
+            if not item_ids:
+                return
+            self._append_frames(self._current_segment(), [{'id': item_id, 'deleted': True} for item_id in item_ids])
+            self._index.remove_many(item_ids)
+
+    def contains(self, item_id: str) -> bool:
+        """Check if a record is archived"""
+        self._ensure_index()
+        return self._index.get(item_id) is not None
+
+    def ids(self) -> List[str]:
+        """Get the ids of all archived records"""
+        self._ensure_index()
+        return self._index.ids()
+
+    def _scan_segments(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Get (item id, location) of the live entries found in the segments
+
+        Used to rebuild a lost index. A torn frame (from an interrupted append)
+        is skipped by searching for the next frame marker.
+        """
+        locations = {}
+        for segment in self._segment_paths():
+            with open(segment, 'rb') as f:
+                data = f.read()
+            offset = 0
+            while offset + FRAME_HEADER.size <= len(data):
+                magic, length = FRAME_HEADER.unpack_from(data, offset)
+                end = offset + FRAME_HEADER.size + length
+                entry = self._decode_frame(data[offset:end]) if magic == FRAME_MAGIC else None
+                if entry is None:
+                    print(f"Skipping unreadable archive frame in {segment.name} at offset {offset}")
+                    offset = data.find(FRAME_MAGIC, offset + 1)
+                    if offset < 0:
+                        break
+                    continue
+                if entry.get('deleted'):
+                    locations.pop(entry.get('id'), None)
+                else:
+                    locations[entry['id']] = {'segment': segment.name, 'offset': offset, 'length': end - offset}
+                offset = end
+        return iter(locations.items())
+
+    def rebuild_index(self) -> int:
+        """Rebuild the offset index from the segments, returns the number of entries"""
+        self._index.rebuild(self._scan_segments())
+        return self._index.size()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of archived records and the size of the segments"""
+        self._ensure_index()
+        segments = self._segment_paths()
+        return {
+            'archived': self._index.size(),
+            'segments': len(segments),
+            'segment_bytes': sum(segment.stat().st_size for segment in segments)
+        }
@@ -0,0 +1,209 @@
+"""
+Run Locks for vntrai Agent Runs
+Per-run mutual exclusion across threads (FIFO) and processes (advisory file locks)
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:
+    # No advisory file locks on this platform, only threads are serialized
+    FILE_LOCKS_AVAILABLE = False
+
+
+class RunLockTimeout(TimeoutError):
+    """Raised when a run lock could not be acquired within the timeout"""
+
+
+class _RunLock:
+    """State of one run's lock inside this process"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.waiters = deque()
+        self.owner = None
+        self.depth = 0
+        self.users = 0
+        self.bucket = None
+
+
+class _LockFile:
+    """flock on one lock file of the pool, shared by the threads of this process"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.guard = threading.Lock()
+        self.holders = 0
+        self.file = None
+
+
+class RunLockManager:
+    """Reentrant per-run locks
+
+    Threads of this process are served in arrival order. While a thread holds
+    a run's lock, this process holds an exclusive flock on the run's lock file,
+    so other worker processes wait for it as well (the OS decides their order).
+    Runs share a fixed pool of lock files (<lock_dir>/<hash prefix>.lock), so
+    the directory does not grow with the number of runs; the threads of a
+    process holding runs of the same lock file share its flock. Waiting is
+    bounded: RunLockTimeout is raised after timeout seconds.
+    """
+
+    FILE_POLL_INTERVAL = 0.005
+    FILE_POLL_MAX_INTERVAL = 0.05
+
+    # Hex digits of the run id hash naming its lock file (16 ** 3 = 4096 lock files)
+    LOCK_FILE_DIGITS = 3
+
+    def __init__(self, lock_dir: Path, timeout: float = 30.0):
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._locks: Dict[str, _RunLock] = {}
+        self._lock_files: Dict[str, _LockFile] = {}
+        self._guard = threading.Lock()
+
+    def lock_file_name(self, run_id: str) -> str:
+        """Get the name of the pooled lock file of a run"""
+        return hashlib.md5(run_id.encode('utf-8')).hexdigest()[:self.LOCK_FILE_DIGITS] + '.lock'
+
+    def order_key(self, run_id: str) -> Tuple[str, str]:
+        """Sort key for acquiring several runs: by lock file first, so processes cannot deadlock"""
+        return (self.lock_file_name(run_id), run_id)
+
+    @contextmanager
+    def hold(self, run_id: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold the lock of a run for the duration of the with block"""
+        self.acquire(run_id, timeout)
+        try:
+            yield
+        finally:
+            self.release(run_id)
+
+    def acquire(self, run_id: str, timeout: Optional[float] = None) -> None:
+        """Acquire the lock of a run, waiting at most timeout seconds"""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        me = threading.get_ident()
+
+        with self._guard:
+            lock = self._locks.setdefault(run_id, _RunLock())
+            lock.users += 1
+
+        try:
+            with lock.condition:
+                if lock.owner == me:
+                    lock.depth += 1
+                    return
+
+                ticket = object()
+                lock.waiters.append(ticket)
+                try:
+                    while lock.owner is not None or lock.waiters[0] is not ticket:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise RunLockTimeout(f"Timed out waiting for lock of run {run_id}")
+                        lock.condition.wait(remaining)
+                except BaseException:
+                    lock.waiters.remove(ticket)
+                    lock.condition.notify_all()
+                    raise
+
+                lock.waiters.popleft()
+                lock.owner = me
+                lock.depth = 1
+
+            try:
+                self._lock_file(lock, run_id, deadline)
+            except BaseException:
+                self._release_thread(lock)
+                raise
+        except BaseException:
+            self._drop_user(run_id, lock)
+            raise
+
+    def release(self, run_id: str) -> None:
+        """Release a lock acquired by the current thread"""
+        with self._guard:
+            lock = self._locks.get(run_id)
+        if lock is None or lock.owner != threading.get_ident():
+            raise RuntimeError(f"Lock of run {run_id} is not held by this thread")
+
+        with lock.condition:
+            lock.depth -= 1
+            if lock.depth == 0:
+                self._unlock_file(lock)
+                self._release_thread(lock)
+        self._drop_user(run_id, lock)
+
+    def _release_thread(self, lock: _RunLock) -> None:
+        with lock.condition:
+            lock.owner = None
+            lock.depth = 0
+            lock.condition.notify_all()
+
+    def _drop_user(self, run_id: str, lock: _RunLock) -> None:
+        with self._guard:
+            lock.users -= 1
+            if lock.users == 0 and self._locks.get(run_id) is lock:
+                del self._locks[run_id]
+
+    def _lock_file(self, lock: _RunLock, run_id: str, deadline: float) -> None:
+        if not FILE_LOCKS_AVAILABLE:
+            return
+
+        name = self.lock_file_name(run_id)
+        with self._guard:
+            bucket = self._lock_files.get(name)
+            if bucket is None:
+                bucket = self._lock_files[name] = _LockFile(self.lock_dir / name)
+
+        if not bucket.guard.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise RunLockTimeout(f"Timed out waiting for lock file of run {run_id}")
+        try:
+            if bucket.holders == 0:
+                bucket.file = self._flock(bucket.path, run_id, deadline)
+            bucket.holders += 1
+            lock.bucket = bucket
+        finally:
+            bucket.guard.release()
+
+    def _flock(self, path: Path, run_id: str, deadline: float):
+        """Open a lock file and take its exclusive flock, polling until the deadline"""
+        lock_file = open(path, 'a+')
+        interval = self.FILE_POLL_INTERVAL
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock_file
+            except BlockingIOError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    lock_file.close()
+                    raise RunLockTimeout(f"Timed out waiting for lock file of run {run_id}")
+                time.sleep(min(interval, remaining))
+                interval = min(interval * 2, self.FILE_POLL_MAX_INTERVAL)
+            except OSError:
+                lock_file.close()
+                raise
+
+    def _unlock_file(self, lock: _RunLock) -> None:
+        bucket, lock.bucket = lock.bucket, None
+        if bucket is None:
+            return
+        with bucket.guard:
+            bucket.holders -= 1
+            if bucket.holders > 0:
+                return
+            try:
+                fcntl.flock(bucket.file.fileno(), fcntl.LOCK_UN)
+            finally:
+                bucket.file.close()
+                bucket.file = None
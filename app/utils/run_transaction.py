@@ -0,0 +1,89 @@
+"""
+Run Transaction for vntrai Agent Runs
+In-memory task state mutations committed once by agent_run_manager.transaction()
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .record_cache import clone_record
+from .task_journal import apply_task_patch
+
+# Fields that change with every task state patch and are not compared for a full save
+PATCHED_FIELDS = ('task_states', 'updated_at')
+
+
+class RunTransaction:
+    """An agent run loaded once inside agent_run_manager.transaction()
+
+    Task state changes are applied to data immediately and recorded as journal
+    patches, which the manager commits in a single append when the with block
+    ends. Direct changes to other fields of data are detected and committed with
+    a full save instead.
+    """
+
+    def __init__(self, run_id: str, agent_run: Dict[str, Any]):
+        self.run_id = run_id
+        self.data = agent_run
+        self.patches: List[Dict[str, Any]] = []
+        self.committed = False
+        self._original_fields = self._run_fields(agent_run)
+
+    @staticmethod
+    def _run_fields(agent_run: Dict[str, Any]) -> Dict[str, Any]:
+        return clone_record({key: value for key, value in agent_run.items() if key not in PATCHED_FIELDS})
+
+    def needs_full_save(self) -> bool:
+        """Check if fields other than the task states were changed"""
+        return self._run_fields(self.data) != self._original_fields
+
+    def get_task_state(self, task_uuid: str) -> Optional[Dict[str, Any]]:
+        """Get the current state of a task, including changes of this transaction"""
+        for task_state in self.data.get('task_states', []):
+            if task_state.get('task_uuid') == task_uuid:
+                return task_state
+        return None
+
+    def update_task_state(self, task_uuid: str, state_data: Dict[str, Any]) -> None:
+        """Merge state_data into a task state (created if missing)"""
+        entry = {
+            'task_uuid': task_uuid,
+            'state': state_data,
+            'at': datetime.now().isoformat()
+        }
+        apply_task_patch(self.data, entry)
+        self.patches.append(entry)
+
+    def set_task_status(self, task_uuid: str, status: str, error: str = None) -> None:
+        """Set task status, tracking start/completion time and execution time"""
+        state_data = {'status': status}
+        task_state = self.get_task_state(task_uuid) or {}
+
+        if status == 'running' and not task_state.get('started_at'):
+            state_data['started_at'] = datetime.now().isoformat()
+        elif status in ['completed', 'error', 'skipped']:
+            state_data['completed_at'] = datetime.now().isoformat()
+
+            # Calculate execution time if started
+            if task_state.get('started_at'):
+                started = datetime.fromisoformat(task_state['started_at'].replace('Z', '+00:00'))
+                completed = datetime.now()
+                execution_time = (completed - started).total_seconds()
+                state_data['execution_time'] = execution_time
+
+        if error:
+            state_data['error'] = error
+
+        self.update_task_state(task_uuid, state_data)
+
+    def set_task_inputs(self, task_uuid: str, inputs: Dict[str, Any]) -> None:
+        """Set task inputs"""
+        self.update_task_state(task_uuid, {'inputs': inputs})
+
+    def set_task_outputs(self, task_uuid: str, outputs: Dict[str, Any]) -> None:
+        """Set task outputs"""
+        self.update_task_state(task_uuid, {'outputs': outputs})
+
+    def set_task_results(self, task_uuid: str, results: Dict[str, Any]) -> None:
+        """Set task results"""
+        self.update_task_state(task_uuid, {'results': results})
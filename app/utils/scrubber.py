@@ -0,0 +1,213 @@
+"""
+Store Scrubber for vntrai Data Management
+Validates record files on a process pool, repairs or quarantines damaged ones
+and rebuilds the derived data of a collection in the same pass
+"""
+
+import json
+import os
+import time
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .json_codec import encode_record, loads
+from .storage_backends import JsonFileBackend
+
+# Temporary files younger than this (seconds) may belong to a write in progress
+TEMP_MAX_AGE = 300
+
+# Files validated per task handed to a worker process
+CHUNK_SIZE = 256
+
+# Collections smaller than this are scrubbed in-process
+MIN_PARALLEL_FILES = 512
+
+
+def list_store_files(data_dir: Path) -> Tuple[List[str], List[str]]:
+    """Get the record files and temporary files of a collection (flat and sharded layout)"""
+    records, temps = [], []
+    directories = [str(data_dir)]
+    while directories:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.json'):
+                        records.append(entry.path)
+                    elif entry.name.endswith('.tmp'):
+                        temps.append(entry.path)
+                    elif len(entry.name) == 2 and entry.is_dir(follow_symlinks=False):
+                        # Shard directory (see sharding.shard_prefix)
+                        directories.append(entry.path)
+        except OSError as e:
+            print(f"Error listing {data_dir}: {e}")
+    return records, temps
+
+
+def recover_record(raw: bytes) -> Optional[Dict[str, Any]]:
+    """Try to recover a record from a damaged file, None if nothing usable is left
+
+    Handles the usual crash damage: a tail of NUL bytes or garbage after the
+    document, a byte order mark and invalid UTF-8 sequences.
+    """
+    text = raw.decode('utf-8', errors='replace').strip('﻿\x00 \t\r\n')
+    try:
+        item, _ = json.JSONDecoder().raw_decode(text)
+    except ValueError:
+        return None
+    return item if isinstance(item, dict) else None
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'rb') as f:
+            item = loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return item if isinstance(item, dict) else None
+
+
+def _write_atomic(path: str, item: Dict[str, Any], pretty: bool) -> None:
+    temp_path = path[:-5] + '.scrub'
+    with open(temp_path, 'wb') as f:
+        f.write(encode_record(item, pretty=pretty, validate=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def scrub_files(paths: List[str], id_field: str, pretty: bool, quarantine_dir: str,
+                repair: bool = True) -> List[Tuple[str, str, Optional[Dict[str, Any]], int, str]]:
+    """Validate record files, repairing or quarantining the damaged ones (runs in worker processes)
+
+    Returns (item id, status, item, size, message) per file; status is 'ok',
+    'repaired' (rewritten), 'quarantined' (moved to quarantine_dir) or 'error'.
+    A damaged file is replaced by an intact temporary file of the same record if
+    one was left by an interrupted write, otherwise recovered with recover_record().
+    """
+    results = []
+    for path in paths:
+        item_id = os.path.basename(path)[:-5]
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            continue  # Removed or moved meanwhile
+        except OSError as e:
+            results.append((item_id, 'error', None, 0, str(e)))
+            continue
+
+        status, message = 'ok', ''
+        try:
+            item = loads(raw)
+        except ValueError as e:
+            item, status, message = None, 'repaired', str(e)
+        if status == 'ok' and not isinstance(item, dict):
+            item, status, message = None, 'repaired', 'not a JSON object'
+
+        temp_path = None
+        if item is None and repair:
+            temp_path = path[:-5] + '.tmp'
+            item = _read_json(temp_path)
+            if item is not None:
+                message += '; restored from temporary file'
+            else:
+                temp_path = None
+                item = recover_record(raw)
+
+        if item is not None and item.get(id_field) != item_id and repair:
+            # The file name is the id, the stored one is missing or was copied along
+            item[id_field] = item_id
+            status, message = 'repaired', message or f'{id_field} did not match the file name'
+
+        try:
+            if item is None:
+                os.makedirs(quarantine_dir, exist_ok=True)
+                os.replace(path, os.path.join(quarantine_dir, f"{os.path.basename(path)}.{int(time.time())}"))
+                status = 'quarantined'
+            elif status == 'repaired':
+                _write_atomic(path, item, pretty)
+                if temp_path:
+                    os.unlink(temp_path)
+        except OSError as e:
+            results.append((item_id, 'error', None, len(raw), f"{message}; {e}"))
+            continue
+
+        results.append((item_id, status, item, len(raw), message))
+    return results
+
+
+def remove_stale_temp_files(paths: List[str], max_age: float = TEMP_MAX_AGE) -> int:
+    """Remove temporary files older than max_age seconds, returns the number removed"""
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in paths:
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.unlink(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def scrub_collection(manager, executor: Optional[Executor] = None, repair: bool = True,
+                     temp_max_age: float = TEMP_MAX_AGE, verbose: bool = False) -> Dict[str, Any]:
+    """Scrub the record files of a manager's collection and rebuild its derived data
+
+    Files are validated in chunks on executor (a ProcessPoolExecutor for large
+    stores); the parent rebuilds indexes, summaries, counters and the search
+    index from the records streamed back, so every file is read once. Damaged
+    files go to DATA_DIR/_quarantine/<collection>. Returns a report with counts
+    and throughput.
+    """
+    started = time.time()
+    report = {'collection': manager.data_type, 'files': 0, 'bytes': 0, 'ok': 0, 'repaired': 0,
+              'quarantined': 0, 'errors': 0, 'temp_removed': 0, 'items': 0}
+
+    if not isinstance(manager.backend, JsonFileBackend):
+        # SQLite rows are validated by the database, only the derived data is rebuilt
+        report['items'] = manager.rebuild_derived_data()
+        report['seconds'] = time.time() - started
+        return report
+
+    record_paths, temp_paths = list_store_files(manager.backend.data_dir)
+    quarantine_dir = str(manager.data_dir.parent / '_quarantine' / manager.data_type)
+    args = (manager.id_field, manager.pretty_json, quarantine_dir, repair)
+    chunks = [record_paths[start:start + CHUNK_SIZE] for start in range(0, len(record_paths), CHUNK_SIZE)]
+
+    if executor is not None and len(record_paths) >= MIN_PARALLEL_FILES:
+        chunk_results = executor.map(scrub_files, chunks, *[[arg] * len(chunks) for arg in args])
+    else:
+        chunk_results = (scrub_files(chunk, *args) for chunk in chunks)
+
+    changed, removed = [], []
+
+    def records() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        seen = set()
+        for results in chunk_results:
+            for item_id, status, item, size, message in results:
+                report['files'] += 1
+                report['bytes'] += size
+                report['errors' if status == 'error' else status] += 1
+                if status != 'ok' and (verbose or status in ('quarantined', 'error')):
+                    print(f"  {manager.data_type}/{item_id}: {status} ({message})")
+                if status == 'repaired':
+                    changed.append(item_id)
+                elif status == 'quarantined':
+                    removed.append(item_id)
+                # Leftover flat copies of sharded records are listed twice
+                if item is not None and item_id not in seen:
+                    seen.add(item_id)
+                    yield item_id, item
+
+    manager.invalidate_cache()
+    report['items'] = manager.rebuild_derived_data(records())
+    report['temp_removed'] = remove_stale_temp_files(temp_paths, temp_max_age)
+    if changed:
+        manager.publish_changes(changed, 'save')
+    if removed:
+        manager.publish_changes(removed, 'delete')
+
+    report['seconds'] = time.time() - started
+    return report
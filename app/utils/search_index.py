@@ -0,0 +1,113 @@
+"""
+Search Index for vntrai Data Management
+Incremental inverted token index with prefix matching for DataManager.search()
+"""
+
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from .summary_store import SummaryStore
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: Any) -> List[str]:
+    """Split text into lowercase word tokens"""
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchIndex(SummaryStore):
+    """Inverted index (token -> item ids) over weighted text fields
+
+    Per item only {token: weight} is persisted, in the same append-only log format
+    as the summaries; the postings and the sorted token list used for prefix
+    lookups are derived in memory while the log is replayed.
+
+    Every query token matches index tokens starting with it, so "cal" finds
+    "Calendar" while the user is still typing. Items must match all query tokens.
+    """
+
+    def __init__(self, log_path: Path, weights: Dict[str, int]):
+        self.weights = dict(weights)
+        self._postings: Dict[str, Set[str]] = {}
+        self._sorted_tokens: Optional[List[str]] = None
+        super().__init__(log_path)
+
+    def _clear(self) -> None:
+        super()._clear()
+        self._postings = {}
+        self._sorted_tokens = None
+
+    def _store(self, item_id: str, summary: Dict[str, Any]) -> None:
+        self._discard(item_id)
+        super()._store(item_id, summary)
+        for token in summary:
+            ids = self._postings.get(token)
+            if ids is None:
+                self._postings[token] = ids = set()
+                self._sorted_tokens = None
+            ids.add(item_id)
+
+    def _discard(self, item_id: str) -> None:
+        for token in self._summaries.get(item_id, {}):
+            ids = self._postings.get(token)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._postings[token]
+                    self._sorted_tokens = None
+        super()._discard(item_id)
+
+    def token_weights(self, item: Dict[str, Any]) -> Dict[str, int]:
+        """Get the index entry of an item: each token with its highest field weight"""
+        weights = {}
+        for field, weight in self.weights.items():
+            for token in tokenize(item.get(field)):
+                if weights.get(token, 0) < weight:
+                    weights[token] = weight
+        return weights
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Get all indexed tokens starting with prefix"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        tokens = []
+        position = bisect_left(self._sorted_tokens, prefix)
+        while position < len(self._sorted_tokens) and self._sorted_tokens[position].startswith(prefix):
+            tokens.append(self._sorted_tokens[position])
+            position += 1
+        return tokens
+
+    def query(self, text: str) -> Dict[str, float]:
+        """Get matching item ids with a relevance score (call ensure_loaded first)
+
+        The score adds the field weight of every matched token, counting exact
+        token matches fully and prefix matches at half weight.
+        """
+        query_tokens = tokenize(text)
+        if not query_tokens:
+            return {}
+
+        with self._lock:
+            scores: Optional[Dict[str, float]] = None
+            for query_token in query_tokens:
+                token_scores: Dict[str, float] = {}
+                for token in self._expand(query_token):
+                    factor = 1.0 if token == query_token else 0.5
+                    for item_id in self._postings[token]:
+                        score = self._summaries[item_id][token] * factor
+                        if token_scores.get(item_id, 0) < score:
+                            token_scores[item_id] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {item_id: score + token_scores[item_id]
+                              for item_id, score in scores.items() if item_id in token_scores}
+                if not scores:
+                    return {}
+            return scores
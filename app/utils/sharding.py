@@ -0,0 +1,124 @@
+"""
+Sharded File Layout for vntrai Data Management
+Spreads per-item files over hashed-prefix subdirectories (e.g. agentrun/ab/<uuid>.json)
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def shard_prefix(name: str) -> str:
+    """Get the 2 hex digit subdirectory of an item (256 shards)
+
+    The prefix is hashed, so ids with a common beginning (or sequential ids) are
+    still spread evenly.
+    """
+    return hashlib.md5(name.encode('utf-8')).hexdigest()[:2]
+
+
+def sharded_path(base_dir: Path, name: str, suffix: str) -> Path:
+    """Get the sharded path of an item file"""
+    return Path(base_dir) / shard_prefix(name) / f"{name}{suffix}"
+
+
+def flat_path(base_dir: Path, name: str, suffix: str) -> Path:
+    """Get the path of an item file in the old flat layout"""
+    return Path(base_dir) / f"{name}{suffix}"
+
+
+def find_path(base_dir: Path, name: str, suffix: str) -> Optional[Path]:
+    """Get the existing file of an item in either layout, None if there is none
+
+    The sharded path is checked again after the flat one, so a lookup running
+    while a migration moves the file still finds it.
+    """
+    path = sharded_path(base_dir, name, suffix)
+    if path.exists():
+        return path
+    legacy_path = flat_path(base_dir, name, suffix)
+    if legacy_path.exists():
+        return legacy_path
+    if path.exists():
+        return path
+    return None
+
+
+def iter_files(base_dir: Path, suffix: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield (name, dir entry) of all item files in both layouts
+
+    Uses os.scandir, so file types and stat results come from the directory
+    listing where the OS provides them. An item present in both layouts (a move
+    interrupted by a crash) is yielded once, from its shard.
+    """
+    shard_names = set()
+    flat_entries = []
+    try:
+        top_entries = list(os.scandir(base_dir))
+    except OSError:
+        return
+
+    for entry in top_entries:
+        if entry.name.endswith(suffix) and entry.is_file():
+            flat_entries.append(entry)
+        elif len(entry.name) == 2 and entry.is_dir():
+            try:
+                shard_entries = list(os.scandir(entry.path))
+            except OSError:
+                continue
+            for shard_entry in shard_entries:
+                if shard_entry.name.endswith(suffix):
+                    name = shard_entry.name[:-len(suffix)]
+                    shard_names.add(name)
+                    yield name, shard_entry
+
+    for entry in flat_entries:
+        name = entry.name[:-len(suffix)]
+        if name not in shard_names:
+            yield name, entry
+
+
+def migrate_flat_files(base_dir: Path, suffix: str, limit: Optional[int] = None) -> Dict[str, int]:
+    """Move files of the flat layout into their shards
+
+    Safe while the application runs: each file is hard-linked into its shard and
+    then unlinked, which keeps mtime and size (so cache signatures stay valid),
+    and lookups check both layouts. When the file already exists in its shard
+    the flat copy is stale and removed.
+    Returns {'moved': n, 'removed': n, 'failed': n, 'remaining': n}.
+    """
+    report = {'moved': 0, 'removed': 0, 'failed': 0, 'remaining': 0}
+    try:
+        entries = [entry for entry in os.scandir(base_dir)
+                   if entry.name.endswith(suffix) and entry.is_file()]
+    except OSError:
+        return report
+
+    for i, entry in enumerate(entries):
+        if limit is not None and i >= limit:
+            report['remaining'] = len(entries) - i
+            break
+
+        name = entry.name[:-len(suffix)]
+        target = sharded_path(base_dir, name, suffix)
+        try:
+            target.parent.mkdir(exist_ok=True)
+            # link() never overwrites, so a save that wrote the shard meanwhile wins
+            os.link(entry.path, target)
+            os.unlink(entry.path)
+            report['moved'] += 1
+        except FileExistsError:
+            try:
+                os.unlink(entry.path)
+                report['removed'] += 1
+            except FileNotFoundError:
+                pass
+        except FileNotFoundError:
+            # Moved or deleted concurrently (e.g. by a save)
+            continue
+        except OSError as e:
+            print(f"Error migrating {entry.path} to {target}: {e}")
+            report['failed'] += 1
+
+    return report
@@ -0,0 +1,74 @@
+"""
+SQLite Database for vntrai Data Management
+Per-thread connections to one SQLite database in WAL mode, shared by all worker processes
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+
+class SQLiteDatabase:
+    """One SQLite database file used by the stores (job queue, batches, result cache, records)
+
+    Every thread gets its own connection (sqlite3 connections are not
+    shareable), opened in autocommit mode with WAL journaling, so readers never
+    block the writer of another process. Writes spanning several statements go
+    through transaction(). sqlite errors are raised as IOError, prefixed with
+    the store's name.
+    """
+
+    def __init__(self, db_path: Path, name: str, schema: Optional[str] = None):
+        self.db_path = Path(db_path)
+        self.name = name
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+        if schema:
+            try:
+                self.connection().executescript(schema)
+            except sqlite3.Error as e:
+                raise IOError(f"Cannot create {self.name} schema in {self.db_path}: {e}")
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            except sqlite3.Error as e:
+                raise IOError(f"Cannot open {self.name} {self.db_path}: {e}")
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run one statement and return its rows"""
+        try:
+            return self.connection().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise IOError(f"Error in {self.name}: {e}")
+
+    def update(self, sql: str, params: tuple = ()) -> int:
+        """Run one INSERT, UPDATE or DELETE statement and return the number of rows changed"""
+        try:
+            return self.connection().execute(sql, params).rowcount
+        except sqlite3.Error as e:
+            raise IOError(f"Error in {self.name}: {e}")
+
+    def transaction(self, work: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run work(conn) in a write transaction taken up front (no lock upgrades between processes)"""
+        conn = self.connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(conn)
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            return result
+        except sqlite3.Error as e:
+            raise IOError(f"Error in {self.name}: {e}")
@@ -0,0 +1,579 @@
+"""
+Storage Backends for vntrai Data Management
+Pluggable record storage behind the DataManager interface (JSON files or SQLite)
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from .json_codec import dumps, encode_record, loads
+from .sharding import flat_path, iter_files, migrate_flat_files, sharded_path
+from .sqlite_db import SQLiteDatabase
+
+# Columns extracted from every record at write time so they can be queried in SQL
+QUERYABLE_COLUMNS = ('name', 'status', 'agent_uuid', 'created_at', 'updated_at')
+
+
+class StorageBackend:
+    """Interface for record storage used by DataManager
+
+    Backends raise IOError (or json.JSONDecodeError for unreadable records) so the
+    managers can keep their existing error handling regardless of the backend.
+    """
+
+    name = 'base'
+
+    def read(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Read a single record, None if it does not exist"""
+        raise NotImplementedError
+
+    def write(self, item_id: str, item: Dict[str, Any], validate: bool = False) -> None:
+        """Write a single record, replacing any previous version"""
+        raise NotImplementedError
+
+    def remove(self, item_id: str) -> bool:
+        """Remove a single record, False if it did not exist"""
+        raise NotImplementedError
+
+    def read_many(self, item_ids: Iterable[str],
+                  errors: Optional[Dict[str, Exception]] = None) -> Dict[str, Dict[str, Any]]:
+        """Read several records, leaving out missing ones
+
+        Records that cannot be read are left out as well; their exceptions are
+        collected in errors when a dict is passed.
+        """
+        items = {}
+        for item_id in item_ids:
+            try:
+                item = self.read(item_id)
+            except (IOError, ValueError) as e:
+                if errors is not None:
+                    errors[item_id] = e
+                continue
+            if item is not None:
+                items[item_id] = item
+        return items
+
+    def write_many(self, items: Dict[str, Dict[str, Any]], validate: bool = False) -> None:
+        """Write several records (item id -> record)"""
+        for item_id, item in items.items():
+            self.write(item_id, item, validate=validate)
+
+    def remove_many(self, item_ids: Iterable[str]) -> List[str]:
+        """Remove several records and return the ids that existed"""
+        return [item_id for item_id in item_ids if self.remove(item_id)]
+
+    def exists(self, item_id: str) -> bool:
+        """Check if a record exists"""
+        return self.signature(item_id) is not None
+
+    def signature(self, item_id: str) -> Optional[Hashable]:
+        """Get a value that changes whenever the stored record changes"""
+        raise NotImplementedError
+
+    def list_signatures(self) -> List[Tuple[str, Hashable]]:
+        """Get (item_id, signature) pairs for all records"""
+        raise NotImplementedError
+
+    def list_ids(self) -> List[str]:
+        """Get all record ids"""
+        return [item_id for item_id, _ in self.list_signatures()]
+
+    def find_ids(self, field: str, value: Any) -> Optional[List[str]]:
+        """Get ids of records where field equals value
+
+        Returns None when the backend cannot answer the query natively.
+        """
+        return None
+
+
+class JsonFileBackend(StorageBackend):
+    """One JSON file per record in the collection directory
+
+    Files are pretty-printed for collections people edit by hand and compact for
+    machine-owned ones (pretty=False). Large collections use the sharded layout
+    (sharded=True, <data_dir>/ab/<id>.json); records still in the flat layout
+    are found as well and moved into their shard when they are next written.
+
+    Batch operations run file I/O on io_workers threads. With fsync, written
+    files and their directories are flushed to disk; a batch flushes each
+    directory once instead of once per record.
+    """
+
+    name = 'json'
+
+    # Batches smaller than this are not worth handing to the thread pool
+    MIN_PARALLEL_BATCH = 8
+
+    def __init__(self, data_dir: Path, pretty: bool = True, sharded: bool = False,
+                 io_workers: int = 8, fsync: bool = False):
+        self.data_dir = Path(data_dir)
+        self.pretty = pretty
+        self.sharded = sharded
+        self.io_workers = max(1, io_workers)
+        self.fsync = fsync
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._shard_dirs = set()  # Shard directories known to exist
+        self._flat_files = None  # Whether flat-layout files may still exist (sharded only)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def path_for(self, item_id: str) -> Path:
+        """Get the file path a record is written to"""
+        if self.sharded:
+            return sharded_path(self.data_dir, item_id, '.json')
+        return flat_path(self.data_dir, item_id, '.json')
+
+    def _has_flat_files(self) -> bool:
+        """Check if records of the flat layout are left (stops at the first one found)
+
+        Checked once and again after each migrate_layout(). The sharded backend
+        never writes flat files, so once none are left lookups skip the flat path.
+        """
+        if self._flat_files is None:
+            try:
+                with os.scandir(self.data_dir) as entries:
+                    self._flat_files = any(entry.name.endswith('.json') for entry in entries)
+            except OSError:
+                self._flat_files = False
+        return self._flat_files
+
+    def _candidate_paths(self, item_id: str) -> Iterator[Path]:
+        """Yield the files a record may be stored in, in lookup order
+
+        The shard is tried again after the flat path, so a lookup racing with
+        the migration of that record still finds it.
+        """
+        file_path = self.path_for(item_id)
+        yield file_path
+        if self.sharded and self._has_flat_files():
+            yield flat_path(self.data_dir, item_id, '.json')
+            yield file_path
+
+    def read(self, item_id: str) -> Optional[Dict[str, Any]]:
+        for file_path in self._candidate_paths(item_id):
+            try:
+                with open(file_path, 'rb') as f:
+                    return loads(f.read())
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _map(self, func: Callable, values: List[Any]) -> List[Any]:
+        """Apply func to all values, on the I/O thread pool for larger batches"""
+        if len(values) < self.MIN_PARALLEL_BATCH or self.io_workers == 1:
+            return [func(value) for value in values]
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.io_workers,
+                                                    thread_name_prefix=f"json-io-{self.data_dir.name}")
+        # Hand out chunks rather than single values to keep the per-task overhead low
+        chunk_size = max(1, len(values) // (self.io_workers * 4))
+        chunks = [values[start:start + chunk_size] for start in range(0, len(values), chunk_size)]
+        results = []
+        for chunk_results in self._executor.map(lambda chunk: [func(value) for value in chunk], chunks):
+            results.extend(chunk_results)
+        return results
+
+    def _prepare_path(self, item_id: str) -> Path:
+        """Get the file path of a record, creating its shard directory if needed"""
+        file_path = self.path_for(item_id)
+        if self.sharded and file_path.parent not in self._shard_dirs:
+            file_path.parent.mkdir(exist_ok=True)
+            self._shard_dirs.add(file_path.parent)
+        return file_path
+
+    def _write_temp(self, file_path: Path, data: bytes) -> Path:
+        """Write data next to file_path (flushed to disk with fsync) and return the temporary file"""
+        temp_path = file_path.with_suffix('.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        except IOError:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+        return temp_path
+
+    @staticmethod
+    def _fsync_dirs(directories: Iterable[Path]) -> None:
+        """Make renames and unlinks in the given directories durable"""
+        for directory in set(directories):
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(dir_fd)
+            except OSError:
+                pass
+            finally:
+                os.close(dir_fd)
+
+    def _drop_flat_copy(self, item_id: str) -> None:
+        if self.sharded and self._has_flat_files():
+            # Online migration: the flat copy is outdated now
+            try:
+                flat_path(self.data_dir, item_id, '.json').unlink()
+            except FileNotFoundError:
+                pass
+
+    def write(self, item_id: str, item: Dict[str, Any], validate: bool = False) -> None:
+        # Serialize (and validate in memory) before touching the file
+        data = encode_record(item, pretty=self.pretty, validate=validate)
+
+        # Safe write with temporary file to prevent corruption
+        file_path = self._prepare_path(item_id)
+        temp_path = self._write_temp(file_path, data)
+        try:
+            os.replace(temp_path, file_path)
+        except OSError:
+            temp_path.unlink()
+            raise
+        if self.fsync:
+            self._fsync_dirs([file_path.parent])
+        self._drop_flat_copy(item_id)
+
+    def write_many(self, items: Dict[str, Dict[str, Any]], validate: bool = False) -> None:
+        """Write records in three phases: temporary files (in parallel), renames, directory fsyncs
+
+        If a temporary file cannot be written, no record of the batch is replaced.
+        """
+        encoded = [(item_id, encode_record(item, pretty=self.pretty, validate=validate))
+                   for item_id, item in items.items()]
+        paths = [self._prepare_path(item_id) for item_id, _ in encoded]
+
+        def write_temp(index: int) -> Any:
+            try:
+                return self._write_temp(paths[index], encoded[index][1])
+            except IOError as e:
+                return e
+
+        temp_paths = self._map(write_temp, list(range(len(encoded))))
+        failed = [result for result in temp_paths if isinstance(result, Exception)]
+        if failed:
+            for temp_path in temp_paths:
+                if isinstance(temp_path, Path) and temp_path.exists():
+                    temp_path.unlink()
+            raise IOError(f"Batch write to {self.data_dir} failed: {failed[0]}")
+
+        for temp_path, file_path in zip(temp_paths, paths):
+            os.replace(temp_path, file_path)
+        if self.fsync:
+            self._fsync_dirs(file_path.parent for file_path in paths)
+        for item_id, _ in encoded:
+            self._drop_flat_copy(item_id)
+
+    def read_many(self, item_ids: Iterable[str],
+                  errors: Optional[Dict[str, Exception]] = None) -> Dict[str, Dict[str, Any]]:
+        item_ids = list(item_ids)
+
+        def read(item_id: str) -> Any:
+            try:
+                return self.read(item_id)
+            except (IOError, ValueError) as e:
+                return e
+
+        items = {}
+        for item_id, result in zip(item_ids, self._map(read, item_ids)):
+            if isinstance(result, Exception):
+                if errors is not None:
+                    errors[item_id] = result
+            elif result is not None:
+                items[item_id] = result
+        return items
+
+    def _unlink(self, item_id: str) -> bool:
+        removed = False
+        for file_path in set(self._candidate_paths(item_id)):
+            try:
+                file_path.unlink()
+                removed = True
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def remove(self, item_id: str) -> bool:
+        removed = self._unlink(item_id)
+        if self.fsync and removed:
+            self._fsync_dirs([self.path_for(item_id).parent])
+        return removed
+
+    def remove_many(self, item_ids: Iterable[str]) -> List[str]:
+        item_ids = list(item_ids)
+        removed = [item_id for item_id, existed in zip(item_ids, self._map(self._unlink, item_ids)) if existed]
+        if self.fsync and removed:
+            self._fsync_dirs(self.path_for(item_id).parent for item_id in removed)
+        return removed
+
+    def signature(self, item_id: str) -> Optional[Hashable]:
+        for file_path in self._candidate_paths(item_id):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            return (stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def list_signatures(self) -> List[Tuple[str, Hashable]]:
+        signatures = []
+        for item_id, entry in self._iter_entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            signatures.append((item_id, (stat.st_mtime_ns, stat.st_size)))
+        return signatures
+
+    def list_ids(self) -> List[str]:
+        return [item_id for item_id, _ in self._iter_entries()]
+
+    def _iter_entries(self) -> Iterable[Tuple[str, os.DirEntry]]:
+        if self.sharded:
+            return iter_files(self.data_dir, '.json')
+        try:
+            return [(entry.name[:-5], entry) for entry in os.scandir(self.data_dir)
+                    if entry.name.endswith('.json')]
+        except OSError:
+            return []
+
+    def migrate_layout(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Move records of the flat layout into their shards (see migrate_flat_files)"""
+        if not self.sharded:
+            return {'moved': 0, 'removed': 0, 'failed': 0, 'remaining': 0}
+        report = migrate_flat_files(self.data_dir, '.json', limit)
+        self._flat_files = None
+        return report
+
+
+class SQLiteBackend(StorageBackend):
+    """All collections in one embedded SQLite database (WAL mode)
+
+    Records are stored as JSON text together with a few columns extracted at write
+    time (see QUERYABLE_COLUMNS), so filters like runs-by-agent run as indexed SQL.
+    Every write stores the next value of a per-collection version counter in the
+    row's revision column, which serves as the cache signature: it never repeats
+    for a collection, even when a record is deleted and written again.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS records (
+            collection TEXT NOT NULL,
+            id TEXT NOT NULL,
+            name TEXT,
+            status TEXT,
+            agent_uuid TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            revision INTEGER NOT NULL DEFAULT 1,
+            data TEXT NOT NULL,
+            PRIMARY KEY (collection, id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_records_agent_uuid ON records (collection, agent_uuid);
+        CREATE INDEX IF NOT EXISTS idx_records_status ON records (collection, status);
+        CREATE INDEX IF NOT EXISTS idx_records_created_at ON records (collection, created_at);
+        CREATE INDEX IF NOT EXISTS idx_records_name ON records (collection, name);
+        CREATE TABLE IF NOT EXISTS record_versions (
+            collection TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: Path, collection: str):
+        self.db_path = Path(db_path)
+        self.collection = collection
+        self._db = SQLiteDatabase(self.db_path, f"SQLite collection {collection}", self.SCHEMA)
+
+        # Databases written before the counter existed continue above their highest revision
+        self._db.update(
+            "INSERT OR IGNORE INTO record_versions (collection, version) "
+            "SELECT ?, COALESCE(MAX(revision), 0) FROM records WHERE collection = ?",
+            (collection, collection)
+        )
+
+    def read(self, item_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._db.execute(
+            "SELECT data FROM records WHERE collection = ? AND id = ?",
+            (self.collection, item_id)
+        )
+        if not rows:
+            return None
+        return loads(rows[0][0])
+
+    UPSERT = """
+        INSERT INTO records (collection, id, name, status, agent_uuid, created_at, updated_at, data, revision)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (collection, id) DO UPDATE SET
+            name = excluded.name,
+            status = excluded.status,
+            agent_uuid = excluded.agent_uuid,
+            created_at = excluded.created_at,
+            updated_at = excluded.updated_at,
+            data = excluded.data,
+            revision = excluded.revision
+    """
+
+    # Ids per "IN (...)" query, below SQLite's host parameter limit
+    BATCH_SIZE = 500
+
+    def _row_values(self, item_id: str, item: Dict[str, Any], validate: bool) -> tuple:
+        data = encode_record(item, validate=validate).decode('utf-8')
+        columns = [self._column_value(item.get(column)) for column in QUERYABLE_COLUMNS]
+        return (self.collection, item_id, *columns, data)
+
+    def write(self, item_id: str, item: Dict[str, Any], validate: bool = False) -> None:
+        self.write_many({item_id: item}, validate=validate)
+
+    def write_many(self, items: Dict[str, Dict[str, Any]], validate: bool = False) -> None:
+        """Write all records in one transaction, each with a new version of the collection"""
+        rows = [self._row_values(item_id, item, validate) for item_id, item in items.items()]
+        if not rows:
+            return
+
+        def upsert(conn):
+            # Taken inside the write transaction, so versions are unique across processes
+            conn.execute("UPDATE record_versions SET version = version + ? WHERE collection = ?",
+                         (len(rows), self.collection))
+            last = conn.execute("SELECT version FROM record_versions WHERE collection = ?",
+                                (self.collection,)).fetchone()[0]
+            first = last - len(rows) + 1
+            conn.executemany(self.UPSERT, [(*row, first + number) for number, row in enumerate(rows)])
+
+        self._db.transaction(upsert)
+
+    def read_many(self, item_ids: Iterable[str],
+                  errors: Optional[Dict[str, Exception]] = None) -> Dict[str, Dict[str, Any]]:
+        item_ids = list(item_ids)
+        items = {}
+        for start in range(0, len(item_ids), self.BATCH_SIZE):
+            chunk = item_ids[start:start + self.BATCH_SIZE]
+            rows = self._db.execute(
+                f"SELECT id, data FROM records WHERE collection = ? AND id IN ({', '.join('?' * len(chunk))})",
+                (self.collection, *chunk)
+            )
+            for item_id, data in rows:
+                try:
+                    items[item_id] = loads(data)
+                except ValueError as e:
+                    if errors is not None:
+                        errors[item_id] = e
+        return items
+
+    def remove_many(self, item_ids: Iterable[str]) -> List[str]:
+        """Remove all records in one transaction"""
+        item_ids = list(item_ids)
+
+        def delete(conn):
+            removed = []
+            for start in range(0, len(item_ids), self.BATCH_SIZE):
+                chunk = item_ids[start:start + self.BATCH_SIZE]
+                condition = f"collection = ? AND id IN ({', '.join('?' * len(chunk))})"
+                rows = conn.execute(f"SELECT id FROM records WHERE {condition}",
+                                    (self.collection, *chunk)).fetchall()
+                conn.execute(f"DELETE FROM records WHERE {condition}", (self.collection, *chunk))
+                removed.extend(row[0] for row in rows)
+            return removed
+
+        return self._db.transaction(delete)
+
+    def remove(self, item_id: str) -> bool:
+        return self._db.update(
+            "DELETE FROM records WHERE collection = ? AND id = ?",
+            (self.collection, item_id)
+        ) > 0
+
+    def signature(self, item_id: str) -> Optional[Hashable]:
+        rows = self._db.execute(
+            "SELECT revision FROM records WHERE collection = ? AND id = ?",
+            (self.collection, item_id)
+        )
+        return rows[0][0] if rows else None
+
+    def list_signatures(self) -> List[Tuple[str, Hashable]]:
+        rows = self._db.execute(
+            "SELECT id, revision FROM records WHERE collection = ?",
+            (self.collection,)
+        )
+        return [(row[0], row[1]) for row in rows]
+
+    def find_ids(self, field: str, value: Any) -> Optional[List[str]]:
+        if field not in QUERYABLE_COLUMNS:
+            return None
+        rows = self._db.execute(
+            f"SELECT id FROM records WHERE collection = ? AND {field} = ?",
+            (self.collection, self._column_value(value))
+        )
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _column_value(value: Any) -> Optional[str]:
+        """Normalize an extracted field to a SQL-comparable value"""
+        if value is None:
+            return None
+        return value if isinstance(value, str) else dumps(value)
+
+
+def create_backend(data_type: str, data_dir: Path, pretty: bool = True,
+                   sharded: bool = False) -> StorageBackend:
+    """Create the storage backend selected by the STORAGE_BACKEND config value
+
+    pretty selects indented JSON files and sharded the hashed-prefix directory
+    layout for the json backend.
+    """
+    from .base_manager import get_config_value
+
+    backend_name = (get_config_value('STORAGE_BACKEND', 'json') or 'json').lower()
+    if backend_name == 'sqlite':
+        db_path = get_config_value('SQLITE_DB_PATH') or Path(data_dir).parent / 'vntrai.db'
+        return SQLiteBackend(Path(db_path), data_type)
+    if backend_name != 'json':
+        print(f"Unknown storage backend '{backend_name}', falling back to json")
+    return JsonFileBackend(data_dir, pretty=pretty, sharded=sharded,
+                           io_workers=int(get_config_value('DATA_IO_WORKERS', 8)),
+                           fsync=bool(get_config_value('DATA_FSYNC', False)))
+
+
+def import_json_collections(data_root: Path, db_path: Path,
+                            collections: Tuple[str, ...] = ('integrations', 'tools', 'agents', 'agentrun')
+                            ) -> Dict[str, Dict[str, int]]:
+    """One-shot import of the JSON directories under data_root into a SQLite database
+
+    Records keep the id they had as file name. Existing rows are overwritten, so
+    the import can simply be re-run.
+    """
+    report = {}
+    for collection in collections:
+        source_dir = Path(data_root) / collection
+        if not source_dir.is_dir():
+            continue
+
+        # Sharded lookup also lists records still in the flat layout
+        source = JsonFileBackend(source_dir, sharded=True)
+        target = SQLiteBackend(Path(db_path), collection)
+        imported = 0
+        failed = 0
+
+        item_ids = source.list_ids()
+        for start in range(0, len(item_ids), SQLiteBackend.BATCH_SIZE):
+            errors = {}
+            items = source.read_many(item_ids[start:start + SQLiteBackend.BATCH_SIZE], errors)
+            for item_id, error in errors.items():
+                print(f"Error importing {collection} {item_id}: {error}")
+            failed += len(errors)
+            try:
+                target.write_many(items)
+                imported += len(items)
+            except (IOError, ValueError) as e:
+                print(f"Error importing {len(items)} {collection} records: {e}")
+                failed += len(items)
+
+        report[collection] = {'imported': imported, 'failed': failed}
+    return report
@@ -0,0 +1,274 @@
+"""
+Summary Store for vntrai Data Management
+Compact per-record summary projections kept in an append-only JSON lines log
+"""
+
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .file_locks import file_lock
+from .json_codec import dumps, loads
+from .record_cache import clone_record
+
+
+class SummaryStore:
+    """Persisted summaries (item id -> small dict) for a collection
+
+    Every change is appended as one line, so updating the summary of a large
+    record costs a few hundred bytes instead of rewriting a file. The log is
+    replayed incrementally: other manager instances or processes only read the
+    lines appended since their last look. When the log grows well beyond the
+    number of live entries it is compacted (rewritten and atomically replaced).
+    Appends, compactions and rebuilds hold an exclusive file lock, so no line
+    is appended to a log that is being replaced; a compacted log starts with a
+    generation line, so readers notice the replacement even if its inode was
+    reused.
+
+    Aggregates over the summaries (number of items per value of counted_fields,
+    totals of summed_fields) are maintained incrementally as entries are applied,
+    so reading them costs O(1) instead of a pass over the collection.
+    """
+
+    COMPACT_MIN_LINES = 1000
+
+    # Longest generation line written by a compaction
+    HEADER_BYTES = 128
+
+    def __init__(self, log_path: Path, counted_fields: Iterable[str] = (), summed_fields: Iterable[str] = ()):
+        self.log_path = Path(log_path)
+        self.lock_path = self.log_path.with_name(f"{self.log_path.name}.lock")
+        self.counted_fields = tuple(counted_fields)
+        self.summed_fields = tuple(summed_fields)
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._counts: Dict[str, Dict[Any, int]] = {field: {} for field in self.counted_fields}
+        self._sums: Dict[str, float] = {field: 0 for field in self.summed_fields}
+        self._offset = 0
+        self._inode = None
+        self._generation = b''
+        self._lines = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def ensure_loaded(self, iter_summaries: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]]) -> None:
+        """Catch up with the log, or rebuild it from iter_summaries if it does not exist"""
+        with self._lock:
+            if self._refresh():
+                return
+            with file_lock(self.lock_path):
+                # Another process may have built the log while this one waited for the lock
+                if self._refresh():
+                    return
+                self._rebuild(iter_summaries())
+
+    def _refresh(self) -> bool:
+        """Read lines appended since the last refresh; False if there is no log"""
+        try:
+            stat = self.log_path.stat()
+        except OSError:
+            self._loaded = False
+            return False
+        if stat.st_ino == self._inode and stat.st_size == self._offset:
+            self._loaded = True
+            return True
+
+        try:
+            f = open(self.log_path, 'rb')
+        except OSError:
+            self._loaded = False
+            return False
+        with f:
+            # Checked on the opened file: a compaction may have replaced the log since the stat above
+            stat = os.fstat(f.fileno())
+            generation = self._read_generation(f)
+            if stat.st_ino != self._inode or stat.st_size < self._offset or generation != self._generation:
+                # Log was compacted or replaced: replay it from the start
+                self._clear()
+                self._offset = 0
+                self._lines = 0
+                self._inode = stat.st_ino
+                self._generation = generation
+
+            if stat.st_size > self._offset:
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+                # Only consume complete lines, a concurrent append may still be in progress
+                complete = data[:data.rfind(b'\n') + 1]
+                for line in complete.splitlines():
+                    self._apply(line)
+                self._offset += len(complete)
+
+        self._loaded = True
+        return True
+
+    def _read_generation(self, f: BinaryIO) -> bytes:
+        """Get the generation line of a compacted log, empty for a log that was never compacted"""
+        f.seek(0)
+        line = f.readline(self.HEADER_BYTES)
+        return line if line.startswith(b'{"generation"') else b''
+
+    def _apply(self, line: bytes) -> None:
+        try:
+            entry = loads(line)
+        except ValueError:
+            return
+        if 'id' not in entry:
+            # Generation line of a compacted log
+            return
+        self._lines += 1
+        if entry.get('deleted'):
+            self._discard(entry.get('id'))
+        else:
+            self._store(entry.get('id'), entry.get('summary', {}))
+
+    # In-memory mutations, overridden by subclasses that derive more state
+    def _clear(self) -> None:
+        self._summaries = {}
+        self._counts = {field: {} for field in self.counted_fields}
+        self._sums = {field: 0 for field in self.summed_fields}
+
+    def _store(self, item_id: str, summary: Dict[str, Any]) -> None:
+        previous = self._summaries.get(item_id)
+        if previous is not None:
+            self._aggregate(previous, -1)
+        self._summaries[item_id] = summary
+        self._aggregate(summary, 1)
+
+    def _discard(self, item_id: str) -> None:
+        previous = self._summaries.pop(item_id, None)
+        if previous is not None:
+            self._aggregate(previous, -1)
+
+    @staticmethod
+    def _count_key(value: Any) -> Any:
+        """Use unhashable values (lists, dicts) by their JSON text"""
+        return value if value is None or isinstance(value, (str, int, float, bool)) else dumps(value, sort_keys=True)
+
+    def _aggregate(self, summary: Dict[str, Any], sign: int) -> None:
+        for field in self.counted_fields:
+            counts = self._counts[field]
+            key = self._count_key(summary.get(field))
+            counts[key] = counts.get(key, 0) + sign
+            if counts[key] <= 0:
+                del counts[key]
+        for field in self.summed_fields:
+            value = summary.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._sums[field] += sign * value
+
+    def _append(self, entries: List[Dict[str, Any]]) -> None:
+        if not entries:
+            return
+        data = ''.join(dumps(entry) + '\n' for entry in entries)
+        try:
+            with file_lock(self.lock_path):
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+                # Under the lock the log is complete: a compaction cannot drop other processes' lines
+                self._refresh()
+                if self._lines > max(self.COMPACT_MIN_LINES, 2 * len(self._summaries)):
+                    self._write_all()
+        except IOError as e:
+            print(f"Error writing summaries {self.log_path}: {e}")
+
+    def _write_all(self) -> None:
+        """Replace the log by the current summaries (caller holds the file lock)"""
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        generation = dumps({'generation': uuid.uuid4().hex}).encode('utf-8') + b'\n'
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=f"{self.log_path.name}.", suffix='.tmp',
+                                             dir=str(self.log_path.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(generation.decode('utf-8'))
+                for item_id, summary in self._summaries.items():
+                    f.write(dumps({'id': item_id, 'summary': summary}) + '\n')
+            os.replace(temp_path, self.log_path)
+        except IOError as e:
+            print(f"Error saving summaries {self.log_path}: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+
+        stat = self.log_path.stat()
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        self._generation = generation
+        self._lines = len(self._summaries)
+        self._loaded = True
+
+    def rebuild(self, summaries: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Replace all summaries and rewrite the log"""
+        with self._lock, file_lock(self.lock_path):
+            self._rebuild(summaries)
+
+    def _rebuild(self, summaries: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        self._clear()
+        for item_id, summary in summaries:
+            self._store(item_id, summary)
+        self._write_all()
+
+    def put(self, item_id: str, summary: Dict[str, Any]) -> None:
+        """Record the summary of a saved item"""
+        self.put_many([(item_id, summary)])
+
+    def put_many(self, summaries: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Record the summaries of saved items in a single append"""
+        with self._lock:
+            self._refresh()
+            if not self._loaded:
+                # No log yet, the first read builds it from the records
+                return
+            self._append([{'id': item_id, 'summary': summary} for item_id, summary in summaries
+                          if self._summaries.get(item_id) != summary])
+
+    def remove(self, item_id: str) -> None:
+        """Forget the summary of a deleted item"""
+        self.remove_many([item_id])
+
+    def remove_many(self, item_ids: Iterable[str]) -> None:
+        """Forget the summaries of deleted items in a single append"""
+        with self._lock:
+            self._refresh()
+            if self._loaded:
+                self._append([{'id': item_id, 'deleted': True} for item_id in item_ids
+                              if item_id in self._summaries])
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of one summary (call ensure_loaded first)"""
+        with self._lock:
+            summary = self._summaries.get(item_id)
+            return clone_record(summary) if summary is not None else None
+
+    def get_field(self, item_id: str, field: str, default: Any = None) -> Any:
+        """Get a single summary field without copying the summary"""
+        with self._lock:
+            return self._summaries.get(item_id, {}).get(field, default)
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        """Get {value: number of items} for a counted field (missing values count as None)"""
+        with self._lock:
+            return dict(self._counts.get(field, {}))
+
+    def total(self, field: str) -> float:
+        """Get the sum of a summed field over all items"""
+        with self._lock:
+            return self._sums.get(field, 0)
+
+    def size(self) -> int:
+        """Get the number of summarized items"""
+        with self._lock:
+            return len(self._summaries)
+
+    def ids(self) -> List[str]:
+        """Get the ids of all summarized items"""
+        with self._lock:
+            return list(self._summaries)
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """Get copies of all summaries by item id (call ensure_loaded first)"""
+        with self._lock:
+            return {item_id: clone_record(summary) for item_id, summary in self._summaries.items()}
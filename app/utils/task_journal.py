@@ -0,0 +1,110 @@
+"""
+Task State Journal for vntrai Agent Runs
+Append-only per-run journal of task state patches, replayed on top of the run snapshot
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .json_codec import dumps_bytes, loads
+
+
+def apply_task_patch(agent_run: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Apply one journal entry to a run, like a direct update_task_state would
+
+    Applying an entry twice gives the same result, so replaying a journal over a
+    snapshot that already contains some of its entries is safe. An entry with
+    'patches' holds several patches committed together by a run transaction.
+    """
+    if 'patches' in entry:
+        for patch in entry['patches']:
+            apply_task_patch(agent_run, patch)
+        return
+
+    task_uuid = entry.get('task_uuid')
+    state = entry.get('state', {})
+    timestamp = entry.get('at')
+    task_states = agent_run.setdefault('task_states', [])
+
+    for i, task_state in enumerate(task_states):
+        if task_state.get('task_uuid') == task_uuid:
+            updated_state = {**task_state, **state}
+            updated_state['task_uuid'] = task_uuid
+            updated_state['updated_at'] = timestamp
+            task_states[i] = updated_state
+            break
+    else:
+        task_states.append({
+            'task_uuid': task_uuid,
+            'status': 'pending',
+            'created_at': timestamp,
+            'updated_at': timestamp,
+            **state
+        })
+
+    agent_run['updated_at'] = timestamp
+
+
+class TaskStateJournal:
+    """One JSON lines file of task state patches per run
+
+    A patch costs one small append instead of rewriting the whole run document.
+    The manager folds the journal into the snapshot (compaction) by saving the
+    run, after which the journal is cleared.
+    """
+
+    def __init__(self, journal_dir: Path):
+        self.journal_dir = Path(journal_dir)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self._counts: Dict[str, Tuple[int, int]] = {}  # run id -> (file size, entries)
+        self._lock = threading.Lock()
+
+    def path_for(self, run_id: str) -> Path:
+        """Get the journal file of a run"""
+        return self.journal_dir / f"{run_id}.jsonl"
+
+    def append(self, run_id: str, entry: Dict[str, Any]) -> int:
+        """Append a patch and return the number of entries in the journal"""
+        line = dumps_bytes(entry) + b'\n'
+        journal_path = self.path_for(run_id)
+
+        with self._lock:
+            with open(journal_path, 'ab') as f:
+                size_before = f.tell()
+                f.write(line)
+
+            cached = self._counts.get(run_id)
+            if cached and cached[0] == size_before:
+                count = cached[1] + 1
+            else:
+                # Written by another process (or first append here): count the lines
+                count = len(self.read(run_id))
+            self._counts[run_id] = (size_before + len(line), count)
+            return count
+
+    def read(self, run_id: str) -> List[Dict[str, Any]]:
+        """Read all complete entries of a run's journal"""
+        try:
+            with open(self.path_for(run_id), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return []
+
+        entries = []
+        # A trailing line without newline is an append still in progress (or torn by a crash)
+        for line in data[:data.rfind(b'\n') + 1].splitlines():
+            try:
+                entries.append(loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def clear(self, run_id: str) -> None:
+        """Drop a run's journal after it was folded into the snapshot (or the run was deleted)"""
+        with self._lock:
+            self._counts.pop(run_id, None)
+            try:
+                self.path_for(run_id).unlink()
+            except OSError:
+                pass
@@ -8,6 +8,7 @@ import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from .async_io import run_blocking
 from .base_manager import DataManager
 
 # Implementation Module Integration
@@ -20,6 +21,10 @@ except ImportError:
 class ToolsManager(DataManager):
     """Manager for tools data with Implementation Module integration"""
     
+    indexed_fields = ('integration_id', 'tool_definition')
+    summary_fields = ('id', 'name', 'category', 'status', 'tool_definition', 'integration_id',
+                      'created_at', 'updated_at')
+    
     def __init__(self):
         super().__init__('tools')
         self.implementation_manager = implementation_manager if IMPLEMENTATION_MODULES_AVAILABLE else None
@@ -86,11 +91,7 @@ class ToolsManager(DataManager):
         # Falls nicht gefunden, versuche über Namen
         if not integration:
             from .integrations_manager import integrations_manager
-            integration = next(
-                (i for i in integrations_manager.get_all() 
-                 if i['name'] == tool_definition), 
-                None
-            )
+            integration = integrations_manager.get_by_name(tool_definition)
         
         # Implementation Module von Integration holen
         if integration and integration.get('implementation'):
@@ -127,8 +128,9 @@ class ToolsManager(DataManager):
         """
         Testet ein Tool über sein Implementation Module.
         """
+        tool = None
         try:
-            tool = self.get_by_id(tool_id)
+            tool = await self.aload(tool_id)
             if not tool:
                 return {'success': False, 'message': 'Tool nicht gefunden'}
             
@@ -159,7 +161,7 @@ class ToolsManager(DataManager):
             tool['status'] = 'connected' if test_result.get('success') else 'error'
             tool['updated_at'] = datetime.utcnow().isoformat() + 'Z'
             
-            self.update(tool_id, tool)
+            await self.aupdate(tool_id, tool)
             
             return test_result
             
@@ -178,7 +180,7 @@ class ToolsManager(DataManager):
                 }
                 tool['status'] = 'error'
                 tool['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-                self.update(tool_id, tool)
+                await self.aupdate(tool_id, tool)
             
             return error_result
     
@@ -186,8 +188,9 @@ class ToolsManager(DataManager):
         """
         Führt ein Tool über sein Implementation Module aus.
         """
+        tool = None
         try:
-            tool = self.get_by_id(tool_id)
+            tool = await self.aload(tool_id)
             if not tool:
                 return {'success': False, 'message': 'Tool nicht gefunden'}
             
@@ -224,7 +227,7 @@ class ToolsManager(DataManager):
             }
             
             tool['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-            self.update(tool_id, tool)
+            await self.aupdate(tool_id, tool)
             
             return execution_result
             
@@ -243,7 +246,7 @@ class ToolsManager(DataManager):
                     'result': error_result
                 }
                 tool['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-                self.update(tool_id, tool)
+                await self.aupdate(tool_id, tool)
             
             return error_result
     
@@ -343,11 +346,11 @@ class ToolsManager(DataManager):
     async def create_assistant_for_tool(self, tool_id: str, force_recreate: bool = False) -> Dict[str, Any]:
         """Create an OpenAI Assistant for a tool if it has assistant options enabled."""
         try:
-            tool = self.get_by_id(tool_id)
+            tool = await self.aload(tool_id)
             if not tool:
                 return {'success': False, 'error': 'Tool not found'}
             
-            assistant_options = self.get_assistant_options(tool_id)
+            assistant_options = await run_blocking(self.get_assistant_options, tool_id)
             if not assistant_options.get('enabled', False):
                 return {'success': False, 'error': 'Assistant not enabled for this tool'}
             
@@ -398,7 +401,7 @@ class ToolsManager(DataManager):
                 
                 # Update tool with assistant ID
                 assistant_options['assistant_id'] = assistant_id
-                self.update_assistant_options(tool_id, assistant_options)
+                await run_blocking(self.update_assistant_options, tool_id, assistant_options)
                 
                 return {
                     'success': True,
@@ -420,11 +423,11 @@ class ToolsManager(DataManager):
     async def chat_with_tool_assistant(self, tool_id: str, message: str, thread_id: str = None) -> Dict[str, Any]:
         """Chat with a tool's assistant."""
         try:
-            tool = self.get_by_id(tool_id)
+            tool = await self.aload(tool_id)
             if not tool:
                 return {'success': False, 'error': 'Tool not found'}
             
-            assistant_options = self.get_assistant_options(tool_id)
+            assistant_options = await run_blocking(self.get_assistant_options, tool_id)
             if not assistant_options.get('enabled', False):
                 return {'success': False, 'error': 'Assistant not enabled for this tool'}
             
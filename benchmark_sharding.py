@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: flat vs. sharded agentrun layout
+Creates N run files in a temporary directory in both layouts and compares
+listing (list_ids / list_signatures), random lookups and the online migration.
+
+Usage:
+    python benchmark_sharding.py [N ...]        (default: 10000 100000)
+"""
+
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.utils.storage_backends import JsonFileBackend
+
+LOOKUPS = 2000
+
+
+def timed(func, repeat: int = 3) -> float:
+    """Best wall time of func in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def populate(backend: JsonFileBackend, item_ids: list) -> None:
+    record = {'agent_uuid': str(uuid.uuid4()), 'status': 'completed', 'task_states': []}
+    for item_id in item_ids:
+        backend.write(item_id, {**record, 'uuid': item_id})
+
+
+def measure(backend: JsonFileBackend, item_ids: list) -> dict:
+    sample = random.sample(item_ids, min(LOOKUPS, len(item_ids)))
+    return {
+        'list_ids': timed(backend.list_ids),
+        'list_signatures': timed(backend.list_signatures),
+        f'{len(sample)} reads': timed(lambda: [backend.read(item_id) for item_id in sample]),
+        f'{len(sample)} signatures': timed(lambda: [backend.signature(item_id) for item_id in sample]),
+    }
+
+
+def run(count: int) -> None:
+    print(f"\n📊 {count} runs")
+    item_ids = [str(uuid.uuid4()) for _ in range(count)]
+    root = Path(tempfile.mkdtemp(prefix='vntrai-shard-bench-'))
+    try:
+        flat = JsonFileBackend(root / 'flat', pretty=False)
+        sharded = JsonFileBackend(root / 'sharded', pretty=False, sharded=True)
+
+        started = time.perf_counter()
+        populate(flat, item_ids)
+        print(f"  write flat:    {time.perf_counter() - started:8.2f}s")
+        started = time.perf_counter()
+        populate(sharded, item_ids)
+        print(f"  write sharded: {time.perf_counter() - started:8.2f}s")
+
+        flat_results = measure(flat, item_ids)
+        sharded_results = measure(sharded, item_ids)
+        print(f"  {'operation':<20} {'flat ms':>10} {'sharded ms':>12}")
+        for operation, flat_ms in flat_results.items():
+            print(f"  {operation:<20} {flat_ms:>10.1f} {sharded_results[operation]:>12.1f}")
+
+        # Online migration of the flat directory into shards
+        migrating = JsonFileBackend(root / 'flat', pretty=False, sharded=True)
+        started = time.perf_counter()
+        report = migrating.migrate_layout()
+        print(f"  migrate flat -> sharded: {report['moved']} moved in {time.perf_counter() - started:.2f}s")
+        assert len(migrating.list_ids()) == count
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    for count in counts:
+        run(count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Maintenance Script: alte Agent Runs archivieren
+Packt abgeschlossene Runs, die seit RUN_ARCHIVE_AFTER_DAYS Tagen nicht geändert
+wurden, in komprimierte Segment-Dateien unter DATA_DIR/archive/agentrun.
+Archivierte Runs bleiben in Listen sichtbar und werden beim Öffnen automatisch
+wiederhergestellt. Kann z.B. täglich per Cron laufen.
+
+Usage:
+    python migration/archive_agent_runs.py [--days N] [--limit N]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive agent runs that were not updated for a while')
+    parser.add_argument('--days', type=float, default=None, help='Age in days (default: RUN_ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--limit', type=int, default=None, help='Maximum number of runs to archive')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        from app.utils.agent_run_manager import AgentRunManager
+        manager = AgentRunManager()
+
+        before = manager.get_archive_stats()
+        print(f"📦 Archiving agent runs in {manager.data_dir}")
+        archived = manager.archive_old_runs(args.days, args.limit)
+        after = manager.get_archive_stats()
+
+        print(f"  {archived} runs archived")
+        print(f"  archive: {after['archived']} runs in {after['segments']} segments, "
+              f"{after['segment_bytes'] / 1024 / 1024:.1f} MB "
+              f"(+{(after['segment_bytes'] - before['segment_bytes']) / 1024:.0f} KB)")
+
+    print("✅ Archiving finished")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
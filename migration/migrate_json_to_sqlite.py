@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration Script: JSON-Verzeichnisse nach SQLite
+Importiert data/integrations, data/tools, data/agents und data/agentrun einmalig
+in die SQLite-Datenbank des SQLite Storage Backends (STORAGE_BACKEND=sqlite).
+
+Usage:
+    python migration/migrate_json_to_sqlite.py [DATA_DIR] [DB_PATH]
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.utils.storage_backends import import_json_collections
+
+
+def main():
+    data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else PROJECT_ROOT / 'data'
+    db_path = Path(sys.argv[2]) if len(sys.argv) > 2 else data_dir / 'vntrai.db'
+
+    print(f"📦 Importing JSON collections from {data_dir} into {db_path}")
+    report = import_json_collections(data_dir, db_path)
+
+    total_failed = 0
+    for collection, counts in report.items():
+        total_failed += counts['failed']
+        print(f"  {collection}: {counts['imported']} imported, {counts['failed']} failed")
+
+    if total_failed:
+        print(f"⚠️  Import finished with {total_failed} failed records")
+        return 1
+
+    print("✅ Import finished - set STORAGE_BACKEND=sqlite to use the database")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Migration Script: flache Verzeichnisse in das Shard-Layout
+Verschiebt data/agentrun/<uuid>.json nach data/agentrun/ab/<uuid>.json und
+data/agentlogs/<uuid>.log nach data/agentlogs/ab/<uuid>.log.
+
+Die Migration läuft online: die Anwendung findet Dateien während der Migration
+in beiden Layouts und verschiebt Runs beim nächsten Speichern selbst.
+
+Usage:
+    python migration/migrate_sharded_layout.py [DATA_DIR] [--batch-size N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.utils.sharding import migrate_flat_files
+
+# Sharded directories with the suffix of their item files
+SHARDED_DIRECTORIES = (('agentrun', '.json'), ('agentlogs', '.log'))
+
+
+def migrate_directory(directory: Path, suffix: str, batch_size: int, pause: float) -> dict:
+    """Migrate one directory in batches, pausing between them to keep the I/O load low"""
+    totals = {'moved': 0, 'removed': 0, 'failed': 0}
+    while True:
+        report = migrate_flat_files(directory, suffix, limit=batch_size)
+        for key in totals:
+            totals[key] += report[key]
+        if not report['remaining'] or not (report['moved'] or report['removed']):
+            return totals
+        time.sleep(pause)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move flat data directories into the sharded layout')
+    parser.add_argument('data_dir', nargs='?', default=str(PROJECT_ROOT / 'data'))
+    parser.add_argument('--batch-size', type=int, default=1000, help='Files moved per batch')
+    parser.add_argument('--pause', type=float, default=0.1, help='Seconds to wait between batches')
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    total_failed = 0
+    for name, suffix in SHARDED_DIRECTORIES:
+        directory = data_dir / name
+        if not directory.is_dir():
+            continue
+
+        print(f"📦 Migrating {directory} to the sharded layout")
+        started = time.time()
+        totals = migrate_directory(directory, suffix, args.batch_size, args.pause)
+        total_failed += totals['failed']
+        print(f"  {name}: {totals['moved']} moved, {totals['removed']} stale copies removed, "
+              f"{totals['failed']} failed ({time.time() - started:.1f}s)")
+
+    if total_failed:
+        print(f"⚠️  Migration finished with {total_failed} failed files - re-run to retry")
+        return 1
+
+    print("✅ Migration finished")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
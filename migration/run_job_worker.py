@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Maintenance Script: Job Worker für Hintergrund-Ausführungen
+Führt die Task- und Run-Ausführungen aus der Job Queue (DATA_DIR/_meta/jobs.db)
+aus. Nötig, wenn die Web-Prozesse mit JOB_WORKERS=0 nur Jobs einreihen; kann
+beliebig oft parallel laufen (auch auf mehreren Rechnern mit gemeinsamem DATA_DIR).
+
+Usage:
+    python migration/run_job_worker.py [--workers N]
+"""
+
+import argparse
+import signal
+import sys
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+from app.config import Config
+
+
+class WorkerConfig(Config):
+    """The workers are started below with --workers threads, not by create_app()"""
+    JOB_WORKERS_AUTOSTART = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Execute queued task and run jobs')
+    parser.add_argument('--workers', type=int, default=4, help='Worker threads (default: 4)')
+    args = parser.parse_args()
+
+    app = create_app(WorkerConfig)
+    with app.app_context():
+        # The job handlers are registered with the agent routes by create_app()
+        from app.utils.job_queue import ensure_job_workers, get_job_queue
+
+        pool = ensure_job_workers(app, max(1, args.workers))
+        print(f"⚙️  {pool.workers} job workers on {get_job_queue().db_path}, queue: {get_job_queue().get_stats()}")
+
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+        try:
+            while not stopping.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+
+        print("Stopping, waiting for running jobs...")
+        pool.stop()
+
+    print("✅ Job worker stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Maintenance Script: Datenbestand prüfen und abgeleitete Daten neu aufbauen
+Liest alle Record-Dateien parallel (Process Pool), repariert beschädigte Dateien
+(abgeschnittene Enden, falsche IDs, liegengebliebene .tmp-Kopien) oder verschiebt
+sie nach DATA_DIR/_quarantine, entfernt alte .tmp-Dateien und baut Indizes,
+Summaries, Zähler und Suchindex in einem Durchlauf neu auf.
+
+Usage:
+    python migration/scrub_data.py [--workers N] [--no-repair] [--temp-age SECONDS] [collection ...]
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import create_app
+
+COLLECTIONS = ('integrations', 'tools', 'agents', 'agentrun')
+
+
+def create_manager(collection: str):
+    from app.utils.data_manager import AgentRunManager, AgentsManager, IntegrationsManager, ToolsManager
+    managers = {
+        'integrations': IntegrationsManager,
+        'tools': ToolsManager,
+        'agents': AgentsManager,
+        'agentrun': AgentRunManager
+    }
+    return managers[collection]()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate and repair record files, rebuild indexes and summaries')
+    parser.add_argument('collections', nargs='*', help=f"Collections to scrub: {', '.join(COLLECTIONS)} (default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--no-repair', action='store_true', help='Quarantine damaged files instead of repairing them')
+    parser.add_argument('--temp-age', type=float, default=None,
+                        help='Remove .tmp files older than this many seconds (default: 300)')
+    parser.add_argument('--verbose', action='store_true', help='List every repaired file')
+    args = parser.parse_args()
+    unknown = [collection for collection in args.collections if collection not in COLLECTIONS]
+    if unknown:
+        parser.error(f"unknown collection: {', '.join(unknown)}")
+
+    app = create_app()
+    with app.app_context():
+        from app.utils.scrubber import TEMP_MAX_AGE, scrub_collection
+
+        temp_age = args.temp_age if args.temp_age is not None else TEMP_MAX_AGE
+        problems = 0
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            for collection in args.collections or COLLECTIONS:
+                manager = create_manager(collection)
+                print(f"🔍 Scrubbing {collection} in {manager.data_dir}")
+                report = scrub_collection(manager, executor, repair=not args.no_repair,
+                                          temp_max_age=temp_age, verbose=args.verbose)
+                seconds = max(report['seconds'], 1e-6)
+                print(f"  {report['files']} files, {report['items']} items: {report['ok']} ok, "
+                      f"{report['repaired']} repaired, {report['quarantined']} quarantined, "
+                      f"{report['errors']} errors, {report['temp_removed']} temp files removed")
+                print(f"  {report['seconds']:.2f}s, {report['files'] / seconds:.0f} files/s, "
+                      f"{report['bytes'] / 1024 / 1024 / seconds:.1f} MB/s")
+                problems += report['quarantined'] + report['errors']
+
+    print("✅ Scrub finished" if not problems else f"⚠️ Scrub finished, {problems} files need attention")
+    return 0 if not problems else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test the collection aggregates (get_counts/get_total/count_all) maintained with the summaries against a full recount
+"""
+
+import random
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+from app.utils.agents_manager import AgentsManager
+from app.utils.summary_store import SummaryStore
+
+
+def _agents_manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return AgentsManager()
+
+
+def _recount(manager):
+    """Aggregates computed from every stored agent"""
+    summaries = [manager.summarize(agent) for agent in manager.load_all()]
+    counts = {}
+    for field in manager.counted_fields:
+        counts[field] = {}
+        for summary in summaries:
+            counts[field][summary.get(field)] = counts[field].get(summary.get(field), 0) + 1
+    return counts, sum(summary['task_count'] for summary in summaries), len(summaries)
+
+
+def _assert_matches_recount(manager):
+    counts, task_count, total = _recount(manager)
+    for field in manager.counted_fields:
+        assert manager.get_counts(field) == counts[field], field
+    assert manager.get_total('task_count') == task_count
+    assert manager.count_all() == total
+
+
+def _random_change(manager, rng, number):
+    agent_id = f"agent-{rng.randrange(12)}"
+    if rng.random() < 0.25:
+        manager.delete(agent_id)
+        return
+    agent = manager.load(agent_id) or {'id': agent_id, 'name': f"Agent {number}"}
+    agent['status'] = rng.choice(['active', 'inactive', 'draft', None])
+    agent['category'] = rng.choice(['general', 'research', 'sales'])
+    agent['use_as_insight'] = rng.random() < 0.5
+    agent['tasks'] = [{'uuid': f"task-{index}"} for index in range(rng.randrange(4))]
+    assert manager.save(agent)
+
+
+def test_aggregates_match_a_full_recount():
+    """Counts and totals stay exact through creates, updates and deletes of this and another process"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        other = _agents_manager(data_dir)
+        _assert_matches_recount(manager)
+
+        rng = random.Random(12)
+        for number in range(200):
+            _random_change(manager if number % 3 else other, rng, number)
+            if number % 20 == 0:
+                _assert_matches_recount(manager)
+                _assert_matches_recount(other)
+        _assert_matches_recount(manager)
+        _assert_matches_recount(other)
+
+        # A fresh process replays the (compacted) log; a rebuild gives the same numbers
+        fresh = _agents_manager(data_dir)
+        _assert_matches_recount(fresh)
+        fresh.rebuild_summaries()
+        _assert_matches_recount(fresh)
+
+
+def test_summary_store_aggregates():
+    """Replacing a summary moves its counts; unhashable values are counted by their JSON text"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = SummaryStore(Path(temp_dir) / 'summaries.jsonl', ('status', 'tags'), ('size',))
+        store.ensure_loaded(lambda: iter(()))
+        store.put('a', {'status': 'active', 'tags': ['x'], 'size': 2})
+        store.put('b', {'status': 'active', 'tags': ['x'], 'size': 3.5})
+        store.put('c', {'status': 'draft', 'size': True})
+        assert store.counts('status') == {'active': 2, 'draft': 1}
+        assert store.counts('tags') == {'["x"]': 2, None: 1}
+        assert store.total('size') == 5.5
+
+        store.put('a', {'status': 'draft', 'size': 1})
+        store.remove('b')
+        assert store.counts('status') == {'draft': 2}
+        assert store.total('size') == 1 and store.size() == 2
+
+
+if __name__ == '__main__':
+    test_aggregates_match_a_full_recount()
+    test_summary_store_aggregates()
+    print("✅ Aggregate tests passed")
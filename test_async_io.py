@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test the awaitable manager calls (aload/asave, ...) on the bounded I/O executor
+"""
+
+import asyncio
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+import app.utils.async_io as async_io
+from app.utils.agents_manager import AgentsManager
+from app.utils.identity_map import identity_scope
+
+
+def _app(data_dir, workers):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    app.config['DATA_ASYNC_WORKERS'] = workers
+    return app
+
+
+def _with_fresh_executor(test):
+    """Run test with an executor created from the test's config, restoring the shared one afterwards"""
+    original = async_io._executor
+    async_io._executor = None
+    try:
+        test()
+    finally:
+        if async_io._executor is not None:
+            async_io._executor.shutdown(wait=True)
+        async_io._executor = original
+
+
+def test_at_most_data_async_workers_calls_run_at_once():
+    def test():
+        running, peak, threads = [0], [0], set()
+        lock = threading.Lock()
+
+        def blocking_call(number):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                threads.add(threading.current_thread().name)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return number
+
+        async def main():
+            ticks = []
+
+            async def ticker():
+                # Keeps running while the blocking calls sleep: the event loop is free
+                while len(ticks) < 5:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+
+            results = await asyncio.gather(ticker(), *(async_io.run_blocking(blocking_call, number)
+                                                       for number in range(12)))
+            return results[1:], ticks
+
+        with tempfile.TemporaryDirectory() as data_dir, _app(data_dir, 3).app_context():
+            results, ticks = asyncio.run(main())
+        assert results == list(range(12))
+        assert peak[0] == 3
+        assert len(ticks) == 5
+        assert all(name.startswith('data-io') for name in threads)
+
+    _with_fresh_executor(test)
+
+
+def test_awaitable_manager_calls():
+    def test():
+        with tempfile.TemporaryDirectory() as data_dir:
+            app = _app(data_dir, 2)
+            with app.app_context():
+                manager = AgentsManager()
+
+                async def main():
+                    assert await manager.asave({'id': 'agent-1', 'name': 'First'})
+                    assert await manager.asave_many([{'id': 'agent-2', 'name': 'Second'}]) == ['agent-2']
+                    assert (await manager.aload('agent-1'))['name'] == 'First'
+                    assert sorted(await manager.aload_many(['agent-1', 'agent-2', 'missing'])) == ['agent-1', 'agent-2']
+                    assert len(await manager.aload_all()) == 2
+                    assert await manager.aupdate('agent-2', {'name': 'Renamed'})
+                    assert [agent['id'] for agent in await manager.afind_by('name', 'Renamed')] == ['agent-2']
+                    assert await manager.adelete('agent-1')
+                    assert await manager.aload('agent-1') is None
+
+                    # The identity map in effect is used on the worker threads
+                    with identity_scope():
+                        first = await manager.aload('agent-2')
+                        assert await manager.aload('agent-2') is first
+                        assert manager.load('agent-2') is first
+
+                asyncio.run(main())
+
+    _with_fresh_executor(test)
+
+
+def test_errors_are_raised_in_the_caller():
+    def test():
+        def failing():
+            raise ValueError('broken')
+
+        with tempfile.TemporaryDirectory() as data_dir, _app(data_dir, 1).app_context():
+            try:
+                asyncio.run(async_io.run_blocking(failing))
+                raise AssertionError("Error of the blocking call was lost")
+            except ValueError as e:
+                assert str(e) == 'broken'
+
+    _with_fresh_executor(test)
+
+
+if __name__ == '__main__':
+    test_at_most_data_async_workers_calls_run_at_once()
+    test_awaitable_manager_calls()
+    test_errors_are_raised_in_the_caller()
+    print("✅ Async I/O tests passed")
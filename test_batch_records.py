@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the batch APIs of the data managers (load_many, save_many, delete_many)
+"""
+
+import tempfile
+import threading
+
+from flask import Flask
+
+import app.utils.agents_manager as agents_module
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.agents_manager import AgentsManager
+from app.utils.base_manager import DataManager
+
+
+class Records(DataManager):
+    """Collection with an index and summaries"""
+    indexed_fields = ('group',)
+    summary_fields = ('id', 'name', 'status')
+    search_fields = {}
+
+
+class SlowSyncRunManager(AgentRunManager):
+    """Run manager writing a task state patch from another thread while a run is being synced"""
+
+    def __init__(self):
+        super().__init__()
+        self.patch_thread = None
+
+    def _synced_task_states(self, agent_run, agent):
+        if self.patch_thread is None:
+            self.patch_thread = threading.Thread(
+                target=self.update_task_state, args=(agent_run['uuid'], 'task-1', {'status': 'completed'}))
+            self.patch_thread.start()
+            # Without the run lock held, the patch is written (and then overwritten) right here
+            self.patch_thread.join(0.5)
+        return AgentRunManager._synced_task_states(agent_run, agent)
+
+
+def _app(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    return app
+
+
+def test_save_many_load_many_delete_many():
+    """Batch operations keep revisions and derived data like single saves"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        with _app(data_dir).app_context():
+            manager = Records('records')
+        items = [{'id': f"item-{number}", 'name': f"Item {number}", 'group': 'a' if number % 2 else 'b',
+                  'status': 'active'} for number in range(10)]
+
+        assert sorted(manager.save_many(items)) == sorted(item['id'] for item in items)
+        loaded = manager.load_many(['item-3', 'missing', 'item-1'])
+        assert list(loaded) == ['item-3', 'item-1']
+        assert manager.get_revision(loaded['item-3']) == 1
+
+        loaded['item-3']['status'] = 'inactive'
+        assert manager.save_many([loaded['item-3']]) == ['item-3']
+        assert manager.get_revision(manager.load('item-3')) == 2
+        assert manager.get_counts('status') == {'active': 9, 'inactive': 1}
+        assert len(manager.find_by('group', 'a')) == 5
+
+        assert sorted(manager.delete_many(['item-1', 'item-3', 'missing'])) == ['item-1', 'item-3']
+        assert manager.count_all() == 8
+        assert len(manager.find_by('group', 'a')) == 3
+        assert manager.load_many(['item-1']) == {}
+
+
+def test_sync_task_definitions_for_agent_keeps_concurrent_patch():
+    """A task state patch written while the runs of an agent are synced must not be lost"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        with _app(data_dir).app_context():
+            agents = AgentsManager()
+            run_manager = SlowSyncRunManager()
+
+        agent = agents.create_agent('Sync test')
+        agent['tasks'] = [{'uuid': 'task-1', 'name': 'First'}]
+        assert agents.save(agent)
+
+        global_agents = agents_module.agents_manager
+        agents_module.agents_manager = agents
+        try:
+            run_uuid = run_manager.create_agent_run(agent['id'])['uuid']
+            agent['tasks'].append({'uuid': 'task-2', 'name': 'Second'})
+            assert agents.save(agent)
+
+            assert run_manager.sync_task_definitions_for_agent(agent['id']) == 1
+            run_manager.patch_thread.join(10)
+        finally:
+            agents_module.agents_manager = global_agents
+
+        task_states = {state['task_uuid']: state for state in run_manager.load(run_uuid)['task_states']}
+        assert set(task_states) == {'task-1', 'task-2'}
+        assert task_states['task-1']['status'] == 'completed'
+
+
+if __name__ == '__main__':
+    test_save_many_load_many_delete_many()
+    test_sync_task_definitions_for_agent_keeps_concurrent_patch()
+    print("✅ Batch record tests passed")
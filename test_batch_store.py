@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test the batch store (CSV parsing, row claiming, retries, pause/resume) and the retry accounting of BatchExecutor
+"""
+
+import tempfile
+import threading
+from pathlib import Path
+
+import app.routes.agents.batch_jobs as batch_jobs
+from app.utils.batch_store import BatchStore, output_table, parse_csv_rows, table_rows
+
+
+def _store(temp_dir):
+    return BatchStore(Path(temp_dir) / 'batches.db')
+
+
+def _batch(store, count=3, concurrency=1, max_attempts=2):
+    rows = [{'text': f"row {index}"} for index in range(count)]
+    return store.create_batch('agent-1', 'task-1', 'Batch', ['text'], rows, concurrency, max_attempts,
+                              {'output_column': 'summary'})
+
+
+def test_parse_csv_rows():
+    """Delimiter is detected, a BOM is dropped, empty lines skipped and short lines filled up"""
+    columns, rows = parse_csv_rows('﻿name;city\nAda;London\n\n;\nAlan\n')
+    assert columns == ['name', 'city']
+    assert rows == [{'name': 'Ada', 'city': 'London'}, {'name': 'Alan', 'city': ''}]
+
+    columns, rows = parse_csv_rows('a,b\n"1,5",2\n')
+    assert columns == ['a', 'b'] and rows == [{'a': '1,5', 'b': '2'}]
+
+    columns, rows = parse_csv_rows('value\nsingle\n')
+    assert columns == ['value'] and rows == [{'value': 'single'}]
+    assert parse_csv_rows('') == ([], [])
+
+
+def test_table_rows_names_empty_header_cells():
+    columns, rows = table_rows([['name', ''], ['Ada', 36]])
+    assert columns == ['name', 'column_2']
+    assert rows == [{'name': 'Ada', 'column_2': 36}]
+
+
+def test_rows_are_claimed_in_order_and_attempts_counted():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(temp_dir)
+        batch = _batch(store)
+        assert batch['status'] == 'created'
+        assert batch['progress'] == {'pending': 3, 'running': 0, 'done': 0, 'failed': 0, 'total': 3}
+
+        claimed = store.claim_rows(batch['id'], 2)
+        assert [item['row_index'] for item in claimed] == [0, 1]
+        assert [item['attempts'] for item in claimed] == [1, 1]
+        assert claimed[0]['inputs'] == {'text': 'row 0'}
+        assert store.claim_rows(batch['id'], 0) == []
+
+        # Failed with attempts left: pending again, claimed before the later rows
+        store.finish_row(batch['id'], 0, 'pending', error='Timeout', run_uuid='run-0')
+        store.finish_row(batch['id'], 1, 'done', output='Summary 1', run_uuid='run-1')
+        claimed = store.claim_rows(batch['id'], 5)
+        assert [(item['row_index'], item['attempts']) for item in claimed] == [(0, 2), (2, 1)]
+        assert claimed[0]['run_uuid'] == 'run-0' and claimed[0]['error'] == 'Timeout'
+
+        store.finish_row(batch['id'], 0, 'failed', error='Timeout again')
+        store.finish_row(batch['id'], 2, 'done', output='Summary 2')
+        assert store.get_rows(batch['id'], status='failed')[0]['run_uuid'] == 'run-0'
+        assert store.progress(batch['id']) == {'pending': 0, 'running': 0, 'done': 2, 'failed': 1, 'total': 3}
+        assert store.claim_rows(batch['id'], 5) == []
+
+
+def test_reset_rows_for_resume_and_retry():
+    """Rows left running start over keeping their attempts; retried failed rows get all attempts again"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(temp_dir)
+        batch = _batch(store, count=4)
+        store.claim_rows(batch['id'], 3)
+        store.finish_row(batch['id'], 1, 'failed', error='Broken')
+        store.finish_row(batch['id'], 2, 'failed', error='Broken')
+
+        assert store.reset_rows(batch['id']) == 1
+        assert [(item['row_index'], item['attempts']) for item in store.get_rows(batch['id'], status='pending')] \
+            == [(0, 1), (3, 0)]
+
+        assert store.reset_rows(batch['id'], ('failed',), row_indexes=[2], reset_attempts=True) == 1
+        assert store.get_rows(batch['id'], offset=2, limit=1)[0]['attempts'] == 0
+        assert store.reset_rows(batch['id'], ('failed',)) == 1
+        assert store.progress(batch['id'])['pending'] == 4
+
+
+def test_batch_updates_output_and_delete():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(temp_dir)
+        batch = _batch(store, count=2)
+        assert store.update_batch(batch['id'], status='running', job_id='job-1', name='ignored')
+        assert not store.update_batch('missing', status='running')
+        assert store.get_status(batch['id']) == 'running'
+        assert store.get_batch(batch['id'])['job_id'] == 'job-1'
+        assert [item['id'] for item in store.list_batches('agent-1')] == [batch['id']]
+        assert store.list_batches('agent-2') == []
+
+        store.finish_row(batch['id'], 0, 'done', output='Short')
+        assert [item['row_index'] for item in store.iter_rows(batch['id'], page_size=1)] == [0, 1]
+        assert list(output_table(store, store.get_batch(batch['id']))) == [
+            ['text', 'summary', 'status', 'error'],
+            ['row 0', 'Short', 'done', ''],
+            ['row 1', '', 'pending', '']
+        ]
+
+        assert store.delete_batch(batch['id'])
+        assert not store.delete_batch(batch['id'])
+        assert store.get_batch(batch['id']) is None and store.progress(batch['id'])['total'] == 0
+
+
+class _FakeRunManager:
+    """Agent runs of the rows: task states written by _FakeTaskExecutor"""
+
+    def __init__(self):
+        self.states = {}
+        self._lock = threading.Lock()
+
+    def create_agent_run(self, agent_uuid, name=None):
+        with self._lock:
+            run_uuid = f"run-{len(self.states)}"
+            self.states[run_uuid] = {}
+        return {'uuid': run_uuid}
+
+    def get_task_state(self, run_uuid, task_uuid, resolve_blobs=False):
+        return self.states.get(run_uuid)
+
+    def set_task_status(self, run_uuid, task_uuid, status, error=None):
+        self.states[run_uuid] = {'status': status, 'error': error}
+
+
+def _fake_task_executor(run_manager, failures):
+    """TaskExecutor failing the first failures[text] executions of a row"""
+
+    class FakeTaskExecutor:
+        def __init__(self, run_uuid, task_uuid, task_def, inputs, agent, method):
+            self.run_uuid = run_uuid
+            self.text = inputs['text']
+
+        def events(self):
+            if failures.get(self.text, 0) > 0:
+                failures[self.text] -= 1
+                run_manager.states[self.run_uuid] = {'status': 'error', 'error': f"{self.text} failed"}
+                yield {'type': 'error', 'error': f"{self.text} failed"}
+                return
+            run_manager.states[self.run_uuid] = {'status': 'completed',
+                                                 'results': {'raw_response': f"Summary of {self.text}"}}
+            yield {'type': 'complete'}
+
+    return FakeTaskExecutor
+
+
+def _execute(store, batch, failures, stop_event=None, stop_after=None):
+    run_manager = _FakeRunManager()
+    originals = batch_jobs.TaskExecutor, batch_jobs.agent_run_manager
+    batch_jobs.TaskExecutor = _fake_task_executor(run_manager, failures)
+    batch_jobs.agent_run_manager = run_manager
+    try:
+        executor = batch_jobs.BatchExecutor(store, store.get_batch(batch['id']), {'uuid': 'agent-1'},
+                                            {'uuid': 'task-1'}, stop_event=stop_event)
+        events = []
+        for payload in executor.events():
+            events.append(payload)
+            if stop_after and len([e for e in events if e['type'] == 'row_finished']) == stop_after:
+                stop_event.set()
+        return events
+    finally:
+        batch_jobs.TaskExecutor, batch_jobs.agent_run_manager = originals
+
+
+def test_failed_rows_are_retried_until_max_attempts():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(temp_dir)
+        batch = _batch(store, count=3, concurrency=2, max_attempts=2)
+        events = _execute(store, batch, {'row 0': 1, 'row 1': 5})
+
+        assert events[-1]['type'] == 'batch_complete'
+        rows = {item['row_index']: item for item in store.iter_rows(batch['id'])}
+        assert (rows[0]['status'], rows[0]['attempts'], rows[0]['output']) == ('done', 2, 'Summary of row 0')
+        assert rows[0]['error'] is None
+        assert (rows[1]['status'], rows[1]['attempts'], rows[1]['error']) == ('failed', 2, 'row 1 failed')
+        assert (rows[2]['status'], rows[2]['attempts']) == ('done', 1)
+        # The retry runs in the agent run of the first attempt
+        assert rows[0]['run_uuid'] == 'run-0'
+        assert store.get_status(batch['id']) == 'completed'
+
+
+def test_paused_batch_resumes_where_it_stopped():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _store(temp_dir)
+        batch = _batch(store, count=3, concurrency=1)
+
+        events = _execute(store, batch, {}, stop_event=threading.Event(), stop_after=1)
+        assert events[-1]['type'] == 'batch_paused'
+        assert store.get_status(batch['id']) == 'paused'
+        assert store.progress(batch['id'])['done'] == 1 and store.progress(batch['id'])['pending'] == 2
+
+        events = _execute(store, batch, {})
+        assert [payload['row'] for payload in events if payload['type'] == 'row_started'] == [1, 2]
+        assert events[-1]['type'] == 'batch_complete'
+        assert store.progress(batch['id'])['done'] == 3
+
+
+if __name__ == '__main__':
+    test_parse_csv_rows()
+    test_table_rows_names_empty_header_cells()
+    test_rows_are_claimed_in_order_and_attempts_counted()
+    test_reset_rows_for_resume_and_retry()
+    test_batch_updates_output_and_delete()
+    test_failed_rows_are_retried_until_max_attempts()
+    test_paused_batch_resumes_where_it_stopped()
+    print("✅ Batch store tests passed")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed blob store with writers storing the same output at once
+"""
+
+import tempfile
+import threading
+from pathlib import Path
+
+from app.utils.blob_store import BlobStore
+
+THREADS = 16
+
+
+def test_concurrent_puts_of_the_same_output():
+    """Threads storing identical output at the same time all get a readable reference"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = BlobStore(Path(temp_dir))
+        text = '<p>Same task output</p>' * 2000
+        start = threading.Barrier(THREADS)
+        refs, errors = [], []
+
+        def put():
+            start.wait()
+            try:
+                refs.append(store.put(text))
+            except IOError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=put) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        assert errors == []
+        assert len(refs) == THREADS and all(ref == refs[0] for ref in refs)
+        assert store.get(refs[0]) == text
+        assert not list(Path(temp_dir).rglob('*.tmp')), "Temporary blob files were left behind"
+
+
+if __name__ == '__main__':
+    test_concurrent_puts_of_the_same_output()
+    print("✅ Blob store tests passed")
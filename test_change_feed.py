@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the change feed shared by worker processes: appends, rotation and missed rotations
+"""
+
+import multiprocessing
+import shutil
+import tempfile
+from pathlib import Path
+
+from app.utils.change_feed import ChangeFeed
+
+PROCESSES = 4
+CHANGES_PER_PROCESS = 300
+
+
+class RecordingFeed(ChangeFeed):
+    """Feed with a tiny size limit that keeps a copy of every log it rotates away"""
+
+    MAX_BYTES = 2000
+
+    def _rotate(self):
+        with open(self.feed_path, 'rb') as log, open(self.feed_path.with_name('rotated.log'), 'ab') as copy:
+            shutil.copyfileobj(log, copy)
+        super()._rotate()
+
+
+def _publisher(feed_path, worker):
+    feed = RecordingFeed(Path(feed_path))
+    for number in range(CHANGES_PER_PROCESS):
+        feed.publish(f"{worker}-{number}")
+
+
+def _logged_ids(path):
+    if not path.exists():
+        return []
+    ids = []
+    for line in path.read_bytes().splitlines():
+        if b'"id"' in line:
+            ids.append(line.split(b'"id":"')[1].split(b'"')[0].decode())
+    return ids
+
+
+def test_poll_returns_changes_of_other_instances():
+    """A second instance (another process) sees exactly the changes published since its last poll"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feed_path = Path(temp_dir) / 'changes.log'
+        writer = ChangeFeed(feed_path)
+        writer.publish('before')
+
+        reader = ChangeFeed(feed_path)
+        assert reader.poll() == []
+
+        writer.publish_many(['a', 'b'], 'save')
+        writer.publish('c', 'delete')
+        assert reader.poll() == [('a', 'save'), ('b', 'save'), ('c', 'delete')]
+        assert reader.poll() == []
+
+
+def test_rotation_invalidates_readers_once():
+    """Readers get None (drop everything) once after a rotation, then changes again"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feed_path = Path(temp_dir) / 'changes.log'
+        writer = RecordingFeed(feed_path)
+        reader = ChangeFeed(feed_path)
+
+        for number in range(100):
+            writer.publish(f"item-{number}")
+        assert reader.poll() is None
+        assert reader.poll() == []
+
+        writer.publish('after')
+        assert reader.poll() == [('after', 'save')]
+
+
+def test_rotation_with_reused_inode_is_detected():
+    """A log replaced in place (as if the old inode was reused) must not be read at the old offset"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feed_path = Path(temp_dir) / 'changes.log'
+        writer = ChangeFeed(feed_path)
+        writer.publish_many([f"item-{number}" for number in range(5)])
+        reader = ChangeFeed(feed_path)
+
+        # Same inode, a rotation header and more data than the reader's offset
+        with open(feed_path, 'r+b') as f:
+            f.truncate(0)
+            f.write(b'{"op":"rotate","generation":"0123"}\n')
+            f.write(b''.join(b'{"id":"new-%d","op":"save"}\n' % number for number in range(20)))
+        assert reader.poll() is None
+
+        writer.publish('after')
+        assert reader.poll() == [('after', 'save')]
+
+
+def test_no_change_is_lost_while_several_processes_rotate():
+    """Every published change ends up in the log that was current (rotated copies included)"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feed_path = Path(temp_dir) / 'changes.log'
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_publisher, args=(str(feed_path), worker))
+                     for worker in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(120)
+            assert process.exitcode == 0, f"Publisher process failed with exit code {process.exitcode}"
+
+        logged = _logged_ids(feed_path.with_name('rotated.log')) + _logged_ids(feed_path)
+        expected = {f"{worker}-{number}" for worker in range(PROCESSES) for number in range(CHANGES_PER_PROCESS)}
+        assert len(logged) == len(expected)
+        assert set(logged) == expected
+
+
+if __name__ == '__main__':
+    test_poll_returns_changes_of_other_instances()
+    test_rotation_invalidates_readers_once()
+    test_rotation_with_reused_inode_is_detected()
+    test_no_change_is_lost_while_several_processes_rotate()
+    print("✅ Change feed tests passed")
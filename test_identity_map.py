@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test the request-scoped identity map: one parsed copy per record within a request, none shared between requests
+"""
+
+import tempfile
+import threading
+
+from flask import Flask, jsonify
+
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.agents_manager import AgentsManager
+from app.utils.identity_map import IdentityMap, current_identity_map, identity_scope, use_identity_map
+
+
+def _app(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    return app
+
+
+def _manager(app, manager_class=AgentsManager):
+    with app.app_context():
+        return manager_class()
+
+
+def test_loads_share_one_copy_within_a_request_only():
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir)
+        manager = _manager(app)
+        writer = _manager(app)  # Another worker process
+        assert manager.save({'id': 'agent-1', 'name': 'First'})
+        seen = []
+
+        @app.route('/agent')
+        @use_identity_map
+        def show_agent():
+            first = manager.load('agent-1')
+            second = manager.load('agent-1')
+            many = manager.load_many(['agent-1', 'missing'])
+            seen.append(first)
+            return jsonify({'same': first is second and many == {'agent-1': first},
+                            'name': first['name'], 'hits': current_identity_map().hits})
+
+        client = app.test_client()
+        assert client.get('/agent').get_json() == {'same': True, 'name': 'First', 'hits': 2}
+        assert writer.save(dict(writer.load('agent-1'), name='Second'))
+        assert client.get('/agent').get_json()['name'] == 'Second'
+        assert seen[0] is not seen[1]
+
+        # Outside a request every load returns its own copy
+        assert manager.load('agent-1') is not manager.load('agent-1')
+
+
+def test_writes_go_through_the_identity_map():
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir)
+        manager = _manager(app)
+        assert manager.save({'id': 'agent-1', 'name': 'First'})
+
+        with identity_scope() as identity:
+            agent = manager.load('agent-1')
+            assert manager.save(dict(agent, name='Renamed'))
+            assert manager.load('agent-1')['name'] == 'Renamed'
+
+            assert manager.load('missing') is None
+            assert manager.save({'id': 'missing', 'name': 'Created'})
+            assert manager.load('missing')['name'] == 'Created'
+
+            assert manager.delete('agent-1')
+            assert manager.load('agent-1') is None
+            assert len(identity) == 2
+
+
+def test_task_state_patches_update_the_mapped_run():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(_app(data_dir), AgentRunManager)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+
+        with identity_scope():
+            agent_run = manager.load(run_uuid)
+            revision = manager.get_revision(agent_run)
+            assert manager.set_task_status(run_uuid, 'task-1', 'completed')
+            assert manager.load(run_uuid) is agent_run
+            assert manager.get_task_state(run_uuid, 'task-1')['status'] == 'completed'
+            assert manager.get_revision(agent_run) == revision + 1
+
+
+def test_scopes_are_per_thread_and_nest():
+    outer, inner = IdentityMap(), IdentityMap()
+    assert current_identity_map() is None
+    with identity_scope(outer):
+        seen_in_thread = []
+        thread = threading.Thread(target=lambda: seen_in_thread.append(current_identity_map()))
+        thread.start()
+        thread.join()
+        assert seen_in_thread == [None]
+
+        with identity_scope(inner):
+            assert current_identity_map() is inner
+        assert current_identity_map() is outer
+    assert current_identity_map() is None
+
+
+def test_generator_scope_closed_out_of_order():
+    """A streaming generator holding a scope may be closed after a later scope was entered"""
+    request_map = IdentityMap()
+
+    def stream():
+        with identity_scope(request_map):
+            yield current_identity_map()
+            yield current_identity_map()
+
+    events = stream()
+    assert next(events) is request_map
+    with identity_scope() as other:
+        assert current_identity_map() is other
+        events.close()
+        assert current_identity_map() is other
+    assert current_identity_map() is None
+
+
+if __name__ == '__main__':
+    test_loads_share_one_copy_within_a_request_only()
+    test_writes_go_through_the_identity_map()
+    test_task_state_patches_update_the_mapped_run()
+    test_scopes_are_per_thread_and_nest()
+    test_generator_scope_closed_out_of_order()
+    print("✅ Identity map tests passed")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test that the job workers start with the app, so jobs queued before a restart are executed
+"""
+
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from app import create_app
+from app.config import Config
+from app.utils.job_queue import JobQueue, JobWorkerPool, ensure_job_workers, register_job_handler
+
+
+def _echo_job(job, cancelled):
+    yield {'type': 'echo', 'value': job['payload']['value']}
+
+
+def _ticking_job(job, cancelled):
+    """Yields an event every 50 ms until it is cancelled, then reports the cancellation itself"""
+    for number in range(400):
+        if cancelled.is_set():
+            yield {'type': 'cancelled', 'after': number}
+            return
+        yield {'type': 'tick', 'number': number}
+        time.sleep(0.05)
+    yield {'type': 'completed'}
+
+
+register_job_handler('test-echo', _echo_job)
+register_job_handler('test-ticking', _ticking_job)
+
+
+def _config(data_dir, autostart):
+    class StartupConfig(Config):
+        DATA_DIR = data_dir
+        JOB_QUEUE_DB = None
+        JOB_WORKERS = 1
+        JOB_WORKERS_AUTOSTART = autostart
+    return StartupConfig
+
+
+def _wait_for_status(queue, job_id, status, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if queue.get(job_id)['status'] == status:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_queued_job_runs_at_startup_without_a_request():
+    """A job left in the queue by a previous process is executed once the app is created"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        queue = JobQueue(Path(data_dir) / '_meta' / 'jobs.db')
+        job, _ = queue.enqueue('test-echo', {'value': 42})
+
+        app = create_app(_config(data_dir, True))
+        try:
+            assert _wait_for_status(queue, job['id'], 'done'), "Queued job was not executed after startup"
+            assert {'type': 'echo', 'value': 42} in [payload for _, payload in queue.events(job['id'])]
+        finally:
+            with app.app_context():
+                ensure_job_workers(app).stop(5)
+
+
+def test_no_workers_without_autostart():
+    """With JOB_WORKERS_AUTOSTART off the app only queues jobs (run_job_worker.py executes them)"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        queue = JobQueue(Path(data_dir) / '_meta' / 'jobs.db')
+        job, _ = queue.enqueue('test-echo', {'value': 1})
+
+        create_app(_config(data_dir, False))
+        assert not _wait_for_status(queue, job['id'], 'done', timeout=1.5)
+        assert queue.get(job['id'])['status'] == 'queued'
+
+
+def _start_pool(queue):
+    # stale_after 60: the maintenance thread forwards cancel requests only every 15 seconds
+    pool = JobWorkerPool(queue, workers=1, stale_after=60)
+    pool.start()
+    return pool
+
+
+def _cancel_request_is_handled_quickly(cancel):
+    with tempfile.TemporaryDirectory() as data_dir:
+        queue = JobQueue(Path(data_dir) / 'jobs.db')
+        pool = _start_pool(queue)
+        try:
+            job, _ = queue.enqueue('test-ticking', {})
+            assert _wait_for_status(queue, job['id'], 'running')
+            time.sleep(0.2)
+
+            requested_at = time.time()
+            cancel(queue, job['id'])
+            assert _wait_for_status(queue, job['id'], 'cancelled', timeout=5)
+            assert time.time() - requested_at < 3, "Cancel request reached the handler too late"
+
+            events = [payload for _, payload in queue.events(job['id'])]
+            assert events[-1]['type'] == 'cancelled'
+            assert not any(payload['type'] == 'completed' for payload in events)
+        finally:
+            pool.stop(5)
+
+
+def test_cancel_in_the_worker_process_stops_the_handler_at_once():
+    """request_cancel made in the process running the job signals its handler directly"""
+    _cancel_request_is_handled_quickly(lambda queue, job_id: queue.request_cancel(job_id))
+
+
+def _cancel_in_child(db_path, job_id):
+    JobQueue(Path(db_path)).request_cancel(job_id)
+
+
+def test_cancel_from_another_process_is_noticed_between_events():
+    """A cancel request of another process is picked up by the worker between two events"""
+    def cancel(queue, job_id):
+        process = multiprocessing.get_context('fork').Process(target=_cancel_in_child,
+                                                              args=(str(queue.db_path), job_id))
+        process.start()
+        process.join(10)
+        assert process.exitcode == 0
+
+    _cancel_request_is_handled_quickly(cancel)
+
+
+if __name__ == '__main__':
+    test_queued_job_runs_at_startup_without_a_request()
+    test_no_workers_without_autostart()
+    test_cancel_in_the_worker_process_stops_the_handler_at_once()
+    test_cancel_from_another_process_is_noticed_between_events()
+    print("✅ Job worker startup tests passed")
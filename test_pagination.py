@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test cursor pagination of DataManager.get_page/iter_items: stable cursors and summary-only sorting
+"""
+
+import tempfile
+
+from flask import Flask
+
+from app.utils.agents_manager import AgentsManager
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def _agents_manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return AgentsManager()
+
+
+def _save_agents(manager, names):
+    for name in names:
+        assert manager.save({'id': f"agent-{name}", 'name': name, 'status': 'active',
+                             'description': f"About {name}"})
+
+
+def _names(items):
+    return [item['name'] for item in items]
+
+
+def test_cursor_round_trip():
+    """Cursors are URL-safe, keep non-ASCII values and reject anything they did not encode"""
+    cursor = encode_cursor('Wetter für Zürich/Genf', 'agent-1')
+    assert cursor.replace('-', '').replace('_', '').isalnum()
+    assert decode_cursor(cursor) == ('Wetter für Zürich/Genf', 'agent-1')
+    for invalid in (None, '', 'not a cursor', encode_cursor('a', 'b')[:-3], 'WzFd'):
+        assert decode_cursor(invalid) is None, invalid
+
+
+def test_pages_follow_each_other_without_gaps():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager, ['e', 'a', 'c', 'd', 'b'])
+
+        page, cursor = manager.get_page(limit=2)
+        assert _names(page) == ['a', 'b']
+        page, cursor = manager.get_page(limit=2, cursor=cursor)
+        assert _names(page) == ['c', 'd']
+        page, cursor = manager.get_page(limit=2, cursor=cursor)
+        assert _names(page) == ['e'] and cursor is None
+
+        page, cursor = manager.get_page(limit=3, reverse=True)
+        assert _names(page) == ['e', 'd', 'c']
+        assert _names(manager.get_page(limit=3, reverse=True, cursor=cursor)[0]) == ['b', 'a']
+
+
+def test_cursor_is_stable_under_inserts():
+    """Items inserted while paging neither shift nor repeat the following pages"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager, ['b', 'd', 'f', 'h'])
+
+        page, cursor = manager.get_page(limit=2)
+        assert _names(page) == ['b', 'd']
+
+        # One before the cursor (not shown any more), one after it (shown in order)
+        _save_agents(manager, ['a', 'e'])
+        page, cursor = manager.get_page(limit=2, cursor=cursor)
+        assert _names(page) == ['e', 'f']
+        page, cursor = manager.get_page(limit=2, cursor=cursor)
+        assert _names(page) == ['h'] and cursor is None
+
+
+def test_equal_sort_values_are_ordered_by_id():
+    """Items with the same sort value are paged by id, so none is skipped at a page boundary"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        for number in range(5):
+            assert manager.save({'id': f"agent-{number}", 'name': 'Same'})
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = manager.get_page(limit=2, cursor=cursor)
+            seen.extend(item['id'] for item in page)
+            if cursor is None:
+                break
+        assert seen == [f"agent-{number}" for number in range(5)]
+
+
+def test_first_page_loads_only_what_it_shows():
+    """Ordering comes from the summaries; only the items of the page are read"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager, [f"name-{number:02d}" for number in range(30)])
+        manager.get_counts('status')  # Summaries are built once
+
+        loaded = []
+        load = manager.load
+        manager.load = lambda item_id: loaded.append(item_id) or load(item_id)
+
+        page, _ = manager.get_page(limit=5)
+        assert _names(page) == [f"name-{number:02d}" for number in range(5)]
+        assert len(loaded) == 6  # The page plus one item telling whether there is a next page
+
+
+def test_sorting_by_a_field_without_summary_fails_fast():
+    """Sorting by a non-summary field would parse every record and is rejected"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager, ['a', 'b'])
+        try:
+            manager.get_page(sort_key='description')
+            raise AssertionError("Sorting by a non-summary field was accepted")
+        except ValueError as e:
+            assert 'description' in str(e)
+
+
+def test_summary_pages_and_filters():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager, ['a', 'b', 'c'])
+        agent = manager.load('agent-b')
+        agent['status'] = 'inactive'
+        assert manager.save(agent)
+
+        page, cursor = manager.get_page({'status': 'active'}, limit=5, summaries=True)
+        assert _names(page) == ['a', 'c'] and cursor is None
+        assert 'description' not in page[0]
+
+
+if __name__ == '__main__':
+    test_cursor_round_trip()
+    test_pages_follow_each_other_without_gaps()
+    test_cursor_is_stable_under_inserts()
+    test_equal_sort_values_are_ordered_by_id()
+    test_first_page_loads_only_what_it_shows()
+    test_sorting_by_a_field_without_summary_fails_fast()
+    test_summary_pages_and_filters()
+    print("✅ Pagination tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test that the persisted record index stays complete with writers in several processes
+"""
+
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+from app.utils.base_manager import DataManager
+from app.utils.record_index import RecordIndex
+
+PROCESSES = 4
+RECORDS_PER_PROCESS = 60
+
+
+class IndexedRecords(DataManager):
+    """Collection with one indexed field and no other derived data"""
+    indexed_fields = ('group',)
+    search_fields = {}
+
+
+def _manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return IndexedRecords('records')
+
+
+def _index_writer(index_path, worker):
+    index = RecordIndex(Path(index_path), ('group',))
+    index.ensure_loaded(lambda: [])
+    for number in range(RECORDS_PER_PROCESS):
+        index.update(f"{worker}-{number}", {'group': 'shared'})
+
+
+def _record_writer(data_dir, worker):
+    manager = _manager(data_dir)
+    for number in range(RECORDS_PER_PROCESS):
+        manager.save({'id': f"{worker}-{number}", 'name': f"Record {worker}-{number}", 'group': 'shared'})
+
+
+def _run_processes(target, argument):
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=target, args=(argument, worker)) for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0, f"Writer process failed with exit code {process.exitcode}"
+
+
+def test_index_updates_from_several_processes_are_merged():
+    """Concurrent update() calls of different processes must not overwrite each other"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = Path(temp_dir) / 'indexes.json'
+        RecordIndex(index_path, ('group',)).rebuild([])
+
+        _run_processes(_index_writer, str(index_path))
+
+        index = RecordIndex(index_path, ('group',))
+        index.ensure_loaded(lambda: [])
+        assert len(index.lookup('group', 'shared')) == PROCESSES * RECORDS_PER_PROCESS
+        assert not list(Path(temp_dir).glob('*.tmp')), "Temporary index files were left behind"
+
+
+def test_find_by_sees_records_saved_by_several_processes():
+    """find_by()/count() through the index must return every record saved concurrently"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(data_dir)
+        # Build (and persist) the index before the writers start, so they all update it
+        assert manager.find_by('group', 'shared') == []
+
+        _run_processes(_record_writer, data_dir)
+
+        expected = PROCESSES * RECORDS_PER_PROCESS
+        assert len(manager.get_all_ids()) == expected
+        assert len(manager.find_by('group', 'shared')) == expected
+        assert manager.count({'group': 'shared'}) == expected
+
+        # A fresh manager (another worker) reads the same persisted index
+        assert len(_manager(data_dir).find_by('group', 'shared')) == expected
+
+
+if __name__ == '__main__':
+    test_index_updates_from_several_processes_are_merged()
+    test_find_by_sees_records_saved_by_several_processes()
+    print("✅ Record index tests passed")
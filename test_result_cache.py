@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the result cache (keys, TTL, LRU eviction) and the replay of cached AI results by TaskExecutor
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from flask import Flask
+
+import app.routes.agents.task_executor as task_executor
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.agents_manager import AgentsManager
+from app.utils.result_cache import ResultCache, result_cache_key
+
+
+def _cache(temp_dir, **limits):
+    return ResultCache(Path(temp_dir) / 'results.db', **limits)
+
+
+def test_key_changes_with_every_part():
+    key = result_cache_key('Summarize A', 'asst-1', 'gpt-4o', 3)
+    assert key == result_cache_key('Summarize A', 'asst-1', 'gpt-4o', 3)
+    assert len({key,
+                result_cache_key('Summarize B', 'asst-1', 'gpt-4o', 3),
+                result_cache_key('Summarize A', 'asst-2', 'gpt-4o', 3),
+                result_cache_key('Summarize A', 'asst-1', 'gpt-4o-mini', 3),
+                result_cache_key('Summarize A', 'asst-1', 'gpt-4o', 4)}) == 5
+    assert result_cache_key('Summarize A', 'asst-1', None, 3) == result_cache_key('Summarize A', 'asst-1', '', 3)
+
+
+def test_entries_expire_after_their_ttl():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = _cache(temp_dir)
+        cache.put('short', 'task-1', {'raw_response': 'Short'}, 0.05)
+        cache.put('long', 'task-1', {'raw_response': 'Long'}, 60)
+        assert cache.get('short') == {'raw_response': 'Short'}
+
+        time.sleep(0.1)
+        assert cache.get('short') is None
+        assert cache.get('long') == {'raw_response': 'Long'}
+        assert cache.evict() == 1
+        assert cache.get_stats()['entries'] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = _cache(temp_dir, max_entries=3)
+        cache.EVICT_INTERVAL = 1
+        for key in ('a', 'b', 'c'):
+            cache.put(key, 'task-1', {'raw_response': key}, 60)
+            time.sleep(0.01)
+        assert cache.get('a')  # Used after b and c
+        time.sleep(0.01)
+
+        cache.put('d', 'task-1', {'raw_response': 'd'}, 60)
+        assert cache.get('b') is None
+        assert all(cache.get(key) for key in ('a', 'c', 'd'))
+        assert cache.get_stats() == {'entries': 3, 'bytes': cache.get_stats()['bytes'], 'hits': 4}
+
+
+def test_size_limit_and_eviction_interval():
+    """Limits are enforced every EVICT_INTERVAL puts, not on each one"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = _cache(temp_dir, max_entries=2)
+        cache.EVICT_INTERVAL = 5
+        for number in range(4):
+            cache.put(f"key-{number}", 'task-1', {'raw_response': str(number)}, 60)
+        assert cache.get_stats()['entries'] == 4
+        cache.put('key-4', 'task-2', {'raw_response': '4'}, 60)
+        assert cache.get_stats()['entries'] == 2
+
+        cache = _cache(temp_dir, max_bytes=100)
+        cache.put('big-1', 'task-1', {'raw_response': 'x' * 60}, 60)
+        cache.put('big-2', 'task-1', {'raw_response': 'y' * 60}, 60)
+        cache.evict()
+        assert cache.get_stats()['bytes'] <= 100 and cache.get('big-2')
+        assert cache.clear('task-1') == 1 and cache.clear() == 0
+
+
+def _drain(generator):
+    """Events of a generator and its return value"""
+    events = []
+    try:
+        while True:
+            events.append(next(generator))
+    except StopIteration as stop:
+        return events, stop.value
+
+
+def test_task_executor_replays_cached_results():
+    """A task with cache_results stores its result and replays it for the same prompt and agent version"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = Flask(__name__)
+        app.config['DATA_DIR'] = data_dir
+        originals = task_executor.agent_run_manager, task_executor.agents_manager
+        with app.app_context():
+            task_executor.agent_run_manager = run_manager = AgentRunManager()
+            task_executor.agents_manager = agents = AgentsManager()
+            try:
+                task_def = {'uuid': 'task-1', 'name': 'Summary', 'type': 'ai', 'cache_results': True,
+                            'ai_config': {'instructions': 'Summarize {{topic}}'}}
+                assert agents.save({'id': 'agent-1', 'name': 'Agent', 'assistant_id': 'asst-1',
+                                    'model': 'gpt-4o', 'tasks': [task_def]})
+                agent = agents.load('agent-1')
+
+                def executor(inputs, use_cache=True):
+                    run_uuid = run_manager.create_agent_run('agent-1')['uuid']
+                    result = task_executor.TaskExecutor(run_uuid, 'task-1', task_def, inputs, agent, 'POST',
+                                                        use_cache=use_cache)
+                    result.agent_run = run_manager.load(run_uuid)
+                    return result
+
+                # Miss: the key is kept and the fresh result stored under it
+                first = executor({'topic': 'weather'})
+                assert _drain(first._replay_cached_result()) == ([], False)
+                first._save_completion({'raw_response': 'Sunny', 'assistant_id': 'asst-1'})
+
+                second = executor({'topic': 'weather'})
+                events = list(second.events())
+                final = next(payload for payload in events if payload['type'] == 'final_content')
+                assert final['cached'] and 'Sunny' in final['content']
+                assert events[-1] == {'type': 'complete'}
+                state = run_manager.get_task_state(second.run_uuid, 'task-1')
+                assert state['status'] == 'completed' and state['results']['raw_response'] == 'Sunny'
+                assert state['results']['cached']
+
+                assert _drain(executor({'topic': 'stocks'})._replay_cached_result())[1] is False
+                assert _drain(executor({'topic': 'weather'}, use_cache=False)._replay_cached_result()) == ([], False)
+
+                # A new agent version does not replay results of the old one
+                assert agents.save(dict(agent, description='Changed'))
+                agent = agents.load('agent-1')
+                assert _drain(executor({'topic': 'weather'})._replay_cached_result())[1] is False
+            finally:
+                task_executor.agent_run_manager, task_executor.agents_manager = originals
+
+
+if __name__ == '__main__':
+    test_key_changes_with_every_part()
+    test_entries_expire_after_their_ttl()
+    test_least_recently_used_entries_are_evicted()
+    test_size_limit_and_eviction_interval()
+    test_task_executor_replays_cached_results()
+    print("✅ Result cache tests passed")
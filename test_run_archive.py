@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the run archive: old runs are packed into segments and restored transparently by load()
+"""
+
+import tempfile
+
+from flask import Flask
+
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.run_archive import RunArchive
+
+
+def _run_manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return AgentRunManager()
+
+
+def _finished_run(manager, agent_uuid='agent-1'):
+    run_uuid = manager.create_agent_run(agent_uuid)['uuid']
+    assert manager.update_task_state(run_uuid, 'task-1', {'status': 'completed',
+                                                          'results': {'raw_response': 'done'}})
+    return run_uuid
+
+
+def test_finished_run_is_archived_and_loaded_back():
+    """A run created from the UI (status 'created') with finished tasks is archived; load() restores it"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = _finished_run(manager)
+        assert manager.load(run_uuid)['status'] == 'created'
+
+        assert manager.archive_old_runs(older_than_days=-1) == 1
+        assert not manager.backend.exists(run_uuid)
+        assert manager.get_archive_stats()['archived'] == 1
+
+        # Listed from the summaries without decompressing, also in another process
+        other = _run_manager(data_dir)
+        assert other.load_summaries()[0]['archived_at']
+        assert other.get_all_ids() == [run_uuid]
+
+        agent_run = other.load(run_uuid)
+        assert agent_run['uuid'] == run_uuid and 'archived_at' not in agent_run
+        assert other.get_task_state(run_uuid, 'task-1')['results'] == {'raw_response': 'done'}
+        assert other.backend.exists(run_uuid)
+        assert other.get_archive_stats()['archived'] == 0
+
+
+def test_runs_with_running_tasks_or_recent_activity_are_kept():
+    """Only runs inactive for the given days and without a running task are archived"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        running_uuid = manager.create_agent_run('agent-1')['uuid']
+        assert manager.update_task_state(running_uuid, 'task-1', {'status': 'running'})
+        finished_uuid = _finished_run(manager)
+
+        assert manager.archive_old_runs(older_than_days=1) == 0
+        assert manager.archive_old_runs(older_than_days=-1) == 1
+        assert manager.backend.exists(running_uuid)
+        assert not manager.backend.exists(finished_uuid)
+
+
+def test_deleting_an_archived_run():
+    """An archived run can be deleted without restoring it first"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = _finished_run(manager)
+        assert manager.archive_old_runs(older_than_days=-1) == 1
+
+        assert manager.delete(run_uuid)
+        assert manager.load(run_uuid) is None
+        assert manager.get_all_ids() == []
+
+
+def test_lost_archive_index_is_rebuilt_from_the_segments():
+    """Removed entries stay removed when the offset index is rebuilt by scanning the segments"""
+    with tempfile.TemporaryDirectory() as archive_dir:
+        archive = RunArchive(archive_dir, segment_max_bytes=200)
+        archive.put_many({f"run-{number}": {'uuid': f"run-{number}", 'step': number} for number in range(10)})
+        archive.remove_many(['run-3'])
+        archive.put_many({'run-4': {'uuid': 'run-4', 'step': 40}})
+
+        rebuilt = RunArchive(archive_dir, segment_max_bytes=200)
+        assert rebuilt.rebuild_index() == 9
+        assert rebuilt.get('run-3') is None
+        assert rebuilt.get('run-4') == {'uuid': 'run-4', 'step': 40}
+        assert rebuilt.get_many(['run-0', 'run-9']) == {'run-0': {'uuid': 'run-0', 'step': 0},
+                                                        'run-9': {'uuid': 'run-9', 'step': 9}}
+
+
+if __name__ == '__main__':
+    test_finished_run_is_archived_and_loaded_back()
+    test_runs_with_running_tasks_or_recent_activity_are_kept()
+    test_deleting_an_archived_run()
+    test_lost_archive_index_is_rebuilt_from_the_segments()
+    print("✅ Run archive tests passed")
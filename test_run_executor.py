@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test RunExecutor: tasks run in dependency order (independent ones in parallel), cycles are rejected,
+output variables are passed downstream and failures skip dependent tasks
+"""
+
+import tempfile
+import threading
+
+from flask import Flask
+
+import app.routes.agents.run_executor as run_executor
+from app.routes.agents.run_executor import RunExecutor, TaskGraphError, task_dependencies, topological_order
+from app.utils.agent_run_manager import AgentRunManager
+
+
+def _run_manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return AgentRunManager()
+
+
+def _task(uuid, depends_on=(), output_variable=None):
+    return {'uuid': uuid, 'name': uuid.upper(), 'type': 'ai', 'depends_on': list(depends_on),
+            'output_variable': output_variable}
+
+
+# a -> b -> d, c -> d; a and c are independent
+TASKS = [_task('a', output_variable='facts'), _task('b', ['a'], 'summary'), _task('c'), _task('d', ['b', 'c'])]
+
+
+def _fake_task_executor(run_manager, calls, failing=(), wait_for=None):
+    """TaskExecutor answering '<uuid> done' (or failing), recording the variables it got"""
+
+    class FakeTaskExecutor:
+        def __init__(self, run_uuid, task_uuid, task_def, task_inputs, agent, request_method, variables=None):
+            self.run_uuid = run_uuid
+            self.task_uuid = task_uuid
+            self.variables = variables
+
+        def events(self):
+            calls.append((self.task_uuid, dict(self.variables or {})))
+            if wait_for and self.task_uuid in wait_for:
+                # Only completes if the other task runs at the same time
+                wait_for[self.task_uuid][0].set()
+                assert wait_for[self.task_uuid][1].wait(5), f"{self.task_uuid} ran alone"
+            yield {'type': 'html_chunk', 'content': self.task_uuid}
+            if self.task_uuid in failing:
+                run_manager.set_task_status(self.run_uuid, self.task_uuid, 'error', 'Broken')
+                return
+            run_manager.set_task_results(self.run_uuid, self.task_uuid, {'raw_response': f"{self.task_uuid} done"})
+            run_manager.set_task_status(self.run_uuid, self.task_uuid, 'completed')
+
+    return FakeTaskExecutor
+
+
+def _execute(run_manager, agent_run, tasks, max_workers=2, **fake_options):
+    calls = []
+    originals = run_executor.TaskExecutor, run_executor.agent_run_manager
+    run_executor.TaskExecutor = _fake_task_executor(run_manager, calls, **fake_options)
+    run_executor.agent_run_manager = run_manager
+    try:
+        executor = RunExecutor(agent_run['uuid'], {'tasks': tasks}, agent_run, max_workers=max_workers)
+        events = [payload for payload in executor.events() if payload]
+    finally:
+        run_executor.TaskExecutor, run_executor.agent_run_manager = originals
+    return events, calls
+
+
+def _finished(events):
+    return [(payload['task_uuid'], payload['status']) for payload in events if payload['type'] == 'task_finished']
+
+
+def test_dependency_graph():
+    assert task_dependencies(TASKS) == {'a': [], 'b': ['a'], 'c': [], 'd': ['b', 'c']}
+    assert topological_order({'d': ['b', 'c'], 'b': ['a'], 'c': [], 'a': []}) == ['c', 'a', 'b', 'd']
+    assert task_dependencies([{'uuid': 'a', 'depends_on': 'b'}, {'uuid': 'b'}]) == {'a': ['b'], 'b': []}
+
+    for tasks, message in (([_task('a', ['b']), _task('b', ['a']), _task('c')], 'Circular task dependencies: A, B'),
+                           ([_task('a', ['a'])], 'Circular'),
+                           ([_task('a', ['missing'])], 'unknown tasks: missing')):
+        try:
+            task_dependencies(tasks)
+            raise AssertionError(f"Invalid graph accepted: {tasks}")
+        except TaskGraphError as e:
+            assert message in str(e), str(e)
+
+
+def test_tasks_run_in_dependency_order_and_pass_outputs():
+    with tempfile.TemporaryDirectory() as data_dir:
+        run_manager = _run_manager(data_dir)
+        agent_run = run_manager.create_agent_run('agent-1')
+        agent_run['inputs'] = {'topic': 'weather'}
+        # a and c must overlap: each waits until the other started
+        a_started, c_started = threading.Event(), threading.Event()
+        events, calls = _execute(run_manager, agent_run, TASKS,
+                                 wait_for={'a': (a_started, c_started), 'c': (c_started, a_started)})
+
+        assert events[0]['type'] == 'run_started'
+        assert [task['task_uuid'] for task in events[0]['tasks']] == ['a', 'c', 'b', 'd']
+        finished = [uuid for uuid, _ in _finished(events)]
+        assert finished.index('b') > finished.index('a') and finished[-1] == 'd'
+
+        variables = dict(calls)
+        assert variables['a'] == {'topic': 'weather'} and variables['c'] == {'topic': 'weather'}
+        assert variables['b'] == {'topic': 'weather', 'facts': 'a done'}
+        assert variables['d'] == {'topic': 'weather', 'facts': 'a done', 'summary': 'b done'}
+
+        # Task events are tagged with their task
+        assert {payload['task_uuid'] for payload in events if payload['type'] == 'html_chunk'} == {'a', 'b', 'c', 'd'}
+        assert events[-1]['type'] == 'run_complete' and events[-1]['status'] == 'completed'
+        assert run_manager.get_task_state(agent_run['uuid'], 'b')['outputs'] == {'summary': 'b done'}
+        assert run_manager.load(agent_run['uuid'])['status'] == 'completed'
+
+
+def test_failed_task_skips_its_dependents():
+    with tempfile.TemporaryDirectory() as data_dir:
+        run_manager = _run_manager(data_dir)
+        agent_run = run_manager.create_agent_run('agent-1')
+        events, calls = _execute(run_manager, agent_run, TASKS, failing=('a',))
+
+        assert sorted(uuid for uuid, _ in calls) == ['a', 'c']
+        assert dict(_finished(events)) == {'a': 'error', 'b': 'skipped', 'c': 'completed', 'd': 'skipped'}
+        assert run_manager.get_task_state(agent_run['uuid'], 'd')['status'] == 'skipped'
+        assert events[-1]['status'] == 'error'
+
+
+def test_completed_tasks_are_not_run_again():
+    """A resumed run starts after the completed tasks and passes their stored outputs on"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        run_manager = _run_manager(data_dir)
+        agent_run = run_manager.create_agent_run('agent-1')
+        _execute(run_manager, agent_run, TASKS, failing=('c',))
+
+        agent_run = run_manager.load(agent_run['uuid'])
+        events, calls = _execute(run_manager, agent_run, TASKS)
+        assert [uuid for uuid, _ in calls] == ['c', 'd']
+        assert dict(calls)['d'] == {'facts': 'a done', 'summary': 'b done'}
+        assert {task['task_uuid']: task['status'] for task in events[0]['tasks']}['b'] == 'completed'
+        assert events[-1]['status'] == 'completed'
+
+
+if __name__ == '__main__':
+    test_dependency_graph()
+    test_tasks_run_in_dependency_order_and_pass_outputs()
+    test_failed_task_skips_its_dependents()
+    test_completed_tasks_are_not_run_again()
+    print("✅ Run executor tests passed")
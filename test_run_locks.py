@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test the per-run locks: FIFO order within a process, no lost updates across threads and processes
+"""
+
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from flask import Flask
+
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.agents_manager import AgentsManager
+from app.utils.run_locks import RunLockManager, RunLockTimeout
+
+UPDATES_PER_WRITER = 25
+
+
+def _manager(data_dir, manager_class=AgentRunManager):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return manager_class()
+
+
+def _run_manager(data_dir):
+    return _manager(data_dir)
+
+
+def _increment(manager, run_uuid, writer):
+    """Read-modify-write of the run under its lock (a lost update shows as a missing count)"""
+    for _ in range(UPDATES_PER_WRITER):
+        with manager.transaction(run_uuid) as run:
+            run.data.setdefault('counts', {})
+            run.data['counts'][writer] = run.data['counts'].get(writer, 0) + 1
+            run.data['total'] = run.data.get('total', 0) + 1
+        assert run.committed
+
+
+def _process_writer(data_dir, run_uuid, writer):
+    _increment(_run_manager(data_dir), run_uuid, writer)
+
+
+def _colliding_run_ids(locks):
+    """Two run ids sharing a lock file"""
+    seen = {}
+    number = 0
+    while True:
+        run_id = f"run-{number}"
+        name = locks.lock_file_name(run_id)
+        if name in seen:
+            return seen[name], run_id
+        seen[name] = run_id
+        number += 1
+
+
+def _hold_in_child(lock_dir, run_id, held, release):
+    locks = RunLockManager(Path(lock_dir))
+    with locks.hold(run_id):
+        held.set()
+        release.wait(10)
+
+
+def test_no_update_is_lost_between_threads_and_processes():
+    """Two threads and two processes incrementing the same run all keep their increments"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_process_writer, args=(data_dir, run_uuid, f"process-{number}"))
+                     for number in range(2)]
+        threads = [threading.Thread(target=_increment, args=(manager, run_uuid, f"thread-{number}"))
+                   for number in range(2)]
+        for worker in processes + threads:
+            worker.start()
+        for thread in threads:
+            thread.join(120)
+        for process in processes:
+            process.join(120)
+            assert process.exitcode == 0, f"Writer process failed with exit code {process.exitcode}"
+
+        agent_run = _run_manager(data_dir).load(run_uuid)
+        assert agent_run['total'] == 4 * UPDATES_PER_WRITER
+        assert set(agent_run['counts'].values()) == {UPDATES_PER_WRITER}
+
+
+def test_threads_get_the_lock_in_arrival_order():
+    """Waiting threads are granted a run's lock first come, first served"""
+    with tempfile.TemporaryDirectory() as lock_dir:
+        locks = RunLockManager(Path(lock_dir))
+        granted = []
+
+        def wait_for_lock(number):
+            with locks.hold('run-1'):
+                granted.append(number)
+
+        threads = []
+        with locks.hold('run-1'):
+            for number in range(8):
+                thread = threading.Thread(target=wait_for_lock, args=(number,))
+                thread.start()
+                threads.append(thread)
+                # Queued before the next thread starts
+                while len(locks._locks['run-1'].waiters) <= number:
+                    time.sleep(0.001)
+        for thread in threads:
+            thread.join(10)
+
+        assert granted == list(range(8))
+
+
+def test_runs_share_a_bounded_pool_of_lock_files():
+    """Lock files do not grow with the number of runs; one thread can hold runs of the same file"""
+    with tempfile.TemporaryDirectory() as lock_dir:
+        locks = RunLockManager(Path(lock_dir), timeout=2)
+        for number in range(5000):
+            with locks.hold(f"run-{number}"):
+                pass
+        assert len(list(Path(lock_dir).iterdir())) <= 16 ** RunLockManager.LOCK_FILE_DIGITS
+
+        first, second = _colliding_run_ids(locks)
+        with locks.hold(first), locks.hold(second):
+            pass
+
+
+def test_other_process_waits_for_the_lock_file():
+    """A run held by another process times out here and is free again once released"""
+    with tempfile.TemporaryDirectory() as lock_dir:
+        context = multiprocessing.get_context('fork')
+        held, release = context.Event(), context.Event()
+        process = context.Process(target=_hold_in_child, args=(lock_dir, 'run-1', held, release))
+        process.start()
+        try:
+            assert held.wait(10)
+            locks = RunLockManager(Path(lock_dir))
+            try:
+                with locks.hold('run-1', timeout=0.2):
+                    raise AssertionError("Lock held by another process was granted")
+            except RunLockTimeout:
+                pass
+        finally:
+            release.set()
+            process.join(10)
+
+        with locks.hold('run-1', timeout=5):
+            pass
+
+
+def test_delete_waits_for_the_lock():
+    """A delete (of any collection) cannot interleave with a writer holding the item lock"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(data_dir, AgentsManager)
+        assert manager.save({'id': 'agent-1', 'name': 'Agent'})
+        deleted = threading.Event()
+
+        with manager.lock('agent-1'):
+            thread = threading.Thread(target=lambda: manager.delete('agent-1') and deleted.set())
+            thread.start()
+            time.sleep(0.2)
+            assert not deleted.is_set()
+            assert manager.load('agent-1') is not None
+        thread.join(10)
+
+        assert deleted.is_set()
+        assert manager.load('agent-1') is None
+        assert manager.delete_many(['agent-1']) == []
+
+
+if __name__ == '__main__':
+    test_no_update_is_lost_between_threads_and_processes()
+    test_threads_get_the_lock_in_arrival_order()
+    test_runs_share_a_bounded_pool_of_lock_files()
+    test_other_process_waits_for_the_lock_file()
+    test_delete_waits_for_the_lock()
+    print("✅ Run lock tests passed")
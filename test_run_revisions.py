@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test that journaled task state patches count as run revisions, so stale saves cannot drop them
+"""
+
+import tempfile
+
+from flask import Flask
+
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.base_manager import RevisionConflict
+
+
+def _run_manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return AgentRunManager()
+
+
+def _task_status(manager, run_uuid, task_uuid):
+    state = manager.get_task_state(run_uuid, task_uuid)
+    return state.get('status') if state else None
+
+
+def test_task_state_patch_bumps_revision():
+    """Every journaled patch is visible as a new revision of the loaded run"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+        revision = manager.get_revision(manager.load(run_uuid))
+
+        assert manager.update_task_state(run_uuid, 'task-1', {'status': 'running'})
+        assert manager.get_revision(manager.load(run_uuid)) == revision + 1
+
+        assert manager.set_task_results(run_uuid, 'task-1', {'raw_response': 'done'})
+        assert manager.get_revision(manager.load(run_uuid)) == revision + 2
+
+        # Folding the journal into the run keeps the revision growing
+        assert manager.compact_journal(run_uuid)
+        assert manager.get_revision(manager.load(run_uuid)) > revision + 2
+
+
+def test_stale_conditional_save_does_not_drop_patch():
+    """save(stale_run, expected_revision=...) must fail after a concurrent task state patch"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+        assert manager.update_task_state(run_uuid, 'task-1', {'status': 'pending'})
+
+        stale = manager.load(run_uuid)
+        revision = manager.get_revision(stale)
+        assert manager.update_task_state(run_uuid, 'task-1', {'status': 'completed'})
+
+        stale['name'] = 'Renamed'
+        try:
+            manager.save(stale, expected_revision=revision)
+            assert False, "Stale save was not rejected"
+        except RevisionConflict as conflict:
+            assert conflict.expected == revision
+            assert conflict.actual == revision + 1
+
+        assert _task_status(manager, run_uuid, 'task-1') == 'completed'
+
+
+def test_modify_keeps_concurrent_patch():
+    """modify() and the run setters built on it keep task state patches written meanwhile"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+        assert manager.update_task_state(run_uuid, 'task-1', {'status': 'pending'})
+
+        attempts = []
+
+        def rename(agent_run):
+            # A patch lands between the first read and the save of modify(), which then retries
+            attempts.append(agent_run.get('name'))
+            if len(attempts) == 1:
+                manager.update_task_state(run_uuid, 'task-1', {'status': 'completed'})
+            agent_run['name'] = 'Renamed'
+
+        assert manager.modify(run_uuid, rename) is not None
+        assert len(attempts) == 2
+        assert manager.load(run_uuid)['name'] == 'Renamed'
+        assert _task_status(manager, run_uuid, 'task-1') == 'completed'
+
+        assert manager.set_language_preference(run_uuid, 'de')
+        assert manager.get_language_preference(run_uuid) == 'de'
+        assert _task_status(manager, run_uuid, 'task-1') == 'completed'
+
+
+if __name__ == '__main__':
+    test_task_state_patch_bumps_revision()
+    test_stale_conditional_save_does_not_drop_patch()
+    test_modify_keeps_concurrent_patch()
+    print("✅ Run revision tests passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the store scrubber: damaged record files are repaired or quarantined and derived data is rebuilt
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from flask import Flask
+
+import app.utils.scrubber as scrubber
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.agents_manager import AgentsManager
+from app.utils.scrubber import recover_record, scrub_collection
+
+
+def _manager(data_dir, manager_class=AgentsManager, backend='json'):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    app.config['STORAGE_BACKEND'] = backend
+    with app.app_context():
+        return manager_class()
+
+
+def test_recover_record():
+    assert recover_record(b'{"id": "a"}\x00\x00\x00') == {'id': 'a'}
+    assert recover_record('﻿{"id": "a"}'.encode('utf-8')) == {'id': 'a'}
+    assert recover_record(b'{"id": "a", "name": "\xff"}}garbage') == {'id': 'a', 'name': '�'}
+    assert recover_record(b'{"id": ') is None
+    assert recover_record(b'[1, 2]') is None
+
+
+def _damage(manager):
+    """Save five agents and damage four of their files in different ways"""
+    for name in ('ok', 'nul', 'broken', 'renamed', 'temp'):
+        assert manager.save({'id': f"agent-{name}", 'name': f"Agent {name}", 'status': 'active'})
+    path = manager.backend.path_for
+
+    with open(path('agent-nul'), 'ab') as f:
+        f.write(b'\x00' * 64)
+    path('agent-broken').write_bytes(b'{"id": "agent-bro')
+    path('agent-renamed').write_text('{"id": "agent-other", "name": "Agent renamed", "status": "inactive"}')
+    # Interrupted write: damaged record next to its complete temporary file
+    temp_path = path('agent-temp').with_suffix('.tmp')
+    temp_path.write_text('{"id": "agent-temp", "name": "Agent temp v2", "status": "draft"}')
+    path('agent-temp').write_bytes(b'')
+
+    stale = path('agent-ok').with_name('agent-old.tmp')
+    stale.write_text('{}')
+    os.utime(stale, (time.time() - 3600, time.time() - 3600))
+    fresh = path('agent-ok').with_name('agent-writing.tmp')
+    fresh.write_text('{}')
+    return stale, fresh
+
+
+def test_damaged_files_are_repaired_or_quarantined():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(data_dir)
+        stale, fresh = _damage(manager)
+
+        report = scrub_collection(manager)
+        assert {key: report[key] for key in ('files', 'ok', 'repaired', 'quarantined', 'errors', 'items',
+                                             'temp_removed')} == \
+            {'files': 5, 'ok': 1, 'repaired': 3, 'quarantined': 1, 'errors': 0, 'items': 4, 'temp_removed': 1}
+
+        # A reader that cached the old state sees the repairs
+        reader = _manager(data_dir)
+        assert reader.load('agent-nul')['name'] == 'Agent nul'
+        assert reader.load('agent-renamed')['id'] == 'agent-renamed'
+        assert reader.load('agent-temp')['name'] == 'Agent temp v2'
+        assert reader.load('agent-broken') is None
+        assert not manager.backend.path_for('agent-temp').with_suffix('.tmp').exists()
+        assert not stale.exists() and fresh.exists()
+
+        quarantined = list((Path(data_dir) / '_quarantine' / 'agents').iterdir())
+        assert [path.name.split('.json')[0] for path in quarantined] == ['agent-broken']
+
+        # Derived data follows the repaired records
+        assert manager.get_counts('status') == {'active': 2, 'inactive': 1, 'draft': 1}
+        assert sorted(manager.get_all_ids()) == ['agent-nul', 'agent-ok', 'agent-renamed', 'agent-temp']
+        assert [agent['id'] for agent in manager.search('renamed')] == ['agent-renamed']
+
+        # A second pass finds nothing to do
+        report = scrub_collection(manager)
+        assert (report['ok'], report['repaired'], report['quarantined']) == (4, 0, 0)
+
+
+def test_without_repair_damaged_files_are_quarantined():
+    """--no-repair: damaged files are moved away, readable ones are left as they are"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(data_dir)
+        _damage(manager)
+        renamed = manager.backend.path_for('agent-renamed').read_bytes()
+
+        report = scrub_collection(manager, repair=False)
+        assert (report['ok'], report['repaired'], report['quarantined']) == (2, 0, 3)
+        assert manager.backend.path_for('agent-renamed').read_bytes() == renamed
+        assert manager.backend.path_for('agent-temp').with_suffix('.tmp').exists()
+        assert sorted(manager.get_all_ids()) == ['agent-ok', 'agent-renamed']
+
+
+def test_sharded_collection_on_a_process_pool():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(data_dir, AgentRunManager)
+        run_uuids = [manager.create_agent_run('agent-1')['uuid'] for _ in range(20)]
+        manager.backend.path_for(run_uuids[0]).write_bytes(b'{"uuid": ')
+        with open(manager.backend.path_for(run_uuids[1]), 'ab') as f:
+            f.write(b'\x00\x00')
+
+        originals = scrubber.MIN_PARALLEL_FILES, scrubber.CHUNK_SIZE
+        scrubber.MIN_PARALLEL_FILES, scrubber.CHUNK_SIZE = 1, 3
+        try:
+            with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('fork')) as executor:
+                report = scrub_collection(manager, executor)
+        finally:
+            scrubber.MIN_PARALLEL_FILES, scrubber.CHUNK_SIZE = originals
+
+        assert (report['files'], report['ok'], report['repaired'], report['quarantined']) == (20, 18, 1, 1)
+        assert report['items'] == 19
+        assert _manager(data_dir, AgentRunManager).load(run_uuids[0]) is None
+        assert manager.count_all() == 19
+
+
+def test_sqlite_collection_only_rebuilds_derived_data():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _manager(data_dir, backend='sqlite')
+        assert manager.save({'id': 'agent-1', 'name': 'Agent', 'status': 'active'})
+        report = scrub_collection(manager)
+        assert report['items'] == 1 and report['files'] == 0
+        assert manager.get_counts('status') == {'active': 1}
+
+
+if __name__ == '__main__':
+    test_recover_record()
+    test_damaged_files_are_repaired_or_quarantined()
+    test_without_repair_damaged_files_are_quarantined()
+    test_sharded_collection_on_a_process_pool()
+    test_sqlite_collection_only_rebuilds_derived_data()
+    print("✅ Scrubber tests passed")
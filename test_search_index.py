@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the full-text search index behind DataManager.search(): prefix matching, AND queries, ranking, upkeep
+"""
+
+import tempfile
+
+from flask import Flask
+
+from app.utils.agents_manager import AgentsManager
+from app.utils.search_index import tokenize
+
+
+def _agents_manager(data_dir):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    with app.app_context():
+        return AgentsManager()
+
+
+def _ids(items):
+    return [item['id'] for item in items]
+
+
+def _save_agents(manager):
+    assert manager.save({'id': 'weather', 'name': 'Weather Report', 'description': 'Daily forecast'})
+    assert manager.save({'id': 'stocks', 'name': 'Stock Report', 'description': 'Weather of the markets'})
+    assert manager.save({'id': 'calendar', 'name': 'Calendar', 'description': 'Daily agenda'})
+
+
+def test_tokenize():
+    assert tokenize('Wetter-Bericht für 2024!') == ['wetter', 'bericht', 'für', '2024']
+    assert tokenize(None) == [] and tokenize(42) == []
+
+
+def test_query_words_match_word_starts():
+    """A query word matches words starting with it, not text in the middle of a word"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager)
+
+        assert _ids(manager.search('cal')) == ['calendar']
+        assert _ids(manager.search('WEATH')) == ['stocks', 'weather']
+        assert manager.search('ather') == []
+        assert manager.search('endar') == []
+
+
+def test_all_query_words_must_match():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager)
+
+        assert _ids(manager.search('daily')) == ['calendar', 'weather']
+        assert _ids(manager.search('daily weather')) == ['weather']
+        assert _ids(manager.search('report market')) == ['stocks']
+        assert manager.search('daily stock') == []
+
+
+def test_ranked_results_weight_fields_and_exact_words():
+    """Name matches rank above description matches, whole words above prefixes"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager)
+        assert manager.save({'id': 'weatherman', 'name': 'Weatherman', 'description': ''})
+
+        scores = manager.search_scores('weather')
+        assert scores == {'weather': 3, 'weatherman': 1.5, 'stocks': 1}
+        assert _ids(manager.search('weather', ranked=True)) == ['weather', 'weatherman', 'stocks']
+        assert _ids(manager.search('weather', ranked=True, limit=1)) == ['weather']
+        assert _ids(manager.search('weather', limit=2)) == ['stocks', 'weather']
+
+
+def test_index_follows_saves_and_deletes():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        _save_agents(manager)
+
+        agent = manager.load('calendar')
+        agent['name'] = 'Planner'
+        assert manager.save(agent)
+        assert manager.search('calendar') == []
+        assert _ids(manager.search('plan')) == ['calendar']
+
+        assert manager.delete('weather')
+        assert _ids(manager.search('weather')) == ['stocks']
+        assert manager.search('forecast') == []
+
+        # The persisted index is read by other processes and can be rebuilt from the records
+        other = _agents_manager(data_dir)
+        assert _ids(other.search('plan')) == ['calendar']
+        assert other.search('forecast') == []
+        other.rebuild_search_index()
+        assert other.search_scores('report') == {'stocks': 3}
+
+
+def test_queries_without_words_fall_back_to_substring_matching():
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _agents_manager(data_dir)
+        assert manager.save({'id': 'a', 'name': 'C++ helper'})
+        assert manager.search_scores('++') is None
+        assert _ids(manager.search('++')) == ['a']
+
+
+if __name__ == '__main__':
+    test_tokenize()
+    test_query_words_match_word_starts()
+    test_all_query_words_must_match()
+    test_ranked_results_weight_fields_and_exact_words()
+    test_index_follows_saves_and_deletes()
+    test_queries_without_words_fall_back_to_substring_matching()
+    print("✅ Search index tests passed")
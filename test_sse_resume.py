@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test resuming job event streams with Last-Event-ID: no event is repeated or lost, nothing is executed again
+"""
+
+import json
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+import app.routes.agents.streaming_api as streaming_api
+import app.utils.job_queue as job_queue_module
+from app import create_app
+from app.config import Config
+from app.routes.agents.task_jobs import task_job_key
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.job_queue import get_job_queue
+
+
+def _app(data_dir, event_buffer=5000):
+    class StreamConfig(Config):
+        DATA_DIR = data_dir
+        JOB_QUEUE_DB = None
+        JOB_WORKERS_AUTOSTART = False
+        JOB_EVENT_BUFFER = event_buffer
+        WTF_CSRF_ENABLED = False
+    return create_app(StreamConfig)
+
+
+def _parse(body):
+    """(id, payload) of the SSE messages of a response body, comments left out"""
+    messages = []
+    for block in body.decode('utf-8').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'data' in fields:
+            messages.append((fields.get('id'), json.loads(fields['data'])))
+    return messages
+
+
+def _job_with_events(queue, count, dedupe_key=None, finish=True):
+    job, _ = queue.enqueue('task', {}, dedupe_key=dedupe_key)
+    assert queue.claim('worker-1', ['task'])['id'] == job['id']
+    for number in range(1, count + 1):
+        queue.add_event(job['id'], {'type': 'html_chunk', 'content': f"part {number}"})
+    if finish:
+        queue.finish(job['id'], 'done')
+    return job
+
+
+def test_stream_resumes_after_last_event_id():
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir)
+        with app.app_context():
+            queue = get_job_queue()
+        job = _job_with_events(queue, 5)
+        client = app.test_client()
+
+        messages = _parse(client.get(f"/agents/api/jobs/{job['id']}/stream").data)
+        assert messages[0] == (f"{job['id']}:0", {'type': 'job', 'job_id': job['id'], 'status': 'done'})
+        assert [message_id for message_id, _ in messages[1:]] == [f"{job['id']}:{seq}" for seq in range(1, 6)]
+
+        messages = _parse(client.get(f"/agents/api/jobs/{job['id']}/stream",
+                                     headers={'Last-Event-ID': f"{job['id']}:3"}).data)
+        assert messages[0][1]['resumed_after'] == 3 and messages[0][1]['missed'] == 0
+        assert [payload['content'] for _, payload in messages[1:]] == ['part 4', 'part 5']
+
+        # Query parameter for clients that cannot set headers; ids of other jobs start over
+        messages = _parse(client.get(f"/agents/api/jobs/{job['id']}/stream?last_event_id={job['id']}:4").data)
+        assert [payload['content'] for _, payload in messages[1:]] == ['part 5']
+        messages = _parse(client.get(f"/agents/api/jobs/{job['id']}/stream",
+                                     headers={'Last-Event-ID': 'other-job:4'}).data)
+        assert len(messages) == 6
+
+
+def test_resumed_stream_follows_a_running_job():
+    """Events appended after the reconnect are streamed until the job finishes"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir)
+        with app.app_context():
+            queue = get_job_queue()
+        job = _job_with_events(queue, 2, finish=False)
+
+        def finish_later():
+            time.sleep(0.3)
+            queue.add_event(job['id'], {'type': 'html_chunk', 'content': 'part 3'})
+            queue.add_event(job['id'], {'type': 'complete'})
+            queue.finish(job['id'], 'done')
+
+        worker = threading.Thread(target=finish_later)
+        worker.start()
+        messages = _parse(app.test_client().get(f"/agents/api/jobs/{job['id']}/stream",
+                                                headers={'Last-Event-ID': f"{job['id']}:1"}).data)
+        worker.join()
+        assert messages[0][1]['status'] == 'running'
+        assert [message_id for message_id, _ in messages[1:]] == [f"{job['id']}:{seq}" for seq in (2, 3, 4)]
+        assert messages[-1][1] == {'type': 'complete'}
+
+
+def test_events_beyond_the_replay_buffer_are_reported_as_missed():
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir, event_buffer=3)
+        with app.app_context():
+            queue = get_job_queue()
+        original = job_queue_module.TRIM_INTERVAL
+        job_queue_module.TRIM_INTERVAL = 1
+        try:
+            job = _job_with_events(queue, 8)
+        finally:
+            job_queue_module.TRIM_INTERVAL = original
+
+        messages = _parse(app.test_client().get(f"/agents/api/jobs/{job['id']}/stream",
+                                                headers={'Last-Event-ID': f"{job['id']}:2"}).data)
+        assert messages[0][1]['missed'] == 3
+        assert [payload['content'] for _, payload in messages[1:]] == ['part 6', 'part 7', 'part 8']
+
+
+def test_task_stream_resume_does_not_execute_again():
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir)
+        with app.app_context():
+            queue = get_job_queue()
+        job = _job_with_events(queue, 3, dedupe_key=task_job_key('run-1', 'task-1'))
+        url = '/agents/api/agent_run/run-1/task_execute/task-1/stream'
+        client = app.test_client()
+
+        messages = _parse(client.get(url, headers={'Last-Event-ID': f"{job['id']}:2"}).data)
+        assert messages[0][1]['job_id'] == job['id']
+        assert [payload['content'] for _, payload in messages[1:]] == ['part 3']
+        assert queue.get_stats().get('queued', 0) == 0
+
+        # The id of another task's job is not resumed here
+        messages = _parse(client.get('/agents/api/agent_run/run-1/task_execute/task-2/stream',
+                                     headers={'Last-Event-ID': f"{job['id']}:2"}).data)
+        assert messages[0][1]['type'] == 'error' and 'expired' in messages[0][1]['error']
+
+
+def test_task_stream_of_a_purged_job_sends_the_stored_result():
+    with tempfile.TemporaryDirectory() as data_dir:
+        app = _app(data_dir)
+        manager_app = Flask(__name__)
+        manager_app.config['DATA_DIR'] = data_dir
+        with manager_app.app_context():
+            run_manager = AgentRunManager()
+        run_uuid = run_manager.create_agent_run('agent-1')['uuid']
+        run_manager.set_task_results(run_uuid, 'task-1', {'html_output': '<p>Done</p>', 'raw_response': 'Done'})
+        run_manager.set_task_status(run_uuid, 'task-1', 'completed')
+
+        original = streaming_api.agent_run_manager
+        streaming_api.agent_run_manager = run_manager
+        try:
+            messages = _parse(app.test_client().get(f"/agents/api/agent_run/{run_uuid}/task_execute/task-1/stream",
+                                                    headers={'Last-Event-ID': 'purged-job:7'}).data)
+        finally:
+            streaming_api.agent_run_manager = original
+        assert [payload['type'] for _, payload in messages] == ['final_content', 'complete']
+        assert messages[1][1]['html_result'] == '<p>Done</p>'
+
+
+if __name__ == '__main__':
+    test_stream_resumes_after_last_event_id()
+    test_resumed_stream_follows_a_running_job()
+    test_events_beyond_the_replay_buffer_are_reported_as_missed()
+    test_task_stream_resume_does_not_execute_again()
+    test_task_stream_of_a_purged_job_sends_the_stored_result()
+    print("✅ SSE resume tests passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the storage backends (JSON files and SQLite) behind DataManager and the JSON to SQLite import
+"""
+
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from flask import Flask
+
+from app.utils.agents_manager import AgentsManager
+from app.utils.storage_backends import JsonFileBackend, SQLiteBackend, import_json_collections
+
+
+def _agents_manager(data_dir, backend):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    app.config['STORAGE_BACKEND'] = backend
+    with app.app_context():
+        return AgentsManager()
+
+
+def _backends(temp_dir):
+    return [JsonFileBackend(Path(temp_dir) / 'json' / 'agents', pretty=False, sharded=True),
+            SQLiteBackend(Path(temp_dir) / 'vntrai.db', 'agents')]
+
+
+def test_backend_round_trip():
+    """Both backends read, list, find and remove what was written"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for backend in _backends(temp_dir):
+            backend.write('a', {'id': 'a', 'name': 'Alpha', 'agent_uuid': 'agent-1'})
+            backend.write_many({'b': {'id': 'b', 'name': 'Beta', 'agent_uuid': 'agent-1'},
+                                'c': {'id': 'c', 'name': 'Gamma', 'agent_uuid': 'agent-2'}})
+
+            assert backend.read('a') == {'id': 'a', 'name': 'Alpha', 'agent_uuid': 'agent-1'}
+            assert backend.read('missing') is None
+            assert sorted(backend.list_ids()) == ['a', 'b', 'c']
+            assert sorted(backend.read_many(['a', 'c', 'missing'])) == ['a', 'c']
+            found = backend.find_ids('agent_uuid', 'agent-1')
+            assert found is None or sorted(found) == ['a', 'b'], backend.name
+
+            assert backend.remove('a') and not backend.remove('a')
+            assert sorted(backend.remove_many(['b', 'missing'])) == ['b']
+            assert backend.list_ids() == ['c'] and not backend.exists('b')
+
+
+def test_signature_changes_on_every_write_and_after_recreate():
+    """A record deleted and written again never gets a signature it had before"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        backend = SQLiteBackend(Path(temp_dir) / 'vntrai.db', 'agents')
+        seen = set()
+        for content in ('first', 'second'):
+            backend.write('a', {'id': 'a', 'name': content})
+            seen.add(backend.signature('a'))
+        backend.remove('a')
+        backend.write('a', {'id': 'a', 'name': 'recreated'})
+        assert backend.signature('a') not in seen
+        assert len(seen) == 2
+
+        # Another connection (process) continues the same counter
+        other = SQLiteBackend(Path(temp_dir) / 'vntrai.db', 'agents')
+        other.write('b', {'id': 'b'})
+        assert other.signature('b') > backend.signature('a')
+        assert dict(other.list_signatures()) == {'a': backend.signature('a'), 'b': other.signature('b')}
+
+
+def test_sqlite_database_uses_wal():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        SQLiteBackend(Path(temp_dir) / 'vntrai.db', 'agents')
+        conn = sqlite3.connect(str(Path(temp_dir) / 'vntrai.db'))
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        conn.close()
+
+
+def test_manager_round_trip_on_both_backends():
+    """load/save/delete/load_all/search work the same on JSON files and SQLite"""
+    for backend in ('json', 'sqlite'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            manager = _agents_manager(data_dir, backend)
+            assert manager.backend.name == backend
+            assert manager.save({'id': 'a', 'name': 'Weather report', 'status': 'active'})
+            assert manager.save({'id': 'b', 'name': 'Stock report', 'status': 'inactive'})
+
+            assert manager.load('a')['name'] == 'Weather report'
+            assert sorted(item['id'] for item in manager.load_all()) == ['a', 'b']
+            assert [item['id'] for item in manager.search('weather')] == ['a']
+            assert sorted(item['id'] for item in manager.search('report')) == ['a', 'b']
+
+            assert manager.delete('a')
+            assert manager.load('a') is None
+            assert [item['id'] for item in manager.load_all()] == ['b']
+            assert manager.search('weather') == []
+
+
+def test_other_instance_does_not_serve_a_recreated_record_from_its_cache():
+    """Deleting and re-creating a record in another process invalidates this process' cached copy"""
+    for backend in ('json', 'sqlite'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            reader = _agents_manager(data_dir, backend)
+            writer = _agents_manager(data_dir, backend)
+            assert writer.save({'id': 'a', 'name': 'Old'})
+            assert reader.load('a')['name'] == 'Old'
+
+            assert writer.delete('a')
+            assert writer.save({'id': 'a', 'name': 'New'})
+            assert reader.load('a')['name'] == 'New', backend
+
+
+def test_import_json_collections():
+    """Records of the JSON directories (flat and sharded) are imported; broken files are reported"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        source = JsonFileBackend(Path(data_dir) / 'agentrun', pretty=False, sharded=True)
+        source.write('run-1', {'uuid': 'run-1', 'agent_uuid': 'agent-1', 'status': 'created'})
+        (Path(data_dir) / 'agentrun' / 'run-2.json').write_text(json.dumps({'uuid': 'run-2', 'agent_uuid': 'agent-1'}))
+        (Path(data_dir) / 'agentrun' / 'broken.json').write_text('{"uuid": ')
+        (Path(data_dir) / 'agents').mkdir()
+        (Path(data_dir) / 'agents' / 'agent-1.json').write_text(json.dumps({'id': 'agent-1', 'name': 'Agent'}))
+
+        db_path = Path(data_dir) / 'vntrai.db'
+        report = import_json_collections(Path(data_dir), db_path)
+        assert report == {'agents': {'imported': 1, 'failed': 0},
+                          'agentrun': {'imported': 2, 'failed': 1}}
+
+        runs = SQLiteBackend(db_path, 'agentrun')
+        assert sorted(runs.find_ids('agent_uuid', 'agent-1')) == ['run-1', 'run-2']
+        assert SQLiteBackend(db_path, 'agents').read('agent-1') == {'id': 'agent-1', 'name': 'Agent'}
+
+        # Re-running the import overwrites instead of duplicating
+        assert import_json_collections(Path(data_dir), db_path)['agentrun'] == {'imported': 2, 'failed': 1}
+        assert sorted(runs.list_ids()) == ['run-1', 'run-2']
+
+
+if __name__ == '__main__':
+    test_backend_round_trip()
+    test_signature_changes_on_every_write_and_after_recreate()
+    test_sqlite_database_uses_wal()
+    test_manager_round_trip_on_both_backends()
+    test_other_instance_does_not_serve_a_recreated_record_from_its_cache()
+    test_import_json_collections()
+    print("✅ Storage backend tests passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the summary log shared by worker processes: incremental replay, compaction and concurrent appends
+"""
+
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+from app.utils.summary_store import SummaryStore
+
+PROCESSES = 4
+ITEMS_PER_PROCESS = 10
+UPDATES_PER_ITEM = 30
+
+
+class SmallStore(SummaryStore):
+    """Store that compacts its log after a few lines"""
+
+    COMPACT_MIN_LINES = 20
+
+
+def _writer(log_path, worker):
+    store = SmallStore(Path(log_path), counted_fields=['status'])
+    store.ensure_loaded(lambda: [])
+    for step in range(UPDATES_PER_ITEM):
+        for number in range(ITEMS_PER_PROCESS):
+            store.put(f"{worker}-{number}", {'status': 'new', 'step': step})
+    for number in range(ITEMS_PER_PROCESS):
+        store.put(f"{worker}-{number}", {'status': 'done', 'step': UPDATES_PER_ITEM})
+
+
+def test_other_instance_sees_appends():
+    """A second instance (another process) replays only what was appended since its last look"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_path = Path(temp_dir) / 'summaries.jsonl'
+        writer = SummaryStore(log_path, counted_fields=['status'])
+        writer.ensure_loaded(lambda: [('a', {'status': 'new'})])
+
+        reader = SummaryStore(log_path, counted_fields=['status'])
+        reader.ensure_loaded(lambda: [])
+        assert reader.all() == {'a': {'status': 'new'}}
+
+        writer.put('b', {'status': 'done'})
+        writer.remove('a')
+        reader.ensure_loaded(lambda: [])
+        assert reader.all() == {'b': {'status': 'done'}}
+        assert reader.counts('status') == {'done': 1}
+
+
+def test_compaction_is_detected_by_readers():
+    """A reader notices a compacted log and replays it instead of reading at its old offset"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_path = Path(temp_dir) / 'summaries.jsonl'
+        writer = SmallStore(log_path)
+        writer.ensure_loaded(lambda: [])
+        reader = SmallStore(log_path)
+        reader.ensure_loaded(lambda: [])
+
+        for number in range(30):
+            writer.put('item', {'step': number})
+        assert len(log_path.read_bytes().splitlines()) < 30, "Log was not compacted"
+
+        reader.ensure_loaded(lambda: [])
+        assert reader.all() == {'item': {'step': 29}}
+        assert not list(Path(temp_dir).glob('*.tmp')), "Temporary log files were left behind"
+
+
+def test_no_summary_is_lost_while_several_processes_compact():
+    """Appends of other processes survive the compactions, a fresh instance sees every summary"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log_path = Path(temp_dir) / 'summaries.jsonl'
+        SmallStore(log_path).ensure_loaded(lambda: [])
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_writer, args=(str(log_path), worker))
+                     for worker in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(120)
+            assert process.exitcode == 0, f"Writer process failed with exit code {process.exitcode}"
+
+        store = SmallStore(log_path, counted_fields=['status'])
+        store.ensure_loaded(lambda: [])
+        assert store.size() == PROCESSES * ITEMS_PER_PROCESS
+        assert store.counts('status') == {'done': PROCESSES * ITEMS_PER_PROCESS}
+
+
+if __name__ == '__main__':
+    test_other_instance_sees_appends()
+    test_compaction_is_detected_by_readers()
+    test_no_summary_is_lost_while_several_processes_compact()
+    print("✅ Summary store tests passed")
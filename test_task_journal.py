@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the task state journal: patches are appended, replayed on load and folded into the run
+"""
+
+import tempfile
+
+from flask import Flask
+
+from app.utils.agent_run_manager import AgentRunManager
+from app.utils.task_journal import TaskStateJournal, apply_task_patch
+
+
+def _run_manager(data_dir, compact_entries=50):
+    app = Flask(__name__)
+    app.config['DATA_DIR'] = data_dir
+    app.config['TASK_JOURNAL_COMPACT_ENTRIES'] = compact_entries
+    with app.app_context():
+        return AgentRunManager()
+
+
+def test_apply_task_patch_is_idempotent():
+    """Replaying an entry over a snapshot that already contains it changes nothing"""
+    agent_run = {'task_states': [{'task_uuid': 'task-1', 'status': 'pending'}]}
+    entry = {'patches': [
+        {'task_uuid': 'task-1', 'state': {'status': 'completed'}, 'at': '2024-01-01T10:00:00'},
+        {'task_uuid': 'task-2', 'state': {'status': 'running'}, 'at': '2024-01-01T10:00:01'}
+    ], 'at': '2024-01-01T10:00:01'}
+
+    apply_task_patch(agent_run, entry)
+    once = {key: value for key, value in agent_run.items()}
+    apply_task_patch(agent_run, entry)
+
+    assert agent_run == once
+    assert [state['status'] for state in agent_run['task_states']] == ['completed', 'running']
+
+
+def test_patches_are_journaled_without_rewriting_the_run():
+    """update_task_state appends to the journal; loads replay it on top of the unchanged run file"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+        run_signature = manager.backend.signature(run_uuid)
+
+        assert manager.update_task_state(run_uuid, 'task-1', {'status': 'running'})
+        assert manager.set_task_outputs(run_uuid, 'task-1', {'result': 'ok'})
+
+        assert manager.backend.signature(run_uuid) == run_signature
+        assert len(manager._journal.read(run_uuid)) == 2
+        task_state = manager.get_task_state(run_uuid, 'task-1')
+        assert task_state['status'] == 'running' and task_state['outputs'] == {'result': 'ok'}
+
+        # Another worker process (fresh manager) sees the same state
+        assert _run_manager(data_dir).get_task_state(run_uuid, 'task-1')['outputs'] == {'result': 'ok'}
+
+
+def test_transaction_commits_one_entry():
+    """All task state changes of a transaction are committed as a single journal entry"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+
+        with manager.transaction(run_uuid) as run:
+            run.set_task_status('task-1', 'running')
+            run.set_task_results('task-1', {'raw_response': 'done'})
+            run.set_task_status('task-1', 'completed')
+        assert run.committed
+
+        assert len(manager._journal.read(run_uuid)) == 1
+        task_state = manager.get_task_state(run_uuid, 'task-1')
+        assert task_state['status'] == 'completed' and task_state['results'] == {'raw_response': 'done'}
+
+
+def test_journal_is_compacted_into_the_run():
+    """After TASK_JOURNAL_COMPACT_ENTRIES patches the journal is folded into the run file"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        manager = _run_manager(data_dir, compact_entries=5)
+        run_uuid = manager.create_agent_run('agent-1')['uuid']
+
+        for number in range(5):
+            assert manager.update_task_state(run_uuid, 'task-1', {'status': 'running', 'step': number})
+
+        assert manager._journal.read(run_uuid) == []
+        assert manager.backend.read(run_uuid)['task_states'][0]['step'] == 4
+        assert manager.get_task_state(run_uuid, 'task-1')['step'] == 4
+
+
+def test_journal_ignores_torn_last_line():
+    """A trailing line without newline (append in progress or crash) is not replayed"""
+    with tempfile.TemporaryDirectory() as journal_dir:
+        journal = TaskStateJournal(journal_dir)
+        journal.append('run-1', {'task_uuid': 'task-1', 'state': {'status': 'running'}, 'at': 'now'})
+        with open(journal.path_for('run-1'), 'ab') as f:
+            f.write(b'{"task_uuid": "task-1", "state": {"sta')
+
+        assert [entry['state'] for entry in journal.read('run-1')] == [{'status': 'running'}]
+
+
+if __name__ == '__main__':
+    test_apply_task_patch_is_idempotent()
+    test_patches_are_journaled_without_rewriting_the_run()
+    test_transaction_commits_one_entry()
+    test_journal_is_compacted_into_the_run()
+    test_journal_ignores_torn_last_line()
+    print("✅ Task journal tests passed")